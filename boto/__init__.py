@@ -26,16 +26,13 @@
 #
 from boto.pyami.config import Config, BotoConfigLocations
 from boto.storage_uri import BucketStorageUri, FileStorageUri
-import boto.plugin
 import datetime
 import os
-import platform
 import re
 import sys
 import logging
-import logging.config
 
-from boto.compat import urlparse
+from boto.compat import lazy_import, urlparse
 from boto.exception import InvalidUriError
 
 __version__ = '2.46.1'
@@ -44,14 +41,28 @@ Version = __version__  # for backware compatibility
 # http://bugs.python.org/issue7980
 datetime.datetime.strptime('', '')
 
-UserAgent = 'Boto/%s Python/%s %s/%s' % (
-    __version__,
-    platform.python_version(),
-    platform.system(),
-    platform.release()
-)
+
+def _platform_info():
+    # os.uname gives the same answer as the platform module, which is
+    # slow to import, wherever it is available.
+    if hasattr(os, 'uname'):
+        system, _, release = os.uname()[:3]
+    else:
+        import platform
+        system, release = platform.system(), platform.release()
+    return sys.version.split()[0], system, release
+
+
+UserAgent = 'Boto/%s Python/%s %s/%s' % ((__version__,) + _platform_info())
 config = Config()
 
+# Service packages are only imported when they are first used.
+lazy_import(globals())
+if sys.version_info < (3, 7):
+    # Submodules can only be loaded on first access from Python 3.7, so
+    # keep loading the one importing boto has always loaded.
+    import boto.plugin
+
 # Regex to disallow buckets violating charset or not [3..255] chars total.
 BUCKET_NAME_RE = re.compile(r'^[a-zA-Z0-9][a-zA-Z0-9\._-]{1,253}[a-zA-Z0-9]$')
 # Regex to disallow buckets with individual DNS labels longer than 63.
@@ -63,6 +74,11 @@ ENDPOINTS_PATH = os.path.join(os.path.dirname(__file__), 'endpoints.json')
 
 
 def init_logging():
+    # Only a config file with a [loggers] section can configure logging,
+    # so logging.config is not worth importing without one.
+    if not config.has_section('loggers'):
+        return
+    import logging.config
     for file in BotoConfigLocations:
         try:
             logging.config.fileConfig(os.path.expanduser(file))
@@ -1206,11 +1222,14 @@ def storage_uri_for_key(key):
     :type key: :class:`boto.s3.key.Key` or subclass
     :param key: URI naming bucket + optional object.
     """
-    if not isinstance(key, boto.s3.key.Key):
+    from boto.s3.key import Key
+    if not isinstance(key, Key):
         raise InvalidUriError('Requested key (%s) is not a subclass of '
                               'boto.s3.key.Key' % str(type(key)))
     prov_name = key.bucket.connection.provider.get_provider_name()
     uri_str = '%s://%s/%s' % (prov_name, key.bucket.name, key.name)
     return storage_uri(uri_str)
 
-boto.plugin.load_plugins(config)
+if config.has_option('Plugin', 'plugin_directory'):
+    import boto.plugin
+    boto.plugin.load_plugins(config)
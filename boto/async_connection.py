@@ -0,0 +1,443 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+"""
+Handles asynchronous connections to AWS.
+
+This module requires Python 3.5 or later (it uses ``async def`` and
+keyword-only arguments), although the rest of boto still supports
+Python 2.6 and later; it is never imported by boto itself.
+
+The connection classes here build, sign and parse requests exactly like
+their blocking counterparts in :mod:`boto.connection`, but send them
+with asyncio on a pool of HTTP/1.1 keep-alive connections, so a single
+thread can have many thousands of requests in flight::
+
+    conn = AsyncAWSQueryConnection(host='sqs.us-east-1.amazonaws.com')
+    status = await conn.get_status('SetQueueAttributes', params,
+                                   path=queue_path)
+
+Because ``make_request`` delegates to ``_mexe``, calling
+``make_request`` on these classes returns an awaitable that resolves
+to an :class:`AsyncHTTPResponse`.
+
+Only Query API services are supported.  :class:`AsyncAWSQueryConnection`
+provides coroutine versions of ``get_list``, ``get_object`` and
+``get_status``; services whose connections override ``make_request``
+or parse responses in their own methods, such as DynamoDB and S3, have
+no asynchronous counterpart here.
+
+The connection's ``timeout`` bounds each attempt at a request,
+connecting, sending and reading the response included, rather than the
+whole call with its retries.  Time spent waiting for one of the host's
+``max_connections_per_host`` slots is not counted.
+"""
+import asyncio
+import random
+import ssl
+import time
+from datetime import datetime
+
+import boto
+from boto import config
+from boto.compat import BytesIO, http_client, six, urlparse
+from boto.connection import AWSAuthConnection, AWSQueryConnection
+from boto.connection import ConnectionPool
+from boto.exception import BotoClientError, BotoServerError
+from boto.exception import PleaseRetryException
+
+
+class AsyncHTTPResponse(object):
+    """
+    A fully read HTTP response.
+
+    It provides the parts of the :class:`http_client.HTTPResponse`
+    interface that boto's response parsing relies on, so responses can
+    be handed to the same parsing code used for blocking requests.
+    """
+    def __init__(self, status, reason, headers, body):
+        self.status = status
+        self.reason = reason
+        self._headers = headers
+        self.msg = http_client.HTTPMessage()
+        for name, value in headers:
+            self.msg[name] = value
+        self._body = body
+        self._fp = BytesIO(body)
+
+    def getheader(self, name, default=None):
+        return self.msg.get(name, default)
+
+    def getheaders(self):
+        return list(self._headers)
+
+    def read(self, amt=None):
+        """
+        Read the response body.  Like :class:`boto.connection.HTTPResponse`,
+        calling this without ``amt`` always returns the whole body.
+        """
+        if amt is None:
+            return self._body
+        return self._fp.read(amt)
+
+    def isclosed(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class _AsyncHTTPConnection(object):
+    """
+    An HTTP/1.1 connection over an asyncio stream pair, opened by the
+    first request sent on it.
+    """
+
+    def __init__(self, ssl_context=None):
+        self.ssl_context = ssl_context
+        self.reader = None
+        self.writer = None
+        self.reusable = True
+
+    def close(self):
+        self.reusable = False
+        if self.writer is not None:
+            self.writer.close()
+
+    async def request(self, method, host, port, is_secure, path, body,
+                      headers):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                host, port, ssl=self.ssl_context if is_secure else None)
+        lines = ['%s %s HTTP/1.1' % (method, path)]
+        names = set(name.lower() for name in headers)
+        if 'host' not in names:
+            if port == (443 if is_secure else 80):
+                lines.append('Host: %s' % host)
+            else:
+                lines.append('Host: %s:%s' % (host, port))
+        if 'accept-encoding' not in names:
+            lines.append('Accept-Encoding: identity')
+        for name, value in headers.items():
+            lines.append('%s: %s' % (name, value))
+        data = ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8')
+        if isinstance(body, six.text_type):
+            body = body.encode('utf-8')
+        if body:
+            data += body
+        self.writer.write(data)
+        await self.writer.drain()
+        return await self._read_response(method)
+
+    async def _read_response(self, method):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise http_client.BadStatusLine('Connection closed by server')
+        parts = status_line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+        if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+            raise http_client.BadStatusLine(status_line)
+        version = parts[0]
+        status = int(parts[1])
+        reason = parts[2] if len(parts) > 2 else ''
+        headers = []
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers.append((name.strip(), value.strip()))
+        lower = dict((name.lower(), value) for name, value in headers)
+        if version == 'HTTP/1.0' or \
+                lower.get('connection', '').lower() == 'close':
+            self.reusable = False
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            body = b''
+        elif lower.get('transfer-encoding', '').lower() == 'chunked':
+            body = await self._read_chunked()
+        elif 'content-length' in lower:
+            body = await self.reader.readexactly(
+                int(lower['content-length']))
+        else:
+            body = await self.reader.read()
+            self.reusable = False
+        return AsyncHTTPResponse(status, reason, headers, body)
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            size_line = await self.reader.readline()
+            size = int(size_line.split(b';', 1)[0].strip(), 16)
+            if size == 0:
+                # Discard any trailers.
+                while True:
+                    line = await self.reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                return b''.join(chunks)
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readexactly(2)
+
+
+class AsyncConnectionPool(object):
+    """
+    A pool of keep-alive connections per (host, port, is_secure).
+
+    At most ``max_connections_per_host`` requests are sent to a host at
+    once; further requests wait for a connection to be released.  Idle
+    connections are discarded after ``ConnectionPool.STALE_DURATION``
+    seconds, like those of the blocking connection pool.  ``timeout`` is
+    not applied here but by the connection to each request attempt.
+
+    This class is not thread-safe; use it from a single event loop.
+    """
+    def __init__(self, ssl_context=None, max_connections_per_host=10,
+                 timeout=None):
+        self.ssl_context = ssl_context
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = timeout
+        self.host_to_idle = {}
+        self._semaphores = {}
+
+    def _semaphore(self, key):
+        # Semaphores are created lazily so they bind to the running loop.
+        if key not in self._semaphores:
+            self._semaphores[key] = asyncio.Semaphore(
+                self.max_connections_per_host)
+        return self._semaphores[key]
+
+    async def acquire(self, host, port, is_secure):
+        """
+        Wait for a free slot for the host and return an idle connection
+        to it, or a new one that connects when it is first used.
+        """
+        key = (host, port, is_secure)
+        await self._semaphore(key).acquire()
+        idle = self.host_to_idle.get(key, [])
+        now = time.time()
+        while idle:
+            conn, return_time = idle.pop()
+            if (return_time + ConnectionPool.STALE_DURATION > now and
+                    not conn.reader.at_eof()):
+                return conn
+            conn.close()
+        return _AsyncHTTPConnection(self.ssl_context)
+
+    def release(self, host, port, is_secure, conn):
+        key = (host, port, is_secure)
+        if conn is not None:
+            if conn.reusable:
+                self.host_to_idle.setdefault(key, []).append(
+                    (conn, time.time()))
+            else:
+                conn.close()
+        self._semaphore(key).release()
+
+    def size(self):
+        return sum(len(idle) for idle in self.host_to_idle.values())
+
+    def close(self):
+        for idle in self.host_to_idle.values():
+            for conn, _ in idle:
+                conn.close()
+        self.host_to_idle = {}
+
+
+class AsyncAWSAuthConnection(AWSAuthConnection):
+    """
+    An :class:`boto.connection.AWSAuthConnection` that sends requests
+    with asyncio.  ``make_request`` returns an awaitable.
+
+    Proxies and streaming ``sender`` callables are not supported.
+    """
+    def __init__(self, *args, max_connections_per_host=10, **kwargs):
+        """
+        Takes exactly the same parameters as the blocking connection
+        class, plus:
+
+        :type max_connections_per_host: int
+        :param max_connections_per_host: The maximum number of requests
+            sent to a single host at once.
+        """
+        super(AsyncAWSAuthConnection, self).__init__(*args, **kwargs)
+        if self.use_proxy:
+            raise BotoClientError('Proxies are not supported by %s' %
+                                  self.__class__.__name__)
+        timeout = self.http_connection_kwargs.get('timeout')
+        self._async_pool = AsyncConnectionPool(
+            self._ssl_context(), max_connections_per_host, timeout)
+        self.http_exceptions += (asyncio.IncompleteReadError,
+                                 asyncio.TimeoutError, ConnectionError,
+                                 ssl.SSLError)
+        self.http_unretryable_exceptions.append(ssl.CertificateError)
+
+    def _ssl_context(self):
+        if self.https_validate_certificates:
+            return ssl.create_default_context(
+                cafile=self.ca_certificates_file)
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        return context
+
+    async def _mexe(self, request, sender=None, override_num_retries=None,
+                    retry_handler=None):
+        """
+        The asynchronous counterpart of
+        :meth:`boto.connection.AWSAuthConnection._mexe`.  Requests are
+        re-signed and retried with jittered exponential backoff on
+        transient errors and 5xx responses, and redirects are followed.
+        """
+        if sender is not None:
+            raise BotoClientError('Streaming senders are not supported by %s'
+                                  % self.__class__.__name__)
+        boto.log.debug('Method: %s' % request.method)
+        boto.log.debug('Path: %s' % request.path)
+        boto.log.debug('Host: %s' % request.host)
+        response = None
+        body = None
+        ex = None
+        if override_num_retries is None:
+            num_retries = config.getint('Boto', 'num_retries',
+                                        self.num_retries)
+        else:
+            num_retries = override_num_retries
+        is_secure = self.is_secure
+        if hasattr(request.body, 'read'):
+            request.body = request.body.read()
+        i = 0
+        while i <= num_retries:
+            next_sleep = min(random.random() * (2 ** i),
+                             float(config.get('Boto', 'max_retry_delay', 60)))
+            conn = None
+            try:
+                request.authorize(connection=self)
+                if 's3' not in self._required_auth_capability():
+                    if not getattr(self, 'anon', False):
+                        if not request.headers.get('Host'):
+                            self.set_host_header(request)
+                request.start_time = datetime.now()
+                port = int(request.port)
+                conn = await self._async_pool.acquire(request.host, port,
+                                                      is_secure)
+                try:
+                    # The timeout bounds this attempt, connecting included,
+                    # so a stalled server cannot hold the host's slot
+                    # forever; the retries each get a fresh one.
+                    response = await asyncio.wait_for(
+                        conn.request(request.method, request.host, port,
+                                     is_secure, request.path, request.body,
+                                     request.headers),
+                        self._async_pool.timeout)
+                except BaseException:
+                    conn.close()
+                    raise
+                finally:
+                    self._async_pool.release(request.host, port, is_secure,
+                                             conn)
+                location = response.getheader('location')
+                if callable(retry_handler):
+                    status = retry_handler(response, i, next_sleep)
+                    if status:
+                        msg, i, next_sleep = status
+                        if msg:
+                            boto.log.debug(msg)
+                        await asyncio.sleep(next_sleep)
+                        continue
+                if response.status in [500, 502, 503, 504]:
+                    msg = 'Received %d response.  ' % response.status
+                    msg += 'Retrying in %3.1f seconds' % next_sleep
+                    boto.log.debug(msg)
+                    body = response.read()
+                    if isinstance(body, bytes):
+                        body = body.decode('utf-8')
+                elif response.status < 300 or response.status >= 400 or \
+                        not location:
+                    if self.request_hook is not None:
+                        self.request_hook.handle_request_data(request,
+                                                              response)
+                    return response
+                else:
+                    scheme, request.host, request.path, \
+                        params, query, fragment = urlparse(location)
+                    if query:
+                        request.path += '?' + query
+                    if ':' in request.host:
+                        request.host, request.port = request.host.split(':', 1)
+                    else:
+                        request.port = 443 if scheme == 'https' else 80
+                    is_secure = scheme == 'https'
+                    boto.log.debug('Redirecting: %s://%s%s' % (
+                        scheme, request.host, request.path))
+                    response = None
+                    continue
+            except PleaseRetryException as e:
+                boto.log.debug('encountered a retry exception: %s' % e)
+                response = e.response
+                ex = e
+            except self.http_exceptions as e:
+                for unretryable in self.http_unretryable_exceptions:
+                    if isinstance(e, unretryable):
+                        boto.log.debug(
+                            'encountered unretryable %s exception, re-raising'
+                            % e.__class__.__name__)
+                        raise
+                boto.log.debug('encountered %s exception, reconnecting' %
+                               e.__class__.__name__)
+                ex = e
+            await asyncio.sleep(next_sleep)
+            i += 1
+        if self.request_hook is not None:
+            self.request_hook.handle_request_data(request, response,
+                                                  error=True)
+        if response:
+            raise BotoServerError(response.status, response.reason, body)
+        elif ex:
+            raise ex
+        else:
+            msg = 'Please report this exception as a Boto Issue!'
+            raise BotoClientError(msg)
+
+    def close(self):
+        """Close any idle HTTP connections."""
+        super(AsyncAWSAuthConnection, self).close()
+        self._async_pool.close()
+
+
+class AsyncAWSQueryConnection(AsyncAWSAuthConnection, AWSQueryConnection):
+    """
+    An :class:`boto.connection.AWSQueryConnection` whose generic
+    request methods are coroutines.
+    """
+
+    async def get_list(self, action, params, markers, path='/',
+                       parent=None, verb='GET'):
+        response = await self.make_request(action, params, path, verb)
+        return self._parse_list_response(response, markers, parent)
+
+    async def get_object(self, action, params, cls, path='/',
+                         parent=None, verb='GET'):
+        response = await self.make_request(action, params, path, verb)
+        return self._parse_object_response(response, cls, parent)
+
+    async def get_status(self, action, params, path='/', parent=None,
+                         verb='GET'):
+        response = await self.make_request(action, params, path, verb)
+        return self._parse_status_response(response, parent)
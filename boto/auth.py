@@ -39,7 +39,7 @@ import hmac
 import os
 import posixpath
 
-from boto.compat import urllib, encodebytes, parse_qs_safe, urlparse
+from boto.compat import urllib, encodebytes, parse_qs_safe, urlparse, six
 from boto.auth_handler import AuthHandler
 from boto.exception import BotoClientError
 
@@ -329,6 +329,11 @@ class HmacAuthV4Handler(AuthHandler, HmacKeys):
 
     capability = ['hmac-v4']
 
+    # The number of derived signing keys to keep.  A handler normally
+    # signs for a single region and service, so a handful is plenty
+    # even across the change of date at midnight UTC.
+    SIGNING_KEY_CACHE_SIZE = 16
+
     def __init__(self, host, config, provider,
                  service_name=None, region_name=None):
         AuthHandler.__init__(self, host, config, provider)
@@ -339,6 +344,12 @@ class HmacAuthV4Handler(AuthHandler, HmacKeys):
         self.service_name = service_name
         self.region_name = region_name
 
+    def update_provider(self, provider):
+        super(HmacAuthV4Handler, self).update_provider(provider)
+        # Signing keys are derived from the secret key, so any cached
+        # keys are stale once the provider changes.
+        self._signing_keys = {}
+
     def _sign(self, key, msg, hex=False):
         if not isinstance(key, bytes):
             key = key.encode('utf-8')
@@ -436,8 +447,10 @@ class HmacAuthV4Handler(AuthHandler, HmacKeys):
         # the entire body into memory.
         if hasattr(body, 'seek') and hasattr(body, 'read'):
             return boto.utils.compute_hash(body, hash_algorithm=sha256)[0]
-        elif not isinstance(body, bytes):
+        elif isinstance(body, six.text_type):
             body = body.encode('utf-8')
+        # Anything else, such as bytes or a memoryview over a mapped file,
+        # is hashed as a buffer without being copied.
         return sha256(body).hexdigest()
 
     def canonical_request(self, http_request):
@@ -515,14 +528,33 @@ class HmacAuthV4Handler(AuthHandler, HmacKeys):
         sts.append(sha256(canonical_request.encode('utf-8')).hexdigest())
         return '\n'.join(sts)
 
-    def signature(self, http_request, string_to_sign):
+    def signing_key(self, http_request):
+        """
+        Return the key used to sign requests for the date, region and
+        service of ``http_request``.
+
+        Deriving the key takes four chained HMACs but the result only
+        changes once a day, so it is cached per secret key, date,
+        region and service.
+        """
         key = self._provider.secret_key
-        k_date = self._sign(('AWS4' + key).encode('utf-8'),
-                            http_request.timestamp)
-        k_region = self._sign(k_date, http_request.region_name)
-        k_service = self._sign(k_region, http_request.service_name)
-        k_signing = self._sign(k_service, 'aws4_request')
-        return self._sign(k_signing, string_to_sign, hex=True)
+        cache_key = (key, http_request.timestamp, http_request.region_name,
+                     http_request.service_name)
+        k_signing = self._signing_keys.get(cache_key)
+        if k_signing is None:
+            k_date = self._sign(('AWS4' + key).encode('utf-8'),
+                                http_request.timestamp)
+            k_region = self._sign(k_date, http_request.region_name)
+            k_service = self._sign(k_region, http_request.service_name)
+            k_signing = self._sign(k_service, 'aws4_request')
+            if len(self._signing_keys) >= self.SIGNING_KEY_CACHE_SIZE:
+                self._signing_keys.clear()
+            self._signing_keys[cache_key] = k_signing
+        return k_signing
+
+    def signature(self, http_request, string_to_sign):
+        return self._sign(self.signing_key(http_request), string_to_sign,
+                          hex=True)
 
     def add_auth(self, req, **kwargs):
         """
@@ -20,9 +20,13 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 
-from boto.cloudformation.connection import CloudFormationConnection
 from boto.regioninfo import RegionInfo, get_regions, load_regions
 from boto.regioninfo import connect
+from boto.compat import lazy_import
+
+lazy_import(globals(), {
+    'CloudFormationConnection': 'boto.cloudformation.connection',
+})
 
 RegionData = load_regions().get('cloudformation')
 
@@ -34,6 +38,7 @@ def regions():
     :rtype: list
     :return: A list of :class:`boto.RegionInfo` instances
     """
+    from boto.cloudformation.connection import CloudFormationConnection
     return get_regions(
         'cloudformation',
         connection_cls=CloudFormationConnection
@@ -51,5 +56,6 @@ def connect_to_region(region_name, **kw_params):
     :return: A connection to the given region, or None if an invalid region
         name is given
     """
+    from boto.cloudformation.connection import CloudFormationConnection
     return connect('cloudformation', region_name,
                    connection_cls=CloudFormationConnection, **kw_params)
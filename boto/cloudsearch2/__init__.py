@@ -20,6 +20,9 @@
 # IN THE SOFTWARE.
 from boto.regioninfo import get_regions
 from boto.regioninfo import connect
+from boto.compat import lazy_import
+
+lazy_import(globals())
 
 
 def regions():
@@ -20,6 +20,7 @@
 # IN THE SOFTWARE.
 #
 import os
+import sys
 
 # This allows boto modules to say "from boto.compat import json".  This is
 # preferred so that all modules don't have to repeat this idiom.
@@ -59,13 +60,61 @@ except (AttributeError, ImportError):
 from boto.vendored import six
 
 from boto.vendored.six import BytesIO, StringIO
-from boto.vendored.six.moves import filter, http_client, map, _thread, \
-                                    urllib, zip
-from boto.vendored.six.moves.queue import Queue
+from boto.vendored.six.moves import filter, map, _thread, urllib, zip
+from boto.vendored.six.moves.queue import Queue, Empty, Full
 from boto.vendored.six.moves.urllib.parse import parse_qs, quote, unquote, \
                                                  urlparse, urlsplit
 from boto.vendored.six.moves.urllib.parse import unquote_plus
-from boto.vendored.six.moves.urllib.request import urlopen
+
+
+def lazy_import(module_globals, attributes=None):
+    """
+    Makes a module resolve some of its attributes, and the submodules of
+    a package, on first access instead of when it is imported.
+
+    This relies on module level ``__getattr__`` (PEP 562), so on Python
+    versions before 3.7 the attributes are imported straight away and
+    submodules have to be imported explicitly, as they always had to be.
+
+    :type module_globals: dict
+    :param module_globals: The ``globals()`` of the module.
+
+    :type attributes: dict
+    :param attributes: Maps attribute names to the names of the modules
+        that define them.
+    """
+    attributes = attributes or {}
+    module_name = module_globals['__name__']
+    if sys.version_info < (3, 7):
+        for name, source in attributes.items():
+            __import__(source)
+            module_globals[name] = getattr(sys.modules[source], name)
+        return
+
+    import importlib
+    import importlib.util
+
+    def __getattr__(name):
+        if name in attributes:
+            value = getattr(importlib.import_module(attributes[name]), name)
+            module_globals[name] = value
+            return value
+        if '__path__' in module_globals and not name.startswith('_'):
+            submodule = '%s.%s' % (module_name, name)
+            if importlib.util.find_spec(submodule) is not None:
+                return importlib.import_module(submodule)
+        raise AttributeError('module %r has no attribute %r' %
+                             (module_name, name))
+
+    module_globals['__getattr__'] = __getattr__
+
+
+# http_client and urlopen pull in ssl, email and the rest of the HTTP
+# stack, which importing boto alone does not need.
+lazy_import(globals(), {
+    'http_client': 'boto.vendored.six.moves',
+    'urlopen': 'boto.vendored.six.moves.urllib.request',
+})
 
 if six.PY3:
     # StandardError was removed, so use the base exception type instead
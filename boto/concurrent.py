@@ -0,0 +1,229 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+"""
+Thread pools and small persistent stores shared by the services.
+
+:class:`ConcurrentTransferer` runs units of work (parts of a multipart
+upload, whole files, batches of keys) on a pool of threads, retrying
+each unit on its own.  :class:`SQLiteStore` keeps string values in an
+SQLite table, which several threads and processes can share.
+"""
+import logging
+import threading
+import time
+
+from boto.compat import Queue, Empty
+
+
+_END_SENTINEL = object()
+log = logging.getLogger('boto.concurrent')
+
+
+class TransferThread(threading.Thread):
+    """
+    A worker that takes units of work off ``worker_queue``, runs
+    ``func`` on each of them and places the outcome on
+    ``result_queue``.
+
+    A successful unit of work produces a ``(work, result)`` tuple.  A
+    unit of work that still fails after ``num_retries`` retries
+    produces the last exception raised, and one that raises anything
+    other than ``retry_exceptions`` produces that exception at once.
+    """
+    def __init__(self, func, worker_queue, result_queue, num_retries=5,
+                 time_between_retries=1, retry_exceptions=Exception):
+        super(TransferThread, self).__init__()
+        self.daemon = True
+        self._func = func
+        self._worker_queue = worker_queue
+        self._result_queue = result_queue
+        self._num_retries = num_retries
+        self._time_between_retries = time_between_retries
+        self._retry_exceptions = retry_exceptions
+        # This value can be set externally by other objects
+        # to indicate that the thread should be shut down.
+        self.should_continue = True
+
+    def run(self):
+        while self.should_continue:
+            try:
+                work = self._worker_queue.get(timeout=1)
+            except Empty:
+                continue
+            if work is _END_SENTINEL:
+                return
+            self._result_queue.put(self._process_work(work))
+
+    def _process_work(self, work):
+        result = None
+        for i in range(self._num_retries + 1):
+            try:
+                return (work, self._func(work))
+            except Exception as e:
+                if not isinstance(e, self._retry_exceptions):
+                    # Not worth retrying, but it still has to reach the
+                    # caller, who is waiting on the result queue.
+                    log.error("Exception caught processing %s, not "
+                              "retrying: %s, msg: %s",
+                              work, e.__class__, e)
+                    return e
+                log.error("Exception caught processing %s, attempt: "
+                          "(%s / %s), exception: %s, msg: %s",
+                          work, i + 1, self._num_retries + 1,
+                          e.__class__, e)
+                result = e
+                if not self.should_continue:
+                    break
+                if i < self._num_retries:
+                    time.sleep(self._time_between_retries * (2 ** i))
+        return result
+
+
+class ConcurrentTransferer(object):
+    """
+    Base class for handlers that run many units of work concurrently.
+    It owns the thread pool and the retry policy shared by every unit
+    of work.
+    """
+    def __init__(self, num_threads=10, num_retries=5,
+                 time_between_retries=1, retry_exceptions=Exception):
+        self._num_threads = num_threads
+        self._num_retries = num_retries
+        self._time_between_retries = time_between_retries
+        self._retry_exceptions = retry_exceptions
+
+    def _map(self, func, work_items):
+        """
+        Run ``func`` over ``work_items`` on the thread pool.
+
+        This is a generator which yields a ``(work, result)`` tuple
+        for each unit of work in the order in which they complete.
+        The first unit of work that exhausts its retries stops the
+        pool and its exception is raised to the caller.
+        """
+        worker_queue = Queue()
+        result_queue = Queue()
+        total = 0
+        for work in work_items:
+            worker_queue.put(work)
+            total += 1
+        num_threads = min(self._num_threads, total)
+        threads = []
+        for _ in range(num_threads):
+            worker_queue.put(_END_SENTINEL)
+        log.debug("Starting %s threads for %s units of work.",
+                  num_threads, total)
+        for _ in range(num_threads):
+            thread = TransferThread(func, worker_queue, result_queue,
+                                    self._num_retries,
+                                    self._time_between_retries,
+                                    self._retry_exceptions)
+            thread.start()
+            threads.append(thread)
+        try:
+            for _ in range(total):
+                result = result_queue.get()
+                if isinstance(result, Exception):
+                    log.debug("An error was found in the result queue, "
+                              "terminating threads: %s", result)
+                    raise result
+                yield result
+        finally:
+            self._shutdown_threads(threads)
+
+    def _shutdown_threads(self, threads):
+        log.debug("Shutting down threads.")
+        for thread in threads:
+            thread.should_continue = False
+        for thread in threads:
+            thread.join()
+        log.debug("Threads have exited.")
+
+
+class SQLiteStore(object):
+    """
+    A key/value table in an SQLite database.
+
+    Keys are made of the ``key_columns`` of the table.  With a single
+    key column a key is a plain value, otherwise it is a tuple with one
+    value per column.  The table is created if it does not exist, and
+    one store can be used by many threads.
+    """
+    def __init__(self, filename, table, key_columns=('name',),
+                 value_column='value'):
+        """
+        :type filename: string
+        :param filename: The database file.
+
+        :type table: string
+        :param table: The table to keep the values in.
+
+        :type key_columns: tuple
+        :param key_columns: The names of the columns that make up a key.
+
+        :type value_column: string
+        :param value_column: The name of the column holding the values.
+        """
+        import sqlite3
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(filename, check_same_thread=False)
+        where = ' AND '.join('%s = ?' % column for column in key_columns)
+        columns = ', '.join(tuple(key_columns) + (value_column,))
+        self._select = 'SELECT %s FROM %s WHERE %s' % (value_column, table,
+                                                       where)
+        self._insert = 'INSERT OR REPLACE INTO %s (%s) VALUES (%s)' % (
+            table, columns, ', '.join('?' * (len(key_columns) + 1)))
+        self._delete = 'DELETE FROM %s WHERE %s' % (table, where)
+        self._single_key = len(key_columns) == 1
+        with self._db:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS %s (%s TEXT, %s TEXT, '
+                'PRIMARY KEY (%s))' % (table, ' TEXT, '.join(key_columns),
+                                       value_column, ', '.join(key_columns)))
+
+    def _key(self, key):
+        if self._single_key:
+            return (key,)
+        return tuple(key)
+
+    def get(self, key):
+        """
+        Returns the value stored for ``key``, or None.
+        """
+        with self._lock:
+            row = self._db.execute(self._select, self._key(key)).fetchone()
+        if row is not None:
+            return row[0]
+
+    def set(self, key, value):
+        with self._lock:
+            with self._db:
+                self._db.execute(self._insert, self._key(key) + (value,))
+
+    def remove(self, key):
+        with self._lock:
+            with self._db:
+                self._db.execute(self._delete, self._key(key))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -65,6 +65,7 @@ from boto.compat import six, http_client, urlparse, quote, encodebytes
 from boto.exception import AWSConnectionError
 from boto.exception import BotoClientError
 from boto.exception import BotoServerError
+from boto.exception import ConnectionPoolFullError
 from boto.exception import PleaseRetryException
 from boto.provider import Provider
 from boto.resultset import ResultSet
@@ -113,14 +114,42 @@ class HostConnectionPool(object):
     if AWS has decided to close it on the other end because of
     inactivity.
 
+    If ``max_requests`` is set, at most that many requests can be
+    waiting for a response from the host at once.  Further callers of
+    reserve() either wait for a request to finish or, if ``block`` is
+    False, fail immediately with a ConnectionPoolFullError.  A request
+    gives its slot back as soon as the response headers arrive, so
+    connections that are still streaming a response body are not
+    counted, and more than ``max_requests`` sockets may be open.
+
+    The pool also counts how often connections were reused (hits),
+    had to be opened (misses), were discarded because they were stale
+    (stale_evictions) and how many TLS handshakes were made.
+
     Thread Safety:
 
-        This class is used only from ConnectionPool while it's mutex
-        is held.
+        This class is thread-safe.  Each host has its own lock, so
+        requests to one host never wait for the pool of another.  The
+        methods whose names start with an underscore must be called
+        with ``mutex`` held.
     """
 
-    def __init__(self):
+    def __init__(self, max_requests=None, block=True, timeout=None):
         self.queue = []
+        self.max_requests = max_requests
+        self.block = block
+        self.timeout = timeout
+        self.in_use = 0
+        # Callers that looked the pool up in order to reserve a slot, but
+        # haven't got one yet.  The pool isn't retired while there are any.
+        self.waiting = 0
+        self.retired = False
+        self.hits = 0
+        self.misses = 0
+        self.stale_evictions = 0
+        self.tls_handshakes = 0
+        self.mutex = threading.Lock()
+        self.slot_available = threading.Condition(self.mutex)
 
     def size(self):
         """
@@ -133,17 +162,28 @@ class HostConnectionPool(object):
     def put(self, conn):
         """
         Adds a connection to the pool, along with the time it was
-        added.
+        added.  Returns False if the pool has been retired.
         """
+        with self.mutex:
+            return self._put(conn)
+
+    def _put(self, conn):
+        if self.retired:
+            return False
         self.queue.append((conn, time.time()))
+        return True
 
     def get(self):
         """
         Returns the next connection in this pool that is ready to be
         reused.  Returns None if there aren't any.
         """
+        with self.mutex:
+            return self._get()
+
+    def _get(self):
         # Discard ready connections that are too old.
-        self.clean()
+        self._clean()
 
         # Return the first connection that is ready, and remove it
         # from the queue.  Connections that aren't ready are returned
@@ -152,11 +192,88 @@ class HostConnectionPool(object):
         for _ in range(len(self.queue)):
             (conn, _) = self.queue.pop(0)
             if self._conn_ready(conn):
+                self.hits += 1
                 return conn
             else:
-                self.put(conn)
+                self.queue.append((conn, time.time()))
+        self.misses += 1
         return None
 
+    def add_waiter(self):
+        """
+        Keeps the pool from being retired until the caller's next
+        reserve() returns.
+        """
+        with self.mutex:
+            self.waiting += 1
+
+    def reserve(self):
+        """
+        Reserves one of the ``max_requests`` request slots for this
+        host.  Must follow a call to add_waiter().  Returns False if the
+        pool has been retired.
+
+        Raises ConnectionPoolFullError if no slot becomes free in
+        time.
+        """
+        with self.mutex:
+            try:
+                return self._reserve()
+            finally:
+                self.waiting -= 1
+
+    def _reserve(self):
+        if self.retired:
+            return False
+        if self.max_requests is not None:
+            deadline = None
+            if self.block and self.timeout is not None:
+                deadline = time.time() + self.timeout
+            while self.in_use >= self.max_requests:
+                if not self.block:
+                    raise ConnectionPoolFullError(
+                        'All %d request slots for this host are in use' %
+                        self.max_requests)
+                if deadline is None:
+                    self.slot_available.wait()
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise ConnectionPoolFullError(
+                            'Timed out waiting for one of %d request '
+                            'slots' % self.max_requests)
+                    self.slot_available.wait(remaining)
+        self.in_use += 1
+        return True
+
+    def release(self):
+        """
+        Releases a request slot taken by reserve().
+        """
+        with self.mutex:
+            self._release()
+
+    def _release(self):
+        self.in_use -= 1
+        self.slot_available.notify()
+
+    def record_tls_handshake(self):
+        with self.mutex:
+            self._record_tls_handshake()
+
+    def _record_tls_handshake(self):
+        self.tls_handshakes += 1
+
+    def stats(self):
+        """
+        Returns a dict with the counters of this pool.
+        """
+        with self.mutex:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'stale_evictions': self.stale_evictions,
+                    'tls_handshakes': self.tls_handshakes}
+
     def _conn_ready(self, conn):
         """
         There is a nice state diagram at the top of http_client.py.  It
@@ -184,10 +301,27 @@ class HostConnectionPool(object):
         """
         Get rid of stale connections.
         """
+        with self.mutex:
+            self._clean()
+
+    def retire(self):
+        """
+        Cleans the pool and, if it has no connections and no requests
+        in flight, marks it as retired so that it can be discarded.
+        Returns True if the pool was retired.
+        """
+        with self.mutex:
+            self._clean()
+            if not self.queue and not self.in_use and not self.waiting:
+                self.retired = True
+            return self.retired
+
+    def _clean(self):
         # Note that we do not close the connection here -- somebody
         # may still be reading from it.
         while len(self.queue) > 0 and self._pair_stale(self.queue[0]):
             self.queue.pop(0)
+            self.stale_evictions += 1
 
     def _pair_stale(self, pair):
         """
@@ -206,6 +340,13 @@ class ConnectionPool(object):
     time.  This saves time spent waiting for a connection that AWS has
     timed out on the other end.
 
+    The number of requests waiting for a response from each host at
+    once can be limited with ``max_requests_per_host``; see
+    HostConnectionPool.  The
+    defaults come from the ``max_requests_per_host``,
+    ``connection_pool_block`` and ``connection_pool_timeout`` options
+    in the ``Boto`` section of the config.
+
     This class is thread-safe.
     """
 
@@ -228,16 +369,49 @@ class ConnectionPool(object):
 
     STALE_DURATION = 60.0
 
-    def __init__(self):
+    def __init__(self, max_requests_per_host=None, block=None,
+                 timeout=None):
+        """
+        :type max_requests_per_host: int
+        :param max_requests_per_host: The maximum number of requests
+            that may be waiting for a response from one host at once.
+            A request stops counting once its response headers arrive,
+            even if the body is still being read.  Unlimited by default.
+
+        :type block: bool
+        :param block: If True (the default), wait for a request to
+            finish when the limit is reached.  Otherwise raise
+            :class:`boto.exception.ConnectionPoolFullError` at once.
+
+        :type timeout: float
+        :param timeout: The number of seconds to wait for a request to
+            finish before raising
+            :class:`boto.exception.ConnectionPoolFullError`.  Waits
+            forever by default.
+        """
         # Mapping from (host,port,is_secure) to HostConnectionPool.
         # If a pool becomes empty, it is removed.
         self.host_to_pool = {}
         # The last time the pool was cleaned.
         self.last_clean_time = 0.0
+        # Counters of the pools that have been removed.
+        self.retired_stats = {}
+        # Protects host_to_pool; each HostConnectionPool has its own lock.
         self.mutex = threading.Lock()
         ConnectionPool.STALE_DURATION = \
             config.getfloat('Boto', 'connection_stale_duration',
                             ConnectionPool.STALE_DURATION)
+        if max_requests_per_host is None:
+            max_requests_per_host = config.getint(
+                'Boto', 'max_requests_per_host', 0) or None
+        if block is None:
+            block = config.getbool('Boto', 'connection_pool_block', True)
+        if timeout is None:
+            timeout = config.getfloat('Boto', 'connection_pool_timeout',
+                                      0.0) or None
+        self.max_requests_per_host = max_requests_per_host
+        self.block = block
+        self.timeout = timeout
 
     def __getstate__(self):
         pickled_dict = copy.copy(self.__dict__)
@@ -246,13 +420,38 @@ class ConnectionPool(object):
         return pickled_dict
 
     def __setstate__(self, dct):
-        self.__init__()
+        self.__init__(dct.get('max_requests_per_host'),
+                      dct.get('block'), dct.get('timeout'))
 
     def size(self):
         """
         Returns the number of connections in the pool.
         """
-        return sum(pool.size() for pool in self.host_to_pool.values())
+        with self.mutex:
+            pools = list(self.host_to_pool.values())
+        return sum(pool.size() for pool in pools)
+
+    def _host_pool(self, host, port, is_secure):
+        # Must be called with the mutex held.  Pools are retired and
+        # removed in one step under the mutex, so the pool returned here
+        # can't be retired until the mutex is released.
+        key = (host, port, is_secure)
+        if key not in self.host_to_pool:
+            self.host_to_pool[key] = HostConnectionPool(
+                self.max_requests_per_host, self.block, self.timeout)
+        return self.host_to_pool[key]
+
+    def _call_host_pool(self, host, port, is_secure, method, *args):
+        # The global mutex is only held to look the pool up; the call is
+        # made under the host's own lock, so requests to one host never
+        # wait for another.  A pool retired in between has already been
+        # removed from host_to_pool, so it is looked up again.
+        while True:
+            with self.mutex:
+                pool = self._host_pool(host, port, is_secure)
+            with pool.mutex:
+                if not pool.retired:
+                    return getattr(pool, method)(*args)
 
     def get_http_connection(self, host, port, is_secure):
         """
@@ -262,22 +461,63 @@ class ConnectionPool(object):
         needed.
         """
         self.clean()
-        with self.mutex:
-            key = (host, port, is_secure)
-            if key not in self.host_to_pool:
-                return None
-            return self.host_to_pool[key].get()
+        return self._call_host_pool(host, port, is_secure, '_get')
 
     def put_http_connection(self, host, port, is_secure, conn):
         """
         Adds a connection to the pool of connections that can be
         reused for the named host.
         """
+        self._call_host_pool(host, port, is_secure, '_put', conn)
+
+    def reserve(self, host, port, is_secure):
+        """
+        Reserves a request slot for the named host, waiting for one to
+        become free if ``max_requests_per_host`` requests are already
+        in flight.  Every successful call must be paired with a call to
+        release().
+        """
+        with self.mutex:
+            pool = self._host_pool(host, port, is_secure)
+            pool.add_waiter()
+        # The waiter keeps the pool from being retired while this blocks.
+        pool.reserve()
+
+    def release(self, host, port, is_secure):
+        """
+        Releases a request slot taken by reserve().
+        """
+        self._call_host_pool(host, port, is_secure, '_release')
+
+    def record_tls_handshake(self, host, port):
+        self._call_host_pool(host, port, True, '_record_tls_handshake')
+
+    def stats(self):
+        """
+        Returns a dict with the total number of connection reuses
+        (``hits``), new connections (``misses``), connections discarded
+        because they were stale (``stale_evictions``) and TLS handshakes
+        (``tls_handshakes``) for all hosts.
+        """
+        totals = dict.fromkeys(('hits', 'misses', 'stale_evictions',
+                                'tls_handshakes'), 0)
+        with self.mutex:
+            pools = list(self.host_to_pool.values())
+            all_stats = [self.retired_stats]
+        all_stats.extend(pool.stats() for pool in pools)
+        for stats in all_stats:
+            for name, value in stats.items():
+                totals[name] += value
+        return totals
+
+    def host_stats(self):
+        """
+        Returns a dict mapping each (host,port,is_secure) that currently
+        has a pool to a dict of its counters, as returned by stats().
+        """
         with self.mutex:
-            key = (host, port, is_secure)
-            if key not in self.host_to_pool:
-                self.host_to_pool[key] = HostConnectionPool()
-            self.host_to_pool[key].put(conn)
+            items = list(self.host_to_pool.items())
+        return dict((key, pool.stats()) for key, pool in items)
 
     def clean(self):
         """
@@ -292,10 +532,12 @@ class ConnectionPool(object):
             if self.last_clean_time + self.CLEAN_INTERVAL < now:
                 to_remove = []
                 for (host, pool) in self.host_to_pool.items():
-                    pool.clean()
-                    if pool.size() == 0:
+                    if pool.retire():
                         to_remove.append(host)
                 for host in to_remove:
+                    for name, value in self.host_to_pool[host].stats().items():
+                        self.retired_stats[name] = \
+                            self.retired_stats.get(name, 0) + value
                     del self.host_to_pool[host]
                 self.last_clean_time = now
 
@@ -745,6 +987,8 @@ class AWSAuthConnection(object):
                 host, http_connection_kwargs)
             if self.use_proxy and not self.skip_proxy(host):
                 connection = self.proxy_ssl(host, is_secure and 443 or 80)
+                # The handshake through the tunnel is already done.
+                self._pool.record_tls_handshake(host, port)
             elif self.https_connection_factory:
                 connection = self.https_connection_factory(host)
             elif self.https_validate_certificates and HAVE_HTTPS_CONNECTION:
@@ -778,11 +1022,61 @@ class AWSAuthConnection(object):
         # Set the response class of the http connection to use our custom
         # class.
         connection.response_class = HTTPResponse
+        if is_secure and getattr(connection, 'sock', None) is None:
+            self._count_tls_handshakes(connection, host, port)
         return connection
 
+    def _count_tls_handshakes(self, connection, host, port):
+        # HTTPS connections connect, and reconnect, lazily from request(),
+        # so a handshake is only recorded once connect() has succeeded.
+        connect = connection.connect
+
+        def connect_and_count():
+            connect()
+            self._pool.record_tls_handshake(host, port)
+        connection.connect = connect_and_count
+
     def put_http_connection(self, host, port, is_secure, connection):
         self._pool.put_http_connection(host, port, is_secure, connection)
 
+    def prewarm_connections(self, count=1, host=None):
+        """
+        Opens connections to a host and adds them to the connection
+        pool, so that the first requests don't have to wait for a TCP
+        and TLS handshake.  Call this at startup, before the connection
+        is used.
+
+        :type count: int
+        :param count: The number of connections to open.
+
+        :type host: str
+        :param host: The host to connect to.  Defaults to the host of
+            this connection.
+
+        :rtype: int
+        :return: The number of connections that were opened.  If a
+            connection fails, no further connections are attempted.
+        """
+        if host is None:
+            host = self.host
+        opened = 0
+        for _ in range(count):
+            connection = self.new_http_connection(host, self.port,
+                                                  self.is_secure)
+            try:
+                # Proxied HTTPS connections are already connected.
+                if getattr(connection, 'sock', None) is None:
+                    connection.connect()
+            except self.http_exceptions as e:
+                boto.log.debug('failed to prewarm connection to %s: %s' %
+                               (host, e))
+                connection.close()
+                break
+            self.put_http_connection(host, self.port, self.is_secure,
+                                     connection)
+            opened += 1
+        return opened
+
     def proxy_ssl(self, host=None, port=None):
         if host and port:
             host = '%s:%d' % (host, port)
@@ -896,6 +1190,11 @@ class AWSAuthConnection(object):
         This code was inspired by the S3Utils classes posted to the boto-users
         Google group by Larry Bates.  Thanks!
 
+        Each attempt holds one of the pool's slots for its host until
+        its response headers arrive, so that no more than
+        ``max_requests_per_host`` requests are waiting for a response
+        at once.  The slot is free again while the body is read and
+        while waiting to retry.
         """
         boto.log.debug('Method: %s' % request.method)
         boto.log.debug('Path: %s' % request.path)
@@ -938,13 +1237,19 @@ class AWSAuthConnection(object):
                             self.set_host_header(request)
                 boto.log.debug('Final headers: %s' % request.headers)
                 request.start_time = datetime.now()
-                if callable(sender):
-                    response = sender(connection, request.method, request.path,
-                                      request.body, request.headers)
-                else:
-                    connection.request(request.method, request.path,
-                                       request.body, request.headers)
-                    response = connection.getresponse()
+                slot = (request.host, request.port, self.is_secure)
+                self._pool.reserve(*slot)
+                try:
+                    if callable(sender):
+                        response = sender(connection, request.method,
+                                          request.path, request.body,
+                                          request.headers)
+                    else:
+                        connection.request(request.method, request.path,
+                                           request.body, request.headers)
+                        response = connection.getresponse()
+                finally:
+                    self._pool.release(*slot)
                 boto.log.debug('Response headers: %s' % response.getheaders())
                 location = response.getheader('location')
                 # -- gross hack --
@@ -1168,9 +1473,12 @@ class AWSQueryConnection(AWSAuthConnection):
 
     def get_list(self, action, params, markers, path='/',
                  parent=None, verb='GET'):
+        response = self.make_request(action, params, path, verb)
+        return self._parse_list_response(response, markers, parent)
+
+    def _parse_list_response(self, response, markers, parent=None):
         if not parent:
             parent = self
-        response = self.make_request(action, params, path, verb)
         body = response.read()
         boto.log.debug(body)
         if not body:
@@ -1188,11 +1496,38 @@ class AWSQueryConnection(AWSAuthConnection):
             boto.log.error('%s' % body)
             raise self.ResponseError(response.status, response.reason, body)
 
+    def iter_list(self, action, params, markers, path='/',
+                  parent=None, verb='GET', result_set=None):
+        """
+        Like get_list, but returns an iterator that parses the response
+        as it is read and yields each item as soon as it is complete,
+        rather than holding the whole response and every item in memory.
+
+        If ``result_set`` is given, it is filled in with the other
+        attributes of the response, such as ``next_token``, once the
+        iterator is exhausted.
+        """
+        if not parent:
+            parent = self
+        response = self.make_request(action, params, path, verb)
+        if response.status != 200:
+            body = response.read()
+            boto.log.error('%s %s' % (response.status, response.reason))
+            boto.log.error('%s' % body)
+            raise self.ResponseError(response.status, response.reason, body)
+        if result_set is None:
+            result_set = ResultSet()
+        result_set.markers = markers
+        return boto.handler.iter_parse(response, result_set, parent)
+
     def get_object(self, action, params, cls, path='/',
                    parent=None, verb='GET'):
+        response = self.make_request(action, params, path, verb)
+        return self._parse_object_response(response, cls, parent)
+
+    def _parse_object_response(self, response, cls, parent=None):
         if not parent:
             parent = self
-        response = self.make_request(action, params, path, verb)
         body = response.read()
         boto.log.debug(body)
         if not body:
@@ -1211,9 +1546,12 @@ class AWSQueryConnection(AWSAuthConnection):
             raise self.ResponseError(response.status, response.reason, body)
 
     def get_status(self, action, params, path='/', parent=None, verb='GET'):
+        response = self.make_request(action, params, path, verb)
+        return self._parse_status_response(response, parent)
+
+    def _parse_status_response(self, response, parent=None):
         if not parent:
             parent = self
-        response = self.make_request(action, params, path, verb)
         body = response.read()
         boto.log.debug(body)
         if not body:
@@ -376,6 +376,22 @@ class Dynamizer(object):
     def _decode_l(self, attr):
         return [self.decode(i) for i in attr]
 
+    def encode_item(self, item):
+        """
+        Encodes a dict of attribute names and python values to the
+        format expected by DynamoDB.
+
+        """
+        return dict([(k, self.encode(v)) for k, v in item.items()])
+
+    def decode_item(self, item):
+        """
+        Takes an item as returned by DynamoDB and constructs a dict of
+        attribute names and python values.
+
+        """
+        return dict([(k, self.decode(v)) for k, v in item.items()])
+
 
 class NonBooleanDynamizer(Dynamizer):
     """Casting boolean type to numeric types.
@@ -408,3 +424,124 @@ class LossyFloatDynamizer(NonBooleanDynamizer):
 
     def _decode_ns(self, attr):
         return set(map(self._decode_n, attr))
+
+
+# Integers below this size are within DYNAMODB_CONTEXT's precision, so
+# their string form needs no further checks.
+_MAX_EXACT_INT = 10 ** 38
+
+
+class FastDynamizer(Dynamizer):
+    """Encode and decode items using precomputed dispatch tables.
+
+    ``Dynamizer`` works out the DynamoDB type of every value, looks up
+    the method for that type by name and validates every number with a
+    ``Decimal`` context.  This class looks the methods up by the exact
+    python type, or by the DynamoDB type when decoding, in tables built
+    once per instance.  Values of other types, such as subclasses of
+    ``dict`` or sets, are handled by ``Dynamizer``, so the results are
+    the same either way.  Integers that clearly fit in a DynamoDB number
+    skip the ``Decimal`` validation, and ``encode_item``/``decode_item``
+    handle whole items in one pass.
+
+    Overriding ``_encode_*`` and ``_decode_*`` methods in a subclass
+    works as it does for ``Dynamizer``.
+
+    :type use_boolean: bool
+    :param use_boolean: Whether ``bool`` values are stored as DynamoDB
+        booleans.  If ``False``, they are stored as numbers, as
+        ``NonBooleanDynamizer`` does.
+
+    :type lossy_float: bool
+    :param lossy_float: Whether numbers are decoded to ``int`` or
+        ``float`` instead of ``Decimal``, and encoded without any
+        precision checks, as ``LossyFloatDynamizer`` does.  This is
+        faster, but may lose precision.
+    """
+    def __init__(self, use_boolean=True, lossy_float=False):
+        self.use_boolean = use_boolean
+        self.lossy_float = lossy_float
+
+        def typed(dynamodb_type, encoder):
+            return lambda attr: {dynamodb_type: encoder(attr)}
+
+        number = typed('N', self._encode_n)
+        self._encoders = {
+            six.text_type: typed('S', self._encode_s),
+            int: number,
+            long_type: number,
+            float: number,
+            Decimal: number,
+            bool: (typed('BOOL', self._encode_bool) if use_boolean
+                   else number),
+            type(None): typed('NULL', self._encode_null),
+            dict: typed('M', self._encode_m),
+            list: typed('L', self._encode_l),
+            Binary: typed('B', self._encode_b),
+        }
+        if six.PY2:
+            self._encoders[str] = self._encoders[six.text_type]
+        else:
+            self._encoders[bytes] = self._encoders[Binary]
+        self._decoders = {
+            'S': self._decode_s,
+            'N': self._decode_n,
+            'SS': self._decode_ss,
+            'NS': self._decode_ns,
+            'B': self._decode_b,
+            'BS': self._decode_bs,
+            'NULL': self._decode_null,
+            'BOOL': self._decode_bool,
+            'M': self._decode_m,
+            'L': self._decode_l,
+        }
+
+    def _get_dynamodb_type(self, attr):
+        return get_dynamodb_type(attr, use_boolean=self.use_boolean)
+
+    def encode(self, attr):
+        encoder = self._encoders.get(type(attr))
+        if encoder is None:
+            return super(FastDynamizer, self).encode(attr)
+        return encoder(attr)
+
+    def decode(self, attr):
+        if type(attr) is dict and len(attr) == 1:
+            for dynamodb_type, value in attr.items():
+                decoder = self._decoders.get(dynamodb_type)
+                if decoder is not None:
+                    return decoder(value)
+        return super(FastDynamizer, self).decode(attr)
+
+    def encode_item(self, item):
+        encode = self.encode
+        encoded = {}
+        for name, value in item.items():
+            encoded[name] = encode(value)
+        return encoded
+
+    def decode_item(self, item):
+        decode = self.decode
+        decoded = {}
+        for name, value in item.items():
+            decoded[name] = decode(value)
+        return decoded
+
+    def _encode_n(self, attr):
+        if type(attr) in (int, long_type) and \
+                -_MAX_EXACT_INT < attr < _MAX_EXACT_INT:
+            return str(attr)
+        if self.lossy_float or type(attr) is bool:
+            return serialize_num(attr)
+        return super(FastDynamizer, self)._encode_n(attr)
+
+    def _encode_m(self, attr):
+        return self.encode_item(attr)
+
+    def _decode_n(self, attr):
+        if self.lossy_float:
+            return convert_num(attr)
+        return DYNAMODB_CONTEXT.create_decimal(attr)
+
+    def _decode_m(self, attr):
+        return self.decode_item(attr)
@@ -0,0 +1,127 @@
+import threading
+import time
+
+from boto.compat import OrderedDict
+
+
+class ItemCache(object):
+    """
+    A bounded, in-process cache of item data, used by ``Table`` to answer
+    repeated ``get_item`` & ``batch_get`` calls without going to DynamoDB.
+
+    Entries are keyed by the encoded primary key of the item & hold its
+    decoded data. Once ``max_size`` entries are cached, the least recently
+    used one is evicted. Entries older than ``ttl`` seconds are treated as
+    missing, which bounds how stale a cached item can get when other
+    processes write to the table.
+
+    ``hits``, ``misses``, ``evictions`` & ``hit_rate`` report on how well
+    the cache is doing.
+
+    Use it through ``Table.use_cache``.
+    """
+    def __init__(self, max_size=1000, ttl=60):
+        """
+        Optionally accepts a ``max_size`` parameter, which should be the
+        most items to keep. (Default: ``1000``)
+
+        Optionally accepts a ``ttl`` parameter, which should be the number
+        of seconds to keep an item for. ``None`` keeps items until they are
+        evicted or invalidated. (Default: ``60``)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        if not lookups:
+            return 0.0
+        return float(self.hits) / lookups
+
+    @property
+    def generation(self):
+        """
+        A counter that goes up whenever anything is invalidated. Pass the
+        value read before fetching an item to ``set``, so that an item
+        fetched while it was being written is not cached.
+        """
+        return self._generation
+
+    def make_key(self, raw_key):
+        """
+        Turns an encoded key, as built by ``Table._encode_keys``, into
+        something hashable.
+        """
+        parts = []
+        for name, value in raw_key.items():
+            for data_type, data in value.items():
+                parts.append((name, data_type, data))
+        parts.sort()
+        return tuple(parts)
+
+    def get(self, raw_key):
+        """
+        Returns the cached data for the item with the given encoded key, or
+        ``None`` if it isn't cached or has expired.
+        """
+        key = self.make_key(raw_key)
+        with self._lock:
+            entry = self._items.pop(key, None)
+            if entry is not None:
+                expires, data = entry
+                if expires is None or expires > time.time():
+                    # Re-inserting moves the entry to the most recently
+                    # used end.
+                    self._items[key] = entry
+                    self.hits += 1
+                    return data
+            self.misses += 1
+            return None
+
+    def set(self, raw_key, data, generation=None):
+        """
+        Caches the data for the item with the given encoded key.
+
+        Optionally accepts a ``generation`` parameter, which should be the
+        value of ``generation`` from before the item was fetched. If
+        anything has been invalidated since, the data is not cached.
+        """
+        key = self.make_key(raw_key)
+        expires = None
+        if self.ttl is not None:
+            expires = time.time() + self.ttl
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._items.pop(key, None)
+            self._items[key] = (expires, data)
+            while len(self._items) > self.max_size:
+                del self._items[next(iter(self._items))]
+                self.evictions += 1
+
+    def invalidate(self, raw_key):
+        """
+        Drops the item with the given encoded key from the cache.
+        """
+        key = self.make_key(raw_key)
+        with self._lock:
+            self._generation += 1
+            self._items.pop(key, None)
+
+    def clear(self):
+        """
+        Drops every item from the cache. The statistics are kept.
+        """
+        with self._lock:
+            self._generation += 1
+            self._items.clear()
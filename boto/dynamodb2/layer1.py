@@ -160,6 +160,7 @@ class DynamoDBConnection(AWSQueryConnection):
     def __init__(self, **kwargs):
         region = kwargs.pop('region', None)
         validate_checksums = kwargs.pop('validate_checksums', True)
+        throughput_limiter = kwargs.pop('throughput_limiter', None)
         if not region:
             region_name = boto.config.get('DynamoDB', 'region',
                                           self.DefaultRegionName)
@@ -177,6 +178,9 @@ class DynamoDBConnection(AWSQueryConnection):
         self._validate_checksums = boto.config.getbool(
             'DynamoDB', 'validate_checksums', validate_checksums)
         self.throughput_exceeded_events = 0
+        # An optional ``boto.dynamodb2.limiter.ThroughputLimiter``, which
+        # paces requests to the capacity set for each table & index.
+        self.throughput_limiter = throughput_limiter
 
     def _required_auth_capability(self):
         return ['hmac-v4']
@@ -2828,6 +2832,51 @@ class DynamoDBConnection(AWSQueryConnection):
                                  body=json.dumps(params))
 
     def make_request(self, action, body):
+        limiter = self.throughput_limiter
+        if limiter is None:
+            return self._make_request(action, body, self._retry_handler)
+
+        params = json.loads(body)
+        reservations = limiter.acquire(action, params)
+        if not reservations:
+            return self._make_request(action, body, self._retry_handler)
+
+        # The limiter needs to know what each request really consumed, per
+        # index, so ask for it even if the caller didn't.
+        return_consumed = params.get('ReturnConsumedCapacity', 'NONE')
+        if return_consumed != 'INDEXES':
+            params['ReturnConsumedCapacity'] = 'INDEXES'
+            body = json.dumps(params)
+
+        def retry_handler(response, i, next_sleep):
+            try:
+                status = self._retry_handler(response, i, next_sleep)
+            except exceptions.ProvisionedThroughputExceededException:
+                limiter.throttled(reservations)
+                raise
+            if response.status == 400 and status is not None:
+                # Anything else that comes back with a 400 is raised, so
+                # this request was throttled & is about to be retried. The
+                # retry waits for capacity like any other request.
+                limiter.throttled(reservations)
+                limiter.wait(reservations)
+            return status
+
+        # A request that fails isn't released, as it says nothing about
+        # how much capacity is left & mustn't bring the rate back up.
+        result = self._make_request(action, body, retry_handler)
+        if result is None:
+            limiter.release(reservations, None)
+            return result
+        unprocessed = (result.get('UnprocessedItems') or
+                       result.get('UnprocessedKeys'))
+        limiter.release(reservations, result.get('ConsumedCapacity'),
+                        throttled=bool(unprocessed))
+        if return_consumed == 'NONE':
+            result.pop('ConsumedCapacity', None)
+        return result
+
+    def _make_request(self, action, body, retry_handler):
         headers = {
             'X-Amz-Target': '%s.%s' % (self.TargetPrefix, action),
             'Host': self.host,
@@ -2839,7 +2888,7 @@ class DynamoDBConnection(AWSQueryConnection):
             headers=headers, data=body, host=self.host)
         response = self._mexe(http_request, sender=None,
                               override_num_retries=self.NumberRetries,
-                              retry_handler=self._retry_handler)
+                              retry_handler=retry_handler)
         response_body = response.read().decode('utf-8')
         boto.log.debug(response_body)
         if response.status == 200:
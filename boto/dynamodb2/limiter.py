@@ -0,0 +1,273 @@
+import threading
+import time
+
+
+READ = 'read'
+WRITE = 'write'
+
+ACTION_KINDS = {
+    'GetItem': READ,
+    'BatchGetItem': READ,
+    'Query': READ,
+    'Scan': READ,
+    'PutItem': WRITE,
+    'UpdateItem': WRITE,
+    'DeleteItem': WRITE,
+    'BatchWriteItem': WRITE,
+}
+
+
+class TokenBucket(object):
+    """
+    Tracks the capacity units available to one kind of request (reads or
+    writes) on a table or index.
+
+    Tokens are added at ``rate`` units a second, up to ``burst_seconds``
+    worth of them. The balance may go negative when a request turns out to
+    cost more than was reserved for it, which makes the next requests wait
+    longer.
+    """
+    def __init__(self, target, burst_seconds=1):
+        self.target = float(target)
+        self.rate = self.target
+        self.burst_seconds = burst_seconds
+        self.tokens = self.size
+        self.updated = time.time()
+
+    @property
+    def size(self):
+        return max(1.0, self.rate * self.burst_seconds)
+
+    def refill(self, now):
+        elapsed = max(0, now - self.updated)
+        self.tokens = min(self.size, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def take(self, units, now):
+        """
+        Takes ``units`` tokens if they are available & returns ``0``.
+        Otherwise, takes nothing & returns the number of seconds to wait
+        before trying again.
+        """
+        self.refill(now)
+        needed = min(units, self.size)
+        if self.tokens >= needed:
+            self.tokens -= units
+            return 0
+        return (needed - self.tokens) / self.rate
+
+    def charge(self, units, now):
+        self.refill(now)
+        self.tokens -= units
+
+    def throttled(self, min_rate):
+        self.rate = max(min_rate, self.rate / 2)
+        self.tokens = min(self.tokens, 0)
+
+    def recovered(self, step):
+        self.rate = min(self.target, self.rate + step)
+
+
+class ThroughputLimiter(object):
+    """
+    A client-side rate limiter that keeps the capacity consumed on tables &
+    indexes close to a target, before DynamoDB has to throttle anything.
+
+    Each table or index given a capacity with ``set_capacity`` gets a
+    ``TokenBucket`` for reads & one for writes. A ``DynamoDBConnection``
+    using the limiter waits for a token before sending each request,
+    then settles up with the ``ConsumedCapacity`` the response reports, so
+    expensive queries & scans slow down later requests accordingly.
+
+    The rate adapts to throttling. Whenever a request is throttled, or a
+    batch request comes back with unprocessed items, the rate of every
+    bucket involved is halved (down to ``min_rate_fraction`` of the
+    target) & the bucket is emptied, so that every thread using the
+    limiter backs off together. A throttled request waits for a token
+    again before it is retried. Each request that goes through without
+    throttling brings the rate back up by ``recovery_fraction`` of the
+    target, while one that fails leaves the rate alone. Retries after
+    server errors or connection failures are not paced, as they seldom
+    consume any capacity.
+
+    One limiter can be shared by any number of threads & connections.
+    ``throttle_events`` & ``time_waited`` report on how it's doing.
+
+    Example::
+
+        >>> from boto.dynamodb2.layer1 import DynamoDBConnection
+        >>> from boto.dynamodb2.limiter import ThroughputLimiter
+        >>> from boto.dynamodb2.table import Table
+        >>> limiter = ThroughputLimiter()
+        >>> limiter.set_capacity('users', read=50, write=20)
+        >>> limiter.set_capacity('users', read=10, index='EverythingIndex')
+        >>> conn = DynamoDBConnection(throughput_limiter=limiter)
+        >>> users = Table('users', connection=conn)
+
+    """
+    def __init__(self, burst_seconds=1, min_rate_fraction=0.1,
+                 recovery_fraction=0.05):
+        """
+        Optionally accepts a ``burst_seconds`` parameter, which should be
+        the number of seconds of unused capacity a bucket may save up.
+        (Default: ``1``)
+
+        Optionally accepts a ``min_rate_fraction`` parameter, which should
+        be the fraction of the target rate that throttling can't push the
+        rate below. (Default: ``0.1``)
+
+        Optionally accepts a ``recovery_fraction`` parameter, which should
+        be the fraction of the target rate to add back after each request
+        that wasn't throttled. (Default: ``0.05``)
+        """
+        self.burst_seconds = burst_seconds
+        self.min_rate_fraction = min_rate_fraction
+        self.recovery_fraction = recovery_fraction
+        self.throttle_events = 0
+        self.time_waited = 0.0
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def set_capacity(self, table_name, read=None, write=None, index=None):
+        """
+        Sets the capacity units per second to aim for on a table or index.
+
+        Requires a ``table_name`` parameter, which should be the name of
+        the table.
+
+        Optionally accepts ``read`` & ``write`` parameters, which should
+        be the read & write capacity units per second to aim for. Leaving
+        one out leaves that kind of request alone.
+
+        Optionally accepts an ``index`` parameter, which should be the name
+        of a secondary index, to limit the index rather than the table.
+        """
+        with self._lock:
+            for kind, target in ((READ, read), (WRITE, write)):
+                if target is not None:
+                    self._buckets[(table_name, index, kind)] = TokenBucket(
+                        target, self.burst_seconds)
+
+    def get_rate(self, table_name, kind=READ, index=None):
+        """
+        Returns the current rate, in capacity units per second, for a
+        table or index, or ``None`` if it has no capacity set.
+        """
+        bucket = self._buckets.get((table_name, index, kind))
+        if bucket is None:
+            return None
+        return bucket.rate
+
+    def acquire(self, action, params):
+        """
+        Waits until the tables & indexes a request uses have capacity
+        for it. Used by ``DynamoDBConnection`` before sending a request.
+
+        Returns a list of ``(key, units)`` reservations to hand to
+        ``release`` & ``throttled``. The list is empty if the request
+        doesn't touch anything with a capacity set.
+        """
+        kind = ACTION_KINDS.get(action)
+        if kind is None or not self._buckets:
+            return []
+        if 'RequestItems' in params:
+            table_names = list(params['RequestItems'].keys())
+        else:
+            table_names = [params.get('TableName')]
+
+        keys = []
+        for key in list(self._buckets.keys()):
+            table_name, index, bucket_kind = key
+            if bucket_kind != kind or table_name not in table_names:
+                continue
+            # Reads only use the index they are made on, while writes use
+            # the table & all of its indexes.
+            if kind == WRITE or index == params.get('IndexName'):
+                keys.append(key)
+
+        reservations = [(key, 1) for key in keys]
+        self.wait(reservations)
+        return reservations
+
+    def wait(self, reservations):
+        """
+        Waits until the tables & indexes of reservations made by
+        ``acquire`` have capacity for another attempt at the request. Used
+        by ``DynamoDBConnection`` before retrying a throttled request.
+        """
+        for key, units in reservations:
+            self._take(key, units)
+
+    def release(self, reservations, consumed_capacity, throttled=False):
+        """
+        Settles the reservations made by ``acquire`` with the capacity a
+        request actually consumed. Used by ``DynamoDBConnection`` after a
+        response comes back.
+
+        ``consumed_capacity`` should be the ``ConsumedCapacity`` of the
+        response, if any. ``throttled`` should be ``True`` if part of the
+        request went unprocessed.
+        """
+        if not reservations:
+            return
+        kind = reservations[0][0][2]
+        consumed = self._parse_consumed(consumed_capacity, kind)
+        now = time.time()
+        with self._lock:
+            for key, units in reservations:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    continue
+                if key in consumed:
+                    bucket.charge(consumed[key] - units, now)
+                if not throttled:
+                    bucket.recovered(bucket.target * self.recovery_fraction)
+        if throttled:
+            self.throttled(reservations)
+
+    def throttled(self, reservations):
+        """
+        Slows down the tables & indexes a throttled request used.
+        """
+        if not reservations:
+            return
+        with self._lock:
+            self.throttle_events += 1
+            for key, units in reservations:
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.throttled(bucket.target * self.min_rate_fraction)
+
+    def _take(self, key, units):
+        while True:
+            with self._lock:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    return
+                wait = bucket.take(units, time.time())
+                if not wait:
+                    return
+                self.time_waited += wait
+            time.sleep(wait)
+
+    def _parse_consumed(self, consumed_capacity, kind):
+        consumed = {}
+        if not consumed_capacity:
+            return consumed
+        if isinstance(consumed_capacity, dict):
+            consumed_capacity = [consumed_capacity]
+
+        for entry in consumed_capacity:
+            table_name = entry.get('TableName')
+            if 'Table' in entry:
+                units = entry['Table'].get('CapacityUnits', 0)
+            else:
+                units = entry.get('CapacityUnits', 0)
+            consumed[(table_name, None, kind)] = units
+
+            for section in ('GlobalSecondaryIndexes',
+                            'LocalSecondaryIndexes'):
+                for index, value in entry.get(section, {}).items():
+                    consumed[(table_name, index, kind)] = value.get(
+                        'CapacityUnits', 0)
+        return consumed
@@ -1,3 +1,13 @@
+import random
+import threading
+import time
+import traceback
+import weakref
+
+import boto
+from boto.compat import Empty, Full, Queue
+
+
 class ResultSet(object):
     """
     A class used to lazily handle page-to-page navigation through a set of
@@ -19,8 +29,15 @@ class ResultSet(object):
         >>> for res in results:
         ...     print res['username']
 
+    With ``prefetch`` set, a background thread fetches up to that many
+    pages ahead while the current page is being iterated over, so that
+    waiting on DynamoDB overlaps with processing the results. Call
+    ``close`` to stop the thread if you stop iterating before the end.
+    A result set that is dropped part way through stops its thread too,
+    once it has been garbage collected.
+
     """
-    def __init__(self, max_page_size=None):
+    def __init__(self, max_page_size=None, prefetch=0):
         super(ResultSet, self).__init__()
         self.the_callable = None
         self.call_args = []
@@ -32,6 +49,9 @@ class ResultSet(object):
         self._fetches = 0
         self._max_page_size = max_page_size
         self._limit = None
+        self._prefetch = prefetch
+        self._pages = None
+        self._prefetch_stopped = threading.Event()
 
     @property
     def first_key(self):
@@ -124,44 +144,119 @@ class ResultSet(object):
         """
         self._reset()
 
+        if self._prefetch:
+            new_results, self._last_key_seen, more = self._next_page()
+        else:
+            new_results, self._last_key_seen, more = self._fetch_page(
+                self._last_key_seen, self._limit)
+
+        if len(new_results):
+            self._results.extend(new_results)
+
+        if not more:
+            self._results_left = False
+
+    def close(self):
+        """
+        Stops fetching pages in the background, when ``prefetch`` is set.
+        Iterating afterwards stops at the end of the current page.
+        """
+        self._prefetch_stopped.set()
+
+    def _fetch_page(self, last_key, limit):
+        # Fetches the page starting after ``last_key``, with ``limit``
+        # results left to return. Returns the results, the key to fetch
+        # the following page with & whether there may be more results.
         args = self.call_args[:]
         kwargs = self.call_kwargs.copy()
 
-        if self._last_key_seen is not None:
-            kwargs[self.first_key] = self._last_key_seen
+        if last_key is not None:
+            kwargs[self.first_key] = last_key
 
         # If the page size is greater than limit set them
         #   to the same value
-        if self._limit and self._max_page_size and self._max_page_size > self._limit:
-            self._max_page_size = self._limit
+        if limit and self._max_page_size and self._max_page_size > limit:
+            self._max_page_size = limit
 
         # Put in the max page size.
         if self._max_page_size is not None:
             kwargs['limit'] = self._max_page_size
-        elif self._limit is not None:
+        elif limit is not None:
             # If max_page_size is not set and limit is available
             #   use it as the page size
-            kwargs['limit'] = self._limit
+            kwargs['limit'] = limit
 
         results = self.the_callable(*args, **kwargs)
         self._fetches += 1
         new_results = results.get('results', [])
-        self._last_key_seen = results.get('last_key', None)
-
-        if len(new_results):
-            self._results.extend(results['results'])
+        last_key = results.get('last_key', None)
+        more = last_key is not None
 
         # Check the limit, if it's present.
-        if self._limit is not None and self._limit >= 0:
-            limit = self._limit
-            limit -= len(results['results'])
+        if limit is not None and limit >= 0:
             # If we've exceeded the limit, we don't have any more
             # results to look for.
-            if limit <= 0:
-                self._results_left = False
-
-        if self._last_key_seen is None:
-            self._results_left = False
+            if limit - len(new_results) <= 0:
+                more = False
+
+        return new_results, last_key, more
+
+    def _next_page(self):
+        if self._pages is None:
+            self._pages = Queue(maxsize=self._prefetch)
+            self._prefetch_stopped.clear()
+            # The thread only keeps a weak reference to the result set, so
+            # one that is dropped part way through can still be collected,
+            # which stops the thread.
+            thread = threading.Thread(
+                target=_prefetch_pages,
+                args=(weakref.ref(self), self._pages, self._prefetch_stopped,
+                      self._last_key_seen, self._limit))
+            thread.daemon = True
+            thread.start()
+
+        if self._prefetch_stopped.is_set():
+            return [], None, False
+        page = self._pages.get()
+        if isinstance(page, Exception):
+            self._prefetch_stopped.set()
+            raise page
+        return page
+
+
+def _prefetch_pages(result_set_ref, pages, stopped, last_key, limit):
+    more = True
+    while more and not stopped.is_set():
+        result_set = result_set_ref()
+        if result_set is None:
+            return
+        try:
+            page = result_set._fetch_page(last_key, limit)
+        except Exception as e:
+            # The frames of the traceback would keep the result set alive.
+            # (Python 2 exceptions carry no traceback, and Python 3.3 has
+            # no way to clear it.)
+            if hasattr(traceback, 'clear_frames'):
+                traceback.clear_frames(e.__traceback__)
+            del result_set
+            _put_page(result_set_ref, pages, stopped, e)
+            return
+        del result_set
+        new_results, last_key, more = page
+        if limit is not None:
+            limit -= len(new_results)
+        _put_page(result_set_ref, pages, stopped, page)
+
+
+def _put_page(result_set_ref, pages, stopped, page):
+    # Stop waiting for room once the consumer has gone away, by calling
+    # ``close`` or by dropping the result set.
+    while not stopped.is_set() and result_set_ref() is not None:
+        try:
+            pages.put(page, timeout=0.1)
+            return
+        except Full:
+            pass
 
 
 class BatchGetResultSet(ResultSet):
@@ -202,3 +297,155 @@ class BatchGetResultSet(ResultSet):
         # Decrease the limit, if it's present.
         if self.call_kwargs.get('limit'):
             self.call_kwargs['limit'] -= len(results['results'])
+
+
+class ConcurrentBatchGetResultSet(BatchGetResultSet):
+    """
+    A ``BatchGetResultSet`` that sends its ``BatchGetItem`` requests from
+    a pool of threads.
+
+    Duplicate keys are dropped, and the remaining keys are split into
+    batches of ``max_batch_get``, ``num_threads`` of which are fetched at
+    once. Items are returned as each response arrives, so they do not
+    come back in the order of the keys. Each thread resends the keys
+    DynamoDB left unprocessed with jittered exponential backoff. Keys
+    still unprocessed after ``max_retries`` attempts end up in
+    ``unprocessed_keys``. Throttled requests are retried by the
+    connection, and raised once it gives up.
+
+    Call ``close`` to stop the threads if you stop iterating before the
+    end. Use it through ``Table.batch_get(num_threads=...)``.
+    """
+    backoff_base = 0.05
+    max_backoff = 20
+
+    def __init__(self, *args, **kwargs):
+        self.num_threads = kwargs.pop('num_threads', 4)
+        self.max_retries = kwargs.pop('max_retries', 10)
+        super(ConcurrentBatchGetResultSet, self).__init__(*args, **kwargs)
+        self._keys_left = self._unique_keys(self._keys_left)
+        self.unprocessed_keys = []
+        self._lock = threading.Lock()
+        self._batches = None
+        self._workers = 0
+        self._finished = 0
+
+    def _unique_keys(self, keys):
+        seen = set()
+        unique = []
+        for key in keys:
+            if isinstance(key, dict):
+                key_id = tuple(sorted(key.items()))
+            else:
+                key_id = key
+            if key_id not in seen:
+                seen.add(key_id)
+                unique.append(key)
+        return unique
+
+    def fetch_more(self):
+        self._reset()
+
+        if self._batches is None:
+            self._start()
+
+        while self._finished < self._workers:
+            if self._prefetch_stopped.is_set():
+                break
+            page = self._pages.get()
+            if page is None:
+                self._finished += 1
+            elif isinstance(page, Exception):
+                self._prefetch_stopped.set()
+                raise page
+            else:
+                self._results.extend(page)
+                return
+
+        self._results_left = False
+
+    def __next__(self):
+        try:
+            return super(ConcurrentBatchGetResultSet, self).__next__()
+        except StopIteration:
+            # A ``limit`` may have ended the iteration early.
+            self.close()
+            raise
+
+    next = __next__
+
+    def _start(self):
+        self._batches = Queue()
+        keys = self._keys_left
+        self._keys_left = []
+        for i in range(0, len(keys), self._max_batch_get):
+            self._batches.put(keys[i:i + self._max_batch_get])
+        self._workers = max(1, min(self.num_threads, self._batches.qsize()))
+        self._pages = Queue(maxsize=self._workers * 2)
+        self._prefetch_stopped.clear()
+        # As with prefetching, the threads only keep a weak reference to
+        # the result set, so dropping it stops them.
+        for _ in range(self._workers):
+            thread = threading.Thread(
+                target=_fetch_batches,
+                args=(weakref.ref(self), self._batches, self._pages,
+                      self._prefetch_stopped))
+            thread.daemon = True
+            thread.start()
+
+    def _fetch_batch(self, keys):
+        # Sends one request. Throttled requests are retried by the
+        # connection, so only unprocessed keys are left to the caller.
+        # Returns the items & the unprocessed keys.
+        kwargs = self.call_kwargs.copy()
+        kwargs['keys'] = keys
+        results = self.the_callable(*self.call_args, **kwargs)
+        with self._lock:
+            self._fetches += 1
+        return results.get('results', []), results.get('unprocessed_keys', [])
+
+    def _give_up(self, keys, attempt):
+        boto.log.info('%s keys were unprocessed after %s attempts.' %
+                      (len(keys), attempt))
+        with self._lock:
+            self.unprocessed_keys.extend(keys)
+
+    def _backoff_time(self, attempt):
+        # Full jitter keeps the threads from retrying in lockstep.
+        return random.uniform(
+            0, min(self.max_backoff, self.backoff_base * (2 ** attempt)))
+
+
+def _fetch_batches(result_set_ref, batches, pages, stopped):
+    result_set = None
+    try:
+        while not stopped.is_set():
+            try:
+                keys = batches.get_nowait()
+            except Empty:
+                break
+            attempt = 0
+            while keys and not stopped.is_set():
+                result_set = result_set_ref()
+                if result_set is None:
+                    return
+                items, keys = result_set._fetch_batch(keys)
+                if keys:
+                    attempt += 1
+                    if attempt > result_set.max_retries:
+                        result_set._give_up(keys, attempt)
+                        keys = []
+                    else:
+                        wait = result_set._backoff_time(attempt)
+                result_set = None
+                if items:
+                    _put_page(result_set_ref, pages, stopped, items)
+                if keys:
+                    time.sleep(wait)
+    except Exception as e:
+        boto.log.debug('Batch get failed: %s' % e)
+        result_set = None
+        if hasattr(traceback, 'clear_frames'):
+            traceback.clear_frames(e.__traceback__)
+        _put_page(result_set_ref, pages, stopped, e)
+    _put_page(result_set_ref, pages, stopped, None)
@@ -1,17 +1,28 @@
+import random
+import threading
+import time
+from copy import deepcopy
+
 import boto
+from boto.compat import Empty, Full, Queue
 from boto.dynamodb2 import exceptions
+from boto.dynamodb2.cache import ItemCache
 from boto.dynamodb2.fields import (HashKey, RangeKey,
                                    AllIndex, KeysOnlyIndex, IncludeIndex,
                                    GlobalAllIndex, GlobalKeysOnlyIndex,
                                    GlobalIncludeIndex)
 from boto.dynamodb2.items import Item
 from boto.dynamodb2.layer1 import DynamoDBConnection
-from boto.dynamodb2.results import ResultSet, BatchGetResultSet
-from boto.dynamodb2.types import (NonBooleanDynamizer, Dynamizer, FILTER_OPERATORS,
-                                  QUERY_OPERATORS, STRING)
+from boto.dynamodb2.results import (ResultSet, BatchGetResultSet,
+                                    ConcurrentBatchGetResultSet)
+from boto.dynamodb2.types import (NonBooleanDynamizer, Dynamizer, FastDynamizer,
+                                  FILTER_OPERATORS, QUERY_OPERATORS, STRING)
 from boto.exception import JSONResponseError
 
 
+_SCAN_DONE = object()
+
+
 class Table(object):
     """
     Interacts & models the behavior of a DynamoDB table.
@@ -122,10 +133,98 @@ class Table(object):
             self.throughput = throughput
 
         self._dynamizer = NonBooleanDynamizer()
+        self.cache = None
 
     def use_boolean(self):
         self._dynamizer = Dynamizer()
 
+    def use_fast_dynamizer(self, lossy_float=False):
+        """
+        Encodes and decodes items with a
+        :class:`boto.dynamodb2.types.FastDynamizer`, which uses less CPU
+        on large result sets.  Booleans keep being stored as they were,
+        so call ``use_boolean`` first if you want that too.
+
+        :type lossy_float: boolean
+        :param lossy_float: Whether numbers are returned as ``int`` or
+            ``float`` instead of ``Decimal``.  This is faster still, but
+            may lose precision.  Defaults to ``False``.
+        """
+        use_boolean = getattr(
+            self._dynamizer, 'use_boolean',
+            not isinstance(self._dynamizer, NonBooleanDynamizer))
+        self._dynamizer = FastDynamizer(use_boolean=use_boolean,
+                                        lossy_float=lossy_float)
+
+    def use_cache(self, max_size=1000, ttl=60):
+        """
+        Keeps recently read items in an in-process
+        :class:`boto.dynamodb2.cache.ItemCache`, so that ``get_item`` &
+        ``batch_get`` can answer repeated reads of the same keys without a
+        request to DynamoDB.
+
+        Only reads of whole items are cached, and consistent reads always
+        go to DynamoDB, though their results are cached. Writes made
+        through this ``Table`` (``put_item``, ``delete_item``,
+        ``Item.save``, ``Item.partial_save`` & batch writes) drop the item
+        from the cache. Writes made by anything else are only seen once
+        the cached item expires, so pick a ``ttl`` your application can
+        live with. Set ``cache`` back to ``None`` to stop caching.
+
+        :type max_size: int
+        :param max_size: The most items to keep.  The least recently used
+            item is evicted first.  Defaults to ``1000``.
+
+        :type ttl: int
+        :param ttl: The number of seconds to keep an item for, or ``None``
+            to keep it until it is evicted.  Defaults to ``60``.
+
+        :rtype: :class:`boto.dynamodb2.cache.ItemCache`
+        :return: The cache, which also reports ``hits``, ``misses`` &
+            ``hit_rate``.
+
+        Example::
+
+            >>> cache = users.use_cache(max_size=10000, ttl=300)
+            >>> john = users.get_item(username='johndoe')
+            # Served from the cache.
+            >>> john = users.get_item(username='johndoe')
+            >>> cache.hits, cache.misses
+            (1, 1)
+
+        """
+        self.cache = ItemCache(max_size=max_size, ttl=ttl)
+        return self.cache
+
+    def _cached_item(self, raw_key):
+        # Hands out a copy, so changes made to the ``Item`` don't leak into
+        # the cache.
+        data = self.cache.get(raw_key)
+        if data is None:
+            return None
+        return Item(self, data=deepcopy(data), loaded=True)
+
+    def _uncache(self, raw_key):
+        if self.cache is not None:
+            self.cache.invalidate(raw_key)
+
+    def _uncache_item(self, raw_item):
+        if self.cache is not None:
+            raw_key = {}
+            for field in self.get_key_fields():
+                if field in raw_item:
+                    raw_key[field] = raw_item[field]
+            self.cache.invalidate(raw_key)
+
+    def _uncache_requests(self, requests):
+        if self.cache is None:
+            return
+        for request in requests:
+            if 'PutRequest' in request:
+                self._uncache_item(request['PutRequest']['Item'])
+            elif 'DeleteRequest' in request:
+                self._uncache(request['DeleteRequest']['Key'])
+
     @classmethod
     def create(cls, table_name, schema, throughput=None, indexes=None,
                global_indexes=None, connection=None):
@@ -623,6 +722,8 @@ class Table(object):
 
         """
         self.connection.delete_table(self.table_name)
+        if self.cache is not None:
+            self.cache.clear()
         return True
 
     def _encode_keys(self, keys):
@@ -672,6 +773,9 @@ class Table(object):
 
         Raises an ``ItemNotFound`` exception if the item is not found.
 
+        If ``use_cache`` has been called, the item may come from the cache
+        instead of DynamoDB.
+
         Example::
 
             # A simple hash key.
@@ -699,6 +803,18 @@ class Table(object):
 
         """
         raw_key = self._encode_keys(kwargs)
+        cache = self.cache
+        if attributes is not None:
+            # Partial items can't stand in for whole ones.
+            cache = None
+
+        if cache is not None:
+            if not consistent:
+                item = self._cached_item(raw_key)
+                if item is not None:
+                    return item
+            generation = cache.generation
+
         item_data = self.connection.get_item(
             self.table_name,
             raw_key,
@@ -709,6 +825,9 @@ class Table(object):
             raise exceptions.ItemNotFound("Item %s couldn't be found." % kwargs)
         item = Item(self)
         item.load(item_data)
+
+        if cache is not None:
+            cache.set(raw_key, deepcopy(item._data), generation)
         return item
 
     def has_item(self, **kwargs):
@@ -833,7 +952,11 @@ class Table(object):
         if expects is not None:
             kwargs['expected'] = expects
 
-        self.connection.put_item(self.table_name, item_data, **kwargs)
+        try:
+            self.connection.put_item(self.table_name, item_data, **kwargs)
+        finally:
+            # The write may have landed even if the request failed.
+            self._uncache_item(item_data)
         return True
 
     def _update_item(self, key, item_data, expects=None):
@@ -849,7 +972,11 @@ class Table(object):
         if expects is not None:
             kwargs['expected'] = expects
 
-        self.connection.update_item(self.table_name, raw_key, item_data, **kwargs)
+        try:
+            self.connection.update_item(self.table_name, raw_key, item_data,
+                                        **kwargs)
+        finally:
+            self._uncache(raw_key)
         return True
 
     def delete_item(self, expected=None, conditional_operator=None, **kwargs):
@@ -913,6 +1040,8 @@ class Table(object):
                                         conditional_operator=conditional_operator)
         except exceptions.ConditionalCheckFailedException:
             return False
+        finally:
+            self._uncache(raw_key)
 
         return True
 
@@ -943,7 +1072,7 @@ class Table(object):
 
         return [field.name for field in self.schema]
 
-    def batch_write(self):
+    def batch_write(self, num_threads=None):
         """
         Allows the batching of writes to DynamoDB.
 
@@ -983,8 +1112,23 @@ class Table(object):
             ...     # Nothing yet, but once we leave the context, the
             ...     # put/deletes will be sent.
 
+        To load large amounts of data faster, pass ``num_threads`` to send
+        several batches at once from a pool of threads.  The batch then
+        also reports ``items_per_second`` and ``consumed_capacity``; see
+        :class:`ConcurrentBatchTable`.
+
+        Example::
+
+            >>> with users.batch_write(num_threads=8) as batch:
+            ...     for user in lots_of_users:
+            ...         batch.put_item(data=user)
+            >>> batch.items_per_second
+            1843.2
+
         """
         # PHENOMENAL COSMIC DOCS!!! itty-bitty code.
+        if num_threads:
+            return ConcurrentBatchTable(self, num_threads=num_threads)
         return BatchTable(self)
 
     def _build_filters(self, filter_kwargs, using=QUERY_OPERATORS):
@@ -1066,7 +1210,7 @@ class Table(object):
 
     def query_2(self, limit=None, index=None, reverse=False,
                 consistent=False, attributes=None, max_page_size=None,
-                query_filter=None, conditional_operator=None,
+                query_filter=None, conditional_operator=None, prefetch=0,
                 **filter_kwargs):
         """
         Queries for a set of matching items in a DynamoDB table.
@@ -1110,6 +1254,11 @@ class Table(object):
         the scan from drowning out other queries. (Default: ``None`` -
         fetch as many as DynamoDB will return)
 
+        Optionally accepts a ``prefetch`` parameter, which should be an
+        integer count of pages to fetch in a background thread while the
+        current page is being iterated over. (Default: ``0`` - fetch each
+        page once the previous one is used up)
+
         Optionally accepts a ``query_filter`` which is a dictionary of filter
         conditions against any arbitrary field in the returned data.
 
@@ -1187,7 +1336,8 @@ class Table(object):
             select = None
 
         results = ResultSet(
-            max_page_size=max_page_size
+            max_page_size=max_page_size,
+            prefetch=prefetch
         )
         kwargs = filter_kwargs.copy()
         kwargs.update({
@@ -1372,7 +1522,7 @@ class Table(object):
 
     def scan(self, limit=None, segment=None, total_segments=None,
              max_page_size=None, attributes=None, conditional_operator=None,
-             **filter_kwargs):
+             prefetch=0, **filter_kwargs):
         """
         Scans across all items within a DynamoDB table.
 
@@ -1403,6 +1553,11 @@ class Table(object):
         the scan from drowning out other queries. (Default: ``None`` -
         fetch as many as DynamoDB will return)
 
+        Optionally accepts a ``prefetch`` parameter, which should be an
+        integer count of pages to fetch in a background thread while the
+        current page is being iterated over. (Default: ``0`` - fetch each
+        page once the previous one is used up)
+
         Optionally accepts an ``attributes`` parameter, which should be a
         tuple. If you provide any attributes only these will be fetched
         from DynamoDB. This uses the ``AttributesToGet`` and set's
@@ -1435,7 +1590,8 @@ class Table(object):
 
         """
         results = ResultSet(
-            max_page_size=max_page_size
+            max_page_size=max_page_size,
+            prefetch=prefetch
         )
         kwargs = filter_kwargs.copy()
         kwargs.update({
@@ -1448,12 +1604,66 @@ class Table(object):
         results.to_call(self._scan, **kwargs)
         return results
 
+    def parallel_scan(self, total_segments=4, num_threads=None,
+                      callback=None, max_read_capacity=None,
+                      max_page_size=None, attributes=None,
+                      conditional_operator=None, **filter_kwargs):
+        """
+        Scans across all items within a DynamoDB table, scanning
+        ``total_segments`` segments of the table at once.
+
+        Each segment is paginated by its own ``ResultSet`` on a pool of
+        threads. The filters and the ``max_page_size``, ``attributes`` &
+        ``conditional_operator`` parameters behave as they do for ``scan``.
+
+        Optionally accepts a ``num_threads`` parameter, which caps how many
+        segments are scanned at once. (Default: ``None`` - all of them)
+
+        Optionally accepts a ``max_read_capacity`` parameter, which should be
+        the number of read capacity units per second the scan may consume
+        in total. Segments pause between pages to stay under it.
+        (Default: ``None`` - no limit)
+
+        Optionally accepts a ``callback`` parameter, which should be a
+        callable taking ``segment`` & ``item`` arguments. It's called from
+        the segment's thread for every item, and ``parallel_scan`` returns
+        once every segment has been scanned. Without a callback, a
+        ``ParallelScan`` is returned, which yields the items of all segments
+        in the order they arrive.
+
+        Example::
+
+            >>> for item in users.parallel_scan(total_segments=8):
+            ...     print item['username']
+
+            # Write each segment to its own file.
+            >>> users.parallel_scan(
+            ...     total_segments=8,
+            ...     max_read_capacity=200,
+            ...     callback=lambda segment, item: files[segment].write(...)
+            ... )
+
+        """
+        scan = ParallelScan(
+            self, total_segments, num_threads=num_threads,
+            max_read_capacity=max_read_capacity,
+            max_page_size=max_page_size, attributes=attributes,
+            conditional_operator=conditional_operator, **filter_kwargs
+        )
+
+        if callback is not None:
+            scan.run(callback)
+        return scan
+
     def _scan(self, limit=None, exclusive_start_key=None, segment=None,
               total_segments=None, attributes=None, conditional_operator=None,
-              **filter_kwargs):
+              capacity_callback=None, **filter_kwargs):
         """
         The internal method that performs the actual scan. Used extensively
         by ``ResultSet`` to perform each (paginated) request.
+
+        If ``capacity_callback`` is given, it's called with the read capacity
+        units consumed by the request.
         """
         kwargs = {
             'limit': limit,
@@ -1463,6 +1673,9 @@ class Table(object):
             'conditional_operator': conditional_operator,
         }
 
+        if capacity_callback is not None:
+            kwargs['return_consumed_capacity'] = 'TOTAL'
+
         if exclusive_start_key:
             kwargs['exclusive_start_key'] = {}
 
@@ -1480,6 +1693,11 @@ class Table(object):
             self.table_name,
             **kwargs
         )
+
+        if capacity_callback is not None:
+            consumed = raw_results.get('ConsumedCapacity', {})
+            capacity_callback(consumed.get('CapacityUnits', 0))
+
         results = []
         last_key = None
 
@@ -1501,7 +1719,8 @@ class Table(object):
             'last_key': last_key,
         }
 
-    def batch_get(self, keys, consistent=False, attributes=None):
+    def batch_get(self, keys, consistent=False, attributes=None,
+                  num_threads=None):
         """
         Fetches many specific items in batch from a table.
 
@@ -1516,6 +1735,16 @@ class Table(object):
         tuple. If you provide any attributes only these will be fetched
         from DynamoDB.
 
+        Optionally accepts a ``num_threads`` parameter, which should be an
+        integer count of ``BatchGetItem`` requests to send at once from a
+        pool of threads. Duplicate keys are dropped & items are returned
+        in the order the responses arrive; see
+        :class:`boto.dynamodb2.results.ConcurrentBatchGetResultSet`.
+        (Default: ``None`` - one request at a time, in key order)
+
+        If ``use_cache`` has been called, keys found in the cache are not
+        requested from DynamoDB.
+
         Returns a ``ResultSet``, which transparently handles the pagination of
         results you get back.
 
@@ -1541,7 +1770,13 @@ class Table(object):
         """
         # We pass the keys to the constructor instead, so it can maintain it's
         # own internal state as to what keys have been processed.
-        results = BatchGetResultSet(keys=keys, max_batch_get=self.max_batch_get)
+        if num_threads:
+            results = ConcurrentBatchGetResultSet(
+                keys=keys, max_batch_get=self.max_batch_get,
+                num_threads=num_threads)
+        else:
+            results = BatchGetResultSet(keys=keys,
+                                        max_batch_get=self.max_batch_get)
         results.to_call(self._batch_get, consistent=consistent, attributes=attributes)
         return results
 
@@ -1562,17 +1797,40 @@ class Table(object):
         if attributes is not None:
             items[self.table_name]['AttributesToGet'] = attributes
 
+        cache = self.cache
+        if attributes is not None:
+            cache = None
+        results = []
+        unprocessed_keys = []
+        key_fields = []
+
         for key_data in keys:
             raw_key = {}
 
             for key, value in key_data.items():
                 raw_key[key] = self._dynamizer.encode(value)
 
+            if cache is not None and not consistent:
+                item = self._cached_item(raw_key)
+                if item is not None:
+                    results.append(item)
+                    continue
+
+            key_fields = list(raw_key.keys())
             items[self.table_name]['Keys'].append(raw_key)
 
+        if not items[self.table_name]['Keys']:
+            # Everything came from the cache.
+            return {
+                'results': results,
+                'last_key': None,
+                'unprocessed_keys': unprocessed_keys,
+            }
+
+        if cache is not None:
+            generation = cache.generation
+
         raw_results = self.connection.batch_get_item(request_items=items)
-        results = []
-        unprocessed_keys = []
 
         for raw_item in raw_results['Responses'].get(self.table_name, []):
             item = Item(self)
@@ -1581,6 +1839,12 @@ class Table(object):
             })
             results.append(item)
 
+            if cache is not None:
+                raw_key = {}
+                for field in key_fields:
+                    raw_key[field] = raw_item.get(field)
+                cache.set(raw_key, deepcopy(item._data), generation)
+
         raw_unprocessed = raw_results.get('UnprocessedKeys', {}).get(self.table_name, {})
 
         for raw_key in raw_unprocessed.get('Keys', []):
@@ -1623,6 +1887,11 @@ class BatchTable(object):
 
     You likely don't want to try to use this object directly.
     """
+    # Bounds, in seconds, for the jittered exponential backoff between
+    # attempts to resend unprocessed items.
+    backoff_base = 0.05
+    max_backoff = 20
+
     def __init__(self, table):
         self.table = table
         self._to_put = []
@@ -1661,32 +1930,43 @@ class BatchTable(object):
 
     def flush(self):
         batch_data = {
-            self.table.table_name: [
-                # We'll insert data here shortly.
-            ],
+            self.table.table_name: self._build_requests(),
         }
 
+        try:
+            resp = self.table.connection.batch_write_item(batch_data)
+        finally:
+            self.table._uncache_requests(batch_data[self.table.table_name])
+        self.handle_unprocessed(resp)
+
+        self._to_put = []
+        self._to_delete = []
+        return True
+
+    def _build_requests(self):
+        requests = []
+
         for put in self._to_put:
             item = Item(self.table, data=put)
-            batch_data[self.table.table_name].append({
+            requests.append({
                 'PutRequest': {
                     'Item': item.prepare_full(),
                 }
             })
 
         for delete in self._to_delete:
-            batch_data[self.table.table_name].append({
+            requests.append({
                 'DeleteRequest': {
                     'Key': self.table._encode_keys(delete),
                 }
             })
 
-        resp = self.table.connection.batch_write_item(batch_data)
-        self.handle_unprocessed(resp)
+        return requests
 
-        self._to_put = []
-        self._to_delete = []
-        return True
+    def _backoff_time(self, attempt):
+        # Full jitter keeps concurrent writers from retrying in lockstep.
+        return random.uniform(
+            0, min(self.max_backoff, self.backoff_base * (2 ** attempt)))
 
     def handle_unprocessed(self, resp):
         if len(resp.get('UnprocessedItems', [])):
@@ -1707,6 +1987,7 @@ class BatchTable(object):
             "Re-sending %s unprocessed items." % len(self._unprocessed)
         )
 
+        attempt = 0
         while len(self._unprocessed):
             # Again, do 25 at a time.
             to_resend = self._unprocessed[:25]
@@ -1716,8 +1997,343 @@ class BatchTable(object):
                 self.table.table_name: to_resend
             }
             boto.log.info("Sending %s items" % len(to_resend))
-            resp = self.table.connection.batch_write_item(batch_data)
+            left_before = len(self._unprocessed)
+            try:
+                resp = self.table.connection.batch_write_item(batch_data)
+            finally:
+                self.table._uncache_requests(to_resend)
             self.handle_unprocessed(resp)
             boto.log.info(
                 "%s unprocessed items left" % len(self._unprocessed)
             )
+            if len(self._unprocessed) > left_before:
+                # Still being throttled, so give the table a moment.
+                attempt += 1
+                time.sleep(self._backoff_time(attempt))
+
+
+class ConcurrentBatchTable(BatchTable):
+    """
+    A ``BatchTable`` that writes batches from a pool of threads.
+
+    Items are collected into batches of 25 just like ``BatchTable``
+    does, but each full batch is handed to one of ``num_threads`` worker
+    threads, so several ``BatchWriteItem`` requests are in flight at
+    once.  Workers resend unprocessed items with jittered exponential
+    backoff; items still unprocessed after ``max_retries`` attempts are
+    resent one batch at a time when the context manager exits.
+
+    The number of requests in flight adapts to throttling.  It is
+    halved whenever DynamoDB returns unprocessed items or raises
+    ``ProvisionedThroughputExceededException``, and grows by one again
+    after every ``num_threads`` batches written without throttling.
+
+    ``items_written``, ``consumed_capacity``, ``throttle_events`` and
+    ``items_per_second`` report on the progress of the load.
+
+    Use it through ``Table.batch_write(num_threads=...)``.
+    """
+    def __init__(self, table, num_threads=4, max_retries=10):
+        super(ConcurrentBatchTable, self).__init__(table)
+        self.num_threads = num_threads
+        self.max_retries = max_retries
+        self.concurrency = num_threads
+        self.items_written = 0
+        self.consumed_capacity = 0.0
+        self.throttle_events = 0
+        self._in_flight = 0
+        self._clean_batches = 0
+        self._error = None
+        self._start_time = None
+        self._end_time = None
+        self._lock = threading.Condition()
+        self._queue = Queue(maxsize=num_threads * 2)
+        self._threads = []
+
+    def __exit__(self, type, value, traceback):
+        try:
+            if self._to_put or self._to_delete:
+                self.flush()
+            self.wait()
+        finally:
+            self._stop_threads()
+            self._end_time = time.time()
+
+        if self._unprocessed:
+            self.resend_unprocessed()
+
+    @property
+    def items_per_second(self):
+        if self._start_time is None:
+            return 0.0
+        elapsed = (self._end_time or time.time()) - self._start_time
+        if elapsed <= 0:
+            return 0.0
+        return self.items_written / elapsed
+
+    def flush(self):
+        """
+        Hands the items collected so far to the worker threads.  This
+        only blocks if the workers are already well behind; use
+        ``wait`` to wait for the items to be written.
+        """
+        self._raise_error()
+        requests = self._build_requests()
+        self._to_put = []
+        self._to_delete = []
+        if not requests:
+            return True
+        if not self._threads:
+            self._start_threads()
+        self._queue.put(requests)
+        return True
+
+    def wait(self):
+        """
+        Blocks until every batch handed to the worker threads has been
+        written, then raises the first error any of them ran into.
+        """
+        if self._threads:
+            self._queue.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def _start_threads(self):
+        self._start_time = time.time()
+        for _ in range(self.num_threads):
+            thread = threading.Thread(target=self._worker)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _stop_threads(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _worker(self):
+        while True:
+            requests = self._queue.get()
+            try:
+                if requests is None:
+                    return
+                # Once something has failed, drain the queue without
+                # sending anything else.
+                if self._error is None:
+                    self._write(requests)
+            except Exception as e:
+                boto.log.debug('Batch write failed: %s' % e)
+                with self._lock:
+                    if self._error is None:
+                        self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _write(self, requests):
+        table_name = self.table.table_name
+        attempt = 0
+        while requests:
+            self._acquire_slot()
+            try:
+                resp = self.table.connection.batch_write_item(
+                    {table_name: requests}, return_consumed_capacity='TOTAL')
+                unprocessed = resp.get('UnprocessedItems', {}).get(
+                    table_name, [])
+            except exceptions.ProvisionedThroughputExceededException:
+                resp = {}
+                unprocessed = requests
+            finally:
+                self._release_slot()
+                self.table._uncache_requests(requests)
+            self._record(resp, len(requests) - len(unprocessed),
+                         throttled=bool(unprocessed))
+            if not unprocessed:
+                return
+            attempt += 1
+            if attempt > self.max_retries:
+                boto.log.info("%s items were unprocessed after %s attempts. "
+                              "Storing for later." % (len(unprocessed),
+                                                      attempt))
+                with self._lock:
+                    self._unprocessed.extend(unprocessed)
+                return
+            time.sleep(self._backoff_time(attempt))
+            requests = unprocessed
+
+    def _acquire_slot(self):
+        with self._lock:
+            while self._in_flight >= self.concurrency:
+                self._lock.wait()
+            self._in_flight += 1
+
+    def _release_slot(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._lock.notify_all()
+
+    def _record(self, resp, written, throttled):
+        with self._lock:
+            self.items_written += written
+            for consumed in resp.get('ConsumedCapacity', []):
+                self.consumed_capacity += consumed.get('CapacityUnits', 0)
+            if throttled:
+                self.throttle_events += 1
+                self.concurrency = max(1, self.concurrency // 2)
+                self._clean_batches = 0
+            else:
+                self._clean_batches += 1
+                if (self._clean_batches >= self.num_threads and
+                        self.concurrency < self.num_threads):
+                    self.concurrency += 1
+                    self._clean_batches = 0
+                    self._lock.notify_all()
+
+
+class ParallelScan(object):
+    """
+    Scans the segments of a table on a pool of threads.
+
+    Iterating over it yields the items of all segments as they arrive.
+    Alternatively, ``run`` hands every item to a callback from the
+    thread scanning its segment.  ``consumed_capacity`` holds the read
+    capacity units consumed so far.
+
+    You likely want to use ``Table.parallel_scan`` rather than this
+    object directly.
+    """
+    # How many items can be waiting for the consumer before segments stop
+    # fetching more.
+    max_buffered_items = 1000
+
+    def __init__(self, table, total_segments, num_threads=None,
+                 max_read_capacity=None, max_page_size=None,
+                 **scan_kwargs):
+        self.table = table
+        self.total_segments = total_segments
+        self.num_threads = min(num_threads or total_segments, total_segments)
+        self.max_read_capacity = max_read_capacity
+        self.max_page_size = max_page_size
+        self.scan_kwargs = scan_kwargs
+        self.consumed_capacity = 0.0
+        self._lock = threading.Lock()
+        self._available_capacity = max_read_capacity
+        self._last_refill = time.time()
+        self._stopped = threading.Event()
+
+    def __iter__(self):
+        items = Queue(maxsize=self.max_buffered_items)
+
+        def put(value):
+            # Stop waiting for room once the consumer has gone away.
+            while not self._stopped.is_set():
+                try:
+                    items.put(value, timeout=0.1)
+                    return
+                except Full:
+                    pass
+
+        def emit(segment, item):
+            put((segment, item))
+
+        threads = self._start(emit, put)
+        try:
+            finished = 0
+            while finished < len(threads):
+                value = items.get()
+                if value is _SCAN_DONE:
+                    finished += 1
+                elif isinstance(value, Exception):
+                    raise value
+                else:
+                    yield value[1]
+        finally:
+            self._stop(threads)
+
+    def run(self, callback):
+        """
+        Scans every segment, calling ``callback(segment, item)`` for each
+        item from the thread scanning that segment. Raises the first error
+        any segment ran into.
+        """
+        errors = []
+
+        def done(value):
+            if isinstance(value, Exception):
+                errors.append(value)
+                self._stopped.set()
+
+        threads = self._start(callback, done)
+        self._stop(threads, wait=True)
+        if errors:
+            raise errors[0]
+
+    def _start(self, emit, done):
+        self._stopped.clear()
+        segments = Queue()
+        for segment in range(self.total_segments):
+            segments.put(segment)
+
+        threads = []
+        for _ in range(self.num_threads):
+            thread = threading.Thread(target=self._worker,
+                                      args=(segments, emit, done))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    def _stop(self, threads, wait=False):
+        if not wait:
+            self._stopped.set()
+        for thread in threads:
+            thread.join()
+
+    def _worker(self, segments, emit, done):
+        try:
+            while not self._stopped.is_set():
+                try:
+                    segment = segments.get_nowait()
+                except Empty:
+                    break
+
+                results = ResultSet(max_page_size=self.max_page_size)
+                results.to_call(
+                    self.table._scan, segment=segment,
+                    total_segments=self.total_segments,
+                    capacity_callback=self._consume, **self.scan_kwargs
+                )
+                for item in results:
+                    if self._stopped.is_set():
+                        break
+                    emit(segment, item)
+        except Exception as e:
+            boto.log.debug('Scan of segment failed: %s' % e)
+            done(e)
+        done(_SCAN_DONE)
+
+    def _consume(self, units):
+        # A token bucket holding at most one second of capacity. Going
+        # into debt is allowed, but then the caller sleeps it off before
+        # its next request.
+        with self._lock:
+            self.consumed_capacity += units
+            if self.max_read_capacity is None:
+                return
+            now = time.time()
+            self._available_capacity = min(
+                self.max_read_capacity,
+                self._available_capacity +
+                (now - self._last_refill) * self.max_read_capacity)
+            self._last_refill = now
+            self._available_capacity -= units
+            delay = 0
+            if self._available_capacity < 0:
+                delay = -self._available_capacity / float(
+                    self.max_read_capacity)
+        if delay:
+            time.sleep(delay)
@@ -1,7 +1,7 @@
 # Shadow the DynamoDB v1 bits.
 # This way, no end user should have to cross-import between versions & we
 # reserve the namespace to extend v2 if it's ever needed.
-from boto.dynamodb.types import NonBooleanDynamizer, Dynamizer
+from boto.dynamodb.types import NonBooleanDynamizer, Dynamizer, FastDynamizer
 
 
 # Some constants for our use.
@@ -23,9 +23,13 @@
 This module provides an interface to the Elastic Compute Cloud (EC2)
 service from AWS.
 """
-from boto.ec2.connection import EC2Connection
 from boto.regioninfo import RegionInfo, get_regions, load_regions
 from boto.regioninfo import connect
+from boto.compat import lazy_import
+
+lazy_import(globals(), {
+    'EC2Connection': 'boto.ec2.connection',
+})
 
 
 RegionData = load_regions().get('ec2', {})
@@ -41,6 +45,7 @@ def regions(**kw_params):
     :rtype: list
     :return: A list of :class:`boto.ec2.regioninfo.RegionInfo`
     """
+    from boto.ec2.connection import EC2Connection
     return get_regions('ec2', connection_cls=EC2Connection)
 
 
@@ -58,6 +63,7 @@ def connect_to_region(region_name, **kw_params):
     :return: A connection to the given region, or None if an invalid region
              name is given
     """
+    from boto.ec2.connection import EC2Connection
     if 'region' in kw_params and isinstance(kw_params['region'], RegionInfo)\
        and region_name == kw_params['region'].name:
         return EC2Connection(**kw_params)
@@ -656,6 +656,35 @@ class EC2Connection(AWSQueryConnection):
 
         return retval
 
+    def iter_instances(self, instance_ids=None, filters=None,
+                       dry_run=False, max_results=None):
+        """
+        Iterate over all the instances associated with your account.
+
+        Unlike :meth:`get_only_instances`, the responses are parsed as
+        they are read, and instances are yielded as soon as their
+        reservation has been parsed, so large accounts never need to be
+        held in memory at once.
+
+        Takes the same parameters as :meth:`get_only_instances`.
+
+        :rtype: iterator
+        :return: An iterator of :class:`boto.ec2.instance.Instance`
+        """
+        next_token = None
+        while True:
+            params = self._build_describe_instances_params(
+                instance_ids, filters, dry_run, max_results, next_token)
+            rs = ResultSet()
+            for reservation in self.iter_list('DescribeInstances', params,
+                                              [('item', Reservation)],
+                                              verb='POST', result_set=rs):
+                for instance in reservation.instances:
+                    yield instance
+            next_token = rs.next_token
+            if not next_token:
+                break
+
     def get_all_reservations(self, instance_ids=None, filters=None,
                              dry_run=False, max_results=None, next_token=None):
         """
@@ -686,6 +715,13 @@ class EC2Connection(AWSQueryConnection):
         :rtype: list
         :return: A list of  :class:`boto.ec2.instance.Reservation`
         """
+        params = self._build_describe_instances_params(
+            instance_ids, filters, dry_run, max_results, next_token)
+        return self.get_list('DescribeInstances', params,
+                             [('item', Reservation)], verb='POST')
+
+    def _build_describe_instances_params(self, instance_ids, filters,
+                                         dry_run, max_results, next_token):
         params = {}
         if instance_ids:
             self.build_list_params(params, instance_ids, 'InstanceId')
@@ -705,8 +741,7 @@ class EC2Connection(AWSQueryConnection):
             params['MaxResults'] = max_results
         if next_token:
             params['NextToken'] = next_token
-        return self.get_list('DescribeInstances', params,
-                             [('item', Reservation)], verb='POST')
+        return params
 
     def get_all_instance_status(self, instance_ids=None,
                                 max_results=None, next_token=None,
@@ -26,11 +26,17 @@
 This module provies an interface to the Elastic MapReduce (EMR)
 service from AWS.
 """
-from boto.emr.connection import EmrConnection
-from boto.emr.step import Step, StreamingStep, JarStep
-from boto.emr.bootstrap_action import BootstrapAction
 from boto.regioninfo import RegionInfo, get_regions
 from boto.regioninfo import connect
+from boto.compat import lazy_import
+
+lazy_import(globals(), {
+    'EmrConnection': 'boto.emr.connection',
+    'Step': 'boto.emr.step',
+    'StreamingStep': 'boto.emr.step',
+    'JarStep': 'boto.emr.step',
+    'BootstrapAction': 'boto.emr.bootstrap_action',
+})
 
 
 def regions():
@@ -40,9 +46,11 @@ def regions():
     :rtype: list
     :return: A list of :class:`boto.regioninfo.RegionInfo`
     """
+    from boto.emr.connection import EmrConnection
     return get_regions('elasticmapreduce', connection_cls=EmrConnection)
 
 
 def connect_to_region(region_name, **kw_params):
+    from boto.emr.connection import EmrConnection
     return connect('elasticmapreduce', region_name,
                    connection_cls=EmrConnection, **kw_params)
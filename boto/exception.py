@@ -430,6 +430,13 @@ class AWSConnectionError(BotoClientError):
     pass
 
 
+class ConnectionPoolFullError(AWSConnectionError):
+    """
+    Raised when no request slot for a host becomes available in time.
+    """
+    pass
+
+
 class StorageDataError(BotoClientError):
     """
     Error receiving data from a storage service.
@@ -21,15 +21,17 @@
 #
 import os
 import math
+import mmap
+import json
 import threading
-import hashlib
 import time
 import logging
-from boto.compat import Queue
+from boto.compat import Queue, Empty, six
 import binascii
 
 from boto.glacier.utils import DEFAULT_PART_SIZE, minimum_part_size, \
-                               chunk_hashes, tree_hash, bytes_to_hex
+                               chunk_hashes, tree_hash, bytes_to_hex, \
+                               compute_hashes_from_bytes
 from boto.glacier.exceptions import UploadArchiveError, \
                                     DownloadArchiveError, \
                                     TreeHashDoesNotMatchError
@@ -65,9 +67,12 @@ class ConcurrentTransferer(object):
             thread.join()
         log.debug("Threads have exited.")
 
-    def _add_work_items_to_queue(self, total_parts, worker_queue, part_size):
+    def _add_work_items_to_queue(self, total_parts, worker_queue, part_size,
+                                 skip=()):
         log.debug("Adding work items to queue.")
         for i in range(total_parts):
+            if i in skip:
+                continue
             worker_queue.put((i, part_size))
         for i in range(self._num_threads):
             worker_queue.put(_END_SENTINEL)
@@ -107,7 +112,7 @@ class ConcurrentUploader(ConcurrentTransferer):
         self._api = api
         self._vault_name = vault_name
 
-    def upload(self, filename, description=None):
+    def upload(self, filename, description=None, checkpoint_file=None):
         """Concurrently create an archive.
 
         The part_size value specified when the class was constructed
@@ -116,48 +121,102 @@ class ConcurrentUploader(ConcurrentTransferer):
         the part size used will be the minimum part size required
         to properly upload the given file.
 
+        If ``checkpoint_file`` is given, the progress of the upload is
+        recorded in that file as parts complete (see
+        :class:`UploadCheckpoint`).  When the file already exists the
+        upload it describes is resumed instead of starting a new one,
+        and only the parts that were not recorded are sent.  A failed
+        upload is left open rather than aborted so that it can be
+        resumed, and the checkpoint file is removed once the archive
+        has been created.
+
         :type file: str
         :param file: The filename to upload
 
         :type description: str
         :param description: The description of the archive.
 
+        :type checkpoint_file: str
+        :param checkpoint_file: The path of a file used to record the
+            progress of the upload so that it can be resumed.
+
         :rtype: str
         :return: The archive id of the newly created archive.
 
         """
         total_size = os.stat(filename).st_size
-        total_parts, part_size = self._calculate_required_part_size(total_size)
+        checkpoint = None
+        if checkpoint_file is not None:
+            checkpoint = UploadCheckpoint.load(checkpoint_file)
+        if checkpoint is not None:
+            if checkpoint.total_size != total_size or \
+                    checkpoint.vault_name != self._vault_name:
+                raise UploadArchiveError(
+                    "Checkpoint %s does not match the upload of %s to "
+                    "vault %s" % (checkpoint_file, filename,
+                                  self._vault_name))
+            # The part size is fixed for the lifetime of a multipart
+            # upload, so it comes from the checkpoint and not from us.
+            part_size = checkpoint.part_size
+            total_parts = int(math.ceil(total_size / float(part_size)))
+            upload_id = checkpoint.upload_id
+            log.debug("Resuming upload %s, %s of %s parts already uploaded.",
+                      upload_id, len(checkpoint.parts), total_parts)
+        else:
+            total_parts, part_size = self._calculate_required_part_size(
+                total_size)
+            response = self._api.initiate_multipart_upload(self._vault_name,
+                                                           part_size,
+                                                           description)
+            upload_id = response['UploadId']
+            if checkpoint_file is not None:
+                checkpoint = UploadCheckpoint.create(
+                    checkpoint_file, self._vault_name, upload_id,
+                    part_size, total_size)
         hash_chunks = [None] * total_parts
+        completed = {}
+        if checkpoint is not None:
+            completed = checkpoint.parts
+            for part_number, tree_sha256 in completed.items():
+                hash_chunks[part_number] = tree_sha256
+        self._checkpoint = checkpoint
         worker_queue = Queue()
         result_queue = Queue()
-        response = self._api.initiate_multipart_upload(self._vault_name,
-                                                       part_size,
-                                                       description)
-        upload_id = response['UploadId']
         # The basic idea is to add the chunks (the offsets not the actual
         # contents) to a work queue, start up a thread pool, let the crank
         # through the items in the work queue, and then place their results
         # in a result queue which we use to complete the multipart upload.
-        self._add_work_items_to_queue(total_parts, worker_queue, part_size)
+        self._add_work_items_to_queue(total_parts, worker_queue, part_size,
+                                      skip=completed)
         self._start_upload_threads(result_queue, upload_id,
                                    worker_queue, filename)
         try:
             self._wait_for_upload_threads(hash_chunks, result_queue,
-                                          total_parts)
+                                          total_parts - len(completed))
         except UploadArchiveError as e:
-            log.debug("An error occurred while uploading an archive, "
-                      "aborting multipart upload.")
-            self._api.abort_multipart_upload(self._vault_name, upload_id)
+            if checkpoint is not None:
+                log.debug("An error occurred while uploading an archive, "
+                          "leaving multipart upload %s open to be resumed "
+                          "from %s.", upload_id, checkpoint_file)
+                checkpoint.close()
+            else:
+                log.debug("An error occurred while uploading an archive, "
+                          "aborting multipart upload.")
+                self._api.abort_multipart_upload(self._vault_name, upload_id)
             raise e
+        finally:
+            self._close_mapping()
         log.debug("Completing upload.")
         response = self._api.complete_multipart_upload(
             self._vault_name, upload_id, bytes_to_hex(tree_hash(hash_chunks)),
             total_size)
+        if checkpoint is not None:
+            checkpoint.remove()
         log.debug("Upload finished.")
         return response['ArchiveId']
 
     def _wait_for_upload_threads(self, hash_chunks, result_queue, total_parts):
+        checkpoint = getattr(self, '_checkpoint', None)
         for _ in range(total_parts):
             result = result_queue.get()
             if isinstance(result, Exception):
@@ -171,18 +230,142 @@ class ConcurrentUploader(ConcurrentTransferer):
             # the entire archive.
             part_number, tree_sha256 = result
             hash_chunks[part_number] = tree_sha256
+            if checkpoint is not None:
+                checkpoint.record_part(part_number, tree_sha256)
         self._shutdown_threads()
 
     def _start_upload_threads(self, result_queue, upload_id, worker_queue,
                               filename):
         log.debug("Starting threads.")
+        mapping = self._open_mapping(filename)
         for _ in range(self._num_threads):
             thread = UploadWorkerThread(self._api, self._vault_name, filename,
-                                        upload_id, worker_queue, result_queue)
+                                        upload_id, worker_queue, result_queue,
+                                        mapping=mapping)
             time.sleep(0.2)
             thread.start()
             self._threads.append(thread)
 
+    def _open_mapping(self, filename):
+        # Mapping the file read-only lets every worker slice its part
+        # straight out of the page cache instead of copying it into a
+        # fresh buffer with read().  Slicing an mmap without copying
+        # requires memoryview support, which mmap only has on Python 3,
+        # so Python 2 keeps reading parts from the file.
+        self._mapping = None
+        if not six.PY3:
+            return None
+        try:
+            with open(filename, 'rb') as f:
+                self._mapping = mmap.mmap(f.fileno(), 0,
+                                          access=mmap.ACCESS_READ)
+        except (EnvironmentError, ValueError) as e:
+            # Empty files cannot be mapped, and neither can some special
+            # files; reading them is still fine.
+            log.debug("Unable to mmap %s, reading parts instead: %s",
+                      filename, e)
+        return self._mapping
+
+    def _close_mapping(self):
+        mapping = getattr(self, '_mapping', None)
+        self._mapping = None
+        if mapping is not None:
+            try:
+                mapping.close()
+            except BufferError:
+                # A worker that was told to stop may still hold a view
+                # of its part; the mapping is released with it.
+                pass
+
+
+class UploadCheckpoint(object):
+    """
+    Records the progress of a multipart upload in a file so that the
+    upload can be resumed after a crash.
+
+    The first line of the file is a JSON header describing the upload.
+    Each following line holds the index and hex tree hash of a part
+    that has been uploaded.  Lines are appended and synced to disk as
+    parts complete, so a crash loses at most the parts in flight.
+
+    ``parts`` maps part indexes to binary tree hashes, the same form
+    :func:`boto.glacier.writer.resume_file_upload` takes as its
+    ``part_hash_map``, so an interrupted upload may also be finished
+    with that function.
+    """
+    def __init__(self, filename, vault_name, upload_id, part_size,
+                 total_size, parts=None):
+        self.filename = filename
+        self.vault_name = vault_name
+        self.upload_id = upload_id
+        self.part_size = part_size
+        self.total_size = total_size
+        self.parts = parts or {}
+        self._fileobj = None
+
+    @classmethod
+    def create(cls, filename, vault_name, upload_id, part_size, total_size):
+        """
+        Start a new checkpoint file, replacing any existing one.
+        """
+        checkpoint = cls(filename, vault_name, upload_id, part_size,
+                         total_size)
+        header = json.dumps({'vault_name': vault_name,
+                             'upload_id': upload_id,
+                             'part_size': part_size,
+                             'total_size': total_size})
+        with open(filename, 'w') as f:
+            f.write(header + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        return checkpoint
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Read a checkpoint file, returning ``None`` if it does not exist.
+        """
+        if not os.path.exists(filename):
+            return None
+        with open(filename) as f:
+            lines = f.read().split('\n')
+        header = json.loads(lines[0])
+        parts = {}
+        for line in lines[1:]:
+            fields = line.split()
+            # The last line may have been cut short by a crash, in
+            # which case that part is simply uploaded again.
+            if len(fields) != 2 or len(fields[1]) != 64:
+                continue
+            parts[int(fields[0])] = binascii.unhexlify(fields[1])
+        return cls(filename, header['vault_name'], header['upload_id'],
+                   header['part_size'], header['total_size'], parts)
+
+    def record_part(self, part_number, tree_hash_bytes):
+        """
+        Durably record that ``part_number`` has been uploaded.
+        """
+        if self._fileobj is None:
+            self._fileobj = open(self.filename, 'a')
+        self.parts[part_number] = tree_hash_bytes
+        self._fileobj.write('%d %s\n' % (
+            part_number, bytes_to_hex(tree_hash_bytes).decode('ascii')))
+        self._fileobj.flush()
+        os.fsync(self._fileobj.fileno())
+
+    def close(self):
+        if self._fileobj is not None:
+            self._fileobj.close()
+            self._fileobj = None
+
+    def remove(self):
+        """
+        Delete the checkpoint file once the upload is complete.
+        """
+        self.close()
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
 
 class TransferThread(threading.Thread):
     def __init__(self, worker_queue, result_queue):
@@ -217,12 +400,13 @@ class UploadWorkerThread(TransferThread):
     def __init__(self, api, vault_name, filename, upload_id,
                  worker_queue, result_queue, num_retries=5,
                  time_between_retries=5,
-                 retry_exceptions=Exception):
+                 retry_exceptions=Exception, mapping=None):
         super(UploadWorkerThread, self).__init__(worker_queue, result_queue)
         self._api = api
         self._vault_name = vault_name
         self._filename = filename
         self._fileobj = open(filename, 'rb')
+        self._mapping = mapping
         self._upload_id = upload_id
         self._num_retries = num_retries
         self._time_between_retries = time_between_retries
@@ -244,21 +428,30 @@ class UploadWorkerThread(TransferThread):
                 result = e
         return result
 
+    def _read_part(self, start_byte, part_size):
+        if self._mapping is not None:
+            return memoryview(self._mapping)[start_byte:start_byte + part_size]
+        self._fileobj.seek(start_byte)
+        return self._fileobj.read(part_size)
+
     def _upload_chunk(self, work):
         part_number, part_size = work
         start_byte = part_number * part_size
-        self._fileobj.seek(start_byte)
-        contents = self._fileobj.read(part_size)
-        linear_hash = hashlib.sha256(contents).hexdigest()
-        tree_hash_bytes = tree_hash(chunk_hashes(contents))
-        byte_range = (start_byte, start_byte + len(contents) - 1)
-        log.debug("Uploading chunk %s of size %s", part_number, part_size)
-        response = self._api.upload_part(self._vault_name, self._upload_id,
-                                         linear_hash,
-                                         bytes_to_hex(tree_hash_bytes),
-                                         byte_range, contents)
-        # Reading the response allows the connection to be reused.
-        response.read()
+        contents = self._read_part(start_byte, part_size)
+        try:
+            linear_hash, tree_hash_bytes = compute_hashes_from_bytes(contents)
+            byte_range = (start_byte, start_byte + len(contents) - 1)
+            log.debug("Uploading chunk %s of size %s", part_number, part_size)
+            response = self._api.upload_part(self._vault_name,
+                                             self._upload_id, linear_hash,
+                                             bytes_to_hex(tree_hash_bytes),
+                                             byte_range, contents)
+            # Reading the response allows the connection to be reused.
+            response.read()
+        finally:
+            if isinstance(contents, memoryview):
+                # Views pin the mapping open, so drop ours right away.
+                contents.release()
         return (part_number, tree_hash_bytes)
 
     def _cleanup(self):
@@ -145,6 +145,37 @@ def compute_hashes_from_fileobj(fileobj, chunk_size=1024 * 1024):
     return linear_hash.hexdigest(), bytes_to_hex(tree_hash(chunks))
 
 
+def compute_hashes_from_bytes(data, chunk_size=_MEGABYTE):
+    """Compute the linear and tree hash of a part in a single pass.
+
+    Each chunk is fed to the linear hash and hashed for the tree in the
+    same loop, so the part is only walked once.  ``data`` may be a
+    bytestring or anything supporting the buffer protocol (such as a
+    ``memoryview`` over an ``mmap``); chunks are taken as views so no
+    part of it is copied.
+
+    :param data: The bytes of the part.
+
+    :param chunk_size: The size of the chunks to use for the tree hash.
+
+    :rtype: tuple
+    :return: A tuple of (linear_hash, tree_hash).  The linear hash is
+        returned in hex and the tree hash as a binary digest, which is
+        what the multipart upload API and ``tree_hash`` expect.
+
+    """
+    view = memoryview(data)
+    linear_hash = hashlib.sha256()
+    chunks = []
+    for start in range(0, len(view), chunk_size):
+        chunk = view[start:start + chunk_size]
+        linear_hash.update(chunk)
+        chunks.append(hashlib.sha256(chunk).digest())
+    if not chunks:
+        chunks = [hashlib.sha256(b'').digest()]
+    return linear_hash.hexdigest(), tree_hash(chunks)
+
+
 def bytes_to_hex(str_as_bytes):
     return binascii.hexlify(str_as_bytes)
 
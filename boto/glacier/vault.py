@@ -236,7 +236,7 @@ class Vault(object):
             self, upload_id, part_size, file_obj, part_hash_map)
 
     def concurrent_create_archive_from_file(self, filename, description,
-                                            **kwargs):
+                                            checkpoint_file=None, **kwargs):
         """
         Create a new archive from a file and upload the given
         file.
@@ -249,6 +249,12 @@ class Vault(object):
         :type filename: str
         :param filename: A filename to upload
 
+        :type checkpoint_file: str
+        :param checkpoint_file: If given, progress is recorded in this
+            file and an upload interrupted by a crash is resumed from it
+            on the next call.  See
+            :py:meth:`boto.glacier.concurrent.ConcurrentUploader.upload`.
+
         :param kwargs: Additional kwargs to pass through to
             :py:class:`boto.glacier.concurrent.ConcurrentUploader`.
             You can pass any argument besides the ``api`` and
@@ -263,7 +269,11 @@ class Vault(object):
 
         """
         uploader = ConcurrentUploader(self.layer1, self.name, **kwargs)
-        archive_id = uploader.upload(filename, description)
+        if checkpoint_file is None:
+            archive_id = uploader.upload(filename, description)
+        else:
+            archive_id = uploader.upload(filename, description,
+                                         checkpoint_file=checkpoint_file)
         return archive_id
 
     def retrieve_archive(self, archive_id, sns_topic=None,
@@ -19,15 +19,16 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 import errno
-import httplib
 import os
 import random
 import re
 import socket
+import threading
 import time
-import urlparse
 from hashlib import md5
 from boto import config, UserAgent
+from boto.compat import http_client, urlparse
+from boto.concurrent import ConcurrentTransferer, SQLiteStore
 from boto.connection import AWSAuthConnection
 from boto.exception import InvalidUriError
 from boto.exception import ResumableTransferDisposition
@@ -47,21 +48,30 @@ aborted in the current process.
 The caller can optionally specify a tracker_file_name param in the
 ResumableUploadHandler constructor. If you do this, that file will
 save the state needed to allow retrying later, in a separate process
-(e.g., in a later run of gsutil).
+(e.g., in a later run of gsutil).  Alternatively, the tracker URIs of
+many uploads can be kept in a single TrackerDatabase.
+
+ResumableUploadManager runs many resumable uploads concurrently.
 """
 
 
 class ResumableUploadHandler(object):
 
     BUFFER_SIZE = 8192
-    RETRYABLE_EXCEPTIONS = (httplib.HTTPException, IOError, socket.error,
+    # With adaptive_buffer_size, the largest buffer sent at once, and how
+    # long sending one buffer should take.
+    MAX_BUFFER_SIZE = 8 * 1024 * 1024
+    ADAPTIVE_SEND_TIME = 0.1
+    RETRYABLE_EXCEPTIONS = (http_client.HTTPException, IOError, socket.error,
                             socket.gaierror)
 
     # (start, end) response indicating server has nothing (upload protocol uses
     # inclusive numbering).
     SERVER_HAS_NOTHING = (0, -1)
 
-    def __init__(self, tracker_file_name=None, num_retries=None):
+    def __init__(self, tracker_file_name=None, num_retries=None,
+                 tracker_db=None, tracker_name=None,
+                 adaptive_buffer_size=False):
         """
         Constructor. Instantiate once for each uploaded file.
 
@@ -77,18 +87,44 @@ class ResumableUploadHandler(object):
         :param num_retries: the number of times we'll re-try a resumable upload
             making no progress. (Count resets every time we get progress, so
             upload can span many more than this number of retries.)
+
+        :type tracker_db: :class:`TrackerDatabase`
+        :param tracker_db: optional database to save the tracker URI in,
+            under ``tracker_name``, instead of a tracker file.
+
+        :type tracker_name: string
+        :param tracker_name: the name of this upload in ``tracker_db``.
+
+        :type adaptive_buffer_size: bool
+        :param adaptive_buffer_size: if True, the amount of data written
+            to the connection at once grows from BUFFER_SIZE up to
+            MAX_BUFFER_SIZE as long as the measured throughput allows
+            each write to finish within ADAPTIVE_SEND_TIME seconds.
         """
         self.tracker_file_name = tracker_file_name
+        self.tracker_db = tracker_db
+        self.tracker_name = tracker_name
         self.num_retries = num_retries
+        self.adaptive_buffer_size = adaptive_buffer_size
+        self.buffer_size = self.BUFFER_SIZE
         self.server_has_bytes = 0  # Byte count at last server check.
         self.tracker_uri = None
-        if tracker_file_name:
+        if tracker_file_name or tracker_db is not None:
             self._load_tracker_uri_from_file()
         # Save upload_start_point in instance state so caller can find how
         # much was transferred by this ResumableUploadHandler (across retries).
         self.upload_start_point = None
 
     def _load_tracker_uri_from_file(self):
+        if self.tracker_db is not None:
+            uri = self.tracker_db.get(self.tracker_name)
+            if uri:
+                try:
+                    self._set_tracker_uri(uri)
+                except InvalidUriError:
+                    print('Invalid tracker URI (%s) found for %s. Restarting '
+                          'upload from scratch.' % (uri, self.tracker_name))
+            return
         f = None
         try:
             f = open(self.tracker_file_name, 'r')
@@ -116,6 +152,9 @@ class ResumableUploadHandler(object):
         """
         Saves URI to tracker file if one was passed to constructor.
         """
+        if self.tracker_db is not None:
+            self.tracker_db.set(self.tracker_name, self.tracker_uri)
+            return
         if not self.tracker_file_name:
             return
         f = None
@@ -139,7 +178,7 @@ class ResumableUploadHandler(object):
 
         Raises InvalidUriError if URI is syntactically invalid.
         """
-        parse_result = urlparse.urlparse(uri)
+        parse_result = urlparse(uri)
         if (parse_result.scheme.lower() not in ['http', 'https'] or
             not parse_result.netloc):
             raise InvalidUriError('Invalid tracker URI (%s)' % uri)
@@ -172,6 +211,8 @@ class ResumableUploadHandler(object):
           return None
 
     def _remove_tracker_file(self):
+        if self.tracker_db is not None:
+            self.tracker_db.remove(self.tracker_name)
         if (self.tracker_file_name and
             os.path.exists(self.tracker_file_name)):
                 os.unlink(self.tracker_file_name)
@@ -323,17 +364,18 @@ class ResumableUploadHandler(object):
 
         Raises ResumableUploadException if any problems occur.
         """
-        buf = fp.read(self.BUFFER_SIZE)
+        buf = fp.read(self.buffer_size)
         if cb:
-            # The cb_count represents the number of full buffers to send between
-            # cb executions.
+            # The cb_bytes represents the number of bytes to send between
+            # cb executions, so that the buffer size does not change how
+            # often cb is called.
             if num_cb > 2:
-                cb_count = file_length / self.BUFFER_SIZE / (num_cb-2)
+                cb_bytes = file_length // (num_cb - 2)
             elif num_cb < 0:
-                cb_count = -1
+                cb_bytes = -1
             else:
-                cb_count = 0
-            i = 0
+                cb_bytes = None
+            cb_sent = 0
             cb(total_bytes_uploaded, file_length)
 
         # Build resumable upload headers for the transfer. Don't send a
@@ -367,16 +409,19 @@ class ResumableUploadHandler(object):
         # in debug stream.
         http_conn.set_debuglevel(0)
         while buf:
+            start_time = time.time()
             http_conn.send(buf)
+            if self.adaptive_buffer_size:
+                self._adjust_buffer_size(len(buf), time.time() - start_time)
             for alg in self.digesters:
                 self.digesters[alg].update(buf)
             total_bytes_uploaded += len(buf)
             if cb:
-                i += 1
-                if i == cb_count or cb_count == -1:
+                cb_sent += len(buf)
+                if cb_bytes == -1 or (cb_bytes and cb_sent >= cb_bytes):
                     cb(total_bytes_uploaded, file_length)
-                    i = 0
-            buf = fp.read(self.BUFFER_SIZE)
+                    cb_sent = 0
+            buf = fp.read(self.buffer_size)
         http_conn.set_debuglevel(conn.debug)
         if cb:
             cb(total_bytes_uploaded, file_length)
@@ -407,6 +452,20 @@ class ResumableUploadHandler(object):
                                        'upload (%s)' %
                                        (resp.status, resp.reason), disposition)
 
+    def _adjust_buffer_size(self, bytes_sent, elapsed):
+        """
+        Doubles or halves the buffer size towards the amount of data the
+        connection sends in ADAPTIVE_SEND_TIME seconds.
+        """
+        if elapsed > 0:
+            target = bytes_sent / elapsed * self.ADAPTIVE_SEND_TIME
+        else:
+            target = self.MAX_BUFFER_SIZE
+        if target >= 2 * self.buffer_size:
+            self.buffer_size = min(2 * self.buffer_size, self.MAX_BUFFER_SIZE)
+        elif target < self.buffer_size // 2:
+            self.buffer_size = max(self.buffer_size // 2, self.BUFFER_SIZE)
+
     def _attempt_resumable_upload(self, key, fp, file_length, headers, cb,
                                   num_cb):
         """
@@ -677,3 +736,129 @@ class ResumableUploadHandler(object):
 
             self.track_progress_less_iterations(server_had_bytes_before_attempt,
                                                 True, debug)
+
+
+class TrackerDatabase(SQLiteStore):
+    """
+    Keeps the tracker URIs of many resumable uploads in one SQLite
+    database, rather than in one tracker file per upload.  It can be
+    shared by the threads of a :class:`ResumableUploadManager` and by
+    later processes resuming the same uploads.
+    """
+    def __init__(self, filename):
+        super(TrackerDatabase, self).__init__(
+            filename, 'resumable_uploads', key_columns=('name',),
+            value_column='tracker_uri')
+
+
+class ResumableUploadManager(ConcurrentTransferer):
+    """
+    Uploads many files to GCS concurrently, each with its own resumable
+    upload session.
+
+    Every file is sent by a :class:`ResumableUploadHandler` with an
+    adaptive buffer size, so fast connections are not limited to small
+    writes.  When a :class:`TrackerDatabase` is given, the tracker URI
+    of every session is kept in it, and running the same uploads again
+    after a failure resumes each of them where it stopped.
+
+    Progress is reported for all the sessions together: ``cb`` is called
+    with the number of bytes the server holds across all files, the
+    total size of all files, and the throughput, in bytes per second,
+    achieved since the uploads started::
+
+        >>> def progress(done, total, rate):
+        ...     print('%d/%d bytes at %.1f MB/s' % (done, total, rate / 1e6))
+        >>> manager = ResumableUploadManager(
+        ...     num_threads=8, tracker_db=TrackerDatabase('uploads.db'),
+        ...     cb=progress)
+        >>> manager.upload([(bucket.new_key(name), name) for name in names])
+    """
+    def __init__(self, num_threads=4, tracker_db=None, num_retries=None,
+                 cb=None, num_cb=10):
+        """
+        :type num_threads: int
+        :param num_threads: The number of files to upload concurrently.
+
+        :type tracker_db: :class:`TrackerDatabase`
+        :param tracker_db: The database to keep tracker URIs in.  Without
+            one, an interrupted upload starts over the next time.
+
+        :type num_retries: int
+        :param num_retries: The number of times each session retries an
+            upload without making progress, as for
+            :class:`ResumableUploadHandler`.
+
+        :type cb: function
+        :param cb: Called with ``(bytes_uploaded, total_bytes,
+            bytes_per_second)`` for all the uploads together.
+
+        :type num_cb: int
+        :param num_cb: The number of times each session reports its
+            progress.
+        """
+        # Sessions retry on their own, so the pool does not.
+        super(ResumableUploadManager, self).__init__(num_threads,
+                                                     num_retries=0)
+        self.tracker_db = tracker_db
+        self.session_num_retries = num_retries
+        self.cb = cb
+        self.num_cb = num_cb
+        self._lock = threading.Lock()
+
+    def upload(self, uploads, headers=None):
+        """
+        Uploads files to keys.  The first upload that fails stops the
+        ones that have not started yet and its exception is raised,
+        after the uploads in progress have finished.
+
+        :type uploads: iterable
+        :param uploads: ``(key, filename)`` pairs, where each key is a
+            :class:`boto.gs.key.Key`.
+
+        :type headers: dict
+        :param headers: The headers to send with every upload.
+
+        :rtype: int
+        :return: The total number of bytes of the uploaded files.
+        """
+        work_items = []
+        for key, filename in uploads:
+            work_items.append((key, filename, os.path.getsize(filename)))
+        total_bytes = sum(size for _, _, size in work_items)
+        # The bytes the server holds for each upload, and how many of them
+        # were sent by this process.
+        progress = {}
+        state = {'sent': 0, 'start_time': time.time()}
+
+        def report(index, bytes_uploaded):
+            with self._lock:
+                previous = progress.get(index)
+                if previous is not None and bytes_uploaded > previous:
+                    state['sent'] += bytes_uploaded - previous
+                progress[index] = bytes_uploaded
+                if self.cb:
+                    elapsed = time.time() - state['start_time']
+                    rate = state['sent'] / elapsed if elapsed > 0 else 0.0
+                    self.cb(sum(progress.values()), total_bytes, rate)
+
+        def upload_file(work):
+            index, (key, filename, size) = work
+            handler = ResumableUploadHandler(
+                num_retries=self.session_num_retries,
+                tracker_db=self.tracker_db,
+                tracker_name=self._tracker_name(key, filename),
+                adaptive_buffer_size=True)
+            key.set_contents_from_filename(
+                filename, headers=headers and headers.copy(),
+                cb=lambda done, total: report(index, done),
+                num_cb=self.num_cb, res_upload_handler=handler)
+            return size
+
+        for _ in self._map(upload_file, enumerate(work_items)):
+            pass
+        return total_bytes
+
+    def _tracker_name(self, key, filename):
+        return 'gs://%s/%s %s' % (key.bucket.name, key.name,
+                                  os.path.abspath(filename))
@@ -58,3 +58,69 @@ class XmlHandlerWrapper(object):
 
     def parseString(self, content):
         return self.parser.parse(StringIO(content))
+
+
+class XmlStreamParser(object):
+    """
+    Parses an XML document that is fed to it in chunks, for example
+    as they are read from a response, into a
+    :class:`boto.resultset.ResultSet`.
+
+    feed() and close() return the items of the result set whose
+    closing tag has been parsed and remove them from the result set,
+    so only the items of the current chunk are held in memory.  The
+    other attributes of the result set, such as ``is_truncated``, are
+    set as they are parsed.
+    """
+    def __init__(self, result_set, connection):
+        self.result_set = result_set
+        self.handler = XmlHandler(result_set, connection)
+        self.parser = xml.sax.make_parser()
+        self.parser.setContentHandler(self.handler)
+        self.parser.setFeature(xml.sax.handler.feature_external_ges, 0)
+
+    def feed(self, data):
+        self.parser.feed(data)
+        return self._pop_complete_items()
+
+    def close(self):
+        self.parser.close()
+        return self._pop_complete_items()
+
+    def _pop_complete_items(self):
+        # An item is still being parsed for as long as it's on the
+        # handler's stack of nodes.
+        in_progress = set(id(node) for _, node in self.handler.nodes)
+        count = 0
+        for item in self.result_set:
+            if id(item) in in_progress:
+                break
+            count += 1
+        items = self.result_set[:count]
+        del self.result_set[:count]
+        return items
+
+
+def iter_parse(response, result_set, connection, chunk_size=16384):
+    """
+    A generator that reads an XML response in chunks of ``chunk_size``
+    bytes and yields the items of ``result_set`` as soon as each one has
+    been parsed.  Once the generator is exhausted, ``result_set`` holds
+    the remaining attributes of the response, but none of its items.
+
+    If the generator is closed early, the rest of the response is read
+    and discarded so that its connection can be reused.
+    """
+    parser = XmlStreamParser(result_set, connection)
+    try:
+        while True:
+            chunk = response.read(chunk_size)
+            if not chunk:
+                break
+            for item in parser.feed(chunk):
+                yield item
+        for item in parser.close():
+            yield item
+    finally:
+        while response.read(chunk_size):
+            pass
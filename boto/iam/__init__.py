@@ -20,11 +20,15 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 
-# this is here for backward compatibility
-# originally, the IAMConnection class was defined here
-from boto.iam.connection import IAMConnection
 from boto.regioninfo import RegionInfo, get_regions
 from boto.regioninfo import connect
+from boto.compat import lazy_import
+
+# this is here for backward compatibility
+# originally, the IAMConnection class was defined here
+lazy_import(globals(), {
+    'IAMConnection': 'boto.iam.connection',
+})
 
 
 class IAMRegionInfo(RegionInfo):
@@ -51,6 +55,7 @@ def regions():
     :rtype: list
     :return: A list of :class:`boto.regioninfo.RegionInfo` instances
     """
+    from boto.iam.connection import IAMConnection
     regions = get_regions(
         'iam',
         region_cls=IAMRegionInfo,
@@ -81,6 +86,7 @@ def connect_to_region(region_name, **kw_params):
     :return: A connection to the given region, or None if an invalid region
              name is given
     """
+    from boto.iam.connection import IAMConnection
     if region_name == 'universal':
         region = IAMRegionInfo(
             name='universal',
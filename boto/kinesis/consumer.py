@@ -0,0 +1,364 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+import os
+import random
+import threading
+import time
+
+import boto
+
+from boto.compat import Empty, Full, Queue, json
+from boto.concurrent import SQLiteStore
+from boto.kinesis import exceptions
+from boto.utils import atomic_write
+
+
+# The checkpoint recorded for a shard that has been read to its end.
+SHARD_END = 'SHARD_END'
+
+
+class CheckpointStore(object):
+    """
+    Remembers how far each shard of a stream has been read.
+
+    Subclasses implement ``get`` and ``set``.  The value stored for a
+    shard is the sequence number of the last record that was processed,
+    or ``SHARD_END`` once a closed shard has been read completely.
+    """
+    def get(self, stream_name, shard_id):
+        raise NotImplementedError
+
+    def set(self, stream_name, shard_id, sequence_number):
+        raise NotImplementedError
+
+
+class MemoryCheckpointStore(CheckpointStore):
+    """
+    Keeps checkpoints in memory, for consumers that do not need to
+    survive a restart.
+    """
+    def __init__(self):
+        self._checkpoints = {}
+
+    def get(self, stream_name, shard_id):
+        return self._checkpoints.get((stream_name, shard_id))
+
+    def set(self, stream_name, shard_id, sequence_number):
+        self._checkpoints[(stream_name, shard_id)] = sequence_number
+
+
+class FileCheckpointStore(CheckpointStore):
+    """
+    Keeps checkpoints in a JSON file.  The file is rewritten through a
+    temporary file and a rename, so a crash leaves either the old or the
+    new checkpoints behind, never a partial file.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._checkpoints = {}
+        if os.path.exists(filename):
+            with open(filename) as f:
+                self._checkpoints = json.load(f)
+
+    def get(self, stream_name, shard_id):
+        with self._lock:
+            return self._checkpoints.get(stream_name, {}).get(shard_id)
+
+    def set(self, stream_name, shard_id, sequence_number):
+        with self._lock:
+            self._checkpoints.setdefault(stream_name, {})[shard_id] = \
+                sequence_number
+            with atomic_write(self.filename) as f:
+                json.dump(self._checkpoints, f)
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """
+    Keeps checkpoints in an SQLite database, which lets several
+    consumers on one host share a single file.
+    """
+    def __init__(self, filename):
+        self._store = SQLiteStore(
+            filename, 'kinesis_checkpoints',
+            key_columns=('stream_name', 'shard_id'),
+            value_column='sequence_number')
+
+    def get(self, stream_name, shard_id):
+        return self._store.get((stream_name, shard_id))
+
+    def set(self, stream_name, shard_id, sequence_number):
+        self._store.set((stream_name, shard_id), sequence_number)
+
+    def close(self):
+        self._store.close()
+
+
+class _ShardBatch(object):
+    def __init__(self, shard_id, records, finished=False):
+        self.shard_id = shard_id
+        self.records = records
+        self.finished = finished
+
+
+class KinesisConsumer(object):
+    """
+    Reads every shard of a stream concurrently.
+
+    Iterating over the consumer yields ``(shard_id, record)`` tuples.
+    Alternatively, ``run`` passes each of them to a callback.  Records
+    of one shard come out in order.  Records of different shards are
+    interleaved.
+
+    Each open shard is polled by its own thread.  The thread fetches
+    the next ``GetRecords`` batch while the previous ones are still
+    being processed, until ``max_buffered_batches`` batches are
+    waiting.  After that, the threads wait for the consumer to catch
+    up.
+
+    Once every record of a batch has been processed, the sequence
+    number of its last record is saved to ``checkpoint_store``.
+    Processing resumes from there when the consumer is restarted, so
+    every record is delivered at least once.
+
+    Resharding is followed through the parent ids of the stream's
+    shards.  A shard created by ``split_shard`` or ``merge_shards`` is
+    only read once its parents have been read to their end, which keeps
+    the records of each partition key in order.  The shard list is read
+    again every ``shard_refresh_interval`` seconds, and whenever a shard
+    ends.  Iteration stops when ``stop`` is called, or when every shard
+    of the stream is closed and has been read.
+    """
+    def __init__(self, connection, stream_name, checkpoint_store=None,
+                 iterator_type='TRIM_HORIZON', batch_size=None,
+                 poll_interval=1.0, max_buffered_batches=10,
+                 shard_refresh_interval=60, backoff_base=0.05,
+                 max_backoff=20):
+        """
+        :type connection: :class:`boto.kinesis.layer1.KinesisConnection`
+        :param connection: The connection to read the stream with.
+
+        :type stream_name: string
+        :param stream_name: The stream to read.
+
+        :type checkpoint_store: :class:`CheckpointStore`
+        :param checkpoint_store: Where to save checkpoints.  Defaults to a
+            :class:`MemoryCheckpointStore`.
+
+        :type iterator_type: string
+        :param iterator_type: Where to start reading shards that have no
+            checkpoint yet, either ``TRIM_HORIZON`` or ``LATEST``.  Shards
+            created by resharding are always read from their start.
+
+        :type batch_size: int
+        :param batch_size: The ``Limit`` to pass to ``GetRecords``.
+
+        :type poll_interval: float
+        :param poll_interval: How long, in seconds, a shard thread waits
+            before polling again after getting no records.
+
+        :type max_buffered_batches: int
+        :param max_buffered_batches: How many batches may wait to be
+            processed before the shard threads stop fetching.
+        """
+        self.connection = connection
+        self.stream_name = stream_name
+        if checkpoint_store is None:
+            checkpoint_store = MemoryCheckpointStore()
+        self.checkpoint_store = checkpoint_store
+        self.iterator_type = iterator_type
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_buffered_batches = max_buffered_batches
+        self.shard_refresh_interval = shard_refresh_interval
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self._readers = {}
+        self._queue = None
+        self._stopped = threading.Event()
+        self._last_refresh = 0
+
+    def __iter__(self):
+        self._stopped.clear()
+        self._queue = Queue(maxsize=self.max_buffered_batches)
+        try:
+            self._refresh_shards()
+            while self._readers and not self._stopped.is_set():
+                try:
+                    batch = self._queue.get(timeout=self.poll_interval)
+                except Empty:
+                    self._maybe_refresh_shards()
+                    continue
+                if isinstance(batch, Exception):
+                    raise batch
+                for record in batch.records:
+                    yield batch.shard_id, record
+                # The consumer only asks for the next record once it is
+                # done with the previous one, so the whole batch has been
+                # processed by now.
+                self._checkpoint(batch)
+                if batch.finished:
+                    del self._readers[batch.shard_id]
+                    self._refresh_shards()
+                else:
+                    self._maybe_refresh_shards()
+        finally:
+            self._stop_readers()
+
+    def run(self, callback):
+        """
+        Calls ``callback(shard_id, record)`` for every record, until
+        ``stop`` is called or every shard has been read to its end.
+        """
+        for shard_id, record in self:
+            callback(shard_id, record)
+
+    def stop(self):
+        """
+        Stops reading.  Records that were fetched but not yet processed
+        are read again by the next consumer.
+        """
+        self._stopped.set()
+
+    def _checkpoint(self, batch):
+        if batch.finished:
+            sequence_number = SHARD_END
+        elif batch.records:
+            sequence_number = batch.records[-1]['SequenceNumber']
+        else:
+            return
+        self.checkpoint_store.set(self.stream_name, batch.shard_id,
+                                  sequence_number)
+
+    def _describe_shards(self):
+        shards = []
+        kwargs = {}
+        while True:
+            description = self.connection.describe_stream(
+                self.stream_name, **kwargs)['StreamDescription']
+            shards.extend(description['Shards'])
+            if not description.get('HasMoreShards') or \
+                    not description['Shards']:
+                return shards
+            kwargs['exclusive_start_shard_id'] = \
+                description['Shards'][-1]['ShardId']
+
+    def _maybe_refresh_shards(self):
+        if time.time() - self._last_refresh >= self.shard_refresh_interval:
+            self._refresh_shards()
+
+    def _refresh_shards(self):
+        self._last_refresh = time.time()
+        shards = self._describe_shards()
+        known = set(shard['ShardId'] for shard in shards)
+        for shard in shards:
+            shard_id = shard['ShardId']
+            if shard_id in self._readers:
+                continue
+            checkpoint = self.checkpoint_store.get(self.stream_name, shard_id)
+            if checkpoint == SHARD_END:
+                continue
+            parents = [shard.get(key) for key in ('ParentShardId',
+                                                  'AdjacentParentShardId')]
+            # Parents that have aged out of the stream no longer hold any
+            # records, so there is nothing to wait for.
+            parents = [parent for parent in parents if parent in known]
+            if any(self.checkpoint_store.get(self.stream_name, parent) !=
+                   SHARD_END for parent in parents):
+                continue
+            if checkpoint is not None:
+                start = ('AFTER_SEQUENCE_NUMBER', checkpoint)
+            elif parents:
+                start = ('TRIM_HORIZON', None)
+            else:
+                start = (self.iterator_type, None)
+            self._start_reader(shard_id, start)
+
+    def _start_reader(self, shard_id, start):
+        boto.log.debug('Reading shard %s from %s' % (shard_id, start[0]))
+        thread = threading.Thread(target=self._read_shard,
+                                  args=(shard_id, start))
+        thread.daemon = True
+        self._readers[shard_id] = thread
+        thread.start()
+
+    def _stop_readers(self):
+        self._stopped.set()
+        for thread in self._readers.values():
+            thread.join()
+        self._readers = {}
+
+    def _put(self, value):
+        # Stop waiting for room once the consumer has gone away.
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(value, timeout=0.1)
+                return
+            except Full:
+                pass
+
+    def _backoff_time(self, attempt):
+        return random.random() * min(self.max_backoff,
+                                     self.backoff_base * (2 ** attempt))
+
+    def _get_iterator(self, shard_id, iterator_type, sequence_number=None):
+        response = self.connection.get_shard_iterator(
+            self.stream_name, shard_id, iterator_type,
+            starting_sequence_number=sequence_number)
+        return response['ShardIterator']
+
+    def _read_shard(self, shard_id, start):
+        try:
+            iterator = self._get_iterator(shard_id, *start)
+            last_sequence_number = start[1]
+            attempt = 0
+            while not self._stopped.is_set():
+                if iterator is None:
+                    # A closed shard has been read to its end.
+                    self._put(_ShardBatch(shard_id, [], finished=True))
+                    return
+                try:
+                    response = self.connection.get_records(
+                        iterator, limit=self.batch_size)
+                except exceptions.ProvisionedThroughputExceededException:
+                    attempt += 1
+                    self._stopped.wait(self._backoff_time(attempt))
+                    continue
+                except exceptions.ExpiredIteratorException:
+                    if last_sequence_number is None:
+                        iterator = self._get_iterator(shard_id, *start)
+                    else:
+                        iterator = self._get_iterator(
+                            shard_id, 'AFTER_SEQUENCE_NUMBER',
+                            last_sequence_number)
+                    continue
+                attempt = 0
+                records = response['Records']
+                iterator = response.get('NextShardIterator')
+                if records:
+                    last_sequence_number = records[-1]['SequenceNumber']
+                    self._put(_ShardBatch(shard_id, records))
+                elif iterator is not None:
+                    self._stopped.wait(self.poll_interval)
+        except Exception as e:
+            boto.log.debug('Reading shard %s failed: %s' % (shard_id, e))
+            self._put(e)
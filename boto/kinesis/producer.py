@@ -0,0 +1,368 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+import base64
+import bisect
+import hashlib
+import random
+import threading
+import time
+
+import boto
+
+from boto.compat import Queue, six
+from boto.kinesis import exceptions
+
+
+# Limits of a single PutRecords request.
+MAX_BATCH_RECORDS = 500
+MAX_BATCH_BYTES = 5 * 1024 * 1024
+# Limit on the data and partition key of a single record.
+MAX_RECORD_BYTES = 1024 * 1024
+
+
+class _Batch(object):
+    def __init__(self):
+        self.records = []
+        self.size = 0
+        self.created = time.time()
+
+
+class KinesisProducer(object):
+    """
+    Buffers records and writes them to a stream with ``PutRecords``
+    from a pool of threads.
+
+    Records are collected into batches, which are handed to one of
+    ``num_threads`` worker threads once they hold ``max_batch_records``
+    records or ``max_batch_bytes`` bytes, or once their first record has
+    waited ``linger_time`` seconds.  Several ``PutRecords`` requests are
+    therefore in flight at once.  Each record is Base64 encoded once,
+    when it is added, rather than on every request that carries it.
+
+    Only the records a ``PutRecords`` response reports as failed are
+    resent, with jittered exponential backoff.  Records that still fail
+    after ``max_retries`` resends are kept in ``failed_records`` along
+    with the ``ErrorCode`` and ``ErrorMessage`` of their last attempt.
+    Any other error stops the producer and is raised from the next call
+    to ``put``, ``flush`` or ``close``.
+
+    With ``shard_aware=True`` the open shards of the stream are looked
+    up when the producer starts and records are batched per shard, using
+    the same MD5 hash of the partition key that Kinesis uses to place
+    them.  A shard that is being throttled then only delays its own
+    records.  The mapping is not refreshed when the stream is resharded;
+    records still land on the right shard, they are only batched
+    together less precisely.
+
+    Like ``PutRecords`` itself, the producer does not preserve the order
+    of records.  Use it as a context manager, or call ``close``, to make
+    sure every buffered record has been sent::
+
+        >>> with KinesisProducer(conn, 'clicks') as producer:
+        ...     for click in clicks:
+        ...         producer.put(click.to_json(), click.user_id)
+    """
+    def __init__(self, connection, stream_name, num_threads=4,
+                 max_batch_records=MAX_BATCH_RECORDS,
+                 max_batch_bytes=MAX_BATCH_BYTES, linger_time=0.1,
+                 max_retries=10, backoff_base=0.05, max_backoff=20,
+                 shard_aware=False):
+        """
+        :type connection: :class:`boto.kinesis.layer1.KinesisConnection`
+        :param connection: The connection to send the records with.
+
+        :type stream_name: string
+        :param stream_name: The stream to write to.
+
+        :type num_threads: int
+        :param num_threads: The number of ``PutRecords`` requests that may
+            be in flight at once.
+
+        :type max_batch_records: int
+        :param max_batch_records: The most records to send in one request.
+
+        :type max_batch_bytes: int
+        :param max_batch_bytes: The most bytes of data and partition keys
+            to send in one request.
+
+        :type linger_time: float
+        :param linger_time: How long, in seconds, a record may wait for
+            its batch to fill up before the batch is sent anyway.  Must
+            be greater than zero.
+
+        :type max_retries: int
+        :param max_retries: How many times failed records are resent.
+
+        :type shard_aware: bool
+        :param shard_aware: Whether to batch records per shard.
+        """
+        if linger_time <= 0:
+            # The linger thread would wake up without ever sleeping.
+            raise ValueError('linger_time must be greater than zero, '
+                             'not %r' % linger_time)
+        self.connection = connection
+        self.stream_name = stream_name
+        self.num_threads = num_threads
+        self.max_batch_records = max_batch_records
+        self.max_batch_bytes = max_batch_bytes
+        self.linger_time = linger_time
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.shard_aware = shard_aware
+        self.records_sent = 0
+        self.requests_sent = 0
+        self.throttle_events = 0
+        self.failed_records = []
+        self._batches = {}
+        self._shard_starts = None
+        self._shard_ids = None
+        self._error = None
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._queue = Queue(maxsize=num_threads * 2)
+        self._threads = []
+        self._linger_thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def put(self, data, partition_key, explicit_hash_key=None):
+        """
+        Adds a record to the producer's buffers.  This only blocks if the
+        worker threads are already well behind.
+
+        :type data: bytes or string
+        :param data: The data of the record.  Strings are encoded as UTF-8.
+
+        :type partition_key: string
+        :param partition_key: The partition key of the record.
+
+        :type explicit_hash_key: string
+        :param explicit_hash_key: The hash value used to pick the shard,
+            overriding the hash of the partition key.
+        """
+        self._raise_error()
+        if not isinstance(data, six.binary_type):
+            data = data.encode('utf-8')
+        size = len(data) + len(partition_key.encode('utf-8'))
+        if size > MAX_RECORD_BYTES:
+            raise ValueError("Record of %s bytes is larger than the %s "
+                             "bytes Kinesis allows" % (size, MAX_RECORD_BYTES))
+        record = {
+            'Data': base64.b64encode(data).decode('utf-8'),
+            'PartitionKey': partition_key,
+        }
+        if explicit_hash_key is not None:
+            record['ExplicitHashKey'] = explicit_hash_key
+        if not self._threads:
+            with self._lock:
+                # Another thread may have started them while we waited.
+                if not self._threads:
+                    self._start_threads()
+        shard = self._shard_for(partition_key, explicit_hash_key)
+
+        full = []
+        with self._lock:
+            batch = self._batches.get(shard)
+            if batch is not None and (
+                    batch.size + size > self.max_batch_bytes):
+                full.append(self._batches.pop(shard))
+                batch = None
+            if batch is None:
+                batch = self._batches[shard] = _Batch()
+            batch.records.append(record)
+            batch.size += size
+            if len(batch.records) >= self.max_batch_records:
+                full.append(self._batches.pop(shard))
+        for batch in full:
+            self._queue.put(batch.records)
+
+    def flush(self):
+        """
+        Hands every buffered record to the worker threads, without
+        waiting for them to be sent.
+        """
+        self._raise_error()
+        with self._lock:
+            batches = list(self._batches.values())
+            self._batches = {}
+        for batch in batches:
+            self._queue.put(batch.records)
+
+    def wait(self):
+        """
+        Sends every buffered record and blocks until they have all been
+        written, then raises the first error any request ran into.
+        """
+        self.flush()
+        if self._threads:
+            self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """
+        Sends every buffered record and stops the worker threads.
+        """
+        try:
+            self.wait()
+        finally:
+            self._stop_threads()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def _backoff_time(self, attempt):
+        # "Full jitter": sleep a random amount up to the exponential
+        # backoff for the attempt.
+        return random.random() * min(self.max_backoff,
+                                     self.backoff_base * (2 ** attempt))
+
+    def _load_shards(self):
+        shards = []
+        kwargs = {}
+        while True:
+            description = self.connection.describe_stream(
+                self.stream_name, **kwargs)['StreamDescription']
+            for shard in description['Shards']:
+                # Closed shards have an ending sequence number and no
+                # longer accept records.
+                if 'EndingSequenceNumber' in shard['SequenceNumberRange']:
+                    continue
+                shards.append((int(shard['HashKeyRange']['StartingHashKey']),
+                               shard['ShardId']))
+            if not description.get('HasMoreShards') or \
+                    not description['Shards']:
+                break
+            kwargs['exclusive_start_shard_id'] = \
+                description['Shards'][-1]['ShardId']
+        shards.sort()
+        self._shard_starts = [start for start, _ in shards]
+        self._shard_ids = [shard_id for _, shard_id in shards]
+
+    def _shard_for(self, partition_key, explicit_hash_key=None):
+        if not self._shard_starts:
+            return None
+        if explicit_hash_key is not None:
+            hash_key = int(explicit_hash_key)
+        else:
+            hash_key = int(hashlib.md5(
+                partition_key.encode('utf-8')).hexdigest(), 16)
+        index = bisect.bisect_right(self._shard_starts, hash_key) - 1
+        return self._shard_ids[max(index, 0)]
+
+    def _start_threads(self):
+        if self.shard_aware and self._shard_starts is None:
+            self._load_shards()
+        self._closed.clear()
+        for _ in range(self.num_threads):
+            thread = threading.Thread(target=self._worker)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+        self._linger_thread = threading.Thread(target=self._linger)
+        self._linger_thread.daemon = True
+        self._linger_thread.start()
+
+    def _stop_threads(self):
+        # Stop the linger thread first, so that it cannot queue a batch
+        # behind the workers' sentinels.
+        self._closed.set()
+        if self._linger_thread is not None:
+            self._linger_thread.join()
+            self._linger_thread = None
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _linger(self):
+        while True:
+            self._closed.wait(self.linger_time)
+            if self._closed.is_set():
+                return
+            expired = []
+            cutoff = time.time() - self.linger_time
+            with self._lock:
+                for shard, batch in list(self._batches.items()):
+                    if batch.created <= cutoff:
+                        expired.append(self._batches.pop(shard))
+            for batch in expired:
+                self._queue.put(batch.records)
+
+    def _worker(self):
+        while True:
+            records = self._queue.get()
+            try:
+                if records is None:
+                    return
+                # Once something has failed, drain the queue without
+                # sending anything else.
+                if self._error is None:
+                    self._send(records)
+            except Exception as e:
+                boto.log.debug('PutRecords failed: %s' % e)
+                with self._lock:
+                    if self._error is None:
+                        self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _send(self, records):
+        attempt = 0
+        while records:
+            try:
+                response = self.connection.put_records(
+                    records, self.stream_name, b64_encode=False)
+                results = response['Records']
+            except exceptions.ProvisionedThroughputExceededException as e:
+                results = [{'ErrorCode': 'ProvisionedThroughputExceededException',
+                            'ErrorMessage': str(e)}] * len(records)
+            failed = []
+            for record, result in zip(records, results):
+                if 'ErrorCode' in result:
+                    failed.append((record, result))
+            with self._lock:
+                self.requests_sent += 1
+                self.records_sent += len(records) - len(failed)
+                if failed:
+                    self.throttle_events += 1
+            if not failed:
+                return
+            attempt += 1
+            if attempt > self.max_retries:
+                boto.log.info("%s records failed after %s attempts." % (
+                    len(failed), attempt))
+                with self._lock:
+                    for record, result in failed:
+                        record = dict(record)
+                        record['ErrorCode'] = result['ErrorCode']
+                        record['ErrorMessage'] = result.get('ErrorMessage')
+                        self.failed_records.append(record)
+                return
+            time.sleep(self._backoff_time(attempt))
+            records = [record for record, _ in failed]
@@ -34,6 +34,9 @@ from boto.rds.vpcsecuritygroupmembership import VPCSecurityGroupMembership
 from boto.regioninfo import get_regions
 from boto.regioninfo import connect
 from boto.rds.logfile import LogFile, LogFileObject
+from boto.compat import lazy_import
+
+lazy_import(globals())
 
 
 def regions():
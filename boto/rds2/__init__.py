@@ -21,6 +21,9 @@
 #
 from boto.regioninfo import get_regions
 from boto.regioninfo import connect
+from boto.compat import lazy_import
+
+lazy_import(globals())
 
 
 def regions():
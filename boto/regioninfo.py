@@ -30,6 +30,9 @@ from boto.endpoints import StaticEndpointBuilder
 
 
 _endpoints_cache = {}
+# The builtin endpoints merged with the user's endpoints file, keyed by
+# the path, size and modification time of that file.
+_merged_endpoints_cache = {}
 
 
 def load_endpoint_json(path):
@@ -109,12 +112,31 @@ def load_regions():
     # If there's a file provided, we'll load it & additively merge it into
     # the endpoints.
     if additional_path:
-        additional = load_endpoint_json(additional_path)
-        endpoints = merge_endpoints(endpoints, additional)
+        endpoints = _merge_endpoints_file(endpoints, additional_path)
 
     return endpoints
 
 
+def _merge_endpoints_file(endpoints, path, _cache=_merged_endpoints_cache):
+    """
+    Merges the endpoints file at ``path`` into a copy of ``endpoints``.
+    The result is reused until the file changes, so it is not read again
+    on every connection.
+    """
+    stat = os.stat(path)
+    cache_key = (path, stat.st_size, stat.st_mtime)
+    if cache_key not in _cache:
+        additional = load_endpoint_json(path)
+        # Copy the services being changed, so that the builtin endpoints
+        # are left alone.
+        merged = dict(endpoints)
+        for service in additional:
+            merged[service] = dict(merged.get(service, {}))
+        _cache.clear()
+        _cache[cache_key] = merge_endpoints(merged, additional)
+    return _cache[cache_key]
+
+
 def _load_builtin_endpoints(_cache=_endpoints_cache):
     """Loads the builtin endpoints in the legacy format."""
     # If there's a cached response, return it
@@ -220,11 +242,20 @@ def connect(service_name, region_name, region_cls=None,
 
 def _get_region(service_name, region_name, region_cls=None,
                 connection_cls=None):
-    """Finds the region by searching through the known regions."""
-    for region in get_regions(service_name, region_cls, connection_cls):
-        if region.name == region_name:
-            return region
-    return None
+    """Finds the region by looking it up in the known regions."""
+    endpoints = load_regions()
+    if service_name not in endpoints:
+        raise BotoClientError(
+            "Service '%s' not found in endpoints." % service_name
+        )
+    endpoint = endpoints[service_name].get(region_name)
+    if endpoint is None:
+        return None
+    return (region_cls or RegionInfo)(
+        name=region_name,
+        endpoint=endpoint,
+        connection_cls=connection_cls
+    )
 
 
 def _get_region_with_heuristics(service_name, region_name, region_cls=None,
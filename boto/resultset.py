@@ -19,7 +19,12 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 
-from boto.s3.user import User
+import sys
+
+if sys.version_info < (3, 7):
+    # Code that only imports boto.exception has always found boto.s3
+    # loaded, and before PEP 562 nothing else would load it on access.
+    from boto.s3.user import User
 
 
 class ResultSet(list):
@@ -70,7 +75,9 @@ class ResultSet(list):
         if name == 'Owner':
             # Makes owner available for get_service and
             # perhaps other lists where not handled by
-            # another element.
+            # another element.  Imported here so that loading
+            # boto.exception does not pull in the S3 package.
+            from boto.s3.user import User
             self.owner = User()
             return self.owner
         return None
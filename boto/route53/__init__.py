@@ -21,11 +21,15 @@
 # IN THE SOFTWARE.
 #
 
-# this is here for backward compatibility
-# originally, the Route53Connection class was defined here
-from boto.route53.connection import Route53Connection
 from boto.regioninfo import RegionInfo, get_regions
 from boto.regioninfo import connect
+from boto.compat import lazy_import
+
+# this is here for backward compatibility
+# originally, the Route53Connection class was defined here
+lazy_import(globals(), {
+    'Route53Connection': 'boto.route53.connection',
+})
 
 
 class Route53RegionInfo(RegionInfo):
@@ -52,6 +56,7 @@ def regions():
     :rtype: list
     :return: A list of :class:`boto.regioninfo.RegionInfo` instances
     """
+    from boto.route53.connection import Route53Connection
     regions = get_regions(
         'route53',
         region_cls=Route53RegionInfo,
@@ -82,6 +87,7 @@ def connect_to_region(region_name, **kw_params):
     :return: A connection to the given region, or None if an invalid region
              name is given
     """
+    from boto.route53.connection import Route53Connection
     if region_name == 'universal':
         region = Route53RegionInfo(
             name='universal',
@@ -25,6 +25,9 @@
 
 from boto.regioninfo import RegionInfo, get_regions
 from boto.regioninfo import connect
+from boto.compat import lazy_import
+
+lazy_import(globals())
 
 
 class S3RegionInfo(RegionInfo):
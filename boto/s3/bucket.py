@@ -34,8 +34,10 @@ from boto.s3.multipart import CompleteMultiPartUpload
 from boto.s3.multidelete import MultiDeleteResult
 from boto.s3.multidelete import Error
 from boto.s3.bucketlistresultset import BucketListResultSet
+from boto.s3.bucketlistresultset import ParallelBucketListResultSet
 from boto.s3.bucketlistresultset import VersionedBucketListResultSet
 from boto.s3.bucketlistresultset import MultiPartUploadListResultSet
+from boto.s3.concurrent import BulkDeleteHandler, ConcurrentCopyHandler
 from boto.s3.lifecycle import Lifecycle
 from boto.s3.tagging import Tags
 from boto.s3.cors import CORSConfiguration
@@ -241,7 +243,7 @@ class Bucket(object):
                     response.status, response.reason, '')
 
     def list(self, prefix='', delimiter='', marker='', headers=None,
-             encoding_type=None):
+             encoding_type=None, streaming=False):
         """
         List key objects within a bucket.  This returns an instance of an
         BucketListResultSet that automatically handles all of the result
@@ -285,11 +287,58 @@ class Bucket(object):
             Valid options: ``url``
         :type encoding_type: string
 
+        :type streaming: bool
+        :param streaming: If True, each page of results is parsed as it
+            is read from the response and keys are yielded as soon as
+            they are parsed, which lowers memory use and the time until
+            the first key is available.
+
         :rtype: :class:`boto.s3.bucketlistresultset.BucketListResultSet`
         :return: an instance of a BucketListResultSet that handles paging, etc
         """
         return BucketListResultSet(self, prefix, delimiter, marker, headers,
-                                   encoding_type=encoding_type)
+                                   encoding_type=encoding_type,
+                                   streaming=streaming)
+
+    def list_parallel(self, prefix='', delimiter='', marker='', headers=None,
+                      encoding_type=None, num_threads=10, ordered=True,
+                      boundaries=None):
+        """
+        List key objects within a bucket using a pool of threads.  The
+        keyspace is split into shards which are listed concurrently,
+        which makes iterating over buckets with many millions of keys
+        considerably faster than :meth:`list`.
+
+        The ``prefix``, ``delimiter``, ``marker``, ``headers`` and
+        ``encoding_type`` parameters are exactly as defined for
+        :meth:`list`.
+
+        :type num_threads: int
+        :param num_threads: The number of shards to list concurrently.
+
+        :type ordered: bool
+        :param ordered: If True (the default) keys are returned in
+            lexicographic order, exactly as :meth:`list` would return
+            them.  If False keys are returned as soon as any shard
+            produces them, which keeps every thread busy.
+
+        :type boundaries: list
+        :param boundaries: The key names at which to split the keyspace.
+            Each shard holds the keys after one boundary up to and
+            including the next.  By default the boundaries are derived
+            from the names on the first page of keys, which cannot show
+            how the rest of the keyspace is laid out.
+
+        :rtype: :class:`boto.s3.bucketlistresultset.ParallelBucketListResultSet`
+        :return: an instance of a ParallelBucketListResultSet that
+            handles paging, etc
+        """
+        return ParallelBucketListResultSet(self, prefix, delimiter, marker,
+                                           headers,
+                                           encoding_type=encoding_type,
+                                           num_threads=num_threads,
+                                           ordered=ordered,
+                                           boundaries=boundaries)
 
     def list_versions(self, prefix='', delimiter='', key_marker='',
                       version_id_marker='', headers=None, encoding_type=None):
@@ -482,6 +531,36 @@ class Bucket(object):
                               ('CommonPrefixes', Prefix)],
                              '', headers, **params)
 
+    def iter_all_keys(self, headers=None, result_set=None, **params):
+        """
+        Like :meth:`get_all_keys`, but returns an iterator that parses
+        the response as it is read and yields each key as soon as it is
+        complete, rather than building the whole page of keys first.
+
+        If ``result_set`` is given, it is filled in with the paging
+        attributes of the response, such as ``is_truncated`` and
+        ``next_marker``, once the iterator is exhausted.
+
+        Takes the same parameters as :meth:`get_all_keys`.
+        """
+        self.validate_kwarg_names(params, ['maxkeys', 'max_keys', 'prefix',
+                                           'marker', 'delimiter',
+                                           'encoding_type'])
+        if result_set is None:
+            result_set = ResultSet()
+        result_set.markers = [('Contents', self.key_class),
+                              ('CommonPrefixes', Prefix)]
+        query_args = self._get_all_query_args(params)
+        response = self.connection.make_request('GET', self.name,
+                                                headers=headers,
+                                                query_args=query_args)
+        if response.status != 200:
+            body = response.read()
+            boto.log.debug(body)
+            raise self.connection.provider.storage_response_error(
+                response.status, response.reason, body)
+        return handler.iter_parse(response, result_set, self)
+
     def get_all_versions(self, headers=None, **params):
         """
         A lower-level, version-aware method for listing contents of a
@@ -670,74 +749,130 @@ class Bucket(object):
         """
         ikeys = iter(keys)
         result = MultiDeleteResult(self)
-        provider = self.connection.provider
-        query_args = 'delete'
 
         def delete_keys2(hdrs):
-            hdrs = hdrs or {}
-            data = u"""<?xml version="1.0" encoding="UTF-8"?>"""
-            data += u"<Delete>"
-            if quiet:
-                data += u"<Quiet>true</Quiet>"
-            count = 0
-            while count < 1000:
+            objects = []
+            while len(objects) < 1000:
                 try:
                     key = next(ikeys)
                 except StopIteration:
                     break
-                if isinstance(key, six.string_types):
-                    key_name = key
-                    version_id = None
-                elif isinstance(key, tuple) and len(key) == 2:
-                    key_name, version_id = key
-                elif (isinstance(key, Key) or isinstance(key, DeleteMarker)) and key.name:
-                    key_name = key.name
-                    version_id = key.version_id
+                obj = self._delete_object_from_key(key)
+                if isinstance(obj, Error):
+                    result.errors.append(obj)
                 else:
-                    if isinstance(key, Prefix):
-                        key_name = key.name
-                        code = 'PrefixSkipped'   # Don't delete Prefix
-                    else:
-                        key_name = repr(key)   # try get a string
-                        code = 'InvalidArgument'  # other unknown type
-                    message = 'Invalid. No delete action taken for this object.'
-                    error = Error(key_name, code=code, message=message)
-                    result.errors.append(error)
-                    continue
-                count += 1
-                data += u"<Object><Key>%s</Key>" % xml.sax.saxutils.escape(key_name)
-                if version_id:
-                    data += u"<VersionId>%s</VersionId>" % version_id
-                data += u"</Object>"
-            data += u"</Delete>"
-            if count <= 0:
+                    objects.append(obj)
+            if not objects:
                 return False  # no more
-            data = data.encode('utf-8')
-            fp = BytesIO(data)
-            md5 = boto.utils.compute_md5(fp)
-            hdrs['Content-MD5'] = md5[1]
-            hdrs['Content-Type'] = 'text/xml'
-            if mfa_token:
-                hdrs[provider.mfa_header] = ' '.join(mfa_token)
-            response = self.connection.make_request('POST', self.name,
-                                                    headers=hdrs,
-                                                    query_args=query_args,
-                                                    data=data)
-            body = response.read()
-            if response.status == 200:
-                h = handler.XmlHandler(result, self)
-                if not isinstance(body, bytes):
-                    body = body.encode('utf-8')
-                xml.sax.parseString(body, h)
-                return count >= 1000  # more?
-            else:
-                raise provider.storage_response_error(response.status,
-                                                      response.reason,
-                                                      body)
+            self._post_delete_keys(objects, quiet, mfa_token, hdrs, result)
+            return len(objects) >= 1000  # more?
         while delete_keys2(headers):
             pass
         return result
 
+    def _delete_object_from_key(self, key):
+        """
+        Turns one of the key forms ``delete_keys`` accepts into a
+        ``(key_name, version_id)`` tuple, or into an
+        :class:`boto.s3.multidelete.Error` if it cannot be deleted.
+        """
+        if isinstance(key, six.string_types):
+            return key, None
+        elif isinstance(key, tuple) and len(key) == 2:
+            return key
+        elif (isinstance(key, Key) or isinstance(key, DeleteMarker)) and key.name:
+            return key.name, key.version_id
+        if isinstance(key, Prefix):
+            key_name = key.name
+            code = 'PrefixSkipped'   # Don't delete Prefix
+        else:
+            key_name = repr(key)   # try get a string
+            code = 'InvalidArgument'  # other unknown type
+        message = 'Invalid. No delete action taken for this object.'
+        return Error(key_name, code=code, message=message)
+
+    def _post_delete_keys(self, objects, quiet=False, mfa_token=None,
+                          headers=None, result=None):
+        """
+        Sends a single Multi-Object Delete request for up to 1000
+        ``(key_name, version_id)`` tuples and parses the response into
+        ``result``, a new :class:`boto.s3.multidelete.MultiDeleteResult`
+        by default.
+        """
+        if result is None:
+            result = MultiDeleteResult(self)
+        provider = self.connection.provider
+        hdrs = dict(headers or {})
+        escape = xml.sax.saxutils.escape
+        parts = [u"""<?xml version="1.0" encoding="UTF-8"?>""", u"<Delete>"]
+        if quiet:
+            parts.append(u"<Quiet>true</Quiet>")
+        for key_name, version_id in objects:
+            parts.append(u"<Object><Key>%s</Key>" % escape(key_name))
+            if version_id:
+                parts.append(u"<VersionId>%s</VersionId>" % version_id)
+            parts.append(u"</Object>")
+        parts.append(u"</Delete>")
+        data = u''.join(parts).encode('utf-8')
+        md5 = boto.utils.compute_md5(BytesIO(data))
+        hdrs['Content-MD5'] = md5[1]
+        hdrs['Content-Type'] = 'text/xml'
+        if mfa_token:
+            hdrs[provider.mfa_header] = ' '.join(mfa_token)
+        response = self.connection.make_request('POST', self.name,
+                                                headers=hdrs,
+                                                query_args='delete',
+                                                data=data)
+        body = response.read()
+        if response.status == 200:
+            h = handler.XmlHandler(result, self)
+            if not isinstance(body, bytes):
+                body = body.encode('utf-8')
+            xml.sax.parseString(body, h)
+            return result
+        else:
+            raise provider.storage_response_error(response.status,
+                                                  response.reason,
+                                                  body)
+
+    def delete_keys_parallel(self, keys, quiet=True, mfa_token=None,
+                             headers=None, num_threads=10, callback=None):
+        """
+        Deletes any number of keys using S3's Multi-object delete API,
+        sending batches of 1000 keys from a pool of threads.
+
+        ``keys`` may be any iterable accepted by :meth:`delete_keys`,
+        including the result of :meth:`list`, and is consumed lazily,
+        so whole prefixes can be deleted without holding their listing
+        in memory.  Keys S3 fails to delete with a transient error are
+        retried.
+
+        :type quiet: boolean
+        :param quiet: Only ask S3 to report the keys it failed to
+            delete.  This keeps responses small; the number of deleted
+            keys is still counted.
+
+        :type num_threads: int
+        :param num_threads: The number of delete requests to send
+            concurrently.
+
+        :type callback: callable
+        :param callback: Called with every
+            :class:`boto.s3.multidelete.Deleted` and
+            :class:`boto.s3.multidelete.Error` as it is reported.  In
+            quiet mode only errors are reported.
+
+        The other parameters are exactly as defined for
+        :meth:`delete_keys`.
+
+        :rtype: :class:`boto.s3.multidelete.MultiDeleteSummary`
+        :returns: The number of keys deleted and the keys that could
+            not be.
+        """
+        deleter = BulkDeleteHandler(num_threads=num_threads)
+        return deleter.delete(self, keys, quiet=quiet, mfa_token=mfa_token,
+                              headers=headers, callback=callback)
+
     def delete_key(self, key_name, headers=None, version_id=None,
                    mfa_token=None):
         """
@@ -799,7 +934,8 @@ class Bucket(object):
     def copy_key(self, new_key_name, src_bucket_name,
                  src_key_name, metadata=None, src_version_id=None,
                  storage_class='STANDARD', preserve_acl=False,
-                 encrypt_key=False, headers=None, query_args=None):
+                 encrypt_key=False, headers=None, query_args=None,
+                 copy_handler=None):
         """
         Create a new key in the bucket by copying another existing key.
 
@@ -850,9 +986,26 @@ class Bucket(object):
         :param query_args: A string of additional querystring arguments
             to append to the request
 
+        :type copy_handler: :class:`boto.s3.concurrent.ConcurrentCopyHandler`
+        :param copy_handler: If provided, this handler will perform the
+            copy.  It copies large objects, including those over the 5 GB
+            a single copy request allows, with concurrent Upload Part -
+            Copy requests.  Without one, the copy is made with a single
+            request, and only a source that S3 rejects as too large for
+            that is copied in parts by a default handler.
+
         :rtype: :class:`boto.s3.key.Key` or subclass
         :returns: An instance of the newly created key object
         """
+        if copy_handler is not None and not query_args:
+            return copy_handler.copy(
+                self, new_key_name, src_bucket_name, src_key_name,
+                metadata=metadata, src_version_id=src_version_id,
+                storage_class=storage_class, preserve_acl=preserve_acl,
+                encrypt_key=encrypt_key, headers=headers)
+        # Kept for a multipart copy, should the source turn out to be too
+        # large for a single request.
+        copy_args = (src_key_name, headers and headers.copy())
         headers = headers or {}
         provider = self.connection.provider
         src_key_name = boto.utils.get_utf8_value(src_key_name)
@@ -895,8 +1048,21 @@ class Bucket(object):
                 self.set_xml_acl(acl, new_key_name)
             return key
         else:
-            raise provider.storage_response_error(response.status,
-                                                  response.reason, body)
+            error = provider.storage_response_error(response.status,
+                                                    response.reason, body)
+            if not query_args and copy_handler is None and \
+                    error.error_code == 'InvalidRequest' and \
+                    'copy source is larger' in (error.message or ''):
+                # Sources over 5 GB can only be copied in parts.  The
+                # handler is told to always use parts, so it never comes
+                # back here.
+                handler = ConcurrentCopyHandler(multipart_threshold=0)
+                return handler.copy(
+                    self, new_key_name, src_bucket_name, copy_args[0],
+                    metadata=metadata, src_version_id=src_version_id,
+                    storage_class=storage_class, preserve_acl=preserve_acl,
+                    encrypt_key=encrypt_key, headers=copy_args[1])
+            raise error
 
     def set_canned_acl(self, acl_str, key_name='', headers=None,
                        version_id=None):
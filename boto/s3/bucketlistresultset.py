@@ -19,20 +19,38 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 
-from boto.compat import unquote_str
+import os
+import string
+import threading
+
+from boto.compat import unquote_str, Queue, Empty, Full
+from boto.resultset import ResultSet
+
+DEFAULT_SHARD_CHARACTERS = string.digits + string.ascii_uppercase + \
+    string.ascii_lowercase
+_SHARD_DONE = object()
 
 def bucket_lister(bucket, prefix='', delimiter='', marker='', headers=None,
-                  encoding_type=None):
+                  encoding_type=None, streaming=False):
     """
-    A generator function for listing keys in a bucket.
+    A generator function for listing keys in a bucket.  If
+    ``streaming`` is True, keys are yielded as each page is parsed.
     """
     more_results = True
     k = None
     while more_results:
-        rs = bucket.get_all_keys(prefix=prefix, marker=marker,
-                                 delimiter=delimiter, headers=headers,
-                                 encoding_type=encoding_type)
-        for k in rs:
+        if streaming:
+            rs = ResultSet()
+            keys = bucket.iter_all_keys(prefix=prefix, marker=marker,
+                                        delimiter=delimiter, headers=headers,
+                                        encoding_type=encoding_type,
+                                        result_set=rs)
+        else:
+            rs = keys = bucket.get_all_keys(prefix=prefix, marker=marker,
+                                            delimiter=delimiter,
+                                            headers=headers,
+                                            encoding_type=encoding_type)
+        for k in keys:
             yield k
         if k:
             marker = rs.next_marker or k.name
@@ -50,19 +68,215 @@ class BucketListResultSet(object):
     """
 
     def __init__(self, bucket=None, prefix='', delimiter='', marker='',
-                 headers=None, encoding_type=None):
+                 headers=None, encoding_type=None, streaming=False):
         self.bucket = bucket
         self.prefix = prefix
         self.delimiter = delimiter
         self.marker = marker
         self.headers = headers
         self.encoding_type = encoding_type
+        self.streaming = streaming
 
     def __iter__(self):
         return bucket_lister(self.bucket, prefix=self.prefix,
                              delimiter=self.delimiter, marker=self.marker,
                              headers=self.headers,
-                             encoding_type=self.encoding_type)
+                             encoding_type=self.encoding_type,
+                             streaming=self.streaming)
+
+def _shard_ranges(prefix, marker, boundaries):
+    """
+    Split the keyspace after ``marker`` into ``(start, end)`` ranges.
+    Each range holds the keys greater than ``start`` and less than or
+    equal to ``end``; the last range is open ended (``end`` is None).
+    """
+    if boundaries is None:
+        boundaries = [prefix + c for c in DEFAULT_SHARD_CHARACTERS]
+    points = sorted(set(b for b in boundaries if b > (marker or '')))
+    starts = [marker] + points
+    ends = points + [None]
+    return list(zip(starts, ends))
+
+
+def _sample_boundaries(prefix, delimiter, first, last):
+    """
+    Choose boundaries for the keys after a first page of a listing,
+    whose first and last names are ``first`` and ``last``.
+
+    Besides ``prefix`` followed by each character, the keyspace is split
+    below the stem the sampled names share, one character before and at
+    its end, so keys that all start with the same stem (hash or date
+    prefixed names, say) still spread over many shards.  With a
+    ``delimiter`` the stem stops before its first delimiter, so no
+    boundary falls inside a common prefix.
+    """
+    stem = os.path.commonprefix([first, last])
+    tail = stem[len(prefix):]
+    if delimiter and delimiter in tail:
+        stem = prefix + tail.split(delimiter)[0]
+    stems = set([prefix])
+    for end in (len(stem) - 1, len(stem)):
+        if end > len(prefix):
+            stems.add(stem[:end])
+    return [s + c for s in stems for c in DEFAULT_SHARD_CHARACTERS]
+
+
+def _put_until_stopped(queue, item, stop):
+    while not stop.is_set():
+        try:
+            queue.put(item, timeout=1)
+            return
+        except Full:
+            continue
+
+
+def parallel_bucket_lister(bucket, prefix='', delimiter='', marker='',
+                           headers=None, encoding_type=None, num_threads=10,
+                           ordered=True, boundaries=None, max_pages=2,
+                           page_size=1000):
+    """
+    A generator function for listing keys in a bucket from a pool of
+    threads.
+
+    The keyspace is split into shards at ``boundaries`` and each shard
+    is paged through ``bucket_lister`` by its own thread.  Every shard
+    buffers at most ``max_pages`` pages of ``page_size`` keys, so memory
+    stays flat however large the bucket is.
+
+    Without ``boundaries`` the first page is listed on its own.  If it
+    holds every key no threads are started; otherwise the boundaries
+    are derived from the names on it (see ``_sample_boundaries``).  A
+    single page cannot show how the rest of the keyspace is laid out,
+    so pass ``boundaries`` for keys whose distribution is known.
+
+    If ``ordered`` is True keys are yielded in the same lexicographic
+    order as ``bucket_lister``; otherwise they are yielded as soon as
+    any shard produces them.  When a ``delimiter`` is used the
+    boundaries must not fall inside a common prefix, which the derived
+    boundaries never do.
+    """
+    first_page = []
+    if boundaries is None:
+        rs = bucket.get_all_keys(prefix=prefix, marker=marker,
+                                 delimiter=delimiter, headers=headers,
+                                 encoding_type=encoding_type)
+        first_page = list(rs)
+        names = [k.name for k in first_page]
+        if encoding_type == "url":
+            names = [unquote_str(name) for name in names]
+        if not rs.is_truncated or not names:
+            for k in first_page:
+                yield k
+            return
+        marker = rs.next_marker or first_page[-1].name
+        if encoding_type == "url":
+            marker = unquote_str(marker)
+        boundaries = _sample_boundaries(prefix, delimiter, names[0],
+                                        names[-1])
+    shards = _shard_ranges(prefix, marker, boundaries)
+    shard_queue = Queue()
+    for i, (start, end) in enumerate(shards):
+        shard_queue.put((i, start, end))
+    if ordered:
+        output_queues = [Queue(maxsize=max_pages) for _ in shards]
+    else:
+        shared_queue = Queue(maxsize=max_pages * num_threads)
+        output_queues = [shared_queue] * len(shards)
+    stop = threading.Event()
+
+    def list_shards():
+        while not stop.is_set():
+            try:
+                i, start, end = shard_queue.get_nowait()
+            except Empty:
+                return
+            output_queue = output_queues[i]
+            try:
+                page = []
+                for k in bucket_lister(bucket, prefix=prefix,
+                                       delimiter=delimiter, marker=start,
+                                       headers=headers,
+                                       encoding_type=encoding_type):
+                    name = k.name
+                    if encoding_type == "url":
+                        name = unquote_str(name)
+                    if end is not None and name > end:
+                        break
+                    page.append(k)
+                    if len(page) >= page_size:
+                        _put_until_stopped(output_queue, page, stop)
+                        page = []
+                    if stop.is_set():
+                        return
+                if page:
+                    _put_until_stopped(output_queue, page, stop)
+                _put_until_stopped(output_queue, _SHARD_DONE, stop)
+            except Exception as e:
+                _put_until_stopped(output_queue, e, stop)
+
+    threads = []
+    for _ in range(min(num_threads, len(shards))):
+        thread = threading.Thread(target=list_shards)
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    try:
+        if ordered:
+            queues = output_queues
+        else:
+            queues = [shared_queue]
+        for k in first_page:
+            yield k
+        shards_done = 0
+        for output_queue in queues:
+            while shards_done < len(shards):
+                item = output_queue.get()
+                if item is _SHARD_DONE:
+                    shards_done += 1
+                    if ordered:
+                        break
+                    continue
+                if isinstance(item, Exception):
+                    raise item
+                for k in item:
+                    yield k
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+class ParallelBucketListResultSet(object):
+    """
+    A resultset for listing keys within a bucket from a pool of
+    threads.  Uses the parallel_bucket_lister generator function and
+    implements the iterator interface.  Listing a large bucket this way
+    is bound by the number of shards listed at once rather than by the
+    round-trip time of each page.
+    """
+
+    def __init__(self, bucket=None, prefix='', delimiter='', marker='',
+                 headers=None, encoding_type=None, num_threads=10,
+                 ordered=True, boundaries=None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.delimiter = delimiter
+        self.marker = marker
+        self.headers = headers
+        self.encoding_type = encoding_type
+        self.num_threads = num_threads
+        self.ordered = ordered
+        self.boundaries = boundaries
+
+    def __iter__(self):
+        return parallel_bucket_lister(self.bucket, prefix=self.prefix,
+                                      delimiter=self.delimiter,
+                                      marker=self.marker,
+                                      headers=self.headers,
+                                      encoding_type=self.encoding_type,
+                                      num_threads=self.num_threads,
+                                      ordered=self.ordered,
+                                      boundaries=self.boundaries)
 
 def versioned_bucket_lister(bucket, prefix='', delimiter='',
                             key_marker='', version_id_marker='', headers=None,
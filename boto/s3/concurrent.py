@@ -0,0 +1,707 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+"""
+Concurrent transfers for S3.
+
+The handlers in this module split a single transfer into independent
+units of work (parts of a multipart upload, for example) and run them
+on a pool of threads that share the bucket's connection pool.  Each
+unit of work is retried on its own, so a transient failure only costs
+the part that failed rather than the whole transfer.
+"""
+import logging
+import math
+import mimetypes
+import os
+import re
+import threading
+import time
+from hashlib import md5
+
+from boto.compat import Queue, six
+from boto.concurrent import ConcurrentTransferer, TransferThread
+from boto.s3.multidelete import Error, MultiDeleteSummary
+from boto.utils import find_matching_headers
+
+
+_MEGABYTE = 1024 * 1024
+DEFAULT_PART_SIZE = 8 * _MEGABYTE
+MINIMUM_PART_SIZE = 5 * _MEGABYTE
+MAXIMUM_NUMBER_OF_PARTS = 10000
+DEFAULT_MULTIPART_THRESHOLD = 2 * DEFAULT_PART_SIZE
+# Copies move no data through the client, so larger parts only cost
+# fewer requests.
+DEFAULT_COPY_PART_SIZE = 64 * _MEGABYTE
+DEFAULT_COPY_THRESHOLD = 2 * DEFAULT_COPY_PART_SIZE
+# The largest object a single PUT Object - Copy can create.
+MAXIMUM_COPY_SIZE = 5 * 1024 * _MEGABYTE
+
+_END_SENTINEL = object()
+log = logging.getLogger('boto.s3.concurrent')
+
+
+def calculate_part_size(total_size, part_size=DEFAULT_PART_SIZE):
+    """Calculate the part size to use for a multipart transfer.
+
+    S3 allows at most 10,000 parts per upload and, except for the last
+    one, every part must be at least 5 MB.  ``part_size`` is used as
+    long as it satisfies both limits, otherwise it is grown to the
+    smallest whole number of megabytes that does.
+
+    :type total_size: int
+    :param total_size: The size, in bytes, of the whole object.
+
+    :type part_size: int
+    :param part_size: The preferred part size, in bytes.
+
+    :rtype: tuple
+    :return: A ``(total_parts, part_size)`` tuple.
+    """
+    min_part_size_required = int(math.ceil(
+        total_size / float(MAXIMUM_NUMBER_OF_PARTS)))
+    if part_size < min_part_size_required:
+        part_size = int(math.ceil(
+            min_part_size_required / float(_MEGABYTE))) * _MEGABYTE
+        log.debug("The part size specified is too small for an object "
+                  "of %s bytes.  Using a part size of: %s",
+                  total_size, part_size)
+    part_size = max(part_size, MINIMUM_PART_SIZE)
+    total_parts = max(1, int(math.ceil(total_size / float(part_size))))
+    return total_parts, part_size
+
+
+def _build_complete_xml(etags):
+    s = '<CompleteMultipartUpload>\n'
+    for part_num in sorted(etags):
+        s += '  <Part>\n'
+        s += '    <PartNumber>%d</PartNumber>\n' % part_num
+        s += '    <ETag>%s</ETag>\n' % etags[part_num]
+        s += '  </Part>\n'
+    s += '</CompleteMultipartUpload>'
+    return s
+
+
+class ConcurrentUploadHandler(ConcurrentTransferer):
+    """
+    Upload a file to S3 using a pool of threads.
+
+    Files of at least ``multipart_threshold`` bytes are uploaded with
+    the multipart upload API: the file is split into parts, each
+    thread reads, hashes and uploads its own parts, and the upload is
+    completed once every part has been stored.  Smaller files are sent
+    with a single PUT.
+
+    Pass an instance as the ``upload_handler`` argument of
+    :meth:`boto.s3.key.Key.set_contents_from_filename`.
+    """
+    def __init__(self, num_threads=10, part_size=DEFAULT_PART_SIZE,
+                 multipart_threshold=DEFAULT_MULTIPART_THRESHOLD,
+                 num_retries=5, time_between_retries=1,
+                 retry_exceptions=Exception):
+        """
+        :type num_threads: int
+        :param num_threads: The number of parts to upload concurrently.
+
+        :type part_size: int
+        :param part_size: The preferred size, in bytes, of each part.
+            It is increased automatically when the file would otherwise
+            need more than 10,000 parts.
+
+        :type multipart_threshold: int
+        :param multipart_threshold: Files smaller than this many bytes
+            are uploaded with a single PUT.
+
+        :type num_retries: int
+        :param num_retries: The number of times a failed part is
+            retried before the whole upload is cancelled.
+
+        :type time_between_retries: int
+        :param time_between_retries: The initial number of seconds to
+            wait before retrying a part.  The delay doubles on each
+            subsequent attempt.
+        """
+        super(ConcurrentUploadHandler, self).__init__(
+            num_threads, num_retries, time_between_retries, retry_exceptions)
+        self._part_size = part_size
+        self._multipart_threshold = multipart_threshold
+
+    def upload(self, key, filename, headers=None, replace=True, cb=None,
+               num_cb=10, policy=None, md5=None, reduced_redundancy=False,
+               encrypt_key=False):
+        """
+        Store the contents of ``filename`` in ``key``.  The parameters
+        are exactly as defined for
+        :meth:`boto.s3.key.Key.set_contents_from_filename`, except
+        that for multipart uploads ``cb`` is called once per completed
+        part and ``md5`` is ignored.
+
+        :rtype: int
+        :return: The number of bytes written to the key.
+        """
+        total_size = os.path.getsize(filename)
+        if total_size < self._multipart_threshold:
+            with open(filename, 'rb') as fp:
+                return key.set_contents_from_file(
+                    fp, headers, replace, cb, num_cb, policy, md5,
+                    reduced_redundancy, encrypt_key=encrypt_key)
+        if not replace and key.bucket.lookup(key.name):
+            return
+        headers = headers.copy() if headers else {}
+        if not find_matching_headers('Content-Type', headers):
+            content_type = mimetypes.guess_type(filename)[0]
+            headers['Content-Type'] = content_type or key.DefaultContentType
+        mp = key.bucket.initiate_multipart_upload(
+            key.name, headers=headers, reduced_redundancy=reduced_redundancy,
+            metadata=key.metadata, encrypt_key=encrypt_key, policy=policy)
+        total_parts, part_size = calculate_part_size(total_size,
+                                                     self._part_size)
+        work_items = []
+        for i in range(total_parts):
+            start_byte = i * part_size
+            work_items.append((i + 1, start_byte,
+                               min(part_size, total_size - start_byte)))
+
+        def upload_part(work):
+            part_num, start_byte, size = work
+            with open(filename, 'rb') as fp:
+                fp.seek(start_byte)
+                part = mp.upload_part_from_file(fp, part_num, size=size)
+            return part.etag
+
+        etags = {}
+        bytes_uploaded = 0
+        if cb:
+            cb(bytes_uploaded, total_size)
+        try:
+            for work, etag in self._map(upload_part, work_items):
+                etags[work[0]] = etag
+                bytes_uploaded += work[2]
+                if cb:
+                    cb(bytes_uploaded, total_size)
+        except Exception:
+            log.debug("An error occurred while uploading %s, cancelling "
+                      "multipart upload %s.", filename, mp.id)
+            mp.cancel_upload()
+            raise
+        completed = key.bucket.complete_multipart_upload(
+            key.name, mp.id, _build_complete_xml(etags))
+        key.etag = completed.etag
+        key.version_id = completed.version_id
+        key.encrypted = completed.encrypted
+        key.size = total_size
+        key.path = filename
+        return total_size
+
+
+class ConcurrentDownloadHandler(ConcurrentTransferer):
+    """
+    Download an S3 object using a pool of threads.
+
+    Objects of at least ``multipart_threshold`` bytes are fetched with
+    concurrent ranged GETs.  Every range is written straight into the
+    destination file at its own offset, so the file is never held in
+    memory.  Smaller objects, torrents and requests that already carry
+    a ``Range`` header are downloaded with a single GET.
+
+    When the object's ETag is a plain MD5 the downloaded content is
+    hashed while the remaining ranges are still in flight and the
+    result is checked against the ETag.  Multipart ETags are checked
+    from the per-range MD5s when the ranges line up with the parts of
+    the original upload.
+
+    Pass an instance as the ``res_download_handler`` argument of
+    :meth:`boto.s3.key.Key.get_contents_to_filename`.  The destination
+    must be a regular file that can be reopened by name.
+    """
+    def __init__(self, num_threads=10, part_size=DEFAULT_PART_SIZE,
+                 multipart_threshold=DEFAULT_MULTIPART_THRESHOLD,
+                 num_retries=5, time_between_retries=1,
+                 retry_exceptions=Exception):
+        """
+        :type num_threads: int
+        :param num_threads: The number of ranges to download
+            concurrently.
+
+        :type part_size: int
+        :param part_size: The size, in bytes, of each range.
+
+        :type multipart_threshold: int
+        :param multipart_threshold: Objects smaller than this many bytes
+            are downloaded with a single GET.
+
+        :type num_retries: int
+        :param num_retries: The number of times a failed range is
+            retried before the download is abandoned.
+
+        :type time_between_retries: int
+        :param time_between_retries: The initial number of seconds to
+            wait before retrying a range.  The delay doubles on each
+            subsequent attempt.
+        """
+        super(ConcurrentDownloadHandler, self).__init__(
+            num_threads, num_retries, time_between_retries, retry_exceptions)
+        self._part_size = part_size
+        self._multipart_threshold = multipart_threshold
+
+    def get_file(self, key, fp, headers, cb=None, num_cb=10, torrent=False,
+                 version_id=None, hash_algs=None):
+        """
+        Retrieves a file from a Key.  The parameters are exactly as
+        defined for :meth:`boto.s3.key.Key.get_file`, except that for
+        concurrent downloads ``cb`` is called once per completed range.
+
+        :raises: :class:`boto.exception.StorageDataError` if the
+            downloaded content does not match the object's ETag.
+        """
+        headers = headers or {}
+        if version_id is None:
+            version_id = key.version_id
+        filename = getattr(fp, 'name', None)
+        if (torrent or hash_algs or 'Range' in headers or
+                not isinstance(filename, six.string_types) or
+                not os.path.isfile(filename)):
+            return self._get_file_serially(key, fp, headers, cb, num_cb,
+                                           torrent, version_id, hash_algs)
+        if key.size is None or key.etag is None:
+            remote_key = key.bucket.get_key(key.name, headers=headers,
+                                            version_id=version_id)
+            if remote_key is None:
+                return self._get_file_serially(key, fp, headers, cb, num_cb,
+                                               torrent, version_id, hash_algs)
+            key.size = remote_key.size
+            key.etag = remote_key.etag
+            key.encrypted = remote_key.encrypted
+            key.last_modified = remote_key.last_modified
+        total_size = key.size
+        if total_size < self._multipart_threshold:
+            return self._get_file_serially(key, fp, headers, cb, num_cb,
+                                           torrent, version_id, hash_algs)
+
+        total_parts, part_size = calculate_part_size(total_size,
+                                                     self._part_size)
+        work_items = []
+        for i in range(total_parts):
+            start_byte = i * part_size
+            end_byte = min(start_byte + part_size, total_size) - 1
+            work_items.append((i, start_byte, end_byte))
+
+        # Preallocate the destination so that every range can be written
+        # at its offset through its own file handle.
+        base_offset = fp.tell()
+        fp.flush()
+        fp.truncate(base_offset + total_size)
+
+        def download_range(work):
+            part_number, start_byte, end_byte = work
+            range_key = key.bucket.new_key(key.name)
+            range_headers = headers.copy()
+            range_headers['Range'] = 'bytes=%d-%d' % (start_byte, end_byte)
+            with open(filename, 'r+b') as part_fp:
+                part_fp.seek(base_offset + start_byte)
+                range_key.get_file(part_fp, range_headers,
+                                   version_id=version_id)
+                received = part_fp.tell() - base_offset - start_byte
+            if received != end_byte - start_byte + 1:
+                raise key.provider.storage_data_error(
+                    'Expected %d bytes for range %d-%d of %s, received %d.' %
+                    (end_byte - start_byte + 1, start_byte, end_byte,
+                     key.name, received))
+            return range_key.local_hashes.get('md5')
+
+        etag = (key.etag or '').strip('"\'')
+        # As with KMS, the ETag of an object encrypted with a
+        # customer-provided key is not the MD5 of its content.
+        sse_customer = [h for h in headers if h.lower().endswith(
+            'server-side-encryption-customer-algorithm')]
+        verify_md5 = (re.match('^[a-fA-F0-9]{32}$', etag) and
+                      key.encrypted != 'aws:kms' and not sse_customer)
+        digester = md5()
+        next_part = 0
+        part_digests = [None] * total_parts
+        bytes_downloaded = 0
+        if cb:
+            cb(bytes_downloaded, total_size)
+        with open(filename, 'rb') as verify_fp:
+            for work, part_digest in self._map(download_range, work_items):
+                part_digests[work[0]] = part_digest
+                bytes_downloaded += work[2] - work[1] + 1
+                if cb:
+                    cb(bytes_downloaded, total_size)
+                # Hash the contiguous prefix of the file that has been
+                # written so far, overlapping hashing with the ranges
+                # that are still being downloaded.
+                while (verify_md5 and next_part < total_parts and
+                       part_digests[next_part] is not None):
+                    _, start_byte, end_byte = work_items[next_part]
+                    verify_fp.seek(base_offset + start_byte)
+                    bytes_togo = end_byte - start_byte + 1
+                    while bytes_togo > 0:
+                        chunk = verify_fp.read(min(bytes_togo,
+                                                   key.BufferSize))
+                        if not chunk:
+                            break
+                        digester.update(chunk)
+                        bytes_togo -= len(chunk)
+                    next_part += 1
+        fp.seek(base_offset + total_size)
+
+        if verify_md5:
+            self._check_etag(key, digester.hexdigest(), etag)
+            key.local_hashes['md5'] = digester.digest()
+        elif etag.endswith('-%d' % total_parts) and all(part_digests):
+            combined = '%s-%d' % (md5(b''.join(part_digests)).hexdigest(),
+                                  total_parts)
+            if combined != etag:
+                log.debug("Could not verify multipart ETag %s of %s, the "
+                          "upload probably used a different part size.",
+                          etag, key.name)
+
+    def _check_etag(self, key, hexdigest, etag):
+        if hexdigest != etag.lower():
+            raise key.provider.storage_data_error(
+                'MD5 of downloaded content (%s) does not match ETag of '
+                '%s (%s).' % (hexdigest, key.name, etag))
+
+    def _get_file_serially(self, key, fp, headers, cb, num_cb, torrent,
+                           version_id, hash_algs):
+        key._get_file_internal(fp, headers=headers, cb=cb, num_cb=num_cb,
+                               torrent=torrent, version_id=version_id,
+                               hash_algs=hash_algs)
+
+
+class ConcurrentCopyHandler(ConcurrentTransferer):
+    """
+    Copy an S3 object using a pool of threads.
+
+    Objects of at least ``multipart_threshold`` bytes, and every object
+    larger than the 5 GB a single PUT Object - Copy allows, are copied
+    with the multipart upload API: each thread copies its own byte
+    ranges of the source with Upload Part - Copy, entirely on the
+    server side, and the upload is completed once every part has been
+    stored.  Smaller objects are copied with a single request.
+
+    A multipart upload does not carry the source's metadata over by
+    itself, so the metadata and content headers read from the source
+    are set on the new object, just as a plain copy would.  Every part
+    is copied only if the source still has the ETag it had when the
+    copy started, so an object that is overwritten mid-copy fails the
+    copy rather than producing a mix of both versions.  Customer-provided
+    encryption keys for the source and the new object, and a
+    request-payer header, are sent with every request that needs them.
+
+    Pass an instance as the ``copy_handler`` argument of
+    :meth:`boto.s3.bucket.Bucket.copy_key`.
+    """
+    def __init__(self, num_threads=10, part_size=DEFAULT_COPY_PART_SIZE,
+                 multipart_threshold=DEFAULT_COPY_THRESHOLD,
+                 num_retries=5, time_between_retries=1,
+                 retry_exceptions=Exception):
+        """
+        :type num_threads: int
+        :param num_threads: The number of parts to copy concurrently.
+
+        :type part_size: int
+        :param part_size: The preferred size, in bytes, of each part.
+            It is increased automatically when the object would
+            otherwise need more than 10,000 parts.
+
+        :type multipart_threshold: int
+        :param multipart_threshold: Objects smaller than this many bytes
+            are copied with a single request.
+
+        :type num_retries: int
+        :param num_retries: The number of times a failed part is
+            retried before the whole copy is cancelled.
+
+        :type time_between_retries: int
+        :param time_between_retries: The initial number of seconds to
+            wait before retrying a part.  The delay doubles on each
+            subsequent attempt.
+        """
+        super(ConcurrentCopyHandler, self).__init__(
+            num_threads, num_retries, time_between_retries, retry_exceptions)
+        self._part_size = part_size
+        self._multipart_threshold = min(multipart_threshold,
+                                        MAXIMUM_COPY_SIZE + 1)
+
+    def copy(self, bucket, new_key_name, src_bucket_name, src_key_name,
+             metadata=None, src_version_id=None, storage_class='STANDARD',
+             preserve_acl=False, encrypt_key=False, headers=None):
+        """
+        Copy a key into ``bucket``.  The parameters are exactly as
+        defined for :meth:`boto.s3.bucket.Bucket.copy_key`.
+
+        :rtype: :class:`boto.s3.key.Key` or subclass
+        :returns: An instance of the newly created key object
+        """
+        if src_bucket_name == bucket.name:
+            src_bucket = bucket
+        else:
+            src_bucket = bucket.connection.get_bucket(src_bucket_name,
+                                                      validate=False)
+        provider = bucket.connection.provider
+        src_headers, part_headers, upload_headers = self._split_headers(
+            provider, headers)
+        src_key = src_bucket.get_key(src_key_name, headers=src_headers,
+                                     version_id=src_version_id)
+        # A missing source is left to the plain copy to report.
+        if src_key is None or src_key.size < self._multipart_threshold:
+            return bucket.copy_key(
+                new_key_name, src_bucket_name, src_key_name,
+                metadata=metadata, src_version_id=src_version_id,
+                storage_class=storage_class, preserve_acl=preserve_acl,
+                encrypt_key=encrypt_key, headers=headers)
+
+        if preserve_acl:
+            acl = src_bucket.get_xml_acl(src_key_name)
+        headers = upload_headers
+        if metadata is None:
+            metadata = src_key.metadata
+            for field in src_key._underscore_base_user_settable_fields:
+                name = field.replace('_', '-')
+                value = getattr(src_key, field, None)
+                if value and name != 'content-md5' and \
+                        not find_matching_headers(name, headers):
+                    headers[name] = value
+        if provider.storage_class_header and storage_class:
+            headers[provider.storage_class_header] = storage_class
+        mp = bucket.initiate_multipart_upload(
+            new_key_name, headers=headers, metadata=metadata,
+            encrypt_key=encrypt_key)
+
+        total_size = src_key.size
+        total_parts, part_size = calculate_part_size(total_size,
+                                                     self._part_size)
+        work_items = []
+        for i in range(total_parts):
+            start_byte = i * part_size
+            work_items.append((i + 1, start_byte,
+                               min(start_byte + part_size, total_size) - 1))
+        if src_key.etag:
+            part_headers[provider.header_prefix + 'copy-source-if-match'] = \
+                src_key.etag
+
+        def copy_part(work):
+            part_num, start, end = work
+            part = mp.copy_part_from_key(
+                src_bucket_name, src_key_name, part_num, start, end,
+                src_version_id=src_version_id, headers=part_headers)
+            return part.etag
+
+        etags = {}
+        try:
+            for work, etag in self._map(copy_part, work_items):
+                etags[work[0]] = etag
+        except Exception:
+            log.debug("An error occurred while copying %s, cancelling "
+                      "multipart upload %s.", src_key_name, mp.id)
+            mp.cancel_upload()
+            raise
+        completed = bucket.complete_multipart_upload(
+            new_key_name, mp.id,
+            _build_complete_xml(etags))
+        if preserve_acl:
+            bucket.set_xml_acl(acl, new_key_name)
+        key = bucket.new_key(new_key_name)
+        key.etag = completed.etag
+        key.version_id = completed.version_id
+        key.encrypted = completed.encrypted
+        key.metadata = metadata
+        key.size = total_size
+        return key
+
+    def _split_headers(self, provider, headers):
+        """
+        Sort the caller's headers into those for reading the source,
+        those for each Upload Part - Copy and those for creating the
+        new object.
+
+        The copy-source encryption headers are sent as plain
+        server-side encryption headers when the source is read, and
+        only to the part copies otherwise.  The encryption headers of
+        the new object go to every part as well as to the upload, and
+        a request-payer header goes to every request.
+        """
+        prefix = provider.header_prefix
+        copy_source_sse = prefix + 'copy-source-server-side-encryption-'
+        sse_customer = prefix + 'server-side-encryption-customer-'
+        request_payer = prefix + 'request-payer'
+        src_headers = {}
+        part_headers = {}
+        new_headers = {}
+        for name, value in six.iteritems(headers or {}):
+            lower = name.lower()
+            if lower.startswith(copy_source_sse):
+                src_headers[prefix + lower[len(prefix + 'copy-source-'):]] = \
+                    value
+                part_headers[name] = value
+                continue
+            if lower.startswith(sse_customer) or lower == request_payer:
+                part_headers[name] = value
+                if lower == request_payer:
+                    src_headers[name] = value
+            new_headers[name] = value
+        return src_headers or None, part_headers, new_headers
+
+
+class BulkDeleteHandler(ConcurrentTransferer):
+    """
+    Delete any number of keys using a pool of threads.
+
+    Keys are read lazily from an iterable, grouped into batches of up
+    to 1000 and handed through a bounded queue to the threads, each of
+    which sends Multi-Object Delete requests of its own.  Keys that S3
+    reports it failed to delete with a transient error (``SlowDown``,
+    ``InternalError`` or ``ServiceUnavailable``) are sent again, as is
+    a whole request that fails.  Only the keys that could not be
+    deleted are kept; deleted keys are merely counted, so memory use
+    does not depend on the number of keys.
+
+    Use it through :meth:`boto.s3.bucket.Bucket.delete_keys_parallel`.
+    """
+    RETRYABLE_ERROR_CODES = ('SlowDown', 'InternalError',
+                             'ServiceUnavailable')
+
+    def __init__(self, num_threads=10, batch_size=1000, num_retries=5,
+                 time_between_retries=1, retry_exceptions=Exception):
+        """
+        :type num_threads: int
+        :param num_threads: The number of delete requests to send
+            concurrently.
+
+        :type batch_size: int
+        :param batch_size: The number of keys to delete per request, at
+            most 1000.
+
+        :type num_retries: int
+        :param num_retries: The number of times a failed request, or a
+            key that failed with a transient error, is retried.
+
+        :type time_between_retries: int
+        :param time_between_retries: The initial number of seconds to
+            wait before retrying.  The delay doubles on each subsequent
+            attempt.
+        """
+        super(BulkDeleteHandler, self).__init__(
+            num_threads, num_retries, time_between_retries, retry_exceptions)
+        self._batch_size = min(batch_size, 1000)
+
+    def delete(self, bucket, keys, quiet=True, mfa_token=None, headers=None,
+               callback=None):
+        """
+        Delete ``keys`` from ``bucket``.  The parameters are exactly as
+        defined for :meth:`boto.s3.bucket.Bucket.delete_keys_parallel`.
+
+        :rtype: :class:`boto.s3.multidelete.MultiDeleteSummary`
+        """
+        summary = MultiDeleteSummary(bucket)
+        lock = threading.Lock()
+        failures = []
+        batches = Queue(maxsize=self._num_threads * 2)
+
+        def report(deleted_count, errors, deleted):
+            with lock:
+                summary.deleted_count += deleted_count
+                summary.errors.extend(errors)
+                if callback:
+                    for item in deleted + errors:
+                        callback(item)
+
+        def worker():
+            while True:
+                objects = batches.get()
+                if objects is _END_SENTINEL:
+                    return
+                # Once a batch has failed, drain the queue without
+                # sending anything else.
+                if failures:
+                    continue
+                try:
+                    self._delete_batch(bucket, objects, quiet, mfa_token,
+                                       headers, report)
+                except Exception as e:
+                    failures.append(e)
+
+        threads = []
+        for _ in range(self._num_threads):
+            thread = threading.Thread(target=worker)
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        try:
+            batch = []
+            for key in keys:
+                if failures:
+                    break
+                obj = bucket._delete_object_from_key(key)
+                if isinstance(obj, Error):
+                    report(0, [obj], [])
+                    continue
+                batch.append(obj)
+                if len(batch) >= self._batch_size:
+                    batches.put(batch)
+                    batch = []
+            if batch:
+                batches.put(batch)
+        finally:
+            for _ in threads:
+                batches.put(_END_SENTINEL)
+            for thread in threads:
+                thread.join()
+        if failures:
+            raise failures[0]
+        return summary
+
+    def _delete_batch(self, bucket, objects, quiet, mfa_token, headers,
+                      report):
+        attempt = 0
+        while objects:
+            result = self._post_with_retries(bucket, objects, quiet,
+                                             mfa_token, headers)
+            retry = []
+            errors = []
+            for error in result.errors:
+                if (error.code in self.RETRYABLE_ERROR_CODES and
+                        attempt < self._num_retries):
+                    retry.append((error.key, error.version_id))
+                else:
+                    errors.append(error)
+            report(len(objects) - len(result.errors), errors, result.deleted)
+            if retry:
+                log.debug("Retrying %s keys S3 failed to delete.", len(retry))
+                time.sleep(self._time_between_retries * (2 ** attempt))
+            attempt += 1
+            objects = retry
+
+    def _post_with_retries(self, bucket, objects, quiet, mfa_token, headers):
+        for i in range(self._num_retries + 1):
+            try:
+                return bucket._post_delete_keys(objects, quiet, mfa_token,
+                                                headers)
+            except self._retry_exceptions as e:
+                log.error("Exception caught deleting %s keys, attempt: "
+                          "(%s / %s), exception: %s, msg: %s",
+                          len(objects), i + 1, self._num_retries + 1,
+                          e.__class__, e)
+                if i == self._num_retries:
+                    raise
+                time.sleep(self._time_between_retries * (2 ** i))
@@ -37,6 +37,7 @@ from boto.exception import BotoClientError
 from boto.exception import StorageDataError
 from boto.exception import PleaseRetryException
 from boto.provider import Provider
+from boto.s3.concurrent import ConcurrentCopyHandler, MAXIMUM_COPY_SIZE
 from boto.s3.keyfile import KeyFile
 from boto.s3.user import User
 from boto import UserAgent
@@ -441,7 +442,8 @@ class Key(object):
 
     def copy(self, dst_bucket, dst_key, metadata=None,
              reduced_redundancy=False, preserve_acl=False,
-             encrypt_key=False, validate_dst_bucket=True):
+             encrypt_key=False, validate_dst_bucket=True,
+             copy_handler=None):
         """
         Copy this Key to another bucket.
 
@@ -483,6 +485,12 @@ class Key(object):
         :param validate_dst_bucket: If True, will validate the dst_bucket
             by using an extra list request.
 
+        :type copy_handler: :class:`boto.s3.concurrent.ConcurrentCopyHandler`
+        :param copy_handler: If provided, this handler will perform the
+            copy.  See :meth:`boto.s3.bucket.Bucket.copy_key`.  S3 keys
+            known to be larger than a single copy request allows are
+            copied in parts by a default handler.
+
         :rtype: :class:`boto.s3.key.Key` or subclass
         :returns: An instance of the newly created key object
         """
@@ -492,12 +500,21 @@ class Key(object):
             storage_class = 'REDUCED_REDUNDANCY'
         else:
             storage_class = self.storage_class
+        if copy_handler is None and self.size and \
+                self.size > MAXIMUM_COPY_SIZE and \
+                dst_bucket.connection.provider.name == 'aws':
+            copy_handler = ConcurrentCopyHandler()
+        kwargs = {}
+        if copy_handler is not None:
+            # Only S3 buckets take a copy handler.
+            kwargs['copy_handler'] = copy_handler
         return dst_bucket.copy_key(dst_key, self.bucket.name,
                                    self.name, metadata,
                                    storage_class=storage_class,
                                    preserve_acl=preserve_acl,
                                    encrypt_key=encrypt_key,
-                                   src_version_id=self.version_id)
+                                   src_version_id=self.version_id,
+                                   **kwargs)
 
     def startElement(self, name, attrs, connection):
         if name == 'Owner':
@@ -1297,7 +1314,7 @@ class Key(object):
     def set_contents_from_filename(self, filename, headers=None, replace=True,
                                    cb=None, num_cb=10, policy=None, md5=None,
                                    reduced_redundancy=False,
-                                   encrypt_key=False):
+                                   encrypt_key=False, upload_handler=None):
         """
         Store an object in S3 using the name of the Key object as the
         key in S3 and the contents of the file named by 'filename'.
@@ -1352,9 +1369,19 @@ class Key(object):
             will be encrypted on the server-side by S3 and will be
             stored in an encrypted form while at rest in S3.
 
+        :type upload_handler: :class:`boto.s3.concurrent.ConcurrentUploadHandler`
+        :param upload_handler: If provided, this handler will perform
+            the upload, splitting large files into parts that are
+            uploaded in parallel.
+
         :rtype: int
         :return: The number of bytes written to the key.
         """
+        if upload_handler:
+            return upload_handler.upload(self, filename, headers, replace,
+                                         cb, num_cb, policy, md5,
+                                         reduced_redundancy,
+                                         encrypt_key=encrypt_key)
         with open(filename, 'rb') as fp:
             return self.set_contents_from_file(fp, headers, replace, cb,
                                                num_cb, policy, md5,
@@ -1687,7 +1714,9 @@ class Key(object):
 
         :type res_upload_handler: ResumableDownloadHandler
         :param res_download_handler: If provided, this handler will
-            perform the download.
+            perform the download.  Pass a
+            :class:`boto.s3.concurrent.ConcurrentDownloadHandler` to
+            download large objects with concurrent ranged GETs.
 
         :type response_headers: dict
         :param response_headers: A dictionary containing HTTP
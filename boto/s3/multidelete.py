@@ -136,3 +136,30 @@ class MultiDeleteResult(object):
     def endElement(self, name, value, connection):
         setattr(self, name, value)
  
+
+
+class MultiDeleteSummary(object):
+    """
+    The outcome of a bulk delete, as returned by
+    :meth:`boto.s3.bucket.Bucket.delete_keys_parallel`.  Unlike
+    :class:`MultiDeleteResult` it does not keep a record of every
+    deleted key, so its size does not grow with the number of keys.
+
+    :ivar deleted_count: The number of keys that were deleted.
+
+    :ivar errors: A list of :class:`Error` objects for the keys that
+        could not be deleted.
+    """
+
+    def __init__(self, bucket=None):
+        self.bucket = bucket
+        self.deleted_count = 0
+        self.errors = []
+
+    def __repr__(self):
+        return '<MultiDeleteSummary: %d deleted, %d errors>' % (
+            self.deleted_count, len(self.errors))
+
+    @property
+    def error_count(self):
+        return len(self.errors)
@@ -0,0 +1,382 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+"""
+Synchronises a local directory with a prefix of an S3 bucket.
+
+The remote prefix is listed once and compared against a walk of the
+local directory, so no per-file requests are needed to find out what
+changed.  Local MD5s are cached in a :class:`SyncManifest` together
+with the size and modification time they were computed for, so files
+that have not changed since the last sync are not read again.  Only
+the differences are transferred or deleted, on a pool of threads.
+"""
+import json
+import logging
+import os
+import threading
+
+from boto.concurrent import ConcurrentTransferer
+from boto.utils import atomic_write, compute_md5
+
+
+log = logging.getLogger('boto.s3.sync')
+
+UPLOAD = 'upload'
+DOWNLOAD = 'download'
+DELETE = 'delete'
+
+
+class SyncManifest(object):
+    """
+    An on-disk index of the files in a synchronised directory.
+
+    For every file it records the size and modification time it had
+    when it was last hashed or transferred, its MD5 and the ETag of
+    the matching S3 object.  A file whose size and modification time
+    still match its entry is taken to be unchanged.  Entries are named
+    by the absolute path of the file, so one manifest can be shared by
+    syncs of different directories.
+
+    The index is kept in a JSON file which is rewritten through a
+    temporary file and a rename, so an interrupted sync leaves either
+    the old or the new index behind.
+    """
+    def __init__(self, filename=None):
+        """
+        :type filename: string
+        :param filename: The file to keep the index in.  If None the
+            index is only kept in memory.
+        """
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._entries = {}
+        if filename and os.path.exists(filename):
+            with open(filename) as f:
+                self._entries = json.load(f)
+
+    def lookup(self, name, size, mtime):
+        """
+        Returns the ``(md5, etag)`` recorded for ``name``, or
+        ``(None, None)`` if the file changed since it was recorded.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None or entry[0] != size or entry[1] != mtime:
+            return None, None
+        return entry[2], entry[3]
+
+    def record(self, name, size, mtime, md5=None, etag=None):
+        with self._lock:
+            self._entries[name] = [size, mtime, md5, etag]
+
+    def remove(self, name):
+        with self._lock:
+            self._entries.pop(name, None)
+
+    def save(self):
+        if not self.filename:
+            return
+        with self._lock:
+            with atomic_write(self.filename) as f:
+                json.dump(self._entries, f)
+
+
+class SyncResult(object):
+    """
+    What a sync did, or with ``dry_run`` what it would have done.
+
+    :ivar transferred: The names of the files that were uploaded or
+        downloaded.
+
+    :ivar deleted: The names of the files or keys that were deleted.
+
+    :ivar unchanged: The number of files that were already in sync.
+    """
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.transferred = []
+        self.deleted = []
+        self.unchanged = 0
+
+    def __repr__(self):
+        return '<SyncResult: %d transferred, %d deleted, %d unchanged>' % (
+            len(self.transferred), len(self.deleted), self.unchanged)
+
+
+class BucketSync(ConcurrentTransferer):
+    """
+    Synchronise a local directory with a prefix of a bucket, in either
+    direction.
+
+    A file and a key are in sync when their sizes match and the key's
+    ETag is either the file's MD5 or the ETag recorded in the manifest
+    when the file was last transferred (which covers multipart ETags).
+    Files whose size or modification time changed since they were
+    recorded are hashed again on the thread pool before they are
+    compared.
+
+    Names are relative to the directory, with ``/`` as the separator.
+    Files and directories starting with a dot, and the manifest itself,
+    are never synchronised.
+    """
+    def __init__(self, num_threads=10, num_retries=5,
+                 time_between_retries=1, retry_exceptions=Exception):
+        """
+        :type num_threads: int
+        :param num_threads: The number of files to hash or transfer
+            concurrently.
+
+        :type num_retries: int
+        :param num_retries: The number of times a failed transfer is
+            retried before the sync is abandoned.
+
+        :type time_between_retries: int
+        :param time_between_retries: The initial number of seconds to
+            wait before retrying a transfer.  The delay doubles on each
+            subsequent attempt.
+        """
+        super(BucketSync, self).__init__(
+            num_threads, num_retries, time_between_retries, retry_exceptions)
+
+    def upload(self, bucket, directory, key_prefix='', manifest=None,
+               delete=False, dry_run=False, ignore_dirs=(), callback=None,
+               **kwargs):
+        """
+        Make ``key_prefix`` in ``bucket`` match ``directory``.
+
+        :type bucket: :class:`boto.s3.bucket.Bucket`
+        :param bucket: The bucket to upload to.
+
+        :type directory: string
+        :param directory: The local directory to upload.
+
+        :type key_prefix: string
+        :param key_prefix: The prefix to place the files under.  It
+            should normally end in ``/``.
+
+        :type manifest: :class:`SyncManifest`
+        :param manifest: The index of the directory.  It is saved once
+            the sync finishes, even if it fails.
+
+        :type delete: bool
+        :param delete: Whether to delete the keys under ``key_prefix``
+            that have no local file.
+
+        :type dry_run: bool
+        :param dry_run: If True, nothing is transferred or deleted and
+            the result describes what would have been done.
+
+        :type ignore_dirs: list
+        :param ignore_dirs: Names of directories not to descend into.
+
+        :type callback: callable
+        :param callback: Called with ``(action, name)`` for every file
+            that is uploaded or key that is deleted, where ``action`` is
+            ``'upload'`` or ``'delete'``.
+
+        Any other keyword arguments are passed on to
+        :meth:`boto.s3.key.Key.set_contents_from_filename`.
+
+        :rtype: :class:`SyncResult`
+        """
+        manifest = manifest or SyncManifest()
+        result = SyncResult(dry_run)
+        remote = self._list_remote(bucket, key_prefix)
+        work_items = []
+        for name, path, size, mtime in self._walk(directory, manifest,
+                                                  ignore_dirs):
+            key = remote.pop(name, None)
+            md5, etag = manifest.lookup(os.path.abspath(path), size, mtime)
+            if md5 is not None and self._matches(key, size, md5, etag):
+                result.unchanged += 1
+                continue
+            work_items.append((name, path, size, mtime, md5, key))
+
+        def upload_file(work):
+            name, path, size, mtime, md5, key = work
+            entry = os.path.abspath(path)
+            upload_kwargs = kwargs
+            if md5 is None:
+                with open(path, 'rb') as fp:
+                    md5, b64_md5, _ = compute_md5(fp)
+                if not dry_run:
+                    manifest.record(entry, size, mtime, md5)
+                if self._matches(key, size, md5, None):
+                    return False
+                # Spare the upload from hashing the file a second time.
+                upload_kwargs = dict(kwargs, md5=(md5, b64_md5))
+            if not dry_run:
+                k = bucket.new_key(key_prefix + name)
+                k.set_contents_from_filename(path, **upload_kwargs)
+                # The key's own md5 is not set when an upload handler
+                # does the upload, so keep the one computed here.
+                manifest.record(entry, size, mtime, md5, k.etag)
+            return True
+
+        try:
+            self._run(upload_file, work_items, UPLOAD, result, callback)
+            if delete and remote:
+                self._delete_remote(bucket, key_prefix, sorted(remote),
+                                    dry_run, result, callback)
+        finally:
+            if not dry_run:
+                manifest.save()
+        return result
+
+    def download(self, bucket, key_prefix, directory, manifest=None,
+                 delete=False, dry_run=False, ignore_dirs=(), callback=None,
+                 **kwargs):
+        """
+        Make ``directory`` match ``key_prefix`` in ``bucket``.  The
+        parameters are as defined for :meth:`upload`, except that
+        ``delete`` removes local files which have no key, ``callback``
+        is called with ``'download'`` rather than ``'upload'``, and
+        other keyword arguments are passed on to
+        :meth:`boto.s3.key.Key.get_contents_to_filename`.
+
+        :rtype: :class:`SyncResult`
+        """
+        manifest = manifest or SyncManifest()
+        result = SyncResult(dry_run)
+        remote = self._list_remote(bucket, key_prefix)
+        local = {}
+        for name, path, size, mtime in self._walk(directory, manifest,
+                                                  ignore_dirs):
+            local[name] = (path, size, mtime)
+        work_items = []
+        for name in sorted(remote):
+            key = remote[name]
+            path = os.path.join(directory, *name.split('/'))
+            if name not in local:
+                work_items.append((name, path, key, False))
+                continue
+            path, size, mtime = local.pop(name)
+            md5, etag = manifest.lookup(os.path.abspath(path), size, mtime)
+            if md5 is None and etag is None:
+                work_items.append((name, path, key, True))
+            elif self._matches(key, size, md5, etag):
+                result.unchanged += 1
+            else:
+                work_items.append((name, path, key, False))
+
+        def download_file(work):
+            name, path, key, check = work
+            if check:
+                stat = os.stat(path)
+                with open(path, 'rb') as fp:
+                    md5 = compute_md5(fp)[0]
+                if self._matches(key, stat.st_size, md5, None):
+                    if not dry_run:
+                        manifest.record(os.path.abspath(path), stat.st_size,
+                                        stat.st_mtime, md5, key.etag)
+                    return False
+            if not dry_run:
+                parent = os.path.dirname(path)
+                if not os.path.isdir(parent):
+                    try:
+                        os.makedirs(parent)
+                    except OSError:
+                        # Another thread may have created it.
+                        if not os.path.isdir(parent):
+                            raise
+                key.get_contents_to_filename(path, **kwargs)
+                stat = os.stat(path)
+                manifest.record(os.path.abspath(path), stat.st_size,
+                                stat.st_mtime, etag=key.etag)
+            return True
+
+        try:
+            self._run(download_file, work_items, DOWNLOAD, result, callback)
+            if delete:
+                for name in sorted(local):
+                    if not dry_run:
+                        path = local[name][0]
+                        os.remove(path)
+                        manifest.remove(os.path.abspath(path))
+                    result.deleted.append(name)
+                    if callback:
+                        callback(DELETE, name)
+        finally:
+            if not dry_run:
+                manifest.save()
+        return result
+
+    def _run(self, func, work_items, action, result, callback):
+        for work, transferred in self._map(func, work_items):
+            if not transferred:
+                result.unchanged += 1
+                continue
+            result.transferred.append(work[0])
+            if callback:
+                callback(action, work[0])
+
+    def _matches(self, key, size, md5, etag):
+        if key is None or key.size != size:
+            return False
+        key_etag = key.etag.strip('"')
+        return key_etag == md5 or (etag is not None and
+                                   key_etag == etag.strip('"'))
+
+    def _list_remote(self, bucket, key_prefix):
+        remote = {}
+        for key in bucket.list_parallel(prefix=key_prefix,
+                                        num_threads=self._num_threads,
+                                        ordered=False):
+            name = key.name[len(key_prefix):]
+            # Skip "directory" placeholder keys.
+            if name and not name.endswith('/'):
+                remote[name] = key
+        return remote
+
+    def _walk(self, directory, manifest, ignore_dirs):
+        skip = None
+        if manifest.filename:
+            skip = os.path.abspath(manifest.filename)
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = [d for d in dirs
+                       if d not in ignore_dirs and not d.startswith('.')]
+            for filename in files:
+                if filename.startswith('.'):
+                    continue
+                path = os.path.join(root, filename)
+                if skip is not None and os.path.abspath(path) == skip:
+                    continue
+                stat = os.stat(path)
+                name = os.path.relpath(path, directory).replace(os.sep, '/')
+                yield name, path, stat.st_size, stat.st_mtime
+
+    def _delete_remote(self, bucket, key_prefix, names, dry_run, result,
+                       callback):
+        if not dry_run:
+            summary = bucket.delete_keys_parallel(
+                [key_prefix + name for name in names],
+                num_threads=self._num_threads)
+            failed = set(error.key for error in summary.errors)
+            for error in summary.errors:
+                log.error("Could not delete %s: %s", error.key,
+                          error.message)
+            names = [name for name in names
+                     if key_prefix + name not in failed]
+        for name in names:
+            result.deleted.append(name)
+            if callback:
+                callback(DELETE, name)
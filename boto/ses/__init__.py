@@ -20,9 +20,13 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 
-from boto.ses.connection import SESConnection
 from boto.regioninfo import RegionInfo, get_regions
 from boto.regioninfo import connect
+from boto.compat import lazy_import
+
+lazy_import(globals(), {
+    'SESConnection': 'boto.ses.connection',
+})
 
 
 def regions():
@@ -32,6 +36,7 @@ def regions():
     :rtype: list
     :return: A list of :class:`boto.regioninfo.RegionInfo` instances
     """
+    from boto.ses.connection import SESConnection
     return get_regions('ses', connection_cls=SESConnection)
 
 
@@ -47,5 +52,6 @@ def connect_to_region(region_name, **kw_params):
     :return: A connection to the given region, or None if an invalid region
              name is given
     """
+    from boto.ses.connection import SESConnection
     return connect('ses', region_name, connection_cls=SESConnection,
                    **kw_params)
@@ -20,11 +20,15 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 
-# this is here for backward compatibility
-# originally, the SNSConnection class was defined here
-from boto.sns.connection import SNSConnection
 from boto.regioninfo import RegionInfo, get_regions
 from boto.regioninfo import connect
+from boto.compat import lazy_import
+
+# this is here for backward compatibility
+# originally, the SNSConnection class was defined here
+lazy_import(globals(), {
+    'SNSConnection': 'boto.sns.connection',
+})
 
 
 def regions():
@@ -34,6 +38,7 @@ def regions():
     :rtype: list
     :return: A list of :class:`boto.regioninfo.RegionInfo` instances
     """
+    from boto.sns.connection import SNSConnection
     return get_regions('sns', connection_cls=SNSConnection)
 
 
@@ -49,5 +54,6 @@ def connect_to_region(region_name, **kw_params):
     :return: A connection to the given region, or None if an invalid region
              name is given
     """
+    from boto.sns.connection import SNSConnection
     return connect('sns', region_name,
                    connection_cls=SNSConnection, **kw_params)
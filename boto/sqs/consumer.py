@@ -0,0 +1,329 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+"""
+A pool of threads that receives, processes and deletes SQS messages.
+"""
+import random
+import threading
+import time
+from collections import namedtuple
+
+import boto
+
+from boto.compat import Empty, Full, Queue
+
+
+# The most entries SQS accepts in a single batch request.
+MAX_BATCH_ENTRIES = 10
+
+# What the batch requests need of a message.  The entry Id is the
+# position in the batch, as one message can be delivered twice in one
+# batch and SQS rejects batches whose Ids are not distinct.
+_BatchEntry = namedtuple('_BatchEntry', ['id', 'receipt_handle'])
+
+
+def _batch_entries(messages):
+    return [_BatchEntry(str(i), message.receipt_handle)
+            for i, message in enumerate(messages)]
+
+
+class QueueConsumer(object):
+    """
+    Processes the messages of a queue on a pool of threads.
+
+    ``num_receivers`` threads long-poll the queue with ``ReceiveMessage``
+    and buffer up to ``max_buffered_messages`` messages locally, where
+    ``num_workers`` threads pick them up and call ``handler(message)``.
+
+    When the handler returns, the message is queued for deletion.
+    Deletions are sent with ``DeleteMessageBatch`` once ten of them have
+    queued up, or once the first of them has waited ``ack_linger``
+    seconds.  When the handler raises, the error is logged and the
+    message is left on the queue.  It becomes visible again when its
+    visibility timeout runs out, and is then received again.
+
+    With ``extend_visibility`` enabled, a heartbeat thread keeps the
+    messages that are buffered or being processed invisible.  Once
+    half of a message's visibility timeout has passed, the heartbeat
+    extends it again, using ``ChangeMessageVisibilityBatch`` in groups
+    of ten.  Slow handlers therefore do not let messages reappear while
+    they are still being worked on.
+
+    ``received``, ``processed``, ``failed``, ``deleted`` and
+    ``visibility_extensions`` count the work done so far.
+
+    Use the consumer as a context manager, or call ``start`` and
+    ``stop``::
+
+        >>> with QueueConsumer(queue, handle_job, num_workers=8):
+        ...     wait_for_shutdown_signal()
+    """
+    def __init__(self, queue, handler, num_receivers=2, num_workers=4,
+                 wait_time_seconds=20, visibility_timeout=None,
+                 max_buffered_messages=None, ack_linger=0.1, num_ackers=2,
+                 extend_visibility=True, attributes=None,
+                 message_attributes=None):
+        """
+        :type queue: :class:`boto.sqs.queue.Queue`
+        :param queue: The queue to consume.
+
+        :type handler: callable
+        :param handler: Called with each message.  The message is deleted
+            if it returns and left on the queue if it raises.
+
+        :type num_receivers: int
+        :param num_receivers: The number of ``ReceiveMessage`` long polls
+            to keep open at once.
+
+        :type num_workers: int
+        :param num_workers: The number of threads calling ``handler``.
+
+        :type wait_time_seconds: int
+        :param wait_time_seconds: How long each long poll waits for
+            messages to arrive.
+
+        :type visibility_timeout: int
+        :param visibility_timeout: The visibility timeout to receive
+            messages with.  Defaults to the queue's own timeout.
+
+        :type max_buffered_messages: int
+        :param max_buffered_messages: How many received messages may wait
+            for a worker before the receivers stop polling.  Defaults to
+            ten per worker.
+
+        :type ack_linger: float
+        :param ack_linger: How long, in seconds, a deletion may wait for
+            others to share its batch request.
+
+        :type num_ackers: int
+        :param num_ackers: The number of threads sending deletions.
+
+        :type extend_visibility: bool
+        :param extend_visibility: Whether to keep buffered and in-progress
+            messages invisible until they have been processed.
+        """
+        self.queue = queue
+        self.handler = handler
+        self.num_receivers = num_receivers
+        self.num_workers = num_workers
+        self.num_ackers = num_ackers
+        self.wait_time_seconds = wait_time_seconds
+        self.visibility_timeout = visibility_timeout
+        if max_buffered_messages is None:
+            max_buffered_messages = num_workers * MAX_BATCH_ENTRIES
+        self.max_buffered_messages = max_buffered_messages
+        self.ack_linger = ack_linger
+        self.extend_visibility = extend_visibility
+        self.attributes = attributes
+        self.message_attributes = message_attributes
+        self.received = 0
+        self.processed = 0
+        self.failed = 0
+        self.deleted = 0
+        self.visibility_extensions = 0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._stopped = threading.Event()
+        self._messages = None
+        self._acks = None
+        self._in_flight = {}
+        self._receivers = []
+        self._workers = []
+        self._ackers = []
+        self._heartbeat = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.stop()
+
+    def start(self):
+        """
+        Starts receiving and processing messages.
+        """
+        if self.visibility_timeout is None and self.extend_visibility:
+            self.visibility_timeout = self.queue.get_timeout()
+        self._stopping.clear()
+        self._stopped.clear()
+        self._messages = Queue(maxsize=self.max_buffered_messages)
+        self._acks = Queue()
+        self._receivers = self._start_threads(self.num_receivers,
+                                              self._receive)
+        self._workers = self._start_threads(self.num_workers, self._work)
+        self._ackers = self._start_threads(self.num_ackers, self._ack)
+        if self.extend_visibility:
+            self._heartbeat = self._start_threads(1, self._extend)[0]
+
+    def stop(self):
+        """
+        Stops receiving messages, processes the messages that were
+        already received and sends their deletions.  This waits for the
+        long polls in progress to return, which may take up to
+        ``wait_time_seconds``.
+        """
+        self._stopping.set()
+        self._join(self._receivers)
+        for _ in self._workers:
+            self._messages.put(None)
+        self._join(self._workers)
+        for _ in self._ackers:
+            self._acks.put(None)
+        self._join(self._ackers)
+        self._stopped.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
+
+    def _start_threads(self, count, target):
+        threads = []
+        for _ in range(count):
+            thread = threading.Thread(target=target)
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    def _join(self, threads):
+        for thread in threads:
+            thread.join()
+        del threads[:]
+
+    def _receive(self):
+        attempt = 0
+        while not self._stopping.is_set():
+            try:
+                messages = self.queue.connection.receive_message(
+                    self.queue, number_messages=MAX_BATCH_ENTRIES,
+                    visibility_timeout=self.visibility_timeout,
+                    attributes=self.attributes,
+                    wait_time_seconds=self.wait_time_seconds,
+                    message_attributes=self.message_attributes)
+            except Exception as e:
+                attempt += 1
+                boto.log.error('Receiving messages from %s failed: %s' % (
+                    self.queue.url, e))
+                self._stopping.wait(random.random() * min(20, 2 ** attempt))
+                continue
+            attempt = 0
+            now = time.time()
+            with self._lock:
+                self.received += len(messages)
+                for message in messages:
+                    self._in_flight[message.receipt_handle] = [message, now]
+            for message in messages:
+                self._put(message)
+
+    def _put(self, message):
+        # Buffered messages are still processed when stopping, so keep
+        # waiting for room until the workers are gone.
+        while True:
+            try:
+                self._messages.put(message, timeout=0.1)
+                return
+            except Full:
+                pass
+
+    def _work(self):
+        while True:
+            message = self._messages.get()
+            if message is None:
+                return
+            try:
+                self.handler(message)
+            except Exception as e:
+                boto.log.error('Processing message %s failed: %s' % (
+                    message.id, e))
+                with self._lock:
+                    self.failed += 1
+                    self._in_flight.pop(message.receipt_handle, None)
+                continue
+            with self._lock:
+                self.processed += 1
+            self._acks.put(message)
+
+    def _ack(self):
+        while True:
+            message = self._acks.get()
+            if message is None:
+                return
+            batch = [message]
+            deadline = time.time() + self.ack_linger
+            stop = False
+            while len(batch) < MAX_BATCH_ENTRIES:
+                try:
+                    message = self._acks.get(
+                        timeout=max(0, deadline - time.time()))
+                except Empty:
+                    break
+                if message is None:
+                    stop = True
+                    break
+                batch.append(message)
+            self._delete(batch)
+            if stop:
+                return
+
+    def _delete(self, messages):
+        try:
+            results = self.queue.connection.delete_message_batch(
+                self.queue, _batch_entries(messages))
+            errors = results.errors
+        except Exception as e:
+            boto.log.error('Deleting %s messages failed: %s' % (
+                len(messages), e))
+            errors = [{'id': str(i)} for i in range(len(messages))]
+        for error in errors:
+            boto.log.error('Deleting message %s failed: %s' % (
+                messages[int(error['id'])].id, error.get('error_message')))
+        with self._lock:
+            self.deleted += len(messages) - len(errors)
+            for message in messages:
+                self._in_flight.pop(message.receipt_handle, None)
+
+    def _extend(self):
+        timeout = self.visibility_timeout
+        interval = max(timeout / 4.0, 0.1)
+        while True:
+            self._stopped.wait(interval)
+            if self._stopped.is_set():
+                return
+            now = time.time()
+            due = []
+            with self._lock:
+                for entry in self._in_flight.values():
+                    if now - entry[1] >= timeout / 2.0:
+                        entry[1] = now
+                        due.append(entry[0])
+            for i in range(0, len(due), MAX_BATCH_ENTRIES):
+                batch = due[i:i + MAX_BATCH_ENTRIES]
+                try:
+                    self.queue.connection.change_message_visibility_batch(
+                        self.queue, [(entry, timeout) for entry in
+                                     _batch_entries(batch)])
+                except Exception as e:
+                    boto.log.error('Extending the visibility of %s messages '
+                                   'failed: %s' % (len(batch), e))
+                    continue
+                with self._lock:
+                    self.visibility_extensions += len(batch)
@@ -0,0 +1,369 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+"""
+Sends SQS messages in batches from a pool of threads.
+"""
+import random
+import threading
+import time
+
+import boto
+
+from boto.compat import Queue, six
+from boto.exception import BotoClientError, SQSError
+
+
+# Limits of a single SendMessageBatch request.
+MAX_BATCH_ENTRIES = 10
+MAX_BATCH_BYTES = 256 * 1024
+
+
+class MessageFuture(object):
+    """
+    The pending result of sending a message through a
+    :class:`SendBuffer`.
+
+    It follows the interface of ``concurrent.futures.Future``.
+    ``result`` returns the message once it has been sent, with its ``id``
+    and ``md5`` filled in, or raises the error that stopped it from being
+    sent.
+    """
+    def __init__(self, message):
+        self.message = message
+        self._exception = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """
+        Waits up to ``timeout`` seconds for the message to be sent and
+        returns it, or raises the error that stopped it from being sent.
+        """
+        exception = self.exception(timeout)
+        if exception is not None:
+            raise exception
+        return self.message
+
+    def exception(self, timeout=None):
+        """
+        Waits up to ``timeout`` seconds for the message to be sent and
+        returns the error that stopped it from being sent, if any.
+        """
+        self._done.wait(timeout)
+        if not self._done.is_set():
+            raise BotoClientError('Timed out waiting for message to be sent')
+        return self._exception
+
+    def add_done_callback(self, fn):
+        """
+        Calls ``fn(future)`` once the message has been sent or has
+        failed.  If that has already happened, ``fn`` is called at once.
+        """
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _finish(self, exception=None):
+        with self._lock:
+            self._exception = exception
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn(self)
+            except Exception as e:
+                boto.log.exception('Message future callback failed: %s' % e)
+
+
+class _Entry(object):
+    def __init__(self, future, body, delay_seconds, size):
+        self.future = future
+        self.body = body
+        self.delay_seconds = delay_seconds
+        self.size = size
+
+    def params(self, entry_id):
+        params = [entry_id, self.body, self.delay_seconds]
+        if self.future.message.message_attributes:
+            params.append(self.future.message.message_attributes)
+        return params
+
+
+class SendBuffer(object):
+    """
+    Gathers messages written to a queue into ``SendMessageBatch``
+    requests, which are sent from a pool of threads.
+
+    A batch is sent once it holds ten messages or 256 KB, or once its
+    first message has waited ``linger_time`` seconds.  Up to
+    ``num_threads`` batches are in flight at once.  ``write`` returns a
+    :class:`MessageFuture` for every message, so each message still
+    succeeds or fails on its own.
+
+    Entries the ``BatchResults`` report as failed through no fault of
+    the sender are resent, with jittered exponential backoff, up to
+    ``max_retries`` times.  Entries rejected as the sender's fault fail
+    at once.  When a whole request fails, every message in it fails
+    with that error.
+
+    Use it as a context manager, or call ``close``, to make sure every
+    buffered message has been sent::
+
+        >>> with SendBuffer(queue) as buffer:
+        ...     futures = [buffer.write(queue.new_message(body))
+        ...                for body in bodies]
+        >>> [future.result().id for future in futures]
+    """
+    def __init__(self, queue, num_threads=4, linger_time=0.05,
+                 max_retries=5, backoff_base=0.05, max_backoff=20):
+        """
+        :type queue: :class:`boto.sqs.queue.Queue`
+        :param queue: The queue to write to.
+
+        :type num_threads: int
+        :param num_threads: The number of ``SendMessageBatch`` requests
+            that may be in flight at once.
+
+        :type linger_time: float
+        :param linger_time: How long, in seconds, a message may wait for
+            its batch to fill up before the batch is sent anyway.
+
+        :type max_retries: int
+        :param max_retries: How many times failed entries are resent.
+        """
+        self.queue = queue
+        self.num_threads = num_threads
+        self.linger_time = linger_time
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.requests_sent = 0
+        self._batch = []
+        self._batch_size = 0
+        self._batch_created = None
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._queue = Queue(maxsize=num_threads * 2)
+        self._threads = []
+        self._linger_thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def write(self, message, delay_seconds=None):
+        """
+        Adds a message to the buffer.  This only blocks if the worker
+        threads are already well behind.
+
+        :type message: :class:`boto.sqs.message.Message` or string
+        :param message: The message to send.  A string is wrapped in a
+            message of the queue's message class.
+
+        :type delay_seconds: int
+        :param delay_seconds: Number of seconds (0 - 900) to delay this
+            message from being processed.
+
+        :rtype: :class:`MessageFuture`
+        :return: The pending result of sending the message.
+        """
+        if not hasattr(message, 'get_body_encoded'):
+            message = self.queue.new_message(message)
+        body = message.get_body_encoded()
+        size = self._message_size(body, message.message_attributes)
+        if size > MAX_BATCH_BYTES:
+            raise ValueError("Message of %s bytes is larger than the %s "
+                             "bytes SQS allows" % (size, MAX_BATCH_BYTES))
+        future = MessageFuture(message)
+        entry = _Entry(future, body, int(delay_seconds or 0), size)
+        if not self._threads:
+            with self._lock:
+                # Another thread may have started them while we waited.
+                if not self._threads:
+                    self._start_threads()
+
+        full = []
+        with self._lock:
+            if self._batch and self._batch_size + size > MAX_BATCH_BYTES:
+                full.append(self._take_batch())
+            if not self._batch:
+                self._batch_created = time.time()
+            self._batch.append(entry)
+            self._batch_size += size
+            if len(self._batch) >= MAX_BATCH_ENTRIES:
+                full.append(self._take_batch())
+        for batch in full:
+            self._queue.put(batch)
+        return future
+
+    def flush(self):
+        """
+        Hands every buffered message to the worker threads, without
+        waiting for them to be sent.
+        """
+        with self._lock:
+            batch = self._take_batch()
+        if batch:
+            self._queue.put(batch)
+
+    def wait(self):
+        """
+        Sends every buffered message and blocks until each of them has
+        been sent or has failed.
+        """
+        self.flush()
+        if self._threads:
+            self._queue.join()
+
+    def close(self):
+        """
+        Sends every buffered message and stops the worker threads.
+        """
+        try:
+            self.wait()
+        finally:
+            self._stop_threads()
+
+    def _take_batch(self):
+        batch = self._batch
+        self._batch = []
+        self._batch_size = 0
+        return batch
+
+    def _message_size(self, body, message_attributes):
+        size = len(self._encode(body))
+        for name, attribute in (message_attributes or {}).items():
+            size += len(self._encode(name))
+            for value in attribute.values():
+                if isinstance(value, (six.binary_type, six.text_type)):
+                    size += len(self._encode(value))
+        return size
+
+    def _encode(self, value):
+        if isinstance(value, six.text_type):
+            return value.encode('utf-8')
+        return value
+
+    def _backoff_time(self, attempt):
+        return random.random() * min(self.max_backoff,
+                                     self.backoff_base * (2 ** attempt))
+
+    def _start_threads(self):
+        self._closed.clear()
+        for _ in range(self.num_threads):
+            thread = threading.Thread(target=self._worker)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+        self._linger_thread = threading.Thread(target=self._linger)
+        self._linger_thread.daemon = True
+        self._linger_thread.start()
+
+    def _stop_threads(self):
+        # Stop the linger thread first, so that it cannot queue a batch
+        # behind the workers' sentinels.
+        self._closed.set()
+        if self._linger_thread is not None:
+            self._linger_thread.join()
+            self._linger_thread = None
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _linger(self):
+        while True:
+            self._closed.wait(self.linger_time)
+            if self._closed.is_set():
+                return
+            batch = None
+            with self._lock:
+                if self._batch and \
+                        time.time() - self._batch_created >= self.linger_time:
+                    batch = self._take_batch()
+            if batch:
+                self._queue.put(batch)
+
+    def _worker(self):
+        while True:
+            batch = self._queue.get()
+            try:
+                if batch is None:
+                    return
+                self._send(batch)
+            except Exception as e:
+                # Handling a response went wrong; make sure nobody waits
+                # forever for the messages that were not settled.
+                boto.log.debug('Sending a batch failed: %s' % e)
+                for entry in batch:
+                    if not entry.future.done():
+                        entry.future._finish(e)
+            finally:
+                self._queue.task_done()
+
+    def _send(self, entries):
+        attempt = 0
+        while entries:
+            try:
+                results = self.queue.connection.send_message_batch(
+                    self.queue, [entry.params(str(i))
+                                 for i, entry in enumerate(entries)])
+            except Exception as e:
+                boto.log.debug('SendMessageBatch failed: %s' % e)
+                for entry in entries:
+                    entry.future._finish(e)
+                return
+            with self._lock:
+                self.requests_sent += 1
+            for result in results.results:
+                entry = entries[int(result['id'])]
+                entry.future.message.id = result.get('message_id')
+                entry.future.message.md5 = result.get('message_md5')
+                entry.future._finish()
+            retry = []
+            attempt += 1
+            for error in results.errors:
+                entry = entries[int(error['id'])]
+                sender_fault = error.get('sender_fault') == 'true'
+                if sender_fault or attempt > self.max_retries:
+                    entry.future._finish(self._entry_error(error))
+                else:
+                    retry.append(entry)
+            if retry:
+                time.sleep(self._backoff_time(attempt))
+            entries = retry
+
+    def _entry_error(self, error):
+        sender_fault = error.get('sender_fault') == 'true'
+        e = SQSError(400 if sender_fault else 500, error.get('error_code'))
+        e.error_code = error.get('error_code')
+        e.message = error.get('error_message')
+        return e
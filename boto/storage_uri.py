@@ -23,8 +23,13 @@
 import boto
 import os
 import sys
-import textwrap
-from boto.s3.deletemarker import DeleteMarker
+
+if sys.version_info < (3, 7):
+    # Without module __getattr__ (PEP 562) boto.s3 cannot be loaded on
+    # first access, and code that only imports boto relies on it being
+    # loaded here.  It has to come before boto.exception, as it always
+    # has, for the imports between the two to resolve.
+    from boto.s3.deletemarker import DeleteMarker
 from boto.exception import BotoClientError
 from boto.exception import InvalidUriError
 
@@ -67,6 +72,7 @@ class StorageUri(object):
 
     def check_response(self, resp, level, uri):
         if resp is None:
+            import textwrap
             raise InvalidUriError('\n'.join(textwrap.wrap(
                 'Attempt to get %s for "%s" failed. This can happen if '
                 'the URI refers to a non-existent object or if you meant to '
@@ -165,6 +171,7 @@ class StorageUri(object):
         self._check_bucket_uri('list_bucket')
         bucket = self.get_bucket(headers=headers)
         if all_versions:
+            from boto.s3.deletemarker import DeleteMarker
             return (v for v in bucket.list_versions(
                 prefix=prefix, delimiter=delimiter, headers=headers)
                 if not isinstance(v, DeleteMarker))
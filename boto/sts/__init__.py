@@ -20,9 +20,13 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 
-from boto.sts.connection import STSConnection
 from boto.regioninfo import RegionInfo, get_regions
 from boto.regioninfo import connect
+from boto.compat import lazy_import
+
+lazy_import(globals(), {
+    'STSConnection': 'boto.sts.connection',
+})
 
 
 def regions():
@@ -32,6 +36,7 @@ def regions():
     :rtype: list
     :return: A list of :class:`boto.regioninfo.RegionInfo` instances
     """
+    from boto.sts.connection import STSConnection
     return get_regions('sts', connection_cls=STSConnection)
 
 
@@ -47,5 +52,6 @@ def connect_to_region(region_name, **kw_params):
     :return: A connection to the given region, or None if an invalid region
              name is given
     """
+    from boto.sts.connection import STSConnection
     return connect('sts', region_name, connection_cls=STSConnection,
                    **kw_params)
@@ -25,7 +25,13 @@
 from boto.ec2.regioninfo import RegionInfo
 from boto.regioninfo import get_regions, load_regions
 from boto.regioninfo import connect
-import boto.swf.layer1
+from boto.compat import lazy_import
+import sys
+
+lazy_import(globals())
+if sys.version_info < (3, 7):
+    # Submodules can only be loaded on first access from Python 3.7.
+    import boto.swf.layer1
 
 REGION_ENDPOINTS = load_regions().get('swf', {})
 
@@ -37,9 +43,10 @@ def regions(**kw_params):
     :rtype: list
     :return: A list of :class:`boto.regioninfo.RegionInfo`
     """
-    return get_regions('swf', connection_cls=boto.swf.layer1.Layer1)
+    from boto.swf.layer1 import Layer1
+    return get_regions('swf', connection_cls=Layer1)
 
 
 def connect_to_region(region_name, **kw_params):
-    return connect('swf', region_name,
-                   connection_cls=boto.swf.layer1.Layer1, **kw_params)
+    from boto.swf.layer1 import Layer1
+    return connect('swf', region_name, connection_cls=Layer1, **kw_params)
@@ -39,6 +39,7 @@
 Some handy utility functions used by several classes.
 """
 
+import os
 import subprocess
 import time
 import logging.handlers
@@ -453,6 +454,44 @@ def setlocale(name):
             locale.setlocale(locale.LC_ALL, saved)
 
 
+@contextmanager
+def atomic_write(filename, mode='w', permissions=None):
+    """
+    A context manager that opens a temporary file next to ``filename``
+    and, once the block finishes, renames it over ``filename``.  Readers
+    see either the old or the new contents, never a partial file.  If
+    the block raises, the temporary file is removed and ``filename`` is
+    left alone.
+
+    :type filename: str
+    :param filename: The file to write.
+
+    :type mode: str
+    :param mode: The mode to open the temporary file with.
+
+    :type permissions: int
+    :param permissions: The permissions to give the file.  The default
+        leaves it readable by its owner only, as ``tempfile.mkstemp``
+        creates it.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, temp_name = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        if permissions is not None:
+            os.chmod(temp_name, permissions)
+        # Unlike os.rename, os.replace (Python 3.3+) also replaces an
+        # existing file on Windows.
+        getattr(os, 'replace', os.rename)(temp_name, filename)
+    except BaseException:
+        try:
+            os.remove(temp_name)
+        except OSError:
+            pass
+        raise
+
+
 def get_ts(ts=None):
     if not ts:
         ts = time.gmtime()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""Benchmark encoding and decoding DynamoDB items.
+
+Compares ``Dynamizer``, ``LossyFloatDynamizer`` and ``FastDynamizer``,
+with and without ``lossy_float``, on a page of made-up items of about
+1 MB, roughly what a single ``Query`` or ``Scan`` call returns.  No
+requests are sent.
+
+Usage
+=====
+
+To run the benchmark with the default number of repetitions::
+
+    python benchmark-dynamizer.py
+
+To use more repetitions, and smaller items::
+
+    python benchmark-dynamizer.py --repeat 10 --fields 5
+
+"""
+import argparse
+import time
+from decimal import Decimal
+
+from boto.dynamodb.types import Dynamizer, FastDynamizer, \
+    LossyFloatDynamizer
+
+
+PAGE_SIZE = 1024 * 1024
+
+
+def make_item(i, fields):
+    item = {
+        'id': 'item-%08d' % i,
+        'count': i,
+        'price': Decimal('%d.%02d' % (i, i % 100)),
+        'tags': set(['tag-%d' % (i % 7), 'tag-%d' % (i % 11)]),
+        'scores': [i % 3, i % 5, i % 7],
+        'address': {'street': '%d Main Street' % i, 'zip': '%05d' % i},
+    }
+    for field in range(fields):
+        item['field-%d' % field] = 'value %d of item %d' % (field, i)
+    return item
+
+
+def make_page(fields):
+    items = []
+    size = 0
+    while size < PAGE_SIZE:
+        item = make_item(len(items), fields)
+        items.append(item)
+        size += len(repr(item))
+    return items
+
+
+def encode_page(dynamizer, items):
+    return [dynamizer.encode_item(item) for item in items]
+
+
+def decode_page(dynamizer, items):
+    return [dynamizer.decode_item(item) for item in items]
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        times.append(time.time() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--repeat', type=int, default=5,
+        help='The number of times to repeat each measurement.  The best '
+             'time is reported.')
+    parser.add_argument(
+        '--fields', type=int, default=10,
+        help='The number of extra string attributes on each item.')
+    args = parser.parse_args()
+
+    items = make_page(args.fields)
+    encoded = encode_page(Dynamizer(), items)
+    dynamizers = [
+        ('Dynamizer', Dynamizer()),
+        ('LossyFloatDynamizer', LossyFloatDynamizer()),
+        ('FastDynamizer', FastDynamizer()),
+        ('FastDynamizer (lossy)', FastDynamizer(lossy_float=True)),
+    ]
+    print('%d items per page' % len(items))
+    for name, dynamizer in dynamizers:
+        encode = best_time(lambda: encode_page(dynamizer, items), args.repeat)
+        decode = best_time(lambda: decode_page(dynamizer, encoded),
+                           args.repeat)
+        print('%-22s encode %8.2f ms   decode %8.2f ms' % (
+            name, encode * 1000, decode * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""Check the time it takes to import boto against a budget.
+
+Runs ``python -X importtime -c "import boto, boto.s3"`` in a fresh
+interpreter a number of times, and adds up the cumulative import time of
+the top level boto modules it imports.  The best run is compared with the
+budget, and the script exits with a non-zero status when the budget is
+exceeded, so that it can run as part of a build.
+
+The default budget of 100 ms was chosen from measurements of
+``import boto, boto.s3``.  Before imports were made lazy it took 108 to
+180 ms, and afterwards 36 to 96 ms, depending on the machine and the
+Python version (3.7 to 3.12).  100 ms passes on all of those and fails
+if the lazy imports are undone.  Absolute times vary between machines,
+so on a slow one compare against another checkout instead: with
+``--baseline`` the budget is a fraction of that checkout's import time.
+
+``-X importtime`` needs Python 3.7 or newer.  Bytecode files should be
+writable, or the first run compiles every module and the measurement
+includes that.
+
+Usage
+=====
+
+To check the default imports against the default budget::
+
+    python benchmark-import.py
+
+To check other imports, with a budget of 50 ms::
+
+    python benchmark-import.py --budget 50 --code "import boto, boto.sqs"
+
+To require the imports to take at most 70% of the time they take in
+another checkout of boto::
+
+    python benchmark-import.py --baseline ../boto-2.46.1 --ratio 0.7
+
+"""
+import argparse
+import subprocess
+import sys
+
+
+DEFAULT_CODE = 'import boto, boto.s3'
+
+
+def import_time(code, cwd=None):
+    """
+    Returns the cumulative import time of ``code``, in microseconds.
+    boto is imported from ``cwd`` if it holds a checkout.
+    """
+    output = subprocess.Popen(
+        [sys.executable, '-X', 'importtime', '-c', code], cwd=cwd,
+        stderr=subprocess.PIPE, universal_newlines=True).communicate()[1]
+    total = 0
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Only top level imports are not indented, and their cumulative
+        # time covers everything they imported in turn.  The interpreter's
+        # own startup imports are left out.
+        if name[1:].startswith('boto') and cumulative.strip().isdigit():
+            total += int(cumulative)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--budget', type=float, default=100,
+        help='The most time, in milliseconds, the imports may take.')
+    parser.add_argument(
+        '--baseline',
+        help='A checkout of boto to compare against.  The budget is then '
+             '--ratio times its import time.')
+    parser.add_argument(
+        '--ratio', type=float, default=0.8,
+        help='The fraction of the baseline import time the imports may '
+             'take.')
+    parser.add_argument(
+        '--code', default=DEFAULT_CODE,
+        help='The imports to measure.')
+    parser.add_argument(
+        '--repeat', type=int, default=10,
+        help='The number of times to repeat the measurement.  The best '
+             'time is reported.')
+    args = parser.parse_args()
+    if sys.version_info < (3, 7):
+        parser.error('-X importtime needs Python 3.7 or newer')
+
+    def best_time(cwd=None):
+        # Warm up the bytecode cache before measuring.
+        import_time(args.code, cwd)
+        return min(import_time(args.code, cwd)
+                   for _ in range(args.repeat)) / 1000.0
+
+    if args.baseline:
+        baseline = best_time(args.baseline)
+        print('%-30s %8.2f ms (baseline)' % (args.code, baseline))
+        args.budget = baseline * args.ratio
+    elapsed = best_time()
+    print('%-30s %8.2f ms (budget %.2f ms)' % (args.code, elapsed,
+                                                args.budget))
+    if elapsed > args.budget:
+        print('Import time is over budget')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
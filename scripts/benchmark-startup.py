@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""Benchmark the cost of looking up regions and endpoints.
+
+Measures how long it takes to find a region by scanning every region of
+a service, as ``connect_to_region`` used to, compared with looking it up
+directly, and how long it takes to merge a user's endpoints file into
+the builtin endpoints on every call compared with reusing the merged
+table.  It also reports how long a fresh interpreter takes to import a
+service module and connect to a region.  No requests are sent.
+
+Usage
+=====
+
+To run the benchmark with the default number of repetitions::
+
+    python benchmark-startup.py
+
+To use more repetitions, and a different module for the startup test::
+
+    python benchmark-startup.py --repeat 50 --module boto.sqs
+
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from boto import regioninfo
+from boto.compat import json
+
+
+STARTUP_CODE = """
+import %(module)s
+%(module)s.connect_to_region('us-west-2', aws_access_key_id='AKID',
+                             aws_secret_access_key='SECRET')
+"""
+
+# A small endpoints file, as a user might provide to add a region.
+ENDPOINTS_FILE = {'ec2': {'test-1': 'ec2.test-1.amazonaws.com'}}
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        times.append(time.time() - start)
+    return min(times)
+
+
+def scan_regions(service_name, region_name):
+    for region in regioninfo.get_regions(service_name):
+        if region.name == region_name:
+            return region
+    return None
+
+
+def benchmark_lookup(repeat):
+    return [
+        ('scan regions', best_time(
+            lambda: scan_regions('ec2', 'us-west-2'), repeat)),
+        ('look up region', best_time(
+            lambda: regioninfo._get_region('ec2', 'us-west-2'), repeat)),
+    ]
+
+
+def benchmark_endpoints_file(repeat):
+    builtin = regioninfo._load_builtin_endpoints()
+    fd, path = tempfile.mkstemp(suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(ENDPOINTS_FILE, f)
+    cache = {}
+    try:
+        return [
+            ('merge endpoints file', best_time(
+                lambda: regioninfo._merge_endpoints_file(builtin, path,
+                                                         _cache={}),
+                repeat)),
+            ('reuse merged file', best_time(
+                lambda: regioninfo._merge_endpoints_file(builtin, path,
+                                                         _cache=cache),
+                repeat)),
+        ]
+    finally:
+        os.remove(path)
+
+
+def benchmark_startup(module, repeat):
+    code = STARTUP_CODE % {'module': module}
+    return [('startup', best_time(
+        lambda: subprocess.check_call([sys.executable, '-c', code]),
+        repeat))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--repeat', type=int, default=20,
+        help='The number of times to repeat each measurement.  The best '
+             'time is reported.')
+    parser.add_argument(
+        '--module', default='boto.ec2',
+        help='The service module to import in the startup test.')
+    args = parser.parse_args()
+    results = benchmark_lookup(args.repeat)
+    results.extend(benchmark_endpoints_file(args.repeat))
+    results.extend(benchmark_startup(args.module, args.repeat))
+    for name, elapsed in results:
+        print('%-22s %8.3f ms' % (name, elapsed * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -263,6 +263,39 @@ class TestSigV4Handler(unittest.TestCase):
 
         self.assertIn('f00', canonical)
 
+    def _signed_request(self):
+        request = copy.copy(self.request)
+        request.timestamp = '20121121'
+        request.region_name = 'us-east-1'
+        request.service_name = 'glacier'
+        return request
+
+    def test_signing_key_is_cached(self):
+        auth = HmacAuthV4Handler('glacier.us-east-1.amazonaws.com',
+                                 mock.Mock(), self.provider)
+        request = self._signed_request()
+        first = auth.signature(request, 'string to sign')
+        with mock.patch.object(auth, '_sign', wraps=auth._sign) as sign:
+            second = auth.signature(request, 'string to sign')
+        self.assertEqual(first, second)
+        # Only the final HMAC over the string to sign is computed.
+        self.assertEqual(sign.call_count, 1)
+
+    def test_signing_key_cache_tracks_secret_key(self):
+        auth = HmacAuthV4Handler('glacier.us-east-1.amazonaws.com',
+                                 mock.Mock(), self.provider)
+        request = self._signed_request()
+        old_signature = auth.signature(request, 'string to sign')
+        self.provider.secret_key = 'rotated_secret_key'
+        auth.update_provider(self.provider)
+        self.assertEqual(auth._signing_keys, {})
+        new_signature = auth.signature(request, 'string to sign')
+        self.assertNotEqual(old_signature, new_signature)
+        fresh = HmacAuthV4Handler('glacier.us-east-1.amazonaws.com',
+                                  mock.Mock(), self.provider)
+        self.assertEqual(fresh.signature(request, 'string to sign'),
+                         new_signature)
+
 
 class TestS3HmacAuthV4Handler(unittest.TestCase):
     def setUp(self):
@@ -103,6 +103,71 @@ class TestDynamizer(unittest.TestCase):
         self.assertEqual(json.loads(doc, object_hook=dynamizer.decode), output_doc)
 
 
+class TestFastDynamizer(unittest.TestCase):
+    values = ['foo', b'bytes', 54, -2 ** 70, Decimal('1.1'), 1.25, True,
+              None, set([1, 2, 3]), set(['foo', 'bar']),
+              set([types.Binary(b'\x01')]), types.Binary(b'\x01'),
+              ['foo', 54, [1, {'a': None}]],
+              {'foo': 'bar', 'hoge': {'sub': 1, 'list': [Decimal('2.5')]}}]
+
+    def test_matches_dynamizer(self):
+        for fast, slow in ((types.FastDynamizer(), types.Dynamizer()),
+                           (types.FastDynamizer(use_boolean=False),
+                            types.NonBooleanDynamizer())):
+            for value in self.values:
+                encoded = slow.encode(value)
+                self.assertEqual(fast.encode(value), encoded)
+                self.assertEqual(fast.decode(encoded), slow.decode(encoded))
+
+    def test_matches_lossy_float_dynamizer(self):
+        fast = types.FastDynamizer(use_boolean=False, lossy_float=True)
+        slow = types.LossyFloatDynamizer()
+        for value in self.values + [1.1, set([1.1, 2])]:
+            encoded = slow.encode(value)
+            self.assertEqual(fast.encode(value), encoded)
+            self.assertEqual(fast.decode(encoded), slow.decode(encoded))
+        self.assertEqual(fast.decode({'N': '1.1'}), 1.1)
+        self.assertEqual(type(fast.decode({'N': '5'})), int)
+
+    def test_number_errors(self):
+        dynamizer = types.FastDynamizer()
+        for value in (1.1, 10 ** 40, Decimal('Infinity'), float('nan')):
+            with self.assertRaises(DynamoDBNumberError):
+                dynamizer.encode(value)
+        self.assertEqual(dynamizer.encode(10 ** 37), {'N': str(10 ** 37)})
+
+    def test_items(self):
+        dynamizer = types.FastDynamizer()
+        item = {'name': 'foo', 'count': 3, 'tags': set(['a']),
+                'meta': {'ok': True}}
+        encoded = dynamizer.encode_item(item)
+        self.assertEqual(encoded, types.Dynamizer().encode_item(item))
+        self.assertEqual(dynamizer.decode_item(encoded), item)
+
+    def test_unknown_types_are_left_alone(self):
+        dynamizer = types.FastDynamizer()
+        self.assertEqual(dynamizer.decode({'s': 'foo'}), {'s': 'foo'})
+        self.assertEqual(dynamizer.decode({'X': 'foo'}), {'X': 'foo'})
+        self.assertEqual(dynamizer.decode({'S': 'a', 'N': '1'}),
+                         {'S': 'a', 'N': '1'})
+        with self.assertRaises(TypeError):
+            dynamizer.encode(object())
+
+    def test_subclass_overrides_are_used(self):
+        class UpperDynamizer(types.FastDynamizer):
+            def _encode_s(self, attr):
+                return attr.upper()
+
+        self.assertEqual(UpperDynamizer().encode({'a': 'foo'}),
+                         {'M': {'a': {'S': 'FOO'}}})
+
+    def test_decoding_full_doc(self):
+        dynamizer = types.FastDynamizer()
+        doc = '{"version":{"N":"1"},"tags":{"L":[{"S":"F"},{"S":"GM"}]}}'
+        self.assertEqual(json.loads(doc, object_hook=dynamizer.decode),
+                         {'version': Decimal('1'), 'tags': ['F', 'GM']})
+
+
 class TestBinary(unittest.TestCase):
     def test_good_input(self):
         data = types.Binary(b'\x01')
@@ -0,0 +1,155 @@
+from tests.compat import mock, unittest
+from boto.dynamodb2 import exceptions
+from boto.dynamodb2.cache import ItemCache
+from boto.dynamodb2.fields import HashKey
+from boto.dynamodb2.layer1 import DynamoDBConnection
+from boto.dynamodb2.table import Table
+
+
+JOHN = {
+    'username': {'S': 'johndoe'},
+    'first_name': {'S': 'John'},
+    'friends': {'SS': ['alice', 'bob']},
+}
+JANE = {
+    'username': {'S': 'jane'},
+    'first_name': {'S': 'Jane'},
+}
+
+
+def raw_key(username):
+    return {'username': {'S': username}}
+
+
+class ItemCacheTestCase(unittest.TestCase):
+    def test_get_and_set(self):
+        cache = ItemCache()
+        self.assertEqual(cache.get(raw_key('johndoe')), None)
+        cache.set(raw_key('johndoe'), {'username': 'johndoe'})
+        self.assertEqual(cache.get(raw_key('johndoe')),
+                         {'username': 'johndoe'})
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(cache.hit_rate, 0.5)
+
+    def test_keys_ignore_attribute_order(self):
+        cache = ItemCache()
+        cache.set({'a': {'S': '1'}, 'b': {'N': '2'}}, 'data')
+        self.assertEqual(cache.get({'b': {'N': '2'}, 'a': {'S': '1'}}),
+                         'data')
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ItemCache(max_size=2)
+        cache.set(raw_key('alice'), 'alice')
+        cache.set(raw_key('bob'), 'bob')
+        cache.get(raw_key('alice'))
+        cache.set(raw_key('jane'), 'jane')
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.get(raw_key('bob')), None)
+        self.assertEqual(cache.get(raw_key('alice')), 'alice')
+
+    def test_expired_items_are_missing(self):
+        cache = ItemCache(ttl=10)
+        with mock.patch('time.time', return_value=100):
+            cache.set(raw_key('johndoe'), 'data')
+        with mock.patch('time.time', return_value=109):
+            self.assertEqual(cache.get(raw_key('johndoe')), 'data')
+        with mock.patch('time.time', return_value=110):
+            self.assertEqual(cache.get(raw_key('johndoe')), None)
+        self.assertEqual(len(cache), 0)
+
+    def test_invalidate(self):
+        cache = ItemCache()
+        cache.set(raw_key('johndoe'), 'data')
+        generation = cache.generation
+        cache.invalidate(raw_key('johndoe'))
+        self.assertEqual(cache.get(raw_key('johndoe')), None)
+        # Data fetched before the invalidation is stale.
+        cache.set(raw_key('johndoe'), 'stale', generation)
+        self.assertEqual(cache.get(raw_key('johndoe')), None)
+        cache.set(raw_key('johndoe'), 'fresh', cache.generation)
+        self.assertEqual(cache.get(raw_key('johndoe')), 'fresh')
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+
+class TableCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        super(TableCacheTestCase, self).setUp()
+        self.connection = mock.create_autospec(DynamoDBConnection)()
+        self.connection.get_item.return_value = {'Item': JOHN}
+        self.users = Table('users', schema=[HashKey('username')],
+                           connection=self.connection)
+        self.cache = self.users.use_cache(max_size=10, ttl=60)
+
+    def test_get_item_is_cached(self):
+        john = self.users.get_item(username='johndoe')
+        john['first_name'] = 'Johann'
+        john['friends'].add('jane')
+        john = self.users.get_item(username='johndoe')
+        self.assertEqual(john['first_name'], 'John')
+        self.assertEqual(john['friends'], set(['alice', 'bob']))
+        self.assertFalse(john.needs_save())
+        self.assertEqual(self.connection.get_item.call_count, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertTrue(self.users.has_item(username='johndoe'))
+        self.assertEqual(self.connection.get_item.call_count, 1)
+
+    def test_consistent_and_partial_reads(self):
+        self.users.get_item(username='johndoe', attributes=['username'])
+        self.assertEqual(len(self.cache), 0)
+        self.users.get_item(username='johndoe')
+        self.users.get_item(username='johndoe', consistent=True)
+        self.assertEqual(self.connection.get_item.call_count, 3)
+
+    def test_missing_items_are_not_cached(self):
+        self.connection.get_item.return_value = {}
+        self.assertRaises(exceptions.ItemNotFound, self.users.get_item,
+                          username='johndoe')
+        self.assertEqual(len(self.cache), 0)
+
+    def test_writes_invalidate(self):
+        john = self.users.get_item(username='johndoe')
+        john['first_name'] = 'Johann'
+        john.partial_save()
+        self.assertEqual(len(self.cache), 0)
+
+        self.users.get_item(username='johndoe')
+        self.users.put_item(data={'username': 'johndoe'}, overwrite=True)
+        self.assertEqual(len(self.cache), 0)
+
+        self.users.get_item(username='johndoe')
+        self.connection.delete_item.side_effect = \
+            exceptions.ConditionalCheckFailedException(400, 'Failed')
+        self.assertFalse(self.users.delete_item(username='johndoe'))
+        self.assertEqual(len(self.cache), 0)
+
+        self.users.get_item(username='johndoe')
+        self.connection.batch_write_item.return_value = {}
+        with self.users.batch_write() as batch:
+            batch.delete_item(username='johndoe')
+        self.assertEqual(len(self.cache), 0)
+
+    def test_batch_get(self):
+        self.users.get_item(username='johndoe')
+        self.connection.batch_get_item.return_value = {
+            'Responses': {'users': [JANE]},
+        }
+        results = self.users.batch_get(keys=[{'username': 'johndoe'},
+                                             {'username': 'jane'}])
+        self.assertEqual(sorted(item['username'] for item in results),
+                         ['jane', 'johndoe'])
+        request = self.connection.batch_get_item.call_args[1]
+        self.assertEqual(request['request_items']['users']['Keys'],
+                         [raw_key('jane')])
+
+        # Both are cached now, so no request is needed at all.
+        results = self.users.batch_get(keys=[{'username': 'johndoe'},
+                                             {'username': 'jane'}])
+        self.assertEqual(len(list(results)), 2)
+        self.assertEqual(self.connection.batch_get_item.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+import json
+
+from tests.compat import mock, unittest
+from boto.dynamodb2 import exceptions
+from boto.dynamodb2.layer1 import DynamoDBConnection
+from boto.dynamodb2.limiter import ThroughputLimiter
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class ThroughputLimiterTestCase(unittest.TestCase):
+    def setUp(self):
+        super(ThroughputLimiterTestCase, self).setUp()
+        self.clock = FakeClock()
+        patcher = mock.patch.multiple('time', time=self.clock.time,
+                                      sleep=self.clock.sleep)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.limiter = ThroughputLimiter()
+        self.limiter.set_capacity('users', read=10, write=2)
+        self.limiter.set_capacity('users', read=4, write=2,
+                                  index='EverythingIndex')
+
+    def test_get_rate(self):
+        self.assertEqual(self.limiter.get_rate('users'), 10)
+        self.assertEqual(self.limiter.get_rate('users', 'write'), 2)
+        self.assertEqual(self.limiter.get_rate('users', 'read',
+                                               'EverythingIndex'), 4)
+        self.assertEqual(self.limiter.get_rate('posts'), None)
+
+    def test_requests_without_capacity_are_not_limited(self):
+        self.assertEqual(self.limiter.acquire('Query',
+                                              {'TableName': 'posts'}), [])
+        self.assertEqual(self.limiter.acquire('DescribeTable',
+                                              {'TableName': 'users'}), [])
+
+    def test_reads_use_their_index_and_writes_use_all(self):
+        reservations = self.limiter.acquire('Query', {
+            'TableName': 'users', 'IndexName': 'EverythingIndex'})
+        self.assertEqual(reservations,
+                         [(('users', 'EverythingIndex', 'read'), 1)])
+        reservations = self.limiter.acquire('BatchWriteItem', {
+            'RequestItems': {'users': [], 'posts': []}})
+        self.assertEqual(set(key for key, units in reservations), set([
+            ('users', 'EverythingIndex', 'write'),
+            ('users', None, 'write'),
+        ]))
+
+    def test_waits_for_capacity(self):
+        for _ in range(10):
+            self.limiter.acquire('GetItem', {'TableName': 'users'})
+        self.assertEqual(self.clock.sleeps, [])
+        self.limiter.acquire('GetItem', {'TableName': 'users'})
+        self.assertAlmostEqual(self.clock.sleeps[0], 0.1)
+        self.assertAlmostEqual(self.limiter.time_waited, 0.1)
+
+    def test_release_charges_consumed_capacity(self):
+        reservations = self.limiter.acquire('Query', {'TableName': 'users'})
+        self.limiter.release(reservations, {
+            'TableName': 'users',
+            'CapacityUnits': 25,
+            'Table': {'CapacityUnits': 20},
+        })
+        # 10 tokens to start with, minus 20 consumed, leaves a debt of 10
+        # which takes 1.1 seconds to pay off & earn another token.
+        self.limiter.acquire('Query', {'TableName': 'users'})
+        self.assertAlmostEqual(sum(self.clock.sleeps), 1.1)
+
+    def test_release_parses_index_and_batch_capacity(self):
+        consumed = self.limiter._parse_consumed([{
+            'TableName': 'users',
+            'CapacityUnits': 3,
+            'GlobalSecondaryIndexes': {
+                'EverythingIndex': {'CapacityUnits': 2},
+            },
+        }, {
+            'TableName': 'posts',
+            'CapacityUnits': 1,
+        }], 'write')
+        self.assertEqual(consumed, {
+            ('users', None, 'write'): 3,
+            ('users', 'EverythingIndex', 'write'): 2,
+            ('posts', None, 'write'): 1,
+        })
+
+    def test_throttling_adapts_rate(self):
+        reservations = self.limiter.acquire('GetItem', {'TableName': 'users'})
+        for _ in range(5):
+            self.limiter.throttled(reservations)
+        self.assertEqual(self.limiter.throttle_events, 5)
+        # Halved, but no lower than a tenth of the target.
+        self.assertEqual(self.limiter.get_rate('users'), 1)
+
+        self.limiter.release(reservations, None)
+        self.assertEqual(self.limiter.get_rate('users'), 1.5)
+        self.limiter.release(reservations, None, throttled=True)
+        self.assertEqual(self.limiter.get_rate('users'), 1)
+        self.assertEqual(self.limiter.throttle_events, 6)
+
+
+class LimitedConnectionTestCase(unittest.TestCase):
+    def setUp(self):
+        super(LimitedConnectionTestCase, self).setUp()
+        self.clock = FakeClock()
+        patcher = mock.patch.multiple('time', time=self.clock.time,
+                                      sleep=self.clock.sleep)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.limiter = ThroughputLimiter()
+        self.limiter.set_capacity('users', read=10)
+        self.connection = DynamoDBConnection(
+            aws_access_key_id='aws_access_key_id',
+            aws_secret_access_key='aws_secret_access_key',
+            throughput_limiter=self.limiter)
+        self.requests = []
+
+    def fake_request(self, responses):
+        def make_request(action, body, retry_handler):
+            self.requests.append(json.loads(body))
+            for response in responses[:-1]:
+                retry_handler(response, 0, 0)
+            return responses[-1]
+        return mock.patch.object(self.connection, '_make_request',
+                                 side_effect=make_request)
+
+    def throttled_response(self):
+        response = mock.Mock(status=400, reason='Bad Request')
+        response.read.return_value = json.dumps({
+            '__type': 'com.amazonaws.dynamodb.v20120810#'
+                      'ProvisionedThroughputExceededException',
+        }).encode('utf-8')
+        response.getheader.return_value = None
+        return response
+
+    def test_consumed_capacity_is_requested(self):
+        with self.fake_request([{
+                'Item': {},
+                'ConsumedCapacity': {'TableName': 'users',
+                                     'CapacityUnits': 4}}]):
+            result = self.connection.get_item('users', {})
+        self.assertEqual(self.requests[0]['ReturnConsumedCapacity'],
+                         'INDEXES')
+        self.assertEqual(result, {'Item': {}})
+        bucket = self.limiter._buckets[('users', None, 'read')]
+        self.assertAlmostEqual(bucket.tokens, 6, places=2)
+
+    def test_throttled_requests_slow_down(self):
+        with self.fake_request([self.throttled_response(), {'Item': {}}]):
+            self.connection.get_item('users', {})
+        self.assertEqual(self.limiter.throttle_events, 1)
+        self.assertEqual(self.connection.throughput_exceeded_events, 1)
+        self.assertEqual(self.limiter.get_rate('users'), 5.5)
+
+    def test_throttled_retries_wait_for_capacity(self):
+        with self.fake_request([self.throttled_response(), {'Item': {}}]):
+            self.connection.get_item('users', {})
+        # The bucket was emptied & halved to 5 units a second, so the
+        # retry waited a fifth of a second for a token.
+        self.assertAlmostEqual(sum(self.clock.sleeps), 0.2)
+        self.assertAlmostEqual(self.limiter.time_waited, 0.2)
+
+    def test_last_throttled_attempt_is_raised(self):
+        self.connection.NumberRetries = 1
+        with self.fake_request([self.throttled_response(), {}]):
+            self.assertRaises(
+                exceptions.ProvisionedThroughputExceededException,
+                self.connection.get_item, 'users', {})
+        self.assertEqual(self.limiter.throttle_events, 1)
+        # Failing doesn't bring the rate back up.
+        self.assertEqual(self.limiter.get_rate('users'), 5)
+
+    def test_other_tables_are_not_limited(self):
+        with self.fake_request([{'Item': {}}]):
+            self.connection.get_item('posts', {})
+        self.assertNotIn('ReturnConsumedCapacity', self.requests[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,7 @@
+import gc
+import threading
+import weakref
+
 from tests.compat import mock, unittest
 from boto.dynamodb2 import exceptions
 from boto.dynamodb2.fields import (HashKey, RangeKey,
@@ -6,10 +10,12 @@ from boto.dynamodb2.fields import (HashKey, RangeKey,
                                    GlobalIncludeIndex)
 from boto.dynamodb2.items import Item
 from boto.dynamodb2.layer1 import DynamoDBConnection
-from boto.dynamodb2.results import ResultSet, BatchGetResultSet
-from boto.dynamodb2.table import Table
+from boto.dynamodb2.results import (ResultSet, BatchGetResultSet,
+                                    ConcurrentBatchGetResultSet)
+from boto.dynamodb2.table import ConcurrentBatchTable, Table
 from boto.dynamodb2.types import (STRING, NUMBER, BINARY,
-                                  FILTER_OPERATORS, QUERY_OPERATORS)
+                                  FILTER_OPERATORS, QUERY_OPERATORS,
+                                  FastDynamizer)
 from boto.exception import JSONResponseError
 from boto.compat import six, long_type
 
@@ -829,6 +835,13 @@ class ItemFromItemTestCase(ItemTestCase):
         self.johndoe = self.create_item(self.johndoe)
 
 
+class FastDynamizerItemTestCase(ItemTestCase):
+    def setUp(self):
+        super(FastDynamizerItemTestCase, self).setUp()
+        self.table.use_fast_dynamizer()
+        self.johndoe = self.create_item(dict(self.johndoe.items()))
+
+
 def fake_results(name, greeting='hello', exclusive_start_key=None, limit=None):
     if exclusive_start_key is None:
         exclusive_start_key = -1
@@ -1071,6 +1084,79 @@ class ResultSetTestCase(unittest.TestCase):
             'Hello john #12'
         ])
 
+    def test_prefetch_list(self):
+        results = ResultSet(prefetch=2)
+        results.to_call(self.result_function, 'john', greeting='Hello',
+                        limit=20)
+        self.assertEqual(list(results),
+                         ['Hello john #%s' % i for i in range(13)])
+        self.assertEqual(self.result_function.call_count, 3)
+        self.result_function.assert_called_with(
+            'john', greeting='Hello', limit=10, exclusive_start_key=9)
+
+    def test_prefetch_limit(self):
+        results = ResultSet(prefetch=2)
+        results.to_call(self.result_function, 'john', greeting='Hello',
+                        limit=6)
+        self.assertEqual(list(results),
+                         ['Hello john #%s' % i for i in range(6)])
+        self.assertEqual(self.result_function.call_count, 2)
+        self.result_function.assert_called_with(
+            'john', greeting='Hello', limit=1, exclusive_start_key=4)
+
+    def test_prefetch_fetches_ahead(self):
+        second_page = threading.Event()
+
+        def fetch(name, greeting, limit=None, exclusive_start_key=None):
+            if exclusive_start_key is not None:
+                second_page.set()
+            return fake_results(name, greeting, exclusive_start_key, limit)
+
+        results = ResultSet(prefetch=1)
+        results.to_call(fetch, 'john', greeting='Hello', limit=20)
+        self.assertEqual(next(results), 'Hello john #0')
+        # The second page is fetched while the first is being used.
+        second_page.wait(5)
+        self.assertTrue(second_page.is_set())
+        self.assertEqual(len(list(results)), 12)
+
+    def test_prefetch_error_is_raised(self):
+        def fetch(name, greeting, limit=None, exclusive_start_key=None):
+            if exclusive_start_key is not None:
+                raise ValueError('boom')
+            return fake_results(name, greeting, exclusive_start_key, limit)
+
+        results = ResultSet(prefetch=2)
+        results.to_call(fetch, 'john', greeting='Hello', limit=20)
+        for i in range(5):
+            self.assertEqual(next(results), 'Hello john #%s' % i)
+        self.assertRaises(ValueError, results.next)
+        self.assertRaises(StopIteration, results.next)
+
+    def test_prefetch_close(self):
+        results = ResultSet(prefetch=1)
+        results.to_call(self.result_function, 'john', greeting='Hello',
+                        limit=20)
+        self.assertEqual(next(results), 'Hello john #0')
+        results.close()
+        self.assertEqual(len(list(results)), 4)
+
+    def test_prefetch_stops_when_abandoned(self):
+        before = set(threading.enumerate())
+        results = ResultSet(prefetch=1)
+        results.to_call(self.result_function, 'john', greeting='Hello',
+                        limit=20)
+        self.assertEqual(next(results), 'Hello john #0')
+        threads = set(threading.enumerate()) - before
+        self.assertEqual(len(threads), 1)
+        result_set_ref = weakref.ref(results)
+        del results
+        gc.collect()
+        self.assertIsNone(result_set_ref())
+        thread = threads.pop()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
 
 def fake_batch_results(keys):
     results = []
@@ -1146,6 +1232,113 @@ class BatchGetResultSetTestCase(unittest.TestCase):
         self.assertRaises(StopIteration, self.results.next)
 
 
+class ConcurrentBatchGetResultSetTestCase(unittest.TestCase):
+    def setUp(self):
+        super(ConcurrentBatchGetResultSetTestCase, self).setUp()
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def make_results(self, keys, fetch, **kwargs):
+        kwargs.setdefault('max_batch_get', 10)
+        results = ConcurrentBatchGetResultSet(keys=keys, num_threads=3,
+                                              **kwargs)
+        results.backoff_base = 0
+        results.to_call(fetch)
+        return results
+
+    def fetch(self, keys):
+        with self.lock:
+            self.calls.append(list(keys))
+        return {'results': ['hello %s' % key for key in keys],
+                'last_key': None}
+
+    def test_iteration(self):
+        keys = ['key%s' % i for i in range(25)]
+        results = self.make_results(keys + keys[:5], self.fetch)
+        self.assertCountEqual(list(results),
+                              ['hello %s' % key for key in keys])
+        self.assertEqual(sorted(len(call) for call in self.calls),
+                         [5, 10, 10])
+        self.assertEqual(results._fetches, 3)
+
+    def test_duplicate_dict_keys(self):
+        results = self.make_results(
+            [{'username': 'jane'}, {'username': 'jane'},
+             {'username': 'bob'}], self.fetch)
+        self.assertEqual(len(list(results)), 2)
+
+    def test_no_keys(self):
+        results = self.make_results([], self.fetch)
+        self.assertEqual(list(results), [])
+
+    def test_unprocessed_keys_are_retried(self):
+        def fetch(keys):
+            with self.lock:
+                self.calls.append(list(keys))
+                first = len(self.calls) == 1
+            if first:
+                return {'results': ['hello %s' % keys[0]],
+                        'unprocessed_keys': keys[1:]}
+            return self.fetch(keys)
+
+        results = self.make_results(['alice', 'bob', 'jane'], fetch)
+        self.assertCountEqual(list(results),
+                              ['hello alice', 'hello bob', 'hello jane'])
+        self.assertEqual(self.calls[-1], ['bob', 'jane'])
+
+    def test_throttling_is_left_to_the_connection(self):
+        def fetch(keys):
+            with self.lock:
+                self.calls.append(list(keys))
+            raise exceptions.ProvisionedThroughputExceededException(
+                400, 'Throttled')
+
+        results = self.make_results(['alice', 'bob'], fetch)
+        self.assertRaises(exceptions.ProvisionedThroughputExceededException,
+                          results.next)
+        # The connection has already retried the request.
+        self.assertEqual(self.calls, [['alice', 'bob']])
+
+    def test_workers_stop_when_abandoned(self):
+        before = set(threading.enumerate())
+        keys = ['key%s' % i for i in range(100)]
+        results = self.make_results(keys, self.fetch, max_batch_get=1)
+        next(results)
+        threads = set(threading.enumerate()) - before
+        self.assertEqual(len(threads), 3)
+        result_set_ref = weakref.ref(results)
+        del results
+        gc.collect()
+        self.assertIsNone(result_set_ref())
+        for thread in threads:
+            thread.join(5)
+            self.assertFalse(thread.is_alive())
+
+    def test_max_retries(self):
+        def fetch(keys):
+            return {'results': [], 'unprocessed_keys': keys}
+
+        results = self.make_results(['alice', 'bob'], fetch, max_retries=2)
+        self.assertEqual(list(results), [])
+        self.assertCountEqual(results.unprocessed_keys, ['alice', 'bob'])
+        self.assertEqual(results._fetches, 3)
+
+    def test_error_is_raised(self):
+        def fetch(keys):
+            raise ValueError('boom')
+
+        results = self.make_results(['alice'], fetch)
+        self.assertRaises(ValueError, results.next)
+
+    def test_limit(self):
+        keys = ['key%s' % i for i in range(30)]
+        results = ConcurrentBatchGetResultSet(keys=keys, num_threads=3,
+                                              max_batch_get=10)
+        results.to_call(self.fetch, limit=4)
+        self.assertEqual(len(list(results)), 4)
+        self.assertTrue(results._prefetch_stopped.is_set())
+
+
 class TableTestCase(unittest.TestCase):
     def setUp(self):
         super(TableTestCase, self).setUp()
@@ -1155,6 +1348,16 @@ class TableTestCase(unittest.TestCase):
             aws_secret_access_key='secret_key'
         )
 
+    def test_use_fast_dynamizer(self):
+        self.users.use_fast_dynamizer()
+        self.assertIsInstance(self.users._dynamizer, FastDynamizer)
+        self.assertEqual(self.users._dynamizer.encode(True), {'N': '1'})
+
+        self.users.use_boolean()
+        self.users.use_fast_dynamizer(lossy_float=True)
+        self.assertEqual(self.users._dynamizer.encode(True), {'BOOL': True})
+        self.assertEqual(self.users._dynamizer.decode({'N': '1.5'}), 1.5)
+
     def test__introspect_schema(self):
         raw_schema_1 = [
             {
@@ -2219,6 +2422,86 @@ class TableTestCase(unittest.TestCase):
             # Post-exit, this should be emptied.
             self.assertEqual(len(batch._unprocessed), 0)
 
+    def test_concurrent_batch_write(self):
+        batches = []
+
+        def batch_write_item(request_items, return_consumed_capacity=None):
+            batches.append(request_items['users'])
+            return {
+                'ConsumedCapacity': [
+                    {'TableName': 'users',
+                     'CapacityUnits': len(request_items['users'])},
+                ],
+            }
+
+        with mock.patch.object(
+                self.users.connection,
+                'batch_write_item',
+                side_effect=batch_write_item):
+            with self.users.batch_write(num_threads=3) as batch:
+                self.assertTrue(isinstance(batch, ConcurrentBatchTable))
+                for i in range(60):
+                    batch.delete_item(username='johndoe%s' % i)
+
+        self.assertEqual(sorted(len(b) for b in batches), [10, 25, 25])
+        self.assertEqual(batch.items_written, 60)
+        self.assertEqual(batch.consumed_capacity, 60)
+        self.assertTrue(batch.items_per_second > 0)
+        self.assertEqual(batch._threads, [])
+
+    @mock.patch('time.sleep')
+    def test_concurrent_batch_write_resends_unprocessed(self, mock_sleep):
+        responses = [
+            {'UnprocessedItems': {'users': [
+                {'DeleteRequest': {'Key': {'username': {'S': 'johndoe1'}}}},
+            ]}},
+            {},
+        ]
+
+        with mock.patch.object(
+                self.users.connection,
+                'batch_write_item',
+                side_effect=responses) as mock_batch:
+            with self.users.batch_write(num_threads=2) as batch:
+                batch.delete_item(username='johndoe0')
+                batch.delete_item(username='johndoe1')
+
+        self.assertEqual(mock_batch.call_count, 2)
+        self.assertEqual(mock_batch.call_args[0][0], {'users': [
+            {'DeleteRequest': {'Key': {'username': {'S': 'johndoe1'}}}},
+        ]})
+        self.assertEqual(mock_sleep.call_count, 1)
+        self.assertEqual(batch.items_written, 2)
+        self.assertEqual(batch.throttle_events, 1)
+        # Throttling halved the number of requests in flight.
+        self.assertEqual(batch.concurrency, 1)
+
+    @mock.patch('time.sleep')
+    def test_concurrent_batch_write_throughput_exceeded(self, mock_sleep):
+        throttled = exceptions.ProvisionedThroughputExceededException(
+            400, 'Bad Request', {})
+
+        with mock.patch.object(
+                self.users.connection,
+                'batch_write_item',
+                side_effect=[throttled, {}]) as mock_batch:
+            with self.users.batch_write(num_threads=4) as batch:
+                batch.delete_item(username='johndoe')
+
+        self.assertEqual(mock_batch.call_count, 2)
+        self.assertEqual(batch.items_written, 1)
+        self.assertEqual(batch.concurrency, 2)
+
+    def test_concurrent_batch_write_raises_errors(self):
+        with mock.patch.object(
+                self.users.connection,
+                'batch_write_item',
+                side_effect=exceptions.ValidationException(
+                    400, 'Bad Request', {})):
+            with self.assertRaises(exceptions.ValidationException):
+                with self.users.batch_write(num_threads=2) as batch:
+                    batch.delete_item(username='johndoe')
+
     def test__build_filters(self):
         filters = self.users._build_filters({
             'username__eq': 'johndoe',
@@ -2664,6 +2947,11 @@ class TableTestCase(unittest.TestCase):
         self.assertTrue(isinstance(results, ResultSet))
         self.assertEqual(len(results._results), 0)
         self.assertEqual(results.the_callable, self.users._scan)
+        self.assertEqual(results._prefetch, 0)
+        self.assertEqual(self.users.scan(prefetch=2)._prefetch, 2)
+        self.assertEqual(
+            self.users.query_2(username__eq='johndoe', prefetch=2)._prefetch,
+            2)
 
         with mock.patch.object(
                 results,
@@ -2733,6 +3021,79 @@ class TableTestCase(unittest.TestCase):
 
         self.assertEqual(mock_query.call_count, 1)
 
+    def fake_segmented_scan(self, table_name, segment=None,
+                            total_segments=None, exclusive_start_key=None,
+                            return_consumed_capacity=None, **kwargs):
+        # Every segment has two pages of two users each.
+        page = 1 if exclusive_start_key else 0
+        names = ['user-%s-%s' % (segment, page * 2 + i) for i in range(2)]
+        response = {
+            'Items': [{'username': {'S': name}} for name in names],
+            'ConsumedCapacity': {'TableName': table_name,
+                                 'CapacityUnits': 1.0},
+        }
+        if not page:
+            response['LastEvaluatedKey'] = {'username': {'S': names[-1]}}
+        return response
+
+    def test_parallel_scan(self):
+        with mock.patch.object(
+                self.users.connection,
+                'scan',
+                side_effect=self.fake_segmented_scan) as mock_scan:
+            scan = self.users.parallel_scan(total_segments=3, num_threads=2,
+                                            friend_count__lte=2)
+            usernames = sorted(item['username'] for item in scan)
+
+        self.assertEqual(usernames, sorted(
+            'user-%s-%s' % (segment, i)
+            for segment in range(3) for i in range(4)))
+        self.assertEqual(mock_scan.call_count, 6)
+        self.assertEqual(scan.consumed_capacity, 6.0)
+        for call in mock_scan.call_args_list:
+            self.assertEqual(call[1]['total_segments'], 3)
+            self.assertEqual(call[1]['return_consumed_capacity'], 'TOTAL')
+            self.assertEqual(list(call[1]['scan_filter']), ['friend_count'])
+
+    def test_parallel_scan_callback(self):
+        seen = {}
+
+        def callback(segment, item):
+            seen.setdefault(segment, []).append(item['username'])
+
+        with mock.patch.object(
+                self.users.connection,
+                'scan',
+                side_effect=self.fake_segmented_scan):
+            self.users.parallel_scan(total_segments=2, callback=callback)
+
+        self.assertEqual(sorted(seen), [0, 1])
+        self.assertEqual(seen[1], ['user-1-0', 'user-1-1', 'user-1-2',
+                                   'user-1-3'])
+
+    def test_parallel_scan_raises_errors(self):
+        with mock.patch.object(
+                self.users.connection,
+                'scan',
+                side_effect=exceptions.ValidationException(
+                    400, 'Bad Request', {})):
+            with self.assertRaises(exceptions.ValidationException):
+                list(self.users.parallel_scan(total_segments=4))
+
+    @mock.patch('time.sleep')
+    def test_parallel_scan_limits_read_capacity(self, mock_sleep):
+        with mock.patch.object(
+                self.users.connection,
+                'scan',
+                side_effect=self.fake_segmented_scan):
+            list(self.users.parallel_scan(total_segments=1,
+                                          max_read_capacity=0.5))
+
+        # The first page uses up the bucket, the second is paid off by
+        # sleeping.
+        self.assertTrue(mock_sleep.called)
+        self.assertTrue(mock_sleep.call_args_list[-1][0][0] > 1.0)
+
     def test_count(self):
         expected = {
             "Table": {
@@ -3041,6 +3402,7 @@ class TableTestCase(unittest.TestCase):
             self.assertEqual(res_2['username'], 'jane')
 
         self.assertEqual(mock_batch_get.call_count, 1)
+
         self.assertEqual(results._keys_left, ['zoeydoe'])
 
         items_2 = {
@@ -3066,3 +3428,10 @@ class TableTestCase(unittest.TestCase):
 
         self.assertEqual(mock_batch_get_2.call_count, 1)
         self.assertEqual(results._keys_left, [])
+
+    def test_batch_get_concurrent(self):
+        results = self.users.batch_get(keys=[{'username': 'johndoe'}],
+                                       num_threads=4)
+        self.assertTrue(isinstance(results, ConcurrentBatchGetResultSet))
+        self.assertEqual(results.num_threads, 4)
+        self.assertEqual(results.the_callable, self.users._batch_get)
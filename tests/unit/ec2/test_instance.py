@@ -4,6 +4,7 @@ import base64
 from tests.compat import unittest, mock
 from tests.unit import AWSMockServiceTestCase
 
+from boto.compat import BytesIO
 from boto.ec2.connection import EC2Connection
 
 DESCRIBE_INSTANCE_VPC = br"""<?xml version="1.0" encoding="UTF-8"?>
@@ -272,6 +273,23 @@ class TestDescribeInstances(AWSMockServiceTestCase):
         self.assertEqual(addresses[2].private_ip_address, '10.0.0.55')
         self.assertFalse(addresses[2].primary)
 
+    def test_iter_instances_parses_incrementally(self):
+        self.set_http_response(status_code=200)
+        response = self.https_connection.getresponse.return_value
+        body = BytesIO(DESCRIBE_INSTANCE_VPC)
+        response.read.side_effect = lambda amt=None: body.read(
+            16 if amt else None)
+
+        instances = list(self.service_connection.iter_instances())
+        self.assertEqual([i.id for i in instances], ['i-instance'])
+        self.assertEqual(len(instances[0].interfaces), 1)
+        self.assert_request_parameters({'Action': 'DescribeInstances'},
+                                       ignore_params_values=[
+                                           'AWSAccessKeyId',
+                                           'SignatureMethod',
+                                           'SignatureVersion', 'Timestamp',
+                                           'Version'])
+
 
 if __name__ == '__main__':
     unittest.main()
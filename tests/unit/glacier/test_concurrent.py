@@ -20,15 +20,21 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 #
+import mmap
+import os
+import shutil
 import tempfile
-from boto.compat import Queue
+from hashlib import sha256
+from boto.compat import Queue, six
 
 from tests.compat import mock, unittest
 from tests.unit import AWSMockServiceTestCase
 
 from boto.glacier.concurrent import ConcurrentUploader, ConcurrentDownloader
-from boto.glacier.concurrent import UploadWorkerThread
+from boto.glacier.concurrent import UploadWorkerThread, UploadCheckpoint
 from boto.glacier.concurrent import _END_SENTINEL
+from boto.glacier.exceptions import UploadArchiveError
+from boto.glacier.utils import chunk_hashes, tree_hash, bytes_to_hex
 
 
 class FakeThreadedConcurrentUploader(ConcurrentUploader):
@@ -43,6 +49,31 @@ class FakeThreadedConcurrentUploader(ConcurrentUploader):
             hash_chunks[i] = b'foo'
 
 
+class InlineConcurrentUploader(ConcurrentUploader):
+    """
+    Works through the queue without threads, failing the parts listed
+    in ``failing_parts``.
+    """
+    def __init__(self, *args, **kwargs):
+        self.failing_parts = kwargs.pop('failing_parts', ())
+        super(InlineConcurrentUploader, self).__init__(*args, **kwargs)
+        self.uploaded_parts = []
+
+    def _start_upload_threads(self, result_queue, upload_id,
+                              worker_queue, filename):
+        while not worker_queue.empty():
+            work = worker_queue.get()
+            if work is _END_SENTINEL:
+                continue
+            part_number = work[0]
+            if part_number in self.failing_parts:
+                result_queue.put(Exception('upload failed'))
+            else:
+                self.uploaded_parts.append(part_number)
+                result_queue.put((part_number,
+                                  sha256(str(part_number).encode()).digest()))
+
+
 class FakeThreadedConcurrentDownloader(ConcurrentDownloader):
     def _start_download_threads(self, results_queue, worker_queue):
         self.results_queue = results_queue
@@ -123,6 +154,74 @@ class TestConcurrentUploader(unittest.TestCase):
         self.assertEqual(len(items), 12)
 
 
+class TestCheckpointedUpload(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tempdir)
+        self.filename = os.path.join(self.tempdir, 'archive')
+        with open(self.filename, 'wb') as f:
+            f.write(b'a' * (8 * 1024 * 1024 + 20))
+        self.checkpoint_file = os.path.join(self.tempdir, 'checkpoint')
+        self.api = mock.Mock()
+        self.api.initiate_multipart_upload.return_value = {
+            'UploadId': 'upload_id'}
+        self.api.complete_multipart_upload.return_value = {
+            'ArchiveId': 'archive_id'}
+
+    def uploader(self, failing_parts=()):
+        return InlineConcurrentUploader(self.api, 'vault_name',
+                                        failing_parts=failing_parts)
+
+    def test_failed_upload_is_left_open_and_recorded(self):
+        uploader = self.uploader(failing_parts=(1,))
+        with self.assertRaises(UploadArchiveError):
+            uploader.upload(self.filename, checkpoint_file=self.checkpoint_file)
+        self.assertFalse(self.api.abort_multipart_upload.called)
+        checkpoint = UploadCheckpoint.load(self.checkpoint_file)
+        self.assertEqual(checkpoint.upload_id, 'upload_id')
+        self.assertEqual(checkpoint.part_size, 4 * 1024 * 1024)
+        self.assertEqual(checkpoint.total_size, 8 * 1024 * 1024 + 20)
+        self.assertEqual(list(checkpoint.parts), [0])
+        self.assertEqual(checkpoint.parts[0], sha256(b'0').digest())
+
+    def test_resume_only_uploads_missing_parts(self):
+        with self.assertRaises(UploadArchiveError):
+            self.uploader(failing_parts=(1,)).upload(
+                self.filename, checkpoint_file=self.checkpoint_file)
+        self.api.initiate_multipart_upload.reset_mock()
+
+        uploader = self.uploader()
+        archive_id = uploader.upload(self.filename,
+                                     checkpoint_file=self.checkpoint_file)
+        self.assertEqual(archive_id, 'archive_id')
+        self.assertFalse(self.api.initiate_multipart_upload.called)
+        self.assertEqual(sorted(uploader.uploaded_parts), [1, 2])
+        expected = tree_hash([sha256(str(i).encode()).digest()
+                              for i in range(3)])
+        self.api.complete_multipart_upload.assert_called_with(
+            'vault_name', 'upload_id', bytes_to_hex(expected),
+            8 * 1024 * 1024 + 20)
+        self.assertFalse(os.path.exists(self.checkpoint_file))
+
+    def test_checkpoint_for_other_file_is_rejected(self):
+        UploadCheckpoint.create(self.checkpoint_file, 'vault_name',
+                                'upload_id', 4 * 1024 * 1024, 42)
+        with self.assertRaises(UploadArchiveError):
+            self.uploader().upload(self.filename,
+                                   checkpoint_file=self.checkpoint_file)
+
+    def test_truncated_last_line_is_ignored(self):
+        checkpoint = UploadCheckpoint.create(
+            self.checkpoint_file, 'vault_name', 'upload_id', 1024 * 1024,
+            3 * 1024 * 1024)
+        checkpoint.record_part(2, b'\x01' * 32)
+        checkpoint.close()
+        with open(self.checkpoint_file, 'a') as f:
+            f.write('0 0101')
+        loaded = UploadCheckpoint.load(self.checkpoint_file)
+        self.assertEqual(loaded.parts, {2: b'\x01' * 32})
+
+
 class TestUploaderThread(unittest.TestCase):
     def setUp(self):
         self.fileobj = tempfile.NamedTemporaryFile()
@@ -174,6 +273,37 @@ class TestUploaderThread(unittest.TestCase):
         upload_thread.run()
         self.assertEqual(api.upload_part.call_count, 3)
 
+    def upload_from_mapping(self, data):
+        self.fileobj.write(data)
+        self.fileobj.flush()
+        mapping = mmap.mmap(self.fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        self.addCleanup(mapping.close)
+        api = mock.Mock()
+        sent = []
+        api.upload_part.side_effect = lambda *args: sent.append(
+            bytes(args[-1])) or mock.Mock()
+        job_queue = Queue()
+        result_queue = Queue()
+        upload_thread = UploadWorkerThread(
+            api, 'vault_name', self.filename, 'upload_id', job_queue,
+            result_queue, mapping=mapping)
+        job_queue.put((1, 1024 * 1024))
+        job_queue.put(_END_SENTINEL)
+        upload_thread.run()
+        return api, sent, result_queue.get(timeout=1)
+
+    @unittest.skipUnless(six.PY3, 'mmap slicing needs memoryview support')
+    def test_parts_are_read_from_mapping(self):
+        data = os.urandom(1024 * 1024) + os.urandom(1500)
+        api, sent, result = self.upload_from_mapping(data)
+        part = data[1024 * 1024:]
+        self.assertEqual(sent, [part])
+        expected_tree_hash = tree_hash(chunk_hashes(part))
+        self.assertEqual(result, (1, expected_tree_hash))
+        args = api.upload_part.call_args[0]
+        self.assertEqual(args[2], sha256(part).hexdigest())
+        self.assertEqual(args[4], (1024 * 1024, 1024 * 1024 + 1499))
+
 
 if __name__ == '__main__':
     unittest.main()
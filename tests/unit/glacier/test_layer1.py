@@ -1,5 +1,6 @@
 import json
 import copy
+import hashlib
 import tempfile
 
 from tests.unit import unittest
@@ -108,6 +109,21 @@ class TestGlacierUploadPart(GlacierLayer1ConnectionBase):
         self.assertIsInstance(self.actual_request.body, six.binary_type)
         self.assertEqual(self.actual_request.body, fake_data)
 
+    def test_upload_part_with_memoryview_body(self):
+        # Concurrent uploads send views over a mapping of the file.
+        fake_data = b'some part data'
+        self.set_http_response(status_code=204)
+        self.service_connection.upload_part(
+            u'vault_name', 'upload_id', 'linear_hash', 'tree_hash',
+            (0, len(fake_data) - 1), memoryview(fake_data))
+        self.assertIn('Signature=',
+                      self.actual_request.headers['Authorization'])
+        self.assertEqual(
+            self.service_connection._auth_handler.payload(self.actual_request),
+            hashlib.sha256(fake_data).hexdigest())
+        sent_body = self.https_connection.request.call_args[0][2]
+        self.assertEqual(bytes(sent_body), fake_data)
+
 
 class GlacierUploadArchiveResets(GlacierLayer1ConnectionBase):
     def test_upload_archive(self):
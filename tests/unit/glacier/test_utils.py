@@ -28,7 +28,7 @@ from tests.unit import unittest
 
 from boto.compat import BytesIO, six, StringIO
 from boto.glacier.utils import minimum_part_size, chunk_hashes, tree_hash, \
-        bytes_to_hex, compute_hashes_from_fileobj
+        bytes_to_hex, compute_hashes_from_fileobj, compute_hashes_from_bytes
 
 
 class TestPartSizeCalculations(unittest.TestCase):
@@ -163,3 +163,22 @@ class TestFileHash(unittest.TestCase):
         # Compute a hash from a file-like BytesIO object.
         f = BytesIO(self._gen_data())
         compute_hashes_from_fileobj(f, chunk_size=512)
+
+
+class TestBytesHash(unittest.TestCase):
+    def test_matches_separate_hashes(self):
+        data = os.urandom(2 * 1024 * 1024 + 20)
+        linear_hash, tree_hash_bytes = compute_hashes_from_bytes(data)
+        self.assertEqual(linear_hash, sha256(data).hexdigest())
+        self.assertEqual(tree_hash_bytes, tree_hash(chunk_hashes(data)))
+
+    def test_memoryview(self):
+        data = os.urandom(5000)
+        self.assertEqual(
+            compute_hashes_from_bytes(memoryview(data)[1000:3000], 512),
+            compute_hashes_from_bytes(data[1000:3000], 512))
+
+    def test_empty(self):
+        linear_hash, tree_hash_bytes = compute_hashes_from_bytes(b'')
+        self.assertEqual(linear_hash, sha256(b'').hexdigest())
+        self.assertEqual(tree_hash_bytes, sha256(b'').digest())
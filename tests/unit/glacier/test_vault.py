@@ -171,6 +171,14 @@ class TestConcurrentUploads(unittest.TestCase):
             c.assert_called_with(None, None, num_threads=10,
                                  part_size=1024 * 1024 * 1024 * 8)
 
+    def test_concurrent_upload_with_checkpoint(self):
+        v = vault.Vault(None, None)
+        with mock.patch('boto.glacier.vault.ConcurrentUploader') as c:
+            v.concurrent_create_archive_from_file(
+                'filename', 'my description', checkpoint_file='progress')
+            c.return_value.upload.assert_called_with(
+                'filename', 'my description', checkpoint_file='progress')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,161 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+import os
+import shutil
+import tempfile
+
+from tests.compat import mock, unittest
+
+from boto.gs.resumable_upload_handler import ResumableUploadHandler
+from boto.gs.resumable_upload_handler import ResumableUploadManager
+from boto.gs.resumable_upload_handler import TrackerDatabase
+
+
+TRACKER_URI = ('https://storage.googleapis.com/bucket/key'
+               '?upload_id=abc123')
+
+
+class TestTrackerDatabase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'trackers.db')
+        self.db = TrackerDatabase(self.filename)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.directory)
+
+    def test_set_get_and_remove(self):
+        self.assertIsNone(self.db.get('upload'))
+        self.db.set('upload', TRACKER_URI)
+        self.assertEqual(TrackerDatabase(self.filename).get('upload'),
+                         TRACKER_URI)
+        self.db.remove('upload')
+        self.assertIsNone(self.db.get('upload'))
+
+    def test_handler_uses_the_database(self):
+        self.db.set('upload', TRACKER_URI)
+        handler = ResumableUploadHandler(tracker_db=self.db,
+                                         tracker_name='upload')
+        self.assertEqual(handler.get_tracker_uri(), TRACKER_URI)
+        self.assertEqual(handler.get_upload_id(), 'abc123')
+        handler.tracker_uri = TRACKER_URI + 'def'
+        handler._save_tracker_uri_to_file()
+        self.assertEqual(self.db.get('upload'), TRACKER_URI + 'def')
+        handler._remove_tracker_file()
+        self.assertIsNone(self.db.get('upload'))
+
+    def test_invalid_uri_restarts_the_upload(self):
+        self.db.set('upload', 'not a uri')
+        handler = ResumableUploadHandler(tracker_db=self.db,
+                                         tracker_name='upload')
+        self.assertIsNone(handler.get_tracker_uri())
+
+
+class TestAdaptiveBufferSize(unittest.TestCase):
+    def setUp(self):
+        self.handler = ResumableUploadHandler(adaptive_buffer_size=True)
+
+    def test_grows_on_fast_connections(self):
+        for _ in range(20):
+            self.handler._adjust_buffer_size(self.handler.buffer_size, 0.001)
+        self.assertEqual(self.handler.buffer_size,
+                         ResumableUploadHandler.MAX_BUFFER_SIZE)
+
+    def test_shrinks_on_slow_connections(self):
+        self.handler.buffer_size = 1024 * 1024
+        self.handler._adjust_buffer_size(1024 * 1024, 10)
+        self.assertEqual(self.handler.buffer_size, 512 * 1024)
+        for _ in range(20):
+            self.handler._adjust_buffer_size(self.handler.buffer_size, 10)
+        self.assertEqual(self.handler.buffer_size,
+                         ResumableUploadHandler.BUFFER_SIZE)
+
+    def test_stays_put_near_the_target(self):
+        size = self.handler.buffer_size = 64 * 1024
+        self.handler._adjust_buffer_size(size, self.handler.ADAPTIVE_SEND_TIME)
+        self.assertEqual(self.handler.buffer_size, size)
+
+
+class TestResumableUploadManager(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.files = []
+        for i, size in enumerate([100, 300]):
+            filename = os.path.join(self.directory, 'file%s' % i)
+            with open(filename, 'wb') as f:
+                f.write(b'x' * size)
+            self.files.append(filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_key(self, name, resumed=0):
+        key = mock.Mock()
+        key.name = name
+        key.bucket.name = 'bucket'
+
+        def upload(filename, headers=None, cb=None, num_cb=10,
+                   res_upload_handler=None):
+            key.handler = res_upload_handler
+            size = os.path.getsize(filename)
+            cb(resumed, size)
+            cb(size, size)
+        key.set_contents_from_filename.side_effect = upload
+        return key
+
+    def test_uploads_report_aggregate_progress(self):
+        calls = []
+        db = mock.Mock()
+        db.get.return_value = None
+        keys = [self.make_key('a'), self.make_key('b', resumed=100)]
+        manager = ResumableUploadManager(
+            num_threads=2, tracker_db=db, num_retries=3,
+            cb=lambda *args: calls.append(args))
+        total = manager.upload(zip(keys, self.files),
+                               headers={'Content-Type': 'text/plain'})
+        self.assertEqual(total, 400)
+        done, total_bytes, rate = calls[-1]
+        self.assertEqual((done, total_bytes), (400, 400))
+        self.assertTrue(rate > 0)
+        self.assertEqual(max(done for done, _, _ in calls), 400)
+        for key, filename in zip(keys, self.files):
+            handler = key.handler
+            self.assertTrue(handler.adaptive_buffer_size)
+            self.assertEqual(handler.num_retries, 3)
+            self.assertIs(handler.tracker_db, db)
+            self.assertEqual(handler.tracker_name, 'gs://bucket/%s %s' % (
+                key.name, os.path.abspath(filename)))
+            self.assertEqual(key.set_contents_from_filename.call_args[1][
+                'headers'], {'Content-Type': 'text/plain'})
+
+    def test_failed_upload_is_raised(self):
+        key = self.make_key('a')
+        key.set_contents_from_filename.side_effect = IOError('boom')
+        manager = ResumableUploadManager(num_threads=1)
+        with self.assertRaises(IOError):
+            manager.upload([(key, self.files[0])])
+        self.assertEqual(key.set_contents_from_filename.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,215 @@
+# Copyright (c) 2013 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+import os
+import shutil
+import tempfile
+
+from tests.compat import mock, unittest
+
+from boto.kinesis.consumer import KinesisConsumer, MemoryCheckpointStore
+from boto.kinesis.consumer import FileCheckpointStore, SQLiteCheckpointStore
+from boto.kinesis.consumer import SHARD_END
+from boto.kinesis.exceptions import ProvisionedThroughputExceededException
+from boto.kinesis.exceptions import ResourceNotFoundException
+
+
+class FakeStream(object):
+    """
+    Serves describe_stream, get_shard_iterator and get_records for a
+    stream whose shards hold the given data, two records at a time.
+    """
+    def __init__(self, shards):
+        self.shards = shards
+
+    def describe_stream(self, stream_name, exclusive_start_shard_id=None):
+        shards = []
+        for shard in self.shards:
+            description = {'ShardId': shard['id'],
+                           'SequenceNumberRange': {}}
+            if shard.get('parent'):
+                description['ParentShardId'] = shard['parent']
+            if shard.get('closed'):
+                description['SequenceNumberRange']['EndingSequenceNumber'] = \
+                    '1'
+            shards.append(description)
+        return {'StreamDescription': {'Shards': shards,
+                                      'HasMoreShards': False}}
+
+    def get_shard_iterator(self, stream_name, shard_id, shard_iterator_type,
+                           starting_sequence_number=None):
+        if shard_iterator_type == 'TRIM_HORIZON':
+            position = 0
+        elif shard_iterator_type == 'AFTER_SEQUENCE_NUMBER':
+            position = int(starting_sequence_number.split(':')[1]) + 1
+        else:
+            position = len(self._shard(shard_id)['data'])
+        return {'ShardIterator': '%s/%d' % (shard_id, position)}
+
+    def get_records(self, shard_iterator, limit=None):
+        shard_id, position = shard_iterator.split('/')
+        shard = self._shard(shard_id)
+        position = int(position)
+        data = shard['data'][position:position + 2]
+        records = [{'SequenceNumber': '%s:%d' % (shard_id, position + i),
+                    'Data': value} for i, value in enumerate(data)]
+        position += len(data)
+        next_iterator = '%s/%d' % (shard_id, position)
+        if shard.get('closed') and position >= len(shard['data']):
+            next_iterator = None
+        return {'Records': records, 'NextShardIterator': next_iterator}
+
+    def _shard(self, shard_id):
+        for shard in self.shards:
+            if shard['id'] == shard_id:
+                return shard
+
+
+class TestKinesisConsumer(unittest.TestCase):
+    def consumer(self, shards, **kwargs):
+        self.stream = FakeStream(shards)
+        self.connection = mock.Mock(wraps=self.stream)
+        kwargs.setdefault('poll_interval', 0.01)
+        kwargs.setdefault('backoff_base', 0)
+        return KinesisConsumer(self.connection, 'stream', **kwargs)
+
+    def test_reads_closed_shards_to_the_end(self):
+        store = MemoryCheckpointStore()
+        consumer = self.consumer([
+            {'id': 'shard-0', 'data': ['a', 'b', 'c'], 'closed': True},
+            {'id': 'shard-1', 'data': ['d'], 'closed': True},
+        ], checkpoint_store=store)
+        records = list(consumer)
+        shard_0 = [r['Data'] for s, r in records if s == 'shard-0']
+        shard_1 = [r['Data'] for s, r in records if s == 'shard-1']
+        self.assertEqual(shard_0, ['a', 'b', 'c'])
+        self.assertEqual(shard_1, ['d'])
+        self.assertEqual(store.get('stream', 'shard-0'), SHARD_END)
+        self.assertEqual(store.get('stream', 'shard-1'), SHARD_END)
+
+    def test_children_are_read_after_their_parents(self):
+        consumer = self.consumer([
+            {'id': 'shard-2', 'data': ['child'], 'closed': True,
+             'parent': 'shard-0'},
+            {'id': 'shard-0', 'data': ['a', 'b', 'c'], 'closed': True},
+        ])
+        records = [r['Data'] for s, r in consumer]
+        self.assertEqual(records, ['a', 'b', 'c', 'child'])
+        self.connection.get_shard_iterator.assert_any_call(
+            'stream', 'shard-2', 'TRIM_HORIZON',
+            starting_sequence_number=None)
+
+    def test_resumes_from_checkpoint(self):
+        store = MemoryCheckpointStore()
+        store.set('stream', 'shard-0', 'shard-0:1')
+        store.set('stream', 'shard-1', SHARD_END)
+        consumer = self.consumer([
+            {'id': 'shard-0', 'data': ['a', 'b', 'c', 'd'], 'closed': True},
+            {'id': 'shard-1', 'data': ['e'], 'closed': True},
+        ], checkpoint_store=store)
+        self.assertEqual([r['Data'] for s, r in consumer], ['c', 'd'])
+
+    def test_checkpoint_waits_for_batch_to_be_processed(self):
+        store = MemoryCheckpointStore()
+        consumer = self.consumer([
+            {'id': 'shard-0', 'data': ['a', 'b', 'c'], 'closed': True},
+        ], checkpoint_store=store)
+        records = iter(consumer)
+        next(records)
+        next(records)
+        self.assertIsNone(store.get('stream', 'shard-0'))
+        next(records)
+        self.assertEqual(store.get('stream', 'shard-0'), 'shard-0:1')
+        records.close()
+
+    def test_open_shards_are_polled_until_stopped(self):
+        consumer = self.consumer([{'id': 'shard-0', 'data': ['a', 'b', 'c']}],
+                                 iterator_type='LATEST')
+        shard = self.stream.shards[0]
+        seen = []
+
+        def callback(shard_id, record):
+            seen.append(record['Data'])
+            consumer.stop()
+
+        def get_records(shard_iterator, limit=None):
+            # Data arrives after the consumer started at the tip.
+            shard['data'].append('new')
+            return FakeStream.get_records(self.stream, shard_iterator, limit)
+
+        self.connection.get_records.side_effect = get_records
+        consumer.run(callback)
+        self.assertEqual(seen[0], 'new')
+
+    def test_throttled_reads_are_retried(self):
+        consumer = self.consumer([
+            {'id': 'shard-0', 'data': ['a'], 'closed': True},
+        ])
+        get_records = self.stream.get_records
+        self.connection.get_records.side_effect = [
+            ProvisionedThroughputExceededException(400, 'Bad Request'),
+            get_records('shard-0/0')]
+        self.assertEqual([r['Data'] for s, r in consumer], ['a'])
+
+    def test_errors_are_raised(self):
+        consumer = self.consumer([{'id': 'shard-0', 'data': ['a']}])
+        self.connection.get_records.side_effect = ResourceNotFoundException(
+            400, 'Bad Request')
+        with self.assertRaises(ResourceNotFoundException):
+            list(consumer)
+
+
+class TestCheckpointStores(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tempdir)
+
+    def assert_round_trip(self, make_store):
+        store = make_store()
+        self.assertIsNone(store.get('stream', 'shard-0'))
+        store.set('stream', 'shard-0', '123')
+        store.set('stream', 'shard-0', '456')
+        store.set('other', 'shard-0', SHARD_END)
+        store = make_store()
+        self.assertEqual(store.get('stream', 'shard-0'), '456')
+        self.assertEqual(store.get('other', 'shard-0'), SHARD_END)
+        return store
+
+    def test_file_store(self):
+        filename = os.path.join(self.tempdir, 'checkpoints.json')
+        self.assert_round_trip(lambda: FileCheckpointStore(filename))
+        self.assertEqual(os.listdir(self.tempdir), ['checkpoints.json'])
+
+    def test_sqlite_store(self):
+        filename = os.path.join(self.tempdir, 'checkpoints.db')
+        stores = []
+
+        def make_store():
+            stores.append(SQLiteCheckpointStore(filename))
+            return stores[-1]
+
+        self.assert_round_trip(make_store)
+        for store in stores:
+            store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+# Copyright (c) 2013 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+import base64
+import threading
+import time
+
+from tests.compat import mock, unittest
+
+from boto.kinesis.exceptions import ProvisionedThroughputExceededException
+from boto.kinesis.exceptions import ResourceNotFoundException
+from boto.kinesis.producer import KinesisProducer
+
+
+def succeeded(records):
+    return {'FailedRecordCount': 0,
+            'Records': [{'SequenceNumber': '1', 'ShardId': 'shard-0'}
+                        for _ in records]}
+
+
+class TestKinesisProducer(unittest.TestCase):
+    def setUp(self):
+        self.connection = mock.Mock()
+        self.sent = []
+
+        def put_records(records, stream_name, b64_encode=True):
+            self.sent.append(list(records))
+            return succeeded(records)
+
+        self.connection.put_records.side_effect = put_records
+
+    def producer(self, **kwargs):
+        kwargs.setdefault('num_threads', 2)
+        kwargs.setdefault('backoff_base', 0)
+        return KinesisProducer(self.connection, 'stream', **kwargs)
+
+    def sent_data(self):
+        return sorted(base64.b64decode(record['Data'])
+                      for batch in self.sent for record in batch)
+
+    def test_records_are_encoded_once_and_sent_on_close(self):
+        with self.producer(linger_time=60) as producer:
+            producer.put(b'\x00\x01', 'a')
+            producer.put('text', 'b')
+            self.assertEqual(self.sent, [])
+        self.assertEqual(self.sent_data(), [b'\x00\x01', b'text'])
+        self.assertEqual(producer.records_sent, 2)
+        self.assertEqual(producer.requests_sent, 1)
+        for call in self.connection.put_records.call_args_list:
+            self.assertEqual(call[1], {'b64_encode': False})
+
+    def test_batches_are_split_on_record_count(self):
+        with self.producer(max_batch_records=3, linger_time=60) as producer:
+            for i in range(7):
+                producer.put(str(i), 'key')
+        self.assertEqual(sorted(len(batch) for batch in self.sent), [1, 3, 3])
+        self.assertEqual(len(self.sent_data()), 7)
+
+    def test_batches_are_split_on_size(self):
+        with self.producer(max_batch_bytes=25, linger_time=60) as producer:
+            for i in range(4):
+                producer.put('x' * 10, 'k')
+        self.assertEqual([len(batch) for batch in self.sent], [2, 2])
+
+    def test_oversized_record_is_rejected(self):
+        producer = self.producer()
+        with self.assertRaises(ValueError):
+            producer.put(b'x' * (1024 * 1024), 'key')
+        producer.close()
+
+    def test_linger_time_must_be_positive(self):
+        for linger_time in (0, -1):
+            with self.assertRaises(ValueError):
+                self.producer(linger_time=linger_time)
+
+    def test_lingering_batches_are_sent(self):
+        producer = self.producer(linger_time=0.01)
+        producer.put('data', 'key')
+        for _ in range(500):
+            if self.sent:
+                break
+            producer._closed.wait(0.01)
+        self.assertEqual(len(self.sent), 1)
+        producer.close()
+
+    def test_only_failed_records_are_resent(self):
+        responses = [
+            {'FailedRecordCount': 1, 'Records': [
+                {'SequenceNumber': '1', 'ShardId': 'shard-0'},
+                {'ErrorCode': 'ProvisionedThroughputExceededException',
+                 'ErrorMessage': 'Slow down'}]},
+        ]
+
+        def put_records(records, stream_name, b64_encode=True):
+            self.sent.append(list(records))
+            if responses:
+                return responses.pop(0)
+            return succeeded(records)
+
+        self.connection.put_records.side_effect = put_records
+        with self.producer(linger_time=60) as producer:
+            producer.put('first', 'a')
+            producer.put('second', 'b')
+        self.assertEqual(len(self.sent), 2)
+        self.assertEqual(base64.b64decode(self.sent[1][0]['Data']), b'second')
+        self.assertEqual(len(self.sent[1]), 1)
+        self.assertEqual(producer.records_sent, 2)
+        self.assertEqual(producer.throttle_events, 1)
+
+    def test_records_failing_every_retry_are_kept(self):
+        def put_records(records, stream_name, b64_encode=True):
+            raise ProvisionedThroughputExceededException(400, 'Bad Request')
+
+        self.connection.put_records.side_effect = put_records
+        with self.producer(max_retries=2, linger_time=60) as producer:
+            producer.put('data', 'key')
+        self.assertEqual(self.connection.put_records.call_count, 3)
+        self.assertEqual(len(producer.failed_records), 1)
+        failed = producer.failed_records[0]
+        self.assertEqual(failed['PartitionKey'], 'key')
+        self.assertEqual(failed['ErrorCode'],
+                         'ProvisionedThroughputExceededException')
+
+    def test_errors_are_raised(self):
+        self.connection.put_records.side_effect = ResourceNotFoundException(
+            400, 'Bad Request')
+        producer = self.producer(linger_time=60)
+        producer.put('data', 'key')
+        with self.assertRaises(ResourceNotFoundException):
+            producer.close()
+        with self.assertRaises(ResourceNotFoundException):
+            producer.put('data', 'key')
+
+    def test_concurrent_first_puts_start_one_set_of_threads(self):
+        def describe_stream(stream_name, **kwargs):
+            time.sleep(0.05)
+            return {'StreamDescription': {'HasMoreShards': False,
+                                          'Shards': []}}
+
+        self.connection.describe_stream.side_effect = describe_stream
+        with self.producer(shard_aware=True, linger_time=60) as producer:
+            threads = [threading.Thread(target=producer.put,
+                                        args=('data %d' % i, 'k'))
+                       for i in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(len(producer._threads), 2)
+        self.assertEqual(self.connection.describe_stream.call_count, 1)
+        self.assertEqual(len(self.sent_data()), 4)
+
+    def test_shard_aware_batches_per_shard(self):
+        half = 2 ** 127
+        self.connection.describe_stream.return_value = {
+            'StreamDescription': {'HasMoreShards': False, 'Shards': [
+                {'ShardId': 'shard-0',
+                 'HashKeyRange': {'StartingHashKey': '0',
+                                  'EndingHashKey': str(half - 1)},
+                 'SequenceNumberRange': {'StartingSequenceNumber': '1'}},
+                {'ShardId': 'shard-1',
+                 'HashKeyRange': {'StartingHashKey': str(half),
+                                  'EndingHashKey': str(2 * half - 1)},
+                 'SequenceNumberRange': {'StartingSequenceNumber': '1'}},
+                {'ShardId': 'shard-closed',
+                 'HashKeyRange': {'StartingHashKey': '0',
+                                  'EndingHashKey': str(2 * half - 1)},
+                 'SequenceNumberRange': {'StartingSequenceNumber': '1',
+                                         'EndingSequenceNumber': '2'}},
+            ]}}
+        with self.producer(shard_aware=True, linger_time=60) as producer:
+            producer.put('low', 'k', explicit_hash_key='5')
+            producer.put('high', 'k', explicit_hash_key=str(half + 5))
+            producer.put('low again', 'k', explicit_hash_key='10')
+            self.assertEqual(producer._shard_for('k', str(half)), 'shard-1')
+        batches = sorted(sorted(base64.b64decode(r['Data']) for r in batch)
+                         for batch in self.sent)
+        self.assertEqual(batches, [[b'high'], [b'low', b'low again']])
+
+
+if __name__ == '__main__':
+    unittest.main()
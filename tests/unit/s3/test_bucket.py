@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
+import mock
 from mock import patch
 import xml.dom.minidom
 
 from tests.unit import unittest
 from tests.unit import AWSMockServiceTestCase
 
-from boto.exception import BotoClientError
+from boto.compat import BytesIO
+from boto.exception import BotoClientError, S3ResponseError
 from boto.s3.connection import Location, S3Connection
 from boto.s3.bucket import Bucket
 from boto.s3.deletemarker import DeleteMarker
@@ -207,6 +209,103 @@ class TestS3Bucket(AWSMockServiceTestCase):
                 validate=False
             )
 
+    def list_page(self, names, truncated):
+        contents = ''.join('<Contents><Key>%s</Key><Size>1</Size></Contents>'
+                           % name for name in names)
+        return ('<?xml version="1.0" encoding="UTF-8"?>'
+                '<ListBucketResult><Name>mybucket</Name>'
+                '<IsTruncated>%s</IsTruncated>%s</ListBucketResult>' % (
+                    'true' if truncated else 'false', contents)
+                ).encode('utf-8')
+
+    def streamed_response(self, body):
+        response = self.create_response(status_code=200)
+        stream = BytesIO(body)
+        response.read.side_effect = lambda amt=None: stream.read(amt or -1)
+        return response, stream
+
+    def test_bucket_list_streaming(self):
+        self.set_http_response(status_code=200)
+        bucket = self.service_connection.get_bucket('mybucket',
+                                                     validate=False)
+        first, first_stream = self.streamed_response(
+            self.list_page(['a%03d' % i for i in range(1000)], True))
+        second, _ = self.streamed_response(self.list_page(['b'], False))
+        self.https_connection.getresponse.side_effect = [first, second]
+
+        keys = iter(bucket.list(streaming=True))
+        self.assertEqual(next(keys).name, 'a000')
+        # The first key is available before the whole page has been read.
+        self.assertTrue(first_stream.tell() < len(first_stream.getvalue()))
+        names = [key.name for key in keys]
+        self.assertEqual(len(names), 1000)
+        self.assertEqual(names[-1], 'b')
+        self.assertIn('marker=a999', self.actual_request.path)
+
+    def test_iter_all_keys_error(self):
+        self.set_http_response(status_code=403, body=b'<Error/>')
+        bucket = self.service_connection.get_bucket('mybucket',
+                                                     validate=False)
+        with self.assertRaises(S3ResponseError):
+            bucket.iter_all_keys()
+
+    def test_copy_key_with_copy_handler(self):
+        bucket = Bucket(self.service_connection, 'mybucket')
+        copy_handler = mock.Mock()
+        result = bucket.copy_key('newkey', 'srcbucket', 'srckey',
+                                 metadata={'a': 'b'},
+                                 copy_handler=copy_handler)
+        self.assertEqual(result, copy_handler.copy.return_value)
+        copy_handler.copy.assert_called_with(
+            bucket, 'newkey', 'srcbucket', 'srckey', metadata={'a': 'b'},
+            src_version_id=None, storage_class='STANDARD',
+            preserve_acl=False, encrypt_key=False, headers=None)
+
+    @patch('boto.s3.bucket.ConcurrentCopyHandler')
+    def test_copy_key_too_large_for_one_request_is_copied_in_parts(
+            self, handler_class):
+        self.set_http_response(status_code=400, body=(
+            b'<Error><Code>InvalidRequest</Code><Message>The specified copy '
+            b'source is larger than the maximum allowable size for a copy '
+            b'source: 5368709120</Message></Error>'))
+        bucket = Bucket(self.service_connection, 'mybucket')
+        result = bucket.copy_key('newkey', 'srcbucket', 'srckey',
+                                 headers={'x-amz-request-payer': 'requester'})
+        handler_class.assert_called_with(multipart_threshold=0)
+        handler = handler_class.return_value
+        self.assertEqual(result, handler.copy.return_value)
+        handler.copy.assert_called_with(
+            bucket, 'newkey', 'srcbucket', 'srckey', metadata=None,
+            src_version_id=None, storage_class='STANDARD',
+            preserve_acl=False, encrypt_key=False,
+            headers={'x-amz-request-payer': 'requester'})
+
+    @patch('boto.s3.bucket.ConcurrentCopyHandler')
+    def test_copy_key_other_invalid_requests_are_raised(self, handler_class):
+        self.set_http_response(status_code=400, body=(
+            b'<Error><Code>InvalidRequest</Code><Message>This copy request '
+            b'is illegal</Message></Error>'))
+        bucket = Bucket(self.service_connection, 'mybucket')
+        with self.assertRaises(S3ResponseError):
+            bucket.copy_key('newkey', 'srcbucket', 'srckey')
+        self.assertFalse(handler_class.called)
+
+    def test_delete_keys(self):
+        self.set_http_response(status_code=200, body=(
+            b'<DeleteResult><Deleted><Key>a&amp;b</Key></Deleted>'
+            b'<Error><Key>c</Key><Code>AccessDenied</Code></Error>'
+            b'</DeleteResult>'))
+        bucket = Bucket(self.service_connection, 'mybucket')
+        result = bucket.delete_keys(['a&b', ('c', 'v1'), Prefix(name='p/')])
+        body = self.actual_request.body.decode('utf-8')
+        self.assertIn('<Object><Key>a&amp;b</Key></Object>', body)
+        self.assertIn('<Object><Key>c</Key><VersionId>v1</VersionId>'
+                      '</Object>', body)
+        self.assertNotIn('p/', body)
+        self.assertEqual([d.key for d in result.deleted], ['a&b'])
+        self.assertEqual([(e.key, e.code) for e in result.errors],
+                         [('p/', 'PrefixSkipped'), ('c', 'AccessDenied')])
+
     def acl_policy(self):
         return """<?xml version="1.0" encoding="UTF-8"?>
         <AccessControlPolicy xmlns="http://s3.amazonaws.com/doc/2006-03-01/">
@@ -27,7 +27,9 @@ import unittest
 
 from boto.s3.bucket import ResultSet
 from boto.s3.bucketlistresultset import multipart_upload_lister
+from boto.s3.bucketlistresultset import parallel_bucket_lister
 from boto.s3.bucketlistresultset import versioned_bucket_lister
+from boto.s3.key import Key
 
 
 class S3BucketListResultSetTest (unittest.TestCase):
@@ -59,3 +61,62 @@ class S3BucketListResultSetTest (unittest.TestCase):
     def test_list_multipart_upload_with_url_encoding(self):
         self._test_patched_lister_encoding(
             'get_all_multipart_uploads', multipart_upload_lister)
+
+
+class S3ParallelBucketListerTest(unittest.TestCase):
+    def setUp(self):
+        self.names = sorted(
+            ['%s%d' % (c, i) for c in 'aAbz09_' for i in range(7)] +
+            ['photos/%03d' % i for i in range(25)])
+        self.bucket = Mock()
+        self.bucket.get_all_keys.side_effect = self.get_all_keys
+
+    def get_all_keys(self, prefix='', marker='', delimiter='', headers=None,
+                     encoding_type=None):
+        matching = [n for n in self.names
+                    if n.startswith(prefix) and n > marker]
+        rs = ResultSet()
+        for name in matching[:4]:
+            rs.append(Key(self.bucket, name))
+        rs.is_truncated = len(matching) > 4
+        rs.next_marker = None
+        return rs
+
+    def test_ordered_listing_matches_serial_listing(self):
+        results = [k.name for k in parallel_bucket_lister(
+            self.bucket, num_threads=4, page_size=3)]
+        self.assertEqual(results, self.names)
+
+    def test_unordered_listing_returns_every_key_once(self):
+        results = [k.name for k in parallel_bucket_lister(
+            self.bucket, num_threads=4, ordered=False)]
+        self.assertEqual(sorted(results), self.names)
+
+    def test_prefix_marker_and_boundaries(self):
+        results = [k.name for k in parallel_bucket_lister(
+            self.bucket, prefix='photos/', marker='photos/004',
+            boundaries=['photos/010', 'photos/020'])]
+        self.assertEqual(results, ['photos/%03d' % i for i in range(5, 25)])
+
+    def test_boundaries_are_derived_from_the_first_page(self):
+        self.names = sorted('logs/%x' % i for i in range(0x100, 0x200, 7))
+        results = [k.name for k in parallel_bucket_lister(
+            self.bucket, num_threads=4, page_size=3)]
+        self.assertEqual(results, self.names)
+        markers = set(c[1]['marker'] for c in
+                      self.bucket.get_all_keys.call_args_list)
+        # Shards start within the 'logs/1' stem the sampled keys share,
+        # not only at the first character of the key.
+        self.assertIn('logs/1a', markers)
+        self.assertIn('logs/1f', markers)
+
+    def test_single_page_listing_starts_no_shards(self):
+        self.names = ['a', 'b', 'c']
+        results = [k.name for k in parallel_bucket_lister(self.bucket)]
+        self.assertEqual(results, self.names)
+        self.assertEqual(self.bucket.get_all_keys.call_count, 1)
+
+    def test_errors_are_raised_to_the_caller(self):
+        self.bucket.get_all_keys.side_effect = ValueError('boom')
+        with self.assertRaises(ValueError):
+            list(parallel_bucket_lister(self.bucket))
@@ -0,0 +1,466 @@
+#!/usr/bin/env python
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+import os
+import tempfile
+from hashlib import md5
+
+from tests.compat import mock, unittest
+
+from boto.exception import S3DataError
+from boto.provider import Provider
+from boto.s3.concurrent import calculate_part_size, ConcurrentUploadHandler
+from boto.s3.concurrent import ConcurrentDownloadHandler
+from boto.s3.concurrent import MINIMUM_PART_SIZE, BulkDeleteHandler
+from boto.s3.concurrent import ConcurrentCopyHandler
+from boto.s3.bucket import Bucket
+from boto.s3.multidelete import Deleted, Error, MultiDeleteResult
+from boto.s3.prefix import Prefix
+from boto.s3.key import Key
+
+
+MB = 1024 * 1024
+
+
+class TestCalculatePartSize(unittest.TestCase):
+    def test_default_part_size_is_used(self):
+        self.assertEqual(calculate_part_size(20 * MB, 8 * MB), (3, 8 * MB))
+
+    def test_part_size_never_below_minimum(self):
+        self.assertEqual(calculate_part_size(12 * MB, 1 * MB),
+                         (3, MINIMUM_PART_SIZE))
+
+    def test_part_size_grows_to_stay_under_part_limit(self):
+        total_parts, part_size = calculate_part_size(100000 * MB, 8 * MB)
+        self.assertEqual(part_size, 10 * MB)
+        self.assertEqual(total_parts, 10000)
+
+
+class TestConcurrentUploadHandler(unittest.TestCase):
+    def setUp(self):
+        fd, self.filename = tempfile.mkstemp()
+        os.write(fd, b'a' * 1024)
+        os.close(fd)
+        self.addCleanup(os.remove, self.filename)
+        self.getsize_patch = mock.patch('os.path.getsize')
+        self.getsize = self.getsize_patch.start()
+        self.addCleanup(self.getsize_patch.stop)
+
+        self.bucket = mock.Mock()
+        self.mp = self.bucket.initiate_multipart_upload.return_value
+        self.mp.id = 'upload-id'
+        self.mp.upload_part_from_file.side_effect = self.fake_upload_part
+        completed = self.bucket.complete_multipart_upload.return_value
+        completed.etag = '"final-etag"'
+        completed.version_id = None
+        completed.encrypted = None
+        self.key = Key(self.bucket, 'mykey')
+
+    def fake_upload_part(self, fp, part_num, size=None):
+        part = mock.Mock()
+        part.etag = '"etag-%s"' % part_num
+        return part
+
+    def test_small_file_uses_single_put(self):
+        self.getsize.return_value = 1024
+        handler = ConcurrentUploadHandler()
+        with mock.patch.object(Key, 'set_contents_from_file') as put:
+            put.return_value = 1024
+            self.key.set_contents_from_filename(self.filename,
+                                                upload_handler=handler)
+        self.assertTrue(put.called)
+        self.assertFalse(self.bucket.initiate_multipart_upload.called)
+
+    def test_large_file_uploads_all_parts(self):
+        self.getsize.return_value = 12 * MB
+        handler = ConcurrentUploadHandler(num_threads=3,
+                                          part_size=5 * MB,
+                                          multipart_threshold=5 * MB)
+        progress = []
+        size = self.key.set_contents_from_filename(
+            self.filename, upload_handler=handler,
+            cb=lambda done, total: progress.append(done))
+        self.assertEqual(size, 12 * MB)
+        sizes = sorted((c[0][1], c[1]['size'])
+                       for c in self.mp.upload_part_from_file.call_args_list)
+        self.assertEqual(sizes, [(1, 5 * MB), (2, 5 * MB), (3, 2 * MB)])
+        self.assertEqual(progress[0], 0)
+        self.assertEqual(progress[-1], 12 * MB)
+        xml_body = self.bucket.complete_multipart_upload.call_args[0][2]
+        self.assertTrue(xml_body.index('"etag-1"') <
+                        xml_body.index('"etag-2"') <
+                        xml_body.index('"etag-3"'))
+        self.assertEqual(self.key.etag, '"final-etag"')
+        headers = self.bucket.initiate_multipart_upload.call_args[1][
+            'headers']
+        self.assertEqual(headers['Content-Type'], 'application/octet-stream')
+
+    def test_failed_part_cancels_upload(self):
+        self.getsize.return_value = 12 * MB
+        self.mp.upload_part_from_file.side_effect = IOError('boom')
+        handler = ConcurrentUploadHandler(num_threads=2, part_size=5 * MB,
+                                          multipart_threshold=5 * MB,
+                                          num_retries=1,
+                                          time_between_retries=0)
+        with self.assertRaises(IOError):
+            handler.upload(self.key, self.filename)
+        self.assertTrue(self.mp.cancel_upload.called)
+        self.assertFalse(self.bucket.complete_multipart_upload.called)
+
+    def test_errors_outside_retry_exceptions_are_raised_at_once(self):
+        self.getsize.return_value = 12 * MB
+        self.mp.upload_part_from_file.side_effect = ValueError('boom')
+        handler = ConcurrentUploadHandler(num_threads=2, part_size=5 * MB,
+                                          multipart_threshold=5 * MB,
+                                          time_between_retries=0,
+                                          retry_exceptions=IOError)
+        with self.assertRaises(ValueError):
+            handler.upload(self.key, self.filename)
+        self.assertEqual(self.mp.upload_part_from_file.call_count, 3)
+        self.assertTrue(self.mp.cancel_upload.called)
+
+    def test_failed_part_is_retried(self):
+        self.getsize.return_value = 6 * MB
+        attempts = []
+
+        def flaky_upload(fp, part_num, size=None):
+            attempts.append(part_num)
+            if attempts.count(part_num) == 1:
+                raise IOError('transient')
+            return self.fake_upload_part(fp, part_num, size)
+
+        self.mp.upload_part_from_file.side_effect = flaky_upload
+        handler = ConcurrentUploadHandler(part_size=5 * MB,
+                                          multipart_threshold=5 * MB,
+                                          time_between_retries=0)
+        handler.upload(self.key, self.filename)
+        self.assertEqual(sorted(attempts), [1, 1, 2, 2])
+        self.assertTrue(self.bucket.complete_multipart_upload.called)
+
+
+class TestConcurrentDownloadHandler(unittest.TestCase):
+    def setUp(self):
+        self.content = os.urandom(6 * MB + 123)
+        fd, self.filename = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, self.filename)
+        self.bucket = mock.Mock()
+        self.bucket.connection.provider.storage_data_error = S3DataError
+        self.bucket.new_key.side_effect = self.fake_new_key
+        self.requested_ranges = []
+        self.key = Key(self.bucket, 'mykey')
+        self.key.size = len(self.content)
+        self.key.etag = '"%s"' % md5(self.content).hexdigest()
+
+    def fake_new_key(self, key_name):
+        range_key = mock.Mock()
+        range_key.local_hashes = {}
+
+        def get_file(fp, headers, version_id=None):
+            start, end = headers['Range'][len('bytes='):].split('-')
+            self.requested_ranges.append((int(start), int(end)))
+            data = self.content[int(start):int(end) + 1]
+            fp.write(data)
+            range_key.local_hashes['md5'] = md5(data).digest()
+
+        range_key.get_file.side_effect = get_file
+        return range_key
+
+    def download(self, handler):
+        with open(self.filename, 'wb') as fp:
+            self.key.get_contents_to_file(fp, res_download_handler=handler)
+        with open(self.filename, 'rb') as fp:
+            return fp.read()
+
+    def test_downloads_ranges_into_place(self):
+        handler = ConcurrentDownloadHandler(num_threads=4,
+                                            part_size=MINIMUM_PART_SIZE,
+                                            multipart_threshold=MB)
+        self.assertEqual(self.download(handler), self.content)
+        self.assertEqual(sorted(self.requested_ranges),
+                         [(0, 5 * MB - 1), (5 * MB, 6 * MB + 122)])
+        self.assertEqual(self.key.local_hashes['md5'],
+                         md5(self.content).digest())
+
+    def test_etag_mismatch_raises(self):
+        self.key.etag = '"%s"' % ('0' * 32)
+        handler = ConcurrentDownloadHandler(part_size=MINIMUM_PART_SIZE,
+                                            multipart_threshold=MB)
+        with self.assertRaises(S3DataError):
+            self.download(handler)
+
+    def test_customer_encrypted_objects_are_not_verified(self):
+        self.key.etag = '"%s"' % ('0' * 32)
+        handler = ConcurrentDownloadHandler(part_size=MINIMUM_PART_SIZE,
+                                            multipart_threshold=MB)
+        headers = {
+            'x-amz-server-side-encryption-customer-algorithm': 'AES256',
+            'x-amz-server-side-encryption-customer-key': 'a2V5',
+        }
+        with open(self.filename, 'wb') as fp:
+            self.key.get_contents_to_file(fp, headers=headers,
+                                          res_download_handler=handler)
+        with open(self.filename, 'rb') as fp:
+            self.assertEqual(fp.read(), self.content)
+
+    def test_small_object_uses_single_get(self):
+        handler = ConcurrentDownloadHandler()
+        with mock.patch.object(Key, '_get_file_internal') as get:
+            self.download(handler)
+        self.assertTrue(get.called)
+        self.assertEqual(self.requested_ranges, [])
+
+
+class TestConcurrentCopyHandler(unittest.TestCase):
+    def setUp(self):
+        self.bucket = mock.Mock()
+        self.bucket.name = 'dst'
+        self.bucket.connection.provider = Provider('aws')
+        self.src_bucket = self.bucket.connection.get_bucket.return_value
+        self.src_key = Key(self.src_bucket, 'src-key')
+        self.src_key.size = 20 * MINIMUM_PART_SIZE
+        self.src_key.etag = '"abc"'
+        self.src_key.metadata = {'color': 'blue'}
+        self.src_key.content_type = 'image/png'
+        self.src_key.content_md5 = 'deadbeef'
+        self.src_bucket.get_key.return_value = self.src_key
+        self.mp = self.bucket.initiate_multipart_upload.return_value
+        self.mp.id = 'upload-id'
+        self.mp.copy_part_from_key.side_effect = self.copy_part
+        self.completed = self.bucket.complete_multipart_upload.return_value
+        self.completed.etag = '"def-2"'
+        self.completed.version_id = 'v2'
+        self.bucket.new_key.side_effect = lambda name: Key(self.bucket, name)
+
+    def copy_part(self, src_bucket_name, src_key_name, part_num, start, end,
+                  src_version_id=None, headers=None):
+        return mock.Mock(etag='"etag-%s"' % part_num)
+
+    def test_small_object_uses_a_single_copy(self):
+        self.src_key.size = 1024
+        handler = ConcurrentCopyHandler()
+        result = handler.copy(self.bucket, 'new-key', 'src', 'src-key',
+                              preserve_acl=True)
+        self.assertEqual(result, self.bucket.copy_key.return_value)
+        self.bucket.copy_key.assert_called_with(
+            'new-key', 'src', 'src-key', metadata=None, src_version_id=None,
+            storage_class='STANDARD', preserve_acl=True, encrypt_key=False,
+            headers=None)
+        self.assertFalse(self.bucket.initiate_multipart_upload.called)
+
+    def test_missing_source_uses_a_single_copy(self):
+        self.src_bucket.get_key.return_value = None
+        handler = ConcurrentCopyHandler()
+        handler.copy(self.bucket, 'new-key', 'src', 'src-key')
+        self.assertTrue(self.bucket.copy_key.called)
+
+    def test_large_object_is_copied_in_parts(self):
+        handler = ConcurrentCopyHandler(num_threads=3,
+                                        part_size=8 * MINIMUM_PART_SIZE,
+                                        multipart_threshold=MINIMUM_PART_SIZE)
+        key = handler.copy(self.bucket, 'new-key', 'src', 'src-key',
+                           src_version_id='v1')
+        self.src_bucket.get_key.assert_called_with('src-key', headers=None,
+                                                   version_id='v1')
+        self.bucket.initiate_multipart_upload.assert_called_with(
+            'new-key', headers={'content-type': 'image/png',
+                                'x-amz-storage-class': 'STANDARD'},
+            metadata={'color': 'blue'}, encrypt_key=False)
+        part_size = 8 * MINIMUM_PART_SIZE
+        calls = sorted(self.mp.copy_part_from_key.call_args_list,
+                       key=lambda c: c[0][2])
+        self.assertEqual([c[0][2:] for c in calls], [
+            (1, 0, part_size - 1),
+            (2, part_size, 2 * part_size - 1),
+            (3, 2 * part_size, 20 * MINIMUM_PART_SIZE - 1)])
+        for c in calls:
+            self.assertEqual(c[1], {
+                'src_version_id': 'v1',
+                'headers': {'x-amz-copy-source-if-match': '"abc"'}})
+        xml = self.bucket.complete_multipart_upload.call_args[0][2]
+        self.assertTrue(xml.index('"etag-1"') < xml.index('"etag-2"') <
+                        xml.index('"etag-3"'))
+        self.assertEqual(key.name, 'new-key')
+        self.assertEqual(key.etag, '"def-2"')
+        self.assertEqual(key.version_id, 'v2')
+        self.assertEqual(key.size, 20 * MINIMUM_PART_SIZE)
+        self.assertEqual(key.metadata, {'color': 'blue'})
+
+    def test_supplied_metadata_replaces_the_source_metadata(self):
+        handler = ConcurrentCopyHandler(multipart_threshold=MINIMUM_PART_SIZE)
+        handler.copy(self.bucket, 'new-key', 'src', 'src-key',
+                     metadata={'color': 'red'}, storage_class=None,
+                     headers={'Content-Type': 'text/plain'})
+        self.bucket.initiate_multipart_upload.assert_called_with(
+            'new-key', headers={'Content-Type': 'text/plain'},
+            metadata={'color': 'red'}, encrypt_key=False)
+
+    def test_encryption_and_request_payer_headers_are_forwarded(self):
+        handler = ConcurrentCopyHandler(multipart_threshold=MINIMUM_PART_SIZE)
+        copy_source_sse = 'x-amz-copy-source-server-side-encryption-'
+        sse = 'x-amz-server-side-encryption-'
+        headers = {
+            copy_source_sse + 'customer-algorithm': 'AES256',
+            copy_source_sse + 'customer-key': 'src-key-b64',
+            sse + 'customer-algorithm': 'AES256',
+            sse + 'customer-key': 'dst-key-b64',
+            'x-amz-request-payer': 'requester',
+        }
+        handler.copy(self.bucket, 'new-key', 'src', 'src-key',
+                     storage_class=None, headers=headers)
+        self.src_bucket.get_key.assert_called_with('src-key', headers={
+            sse + 'customer-algorithm': 'AES256',
+            sse + 'customer-key': 'src-key-b64',
+            'x-amz-request-payer': 'requester',
+        }, version_id=None)
+        upload_headers = self.bucket.initiate_multipart_upload.call_args[1]
+        self.assertEqual(upload_headers['headers'], {
+            'content-type': 'image/png',
+            sse + 'customer-algorithm': 'AES256',
+            sse + 'customer-key': 'dst-key-b64',
+            'x-amz-request-payer': 'requester',
+        })
+        part_headers = dict(headers)
+        part_headers['x-amz-copy-source-if-match'] = '"abc"'
+        for c in self.mp.copy_part_from_key.call_args_list:
+            self.assertEqual(c[1]['headers'], part_headers)
+        # The caller's headers are left alone.
+        self.assertEqual(len(headers), 5)
+
+    def test_objects_too_large_for_a_single_copy_use_parts(self):
+        self.src_key.size = 5 * 1024 * 1024 * 1024 + 1
+        handler = ConcurrentCopyHandler(multipart_threshold=1 << 40)
+        handler.copy(self.bucket, 'new-key', 'src', 'src-key')
+        self.assertFalse(self.bucket.copy_key.called)
+        self.assertTrue(self.bucket.complete_multipart_upload.called)
+
+    def test_preserve_acl(self):
+        handler = ConcurrentCopyHandler(multipart_threshold=MINIMUM_PART_SIZE)
+        handler.copy(self.bucket, 'new-key', 'src', 'src-key',
+                     preserve_acl=True)
+        self.src_bucket.get_xml_acl.assert_called_with('src-key')
+        self.bucket.set_xml_acl.assert_called_with(
+            self.src_bucket.get_xml_acl.return_value, 'new-key')
+
+    def test_failed_part_cancels_the_upload(self):
+        self.mp.copy_part_from_key.side_effect = IOError('boom')
+        handler = ConcurrentCopyHandler(multipart_threshold=MINIMUM_PART_SIZE,
+                                        num_retries=0)
+        with self.assertRaises(IOError):
+            handler.copy(self.bucket, 'new-key', 'src', 'src-key')
+        self.assertTrue(self.mp.cancel_upload.called)
+        self.assertFalse(self.bucket.complete_multipart_upload.called)
+
+
+class TestBulkDeleteHandler(unittest.TestCase):
+    def setUp(self):
+        self.bucket = Bucket(mock.Mock(), 'mybucket')
+        self.requests = []
+        self.responses = {}
+        self.bucket._post_delete_keys = self.post_delete_keys
+
+    def post_delete_keys(self, objects, quiet=False, mfa_token=None,
+                         headers=None):
+        self.requests.append(list(objects))
+        result = MultiDeleteResult(self.bucket)
+        for name, version_id in objects:
+            code = self.responses.get(name)
+            if callable(code):
+                code = code()
+            if code is not None:
+                result.errors.append(Error(name, version_id, code=code))
+            elif not quiet:
+                result.deleted.append(Deleted(name, version_id))
+        return result
+
+    def test_keys_are_deleted_in_batches(self):
+        handler = BulkDeleteHandler(num_threads=3, batch_size=4)
+        keys = ('key-%s' % i for i in range(10))
+        summary = handler.delete(self.bucket, keys)
+        self.assertEqual(summary.deleted_count, 10)
+        self.assertEqual(summary.errors, [])
+        self.assertEqual(sorted(len(r) for r in self.requests), [2, 4, 4])
+        deleted = sorted(name for r in self.requests for name, _ in r)
+        self.assertEqual(deleted, sorted('key-%s' % i for i in range(10)))
+
+    def test_batch_size_is_capped_at_the_s3_limit(self):
+        handler = BulkDeleteHandler(num_threads=1, batch_size=5000)
+        summary = handler.delete(self.bucket, ['k%s' % i for i in range(1500)])
+        self.assertEqual(summary.deleted_count, 1500)
+        self.assertEqual([len(r) for r in self.requests], [1000, 500])
+
+    def test_only_transient_errors_are_retried(self):
+        codes = ['SlowDown', None]
+        self.responses = {'slow': lambda: codes.pop(0),
+                          'denied': 'AccessDenied'}
+        handler = BulkDeleteHandler(num_threads=1, time_between_retries=0)
+        summary = handler.delete(self.bucket, ['slow', 'denied', 'ok'])
+        self.assertEqual(self.requests,
+                         [[('slow', None), ('denied', None), ('ok', None)],
+                          [('slow', None)]])
+        self.assertEqual(summary.deleted_count, 2)
+        self.assertEqual([(e.key, e.code) for e in summary.errors],
+                         [('denied', 'AccessDenied')])
+
+    def test_transient_errors_give_up_after_retries(self):
+        self.responses = {'slow': 'SlowDown'}
+        handler = BulkDeleteHandler(num_threads=1, num_retries=2,
+                                    time_between_retries=0)
+        summary = handler.delete(self.bucket, ['slow'])
+        self.assertEqual(len(self.requests), 3)
+        self.assertEqual(summary.deleted_count, 0)
+        self.assertEqual(summary.error_count, 1)
+
+    def test_invalid_keys_are_reported_without_a_request(self):
+        handler = BulkDeleteHandler(num_threads=1)
+        summary = handler.delete(self.bucket, [Prefix(name='dir/'), 'a'])
+        self.assertEqual(self.requests, [[('a', None)]])
+        self.assertEqual([(e.key, e.code) for e in summary.errors],
+                         [('dir/', 'PrefixSkipped')])
+
+    def test_callback_receives_each_result(self):
+        self.responses = {'b': 'AccessDenied'}
+        seen = []
+        handler = BulkDeleteHandler(num_threads=2, batch_size=1)
+        handler.delete(self.bucket, ['a', 'b'], quiet=False,
+                       callback=seen.append)
+        self.assertEqual(sorted((type(r).__name__, r.key) for r in seen),
+                         [('Deleted', 'a'), ('Error', 'b')])
+
+    def test_failed_request_is_retried_then_raised(self):
+        self.bucket._post_delete_keys = mock.Mock(
+            side_effect=IOError('connection reset'))
+        handler = BulkDeleteHandler(num_threads=2, num_retries=1,
+                                    time_between_retries=0)
+        with self.assertRaises(IOError):
+            handler.delete(self.bucket, ['a'])
+        self.assertEqual(self.bucket._post_delete_keys.call_count, 2)
+
+    def test_delete_keys_parallel(self):
+        summary = self.bucket.delete_keys_parallel(['a', ('b', 'v1')],
+                                                   num_threads=2)
+        self.assertEqual(summary.deleted_count, 2)
+        self.assertEqual(self.requests, [[('a', None), ('b', 'v1')]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -151,6 +151,27 @@ class TestS3Key(AWSMockServiceTestCase):
             validate_dst_bucket=True,
         )
 
+    @mock.patch('boto.s3.key.ConcurrentCopyHandler')
+    def test_copy_of_key_over_5gb_uses_copy_handler(self, handler_class):
+        b = Bucket(self.service_connection, 'mybucket')
+        k = Key(b, 'fookey')
+        k.size = 6 * 1024 ** 3
+        k.storage_class = 'STANDARD'
+        dst_bucket = mock.Mock()
+        dst_bucket.connection.provider = self.service_connection.provider
+        with mock.patch.object(self.service_connection, 'lookup',
+                               return_value=dst_bucket):
+            k.copy('otherbucket', 'newkey')
+            self.assertEqual(
+                dst_bucket.copy_key.call_args[1]['copy_handler'],
+                handler_class.return_value)
+
+            # Smaller keys keep the plain copy.
+            k.size = 1024
+            k.copy('otherbucket', 'newkey')
+            self.assertNotIn('copy_handler', dst_bucket.copy_key.call_args[1])
+        self.assertEqual(handler_class.call_count, 1)
+
 
 def counter(fn):
     def _wrapper(*args, **kwargs):
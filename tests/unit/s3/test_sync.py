@@ -0,0 +1,256 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+import os
+import shutil
+import tempfile
+from hashlib import md5
+
+from tests.compat import mock, unittest
+
+from boto.s3.multidelete import MultiDeleteSummary
+from boto.s3.sync import BucketSync, SyncManifest
+
+
+class FakeKey(object):
+    def __init__(self, bucket, name, data=None, etag=None):
+        self.bucket = bucket
+        self.name = name
+        self.md5 = None
+        if data is not None:
+            self.size = len(data)
+            self.etag = etag or '"%s"' % md5(data).hexdigest()
+        self.data = data
+
+    def set_contents_from_filename(self, filename, **kwargs):
+        with open(filename, 'rb') as f:
+            self.data = f.read()
+        self.size = len(self.data)
+        self.md5 = md5(self.data).hexdigest()
+        self.etag = '"%s"' % self.md5
+        self.bucket.uploads.append((self.name, kwargs))
+        self.bucket.keys[self.name] = self
+
+    def get_contents_to_filename(self, filename, **kwargs):
+        self.bucket.downloads.append(self.name)
+        with open(filename, 'wb') as f:
+            f.write(self.data)
+
+
+class FakeBucket(object):
+    name = 'mybucket'
+
+    def __init__(self):
+        self.keys = {}
+        self.uploads = []
+        self.downloads = []
+        self.deleted = []
+
+    def add(self, name, data, etag=None):
+        self.keys[name] = FakeKey(self, name, data, etag)
+
+    def new_key(self, name):
+        return FakeKey(self, name)
+
+    def list_parallel(self, prefix='', num_threads=10, ordered=True):
+        return [key for name, key in sorted(self.keys.items())
+                if name.startswith(prefix)]
+
+    def delete_keys_parallel(self, names, num_threads=10):
+        summary = MultiDeleteSummary(self)
+        for name in names:
+            self.deleted.append(name)
+            del self.keys[name]
+            summary.deleted_count += 1
+        return summary
+
+
+class TestBucketSync(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.bucket = FakeBucket()
+        self.syncer = BucketSync(num_threads=3, time_between_retries=0)
+        self.manifest_file = os.path.join(self.directory, '.manifest')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, data):
+        path = os.path.join(self.directory, *name.split('/'))
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def read(self, name):
+        with open(os.path.join(self.directory, *name.split('/')), 'rb') as f:
+            return f.read()
+
+    def manifest(self):
+        return SyncManifest(self.manifest_file)
+
+    def test_upload_transfers_only_differences(self):
+        self.write('same.txt', b'same')
+        self.write('changed.txt', b'new')
+        self.write('sub/new.txt', b'new file')
+        self.write('.hidden', b'hidden')
+        self.bucket.add('p/same.txt', b'same')
+        self.bucket.add('p/changed.txt', b'old')
+        calls = []
+        result = self.syncer.upload(self.bucket, self.directory, 'p/',
+                                    self.manifest(),
+                                    callback=lambda *a: calls.append(a),
+                                    reduced_redundancy=True)
+        self.assertEqual(sorted(result.transferred),
+                         ['changed.txt', 'sub/new.txt'])
+        self.assertEqual(result.unchanged, 1)
+        self.assertEqual(sorted(name for name, _ in self.bucket.uploads),
+                         ['p/changed.txt', 'p/sub/new.txt'])
+        self.assertEqual(sorted(calls), [('upload', 'changed.txt'),
+                                         ('upload', 'sub/new.txt')])
+        for _, kwargs in self.bucket.uploads:
+            self.assertTrue(kwargs['reduced_redundancy'])
+            self.assertEqual(len(kwargs['md5']), 2)
+        self.assertEqual(self.bucket.keys['p/sub/new.txt'].data, b'new file')
+
+    def test_manifest_avoids_hashing_unchanged_files(self):
+        self.write('a.txt', b'a')
+        self.syncer.upload(self.bucket, self.directory, 'p/', self.manifest())
+        self.bucket.uploads = []
+        with mock.patch('boto.s3.sync.compute_md5') as compute_md5:
+            result = self.syncer.upload(self.bucket, self.directory, 'p/',
+                                        self.manifest())
+        self.assertFalse(compute_md5.called)
+        self.assertEqual(result.unchanged, 1)
+        self.assertEqual(self.bucket.uploads, [])
+
+    def test_manifest_covers_multipart_etags(self):
+        self.write('big.bin', b'big')
+        manifest = self.manifest()
+        self.syncer.upload(self.bucket, self.directory, 'p/', manifest)
+        # The key now has an ETag that is not the MD5 of the file, as a
+        # multipart upload would give it.
+        self.bucket.add('p/big.bin', b'big', etag='"abc-2"')
+        path = os.path.join(self.directory, 'big.bin')
+        stat = os.stat(path)
+        manifest.record(os.path.abspath(path), stat.st_size, stat.st_mtime,
+                        md5(b'big').hexdigest(), '"abc-2"')
+        self.bucket.uploads = []
+        result = self.syncer.upload(self.bucket, self.directory, 'p/',
+                                    manifest)
+        self.assertEqual(result.unchanged, 1)
+        self.assertEqual(self.bucket.uploads, [])
+
+    def test_upload_delete_removes_extra_keys(self):
+        self.write('a.txt', b'a')
+        self.bucket.add('p/a.txt', b'a')
+        self.bucket.add('p/gone.txt', b'gone')
+        self.bucket.add('other/keep.txt', b'keep')
+        result = self.syncer.upload(self.bucket, self.directory, 'p/',
+                                    delete=True)
+        self.assertEqual(result.deleted, ['gone.txt'])
+        self.assertEqual(self.bucket.deleted, ['p/gone.txt'])
+        self.assertIn('other/keep.txt', self.bucket.keys)
+
+    def test_upload_dry_run_changes_nothing(self):
+        self.write('a.txt', b'a')
+        self.bucket.add('p/gone.txt', b'gone')
+        result = self.syncer.upload(self.bucket, self.directory, 'p/',
+                                    self.manifest(), delete=True,
+                                    dry_run=True)
+        self.assertEqual(result.transferred, ['a.txt'])
+        self.assertEqual(result.deleted, ['gone.txt'])
+        self.assertEqual(self.bucket.uploads, [])
+        self.assertEqual(self.bucket.deleted, [])
+        self.assertFalse(os.path.exists(self.manifest_file))
+
+    def test_download_transfers_only_differences(self):
+        self.write('same.txt', b'same')
+        self.write('changed.txt', b'old')
+        self.write('extra.txt', b'extra')
+        self.bucket.add('p/same.txt', b'same')
+        self.bucket.add('p/changed.txt', b'new')
+        self.bucket.add('p/sub/new.txt', b'new file')
+        self.bucket.add('p/dir/', b'')
+        result = self.syncer.download(self.bucket, 'p/', self.directory,
+                                      self.manifest(), delete=True)
+        self.assertEqual(sorted(result.transferred),
+                         ['changed.txt', 'sub/new.txt'])
+        self.assertEqual(result.deleted, ['extra.txt'])
+        self.assertEqual(result.unchanged, 1)
+        self.assertEqual(self.read('changed.txt'), b'new')
+        self.assertEqual(self.read('sub/new.txt'), b'new file')
+        self.assertFalse(os.path.exists(
+            os.path.join(self.directory, 'extra.txt')))
+
+        self.bucket.downloads = []
+        with mock.patch('boto.s3.sync.compute_md5') as compute_md5:
+            result = self.syncer.download(self.bucket, 'p/', self.directory,
+                                          self.manifest())
+        self.assertFalse(compute_md5.called)
+        self.assertEqual(result.unchanged, 3)
+        self.assertEqual(self.bucket.downloads, [])
+
+    def test_failed_transfer_is_raised_and_manifest_saved(self):
+        self.write('a.txt', b'a')
+        self.bucket.new_key = mock.Mock(side_effect=IOError('boom'))
+        syncer = BucketSync(num_threads=1, num_retries=0)
+        with self.assertRaises(IOError):
+            syncer.upload(self.bucket, self.directory, 'p/', self.manifest())
+        # The hash computed before the upload failed is kept.
+        path = os.path.abspath(os.path.join(self.directory, 'a.txt'))
+        stat = os.stat(path)
+        self.assertEqual(self.manifest().lookup(path, stat.st_size,
+                                                stat.st_mtime),
+                         (md5(b'a').hexdigest(), None))
+
+    def test_manifest_keeps_md5_when_key_has_none(self):
+        # An upload handler leaves the key's md5 unset.
+        path = os.path.abspath(self.write('a.txt', b'a'))
+        self.bucket.new_key = lambda name: mock.Mock(md5=None,
+                                                     etag='"abc-1"')
+        self.syncer.upload(self.bucket, self.directory, 'p/',
+                           self.manifest())
+        stat = os.stat(path)
+        self.assertEqual(self.manifest().lookup(path, stat.st_size,
+                                                stat.st_mtime),
+                         (md5(b'a').hexdigest(), '"abc-1"'))
+
+    def test_manifest_can_be_shared_between_directories(self):
+        other = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, other)
+        self.write('a.txt', b'a')
+        with open(os.path.join(other, 'a.txt'), 'wb') as f:
+            f.write(b'b')
+        manifest = self.manifest()
+        self.syncer.upload(self.bucket, self.directory, 'p/', manifest)
+        self.syncer.upload(self.bucket, other, 'q/', manifest)
+        self.assertEqual(len(manifest._entries), 2)
+        self.bucket.uploads = []
+        result = self.syncer.upload(self.bucket, self.directory, 'p/',
+                                    manifest)
+        self.assertEqual(result.unchanged, 1)
+        self.assertEqual(self.bucket.uploads, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+# Copyright (c) 2013 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+import threading
+import time
+
+from tests.compat import mock, unittest
+
+from boto.sqs.batchresults import BatchResults
+from boto.sqs.consumer import QueueConsumer
+from boto.sqs.message import Message
+from boto.sqs.queue import Queue
+
+
+def make_messages(count, start=0):
+    messages = []
+    for i in range(start, start + count):
+        message = Message(body='message %d' % i)
+        message.id = 'id-%d' % i
+        message.receipt_handle = 'handle-%d' % i
+        messages.append(message)
+    return messages
+
+
+class TestQueueConsumer(unittest.TestCase):
+    def setUp(self):
+        self.connection = mock.Mock()
+        self.queue = Queue(connection=self.connection,
+                           url='https://sqs.us-east-1.amazonaws.com/id/q')
+        self.pending = make_messages(25)
+        self.lock = threading.Lock()
+        self.connection.receive_message.side_effect = self.receive_message
+        self.deleted_batches = []
+        self.connection.delete_message_batch.side_effect = \
+            self.delete_message_batch
+
+    def receive_message(self, queue, number_messages=1, **kwargs):
+        with self.lock:
+            messages = self.pending[:number_messages]
+            del self.pending[:number_messages]
+        if not messages:
+            time.sleep(0.01)
+        return messages
+
+    def delete_message_batch(self, queue, messages):
+        with self.lock:
+            self.deleted_batches.append([m.receipt_handle for m in messages])
+        return BatchResults(None)
+
+    def wait_for(self, condition):
+        for _ in range(500):
+            if condition():
+                return
+            time.sleep(0.01)
+        self.fail('Timed out waiting for the consumer')
+
+    def test_messages_are_processed_and_deleted_in_batches(self):
+        handled = []
+        consumer = QueueConsumer(self.queue, handled.append,
+                                 extend_visibility=False, ack_linger=0.05)
+        with consumer:
+            self.wait_for(lambda: len(handled) == 25)
+        self.assertEqual(sorted(m.id for m in handled),
+                         sorted(m.id for m in make_messages(25)))
+        deleted = [h for batch in self.deleted_batches for h in batch]
+        self.assertEqual(sorted(deleted),
+                         sorted(m.receipt_handle for m in handled))
+        self.assertTrue(all(len(b) <= 10 for b in self.deleted_batches))
+        self.assertTrue(len(self.deleted_batches) < 25)
+        self.assertEqual(consumer.received, 25)
+        self.assertEqual(consumer.processed, 25)
+        self.assertEqual(consumer.deleted, 25)
+        call = self.connection.receive_message.call_args
+        self.assertEqual(call[1]['number_messages'], 10)
+        self.assertEqual(call[1]['wait_time_seconds'], 20)
+
+    def test_failed_messages_are_not_deleted(self):
+        def handler(message):
+            if message.id == 'id-3':
+                raise ValueError('bad message')
+
+        consumer = QueueConsumer(self.queue, handler,
+                                 extend_visibility=False, ack_linger=0)
+        with consumer:
+            self.wait_for(lambda: consumer.processed + consumer.failed == 25)
+        deleted = [h for batch in self.deleted_batches for h in batch]
+        self.assertNotIn('handle-3', deleted)
+        self.assertEqual(len(deleted), 24)
+        self.assertEqual(consumer.failed, 1)
+
+    def test_duplicate_deliveries_get_distinct_entry_ids(self):
+        self.pending = make_messages(2)
+        self.pending[1].id = self.pending[0].id
+        entry_ids = []
+
+        def delete_message_batch(queue, messages):
+            entry_ids.append([m.id for m in messages])
+            return self.delete_message_batch(queue, messages)
+
+        self.connection.delete_message_batch.side_effect = \
+            delete_message_batch
+        consumer = QueueConsumer(self.queue, lambda m: None,
+                                 extend_visibility=False, ack_linger=1)
+        with consumer:
+            self.wait_for(lambda: consumer.processed == 2)
+        self.assertEqual(entry_ids, [['0', '1']])
+        self.assertEqual(sorted(self.deleted_batches[0]),
+                         ['handle-0', 'handle-1'])
+
+    def test_failed_deletes_are_counted(self):
+        def delete_message_batch(queue, messages):
+            results = BatchResults(None)
+            results.errors.append({'id': messages[0].id,
+                                   'error_message': 'nope'})
+            return results
+
+        self.pending = make_messages(1)
+        self.connection.delete_message_batch.side_effect = \
+            delete_message_batch
+        consumer = QueueConsumer(self.queue, lambda m: None,
+                                 extend_visibility=False, ack_linger=0)
+        with consumer:
+            self.wait_for(lambda: consumer.processed == 1)
+        self.assertEqual(consumer.deleted, 0)
+
+    def test_visibility_of_slow_messages_is_extended(self):
+        self.pending = make_messages(2)
+        self.connection.get_queue_attributes.return_value = {
+            'VisibilityTimeout': '1'}
+        release = threading.Event()
+        consumer = QueueConsumer(self.queue, lambda m: release.wait(),
+                                 num_workers=2)
+        with consumer:
+            self.wait_for(lambda: consumer.visibility_extensions >= 2)
+            release.set()
+        call = self.connection.change_message_visibility_batch.call_args
+        queue, entries = call[0]
+        self.assertEqual(sorted(m.receipt_handle for m, timeout in entries),
+                         ['handle-0', 'handle-1'])
+        self.assertEqual(sorted(m.id for m, timeout in entries), ['0', '1'])
+        self.assertEqual(set(timeout for m, timeout in entries), set([1]))
+        self.connection.get_queue_attributes.assert_called_with(
+            self.queue, 'VisibilityTimeout')
+
+
+if __name__ == '__main__':
+    unittest.main()
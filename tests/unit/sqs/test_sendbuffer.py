@@ -0,0 +1,217 @@
+# Copyright (c) 2013 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+import threading
+import time
+
+from tests.compat import mock, unittest
+
+from boto.exception import BotoClientError, SQSError
+from boto.sqs.batchresults import BatchResults, ResultEntry
+from boto.sqs.message import Message, RawMessage
+from boto.sqs.queue import Queue
+from boto.sqs.sendbuffer import SendBuffer, MessageFuture
+
+
+def entry(**kwargs):
+    result = ResultEntry()
+    result.update(kwargs)
+    return result
+
+
+class TestSendBuffer(unittest.TestCase):
+    def setUp(self):
+        self.connection = mock.Mock()
+        self.queue = Queue(connection=self.connection,
+                           url='https://sqs.us-east-1.amazonaws.com/id/q',
+                           message_class=RawMessage)
+        self.batches = []
+        self.lock = threading.Lock()
+        self.connection.send_message_batch.side_effect = self.send_batch
+
+    def send_batch(self, queue, messages):
+        with self.lock:
+            self.batches.append([list(m) for m in messages])
+        results = BatchResults(None)
+        for message in messages:
+            results.results.append(entry(id=message[0],
+                                         message_id='sqs-' + message[1],
+                                         message_md5='md5'))
+        return results
+
+    def buffer(self, **kwargs):
+        kwargs.setdefault('backoff_base', 0)
+        kwargs.setdefault('linger_time', 60)
+        return SendBuffer(self.queue, **kwargs)
+
+    def test_messages_are_sent_in_batches_of_ten(self):
+        with self.buffer() as buffer:
+            futures = [buffer.write('body %d' % i) for i in range(23)]
+        self.assertEqual(sorted(len(b) for b in self.batches), [3, 10, 10])
+        for i, future in enumerate(futures):
+            self.assertTrue(future.done())
+            message = future.result()
+            self.assertEqual(message.id, 'sqs-body %d' % i)
+            self.assertEqual(message.md5, 'md5')
+        ids = [m[0] for m in self.batches[0]]
+        self.assertEqual(ids, [str(i) for i in range(10)])
+
+    def test_concurrent_first_writes_start_one_set_of_threads(self):
+        start_threads = SendBuffer._start_threads
+
+        def slow_start_threads(buffer):
+            time.sleep(0.05)
+            start_threads(buffer)
+
+        with mock.patch.object(SendBuffer, '_start_threads',
+                               slow_start_threads):
+            with self.buffer(num_threads=2) as buffer:
+                threads = [threading.Thread(target=buffer.write,
+                                            args=('body %d' % i,))
+                           for i in range(4)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                self.assertEqual(len(buffer._threads), 2)
+        self.assertEqual(sum(len(b) for b in self.batches), 4)
+
+    def test_batches_are_split_on_size(self):
+        body = 'x' * (100 * 1024)
+        with self.buffer() as buffer:
+            for _ in range(5):
+                buffer.write(body)
+        self.assertEqual([len(b) for b in self.batches], [2, 2, 1])
+
+    def test_oversized_message_is_rejected(self):
+        buffer = self.buffer()
+        with self.assertRaises(ValueError):
+            buffer.write('x' * (256 * 1024 + 1))
+        buffer.close()
+
+    def test_delay_and_attributes_are_sent(self):
+        message = Message(body='hello')
+        message.message_attributes = {
+            'name': {'data_type': 'String', 'string_value': 'value'}}
+        with self.buffer() as buffer:
+            buffer.write(message, delay_seconds=5)
+        sent = self.batches[0][0]
+        self.assertEqual(sent[1], message.get_body_encoded())
+        self.assertEqual(sent[2], 5)
+        self.assertEqual(sent[3], message.message_attributes)
+
+    def test_lingering_batch_is_sent(self):
+        buffer = self.buffer(linger_time=0.01)
+        future = buffer.write('body')
+        self.assertEqual(future.result(timeout=5).id, 'sqs-body')
+        buffer.close()
+
+    def test_only_failed_entries_are_retried(self):
+        calls = []
+
+        def send_batch(queue, messages):
+            calls.append([m[1] for m in messages])
+            results = BatchResults(None)
+            for message in messages:
+                if message[1] == 'flaky' and len(calls) == 1:
+                    results.errors.append(entry(
+                        id=message[0], sender_fault='false',
+                        error_code='InternalError'))
+                elif message[1] == 'bad':
+                    results.errors.append(entry(
+                        id=message[0], sender_fault='true',
+                        error_code='InvalidMessageContents',
+                        error_message='Bad characters'))
+                else:
+                    results.results.append(entry(
+                        id=message[0], message_id='sqs-' + message[1]))
+            return results
+
+        self.connection.send_message_batch.side_effect = send_batch
+        with self.buffer() as buffer:
+            ok = buffer.write('ok')
+            flaky = buffer.write('flaky')
+            bad = buffer.write('bad')
+        self.assertEqual(calls, [['ok', 'flaky', 'bad'], ['flaky']])
+        self.assertEqual(ok.result().id, 'sqs-ok')
+        self.assertEqual(flaky.result().id, 'sqs-flaky')
+        error = bad.exception()
+        self.assertIsInstance(error, SQSError)
+        self.assertEqual(error.error_code, 'InvalidMessageContents')
+        self.assertEqual(error.message, 'Bad characters')
+        self.assertRaises(SQSError, bad.result)
+
+    def test_entries_fail_after_max_retries(self):
+        def send_batch(queue, messages):
+            results = BatchResults(None)
+            results.errors.append(entry(id='0', sender_fault='false',
+                                        error_code='InternalError'))
+            return results
+
+        self.connection.send_message_batch.side_effect = send_batch
+        with self.buffer(max_retries=2) as buffer:
+            future = buffer.write('body')
+        self.assertEqual(self.connection.send_message_batch.call_count, 3)
+        self.assertEqual(future.exception().error_code, 'InternalError')
+
+    def test_request_errors_fail_every_message(self):
+        error = SQSError(403, 'Forbidden')
+        self.connection.send_message_batch.side_effect = error
+        with self.buffer() as buffer:
+            futures = [buffer.write('body'), buffer.write('body')]
+        self.assertEqual([f.exception() for f in futures], [error, error])
+
+    def test_unexpected_errors_fail_unsettled_messages(self):
+        def send_batch(queue, messages):
+            results = BatchResults(None)
+            results.results.append(entry(id=messages[0][0],
+                                         message_id='sqs-1',
+                                         message_md5='md5'))
+            # An id the request never had.
+            results.results.append(entry(id='99', message_id='sqs-2'))
+            return results
+
+        self.connection.send_message_batch.side_effect = send_batch
+        with self.buffer() as buffer:
+            futures = [buffer.write('body'), buffer.write('body')]
+        self.assertEqual(futures[0].exception(timeout=5), None)
+        self.assertIsInstance(futures[1].exception(timeout=5), IndexError)
+
+
+class TestMessageFuture(unittest.TestCase):
+    def test_callbacks(self):
+        future = MessageFuture('message')
+        seen = []
+        future.add_done_callback(seen.append)
+        self.assertEqual(seen, [])
+        future._finish()
+        self.assertEqual(seen, [future])
+        future.add_done_callback(seen.append)
+        self.assertEqual(seen, [future, future])
+        self.assertEqual(future.result(), 'message')
+
+    def test_result_timeout(self):
+        future = MessageFuture('message')
+        self.assertRaises(BotoClientError, future.result, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+import socket
+import sys
+import threading
+import time
+
+from tests.compat import mock, unittest
+
+from boto.exception import BotoServerError
+
+if sys.version_info >= (3, 5):
+    import asyncio
+    from boto.async_connection import AsyncAWSQueryConnection
+else:
+    asyncio = None
+
+
+class CannedHTTPServer(threading.Thread):
+    """
+    Answers HTTP requests on a local port with canned responses, in
+    order, and records the raw requests it received.
+    """
+    def __init__(self, responses, delay=0):
+        super(CannedHTTPServer, self).__init__()
+        self.daemon = True
+        self.responses = list(responses)
+        self.delay = delay
+        self.requests = []
+        self.connections = 0
+        self.sock = socket.socket()
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(5)
+        self.port = self.sock.getsockname()[1]
+
+    def run(self):
+        while self.responses:
+            conn, _ = self.sock.accept()
+            self.connections += 1
+            fp = conn.makefile('rb')
+            while self.responses:
+                request = self._read_request(fp)
+                if request is None:
+                    break
+                self.requests.append(request)
+                time.sleep(self.delay)
+                conn.sendall(self.responses.pop(0))
+            fp.close()
+            conn.close()
+        self.sock.close()
+
+    def _read_request(self, fp):
+        head = []
+        length = 0
+        while True:
+            line = fp.readline()
+            if not line:
+                return None
+            if line == b'\r\n':
+                break
+            head.append(line)
+            if line.lower().startswith(b'content-length:'):
+                length = int(line.split(b':', 1)[1])
+        return b''.join(head) + b'\r\n' + fp.read(length)
+
+
+def response(status, body, reason='OK'):
+    return ('HTTP/1.1 %d %s\r\nContent-Length: %d\r\n\r\n%s' % (
+        status, reason, len(body), body)).encode('utf-8')
+
+
+STATUS_BODY = '<Response><return>true</return></Response>'
+
+
+class MockAsyncService(AsyncAWSQueryConnection if asyncio else object):
+    APIVersion = '2012-01-01'
+
+    def _required_auth_capability(self):
+        return ['sign-v2']
+
+
+@unittest.skipIf(asyncio is None, 'asyncio requires Python 3.5 or later')
+class TestAsyncAWSQueryConnection(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.addCleanup(self.loop.close)
+        self.addCleanup(asyncio.set_event_loop, None)
+
+    def connect(self, responses, delay=0, **kwargs):
+        server = CannedHTTPServer(responses, delay)
+        server.start()
+        conn = MockAsyncService(aws_access_key_id='access_key',
+                                aws_secret_access_key='secret',
+                                host='127.0.0.1', port=server.port,
+                                is_secure=False, **kwargs)
+        self.addCleanup(conn.close)
+        return server, conn
+
+    def run_coroutine(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_get_status(self):
+        server, conn = self.connect([response(200, STATUS_BODY)])
+        status = self.run_coroutine(
+            conn.get_status('ModifyThing', {'Name': 'foo'}, verb='POST'))
+        self.assertTrue(status)
+        self.assertIn(b'POST / HTTP/1.1', server.requests[0])
+        self.assertIn(b'Action=ModifyThing', server.requests[0])
+        self.assertIn(b'Signature=', server.requests[0])
+
+    def test_connections_are_reused(self):
+        server, conn = self.connect([response(200, STATUS_BODY)] * 3)
+        for _ in range(3):
+            self.run_coroutine(conn.get_status('ModifyThing', {}))
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(server.connections, 1)
+
+    def test_concurrent_requests(self):
+        server, conn = self.connect([response(200, STATUS_BODY)] * 4,
+                                    max_connections_per_host=1)
+
+        results = self.run_coroutine(asyncio.gather(
+            *[conn.get_status('ModifyThing', {}) for _ in range(4)]))
+        self.assertEqual(results, [True] * 4)
+        self.assertEqual(server.connections, 1)
+
+    @mock.patch('random.random', mock.Mock(return_value=0))
+    def test_server_errors_are_retried(self):
+        server, conn = self.connect([response(500, 'oops', 'Error'),
+                                     response(200, STATUS_BODY)])
+        status = self.run_coroutine(conn.get_status('ModifyThing', {}))
+        self.assertTrue(status)
+        self.assertEqual(len(server.requests), 2)
+
+    @mock.patch('random.random', mock.Mock(return_value=0))
+    def test_stalled_responses_time_out(self):
+        # The first response never comes, so the request times out & is
+        # retried on a new connection.
+        server, conn = self.connect([b'', response(200, STATUS_BODY)],
+                                    max_connections_per_host=1)
+        conn._async_pool.timeout = 0.2
+        status = self.run_coroutine(conn.get_status('ModifyThing', {}))
+        self.assertTrue(status)
+        self.assertEqual(len(server.requests), 2)
+        self.assertEqual(server.connections, 2)
+
+    def test_timeout_applies_to_each_attempt(self):
+        # The requests take longer than the timeout in total, but none
+        # of them does on its own; waiting for the host's only slot is
+        # not counted.
+        server, conn = self.connect([response(200, STATUS_BODY)] * 3,
+                                    delay=0.15, max_connections_per_host=1)
+        conn._async_pool.timeout = 0.3
+        results = self.run_coroutine(asyncio.gather(
+            *[conn.get_status('ModifyThing', {}) for _ in range(3)]))
+        self.assertEqual(results, [True] * 3)
+        self.assertEqual(len(server.requests), 3)
+
+    def test_error_response_raises(self):
+        body = ('<Response><Errors><Error><Code>Throttled</Code>'
+                '</Error></Errors></Response>')
+        server, conn = self.connect([response(400, body, 'Bad Request')])
+        with self.assertRaises(BotoServerError) as cm:
+            self.run_coroutine(conn.get_status('ModifyThing', {}))
+        self.assertEqual(cm.exception.status, 400)
+        self.assertEqual(cm.exception.error_code, 'Throttled')
+
+
+if __name__ == '__main__':
+    unittest.main()
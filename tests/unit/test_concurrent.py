@@ -0,0 +1,79 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+import os
+import shutil
+import tempfile
+
+from tests.compat import unittest
+
+from boto.concurrent import ConcurrentTransferer, SQLiteStore
+
+
+class TestConcurrentTransferer(unittest.TestCase):
+    def test_map_runs_every_unit_of_work(self):
+        transferer = ConcurrentTransferer(num_threads=3)
+        results = dict(transferer._map(lambda n: n * 2, range(10)))
+        self.assertEqual(results, dict((n, n * 2) for n in range(10)))
+
+    def test_first_failure_is_raised(self):
+        def func(n):
+            if n == 3:
+                raise ValueError(n)
+            return n
+        transferer = ConcurrentTransferer(num_threads=2, num_retries=1,
+                                          time_between_retries=0)
+        with self.assertRaises(ValueError):
+            list(transferer._map(func, range(5)))
+
+
+class TestSQLiteStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'store.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_single_column_keys(self):
+        store = SQLiteStore(self.filename, 'things')
+        self.addCleanup(store.close)
+        self.assertIsNone(store.get('a'))
+        store.set('a', '1')
+        store.set('a', '2')
+        self.assertEqual(SQLiteStore(self.filename, 'things').get('a'), '2')
+        store.remove('a')
+        self.assertIsNone(store.get('a'))
+
+    def test_multi_column_keys(self):
+        store = SQLiteStore(self.filename, 'checkpoints',
+                            key_columns=('stream', 'shard'),
+                            value_column='sequence')
+        self.addCleanup(store.close)
+        store.set(('stream', 'shard-1'), '100')
+        store.set(('stream', 'shard-2'), '200')
+        self.assertEqual(store.get(('stream', 'shard-1')), '100')
+        self.assertEqual(store.get(('stream', 'shard-2')), '200')
+        self.assertIsNone(store.get(('other', 'shard-1')))
+
+
+if __name__ == '__main__':
+    unittest.main()
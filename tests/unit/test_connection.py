@@ -21,6 +21,8 @@
 #
 import os
 import socket
+import threading
+import time
 
 from tests.compat import mock, unittest
 from httpretty import HTTPretty
@@ -28,7 +30,8 @@ from httpretty import HTTPretty
 from boto import UserAgent
 from boto.compat import json, parse_qs
 from boto.connection import AWSQueryConnection, AWSAuthConnection, HTTPRequest
-from boto.exception import BotoServerError
+from boto.connection import ConnectionPool
+from boto.exception import BotoServerError, ConnectionPoolFullError
 from boto.regioninfo import RegionInfo
 
 
@@ -553,5 +556,196 @@ class TestHTTPRequest(unittest.TestCase):
         # example, assumes headers are of type str.)
         self.assertIsInstance(request.headers['Content-Length'], str)
 
+
+class TestConnectionPool(unittest.TestCase):
+    def ready_connection(self):
+        conn = mock.Mock()
+        conn._HTTPConnection__response = None
+        return conn
+
+    def test_counts_hits_and_misses(self):
+        pool = ConnectionPool()
+        self.assertIsNone(pool.get_http_connection('host', 443, True))
+        conn = self.ready_connection()
+        pool.put_http_connection('host', 443, True, conn)
+        self.assertIs(pool.get_http_connection('host', 443, True), conn)
+        stats = pool.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(pool.host_stats()[('host', 443, True)], stats)
+
+    def test_counts_stale_evictions(self):
+        pool = ConnectionPool()
+        pool.put_http_connection('host', 443, True, self.ready_connection())
+        with mock.patch('time.time', return_value=time.time() +
+                        ConnectionPool.STALE_DURATION + 1):
+            self.assertIsNone(pool.get_http_connection('host', 443, True))
+        self.assertEqual(pool.stats()['stale_evictions'], 1)
+
+    def test_stats_survive_removal_of_empty_pools(self):
+        pool = ConnectionPool()
+        pool.get_http_connection('host', 443, True)
+        pool.last_clean_time = 0
+        pool.clean()
+        self.assertEqual(pool.host_stats(), {})
+        self.assertEqual(pool.stats()['misses'], 1)
+
+    def test_fail_fast_when_host_is_full(self):
+        pool = ConnectionPool(max_requests_per_host=1, block=False)
+        pool.reserve('host', 443, True)
+        with self.assertRaises(ConnectionPoolFullError):
+            pool.reserve('host', 443, True)
+        # Other hosts have their own limit.
+        pool.reserve('other', 443, True)
+        pool.release('host', 443, True)
+        pool.reserve('host', 443, True)
+
+    def test_blocking_reserve_times_out(self):
+        pool = ConnectionPool(max_requests_per_host=1, timeout=0.01)
+        pool.reserve('host', 443, True)
+        with self.assertRaises(ConnectionPoolFullError):
+            pool.reserve('host', 443, True)
+
+    def test_blocking_reserve_waits_for_release(self):
+        pool = ConnectionPool(max_requests_per_host=1)
+        pool.reserve('host', 443, True)
+        reserved = threading.Event()
+
+        def reserve():
+            pool.reserve('host', 443, True)
+            reserved.set()
+
+        thread = threading.Thread(target=reserve)
+        thread.start()
+        self.assertFalse(reserved.wait(0.05))
+        pool.release('host', 443, True)
+        thread.join(5)
+        self.assertTrue(reserved.is_set())
+
+    def test_pools_with_waiters_are_not_retired(self):
+        pool = ConnectionPool(max_requests_per_host=1)
+        pool.reserve('host', 443, True)
+        pool.release('host', 443, True)
+        host_pool = pool.host_to_pool[('host', 443, True)]
+        host_pool.add_waiter()
+        pool.last_clean_time = 0
+        pool.clean()
+        self.assertIs(pool.host_to_pool[('host', 443, True)], host_pool)
+        self.assertTrue(host_pool.reserve())
+        pool.release('host', 443, True)
+        pool.last_clean_time = 0
+        pool.clean()
+        self.assertEqual(pool.host_stats(), {})
+        self.assertTrue(host_pool.retired)
+
+    @mock.patch('random.random', mock.Mock(return_value=0))
+    def test_slot_is_released_while_waiting_to_retry(self):
+        conn = AWSAuthConnection('mockservice.cc-zone-1.amazonaws.com',
+                                 aws_access_key_id='access_key',
+                                 aws_secret_access_key='secret')
+        conn._pool = ConnectionPool(max_requests_per_host=1, block=False)
+        http_connection = mock.Mock()
+        error = mock.Mock(status=500, reason='Error')
+        error.read.return_value = b''
+        ok = mock.Mock(status=200)
+        ok.getheader.return_value = None
+        http_connection.getresponse.side_effect = [error, ok]
+        request = conn.build_base_http_request('GET', '/', None)
+
+        def sleep(seconds):
+            # Raises ConnectionPoolFullError if the slot is still held.
+            conn._pool.reserve(request.host, request.port, conn.is_secure)
+            conn._pool.release(request.host, request.port, conn.is_secure)
+
+        with mock.patch.object(conn, 'get_http_connection',
+                               return_value=http_connection):
+            with mock.patch('time.sleep', side_effect=sleep) as mock_sleep:
+                self.assertIs(conn._mexe(request), ok)
+        self.assertEqual(mock_sleep.call_count, 1)
+
+    def test_tls_handshakes_counted_under_resolved_host(self):
+        conn = AWSAuthConnection('mockservice.cc-zone-1.amazonaws.com',
+                                 aws_access_key_id='access_key',
+                                 aws_secret_access_key='secret')
+        http_connection = mock.Mock()
+        http_connection.sock = None
+        with mock.patch('boto.https_connection.'
+                        'CertValidatingHTTPSConnection',
+                        return_value=http_connection):
+            conn.new_http_connection(None, 443, True).connect()
+        self.assertEqual(list(conn._pool.host_stats().keys()),
+                         [('mockservice.cc-zone-1.amazonaws.com', 443, True)])
+
+    def test_tls_handshakes_counted_after_connecting(self):
+        conn = AWSAuthConnection('mockservice.cc-zone-1.amazonaws.com',
+                                 aws_access_key_id='access_key',
+                                 aws_secret_access_key='secret')
+        http_connection = mock.Mock()
+        http_connection.sock = None
+        connect = http_connection.connect
+        connect.side_effect = [socket.error('refused'), None]
+        with mock.patch('boto.https_connection.'
+                        'CertValidatingHTTPSConnection',
+                        return_value=http_connection):
+            connection = conn.new_http_connection(None, 443, True)
+        self.assertEqual(conn._pool.stats()['tls_handshakes'], 0)
+        with self.assertRaises(socket.error):
+            connection.connect()
+        self.assertEqual(conn._pool.stats()['tls_handshakes'], 0)
+        connection.connect()
+        self.assertEqual(connect.call_count, 2)
+        self.assertEqual(conn._pool.stats()['tls_handshakes'], 1)
+
+    def test_host_pool_lock_is_not_global(self):
+        pool = ConnectionPool()
+        pool.put_http_connection('host', 443, True, self.ready_connection())
+        other = pool.host_to_pool[('host', 443, True)]
+        pool.last_clean_time = time.time()
+        with other.mutex:
+            # Another host's pool can be used while this one is locked.
+            self.assertIsNone(pool.get_http_connection('other', 443, True))
+
+    def test_retired_pools_are_replaced(self):
+        pool = ConnectionPool()
+        conn = self.ready_connection()
+        retired = pool._host_pool('host', 443, True)
+        # Retire and remove the pool as clean() does, but just after
+        # put_http_connection() has looked it up.
+        lookup = pool._host_pool
+
+        def retire_after_lookup(*args):
+            host_pool = lookup(*args)
+            if host_pool is retired and not retired.retired:
+                retired.retire()
+                del pool.host_to_pool[('host', 443, True)]
+            return host_pool
+
+        with mock.patch.object(pool, '_host_pool', retire_after_lookup):
+            pool.put_http_connection('host', 443, True, conn)
+        self.assertTrue(retired.retired)
+        self.assertEqual(retired.size(), 0)
+        self.assertIs(pool.get_http_connection('host', 443, True), conn)
+
+    def test_prewarm_connections(self):
+        conn = AWSAuthConnection('mockservice.cc-zone-1.amazonaws.com',
+                                 aws_access_key_id='access_key',
+                                 aws_secret_access_key='secret')
+        connects = []
+
+        def new_connection(*args, **kwargs):
+            http_connection = mock.Mock()
+            http_connection.sock = None
+            connects.append(http_connection.connect)
+            return http_connection
+
+        with mock.patch('boto.https_connection.'
+                        'CertValidatingHTTPSConnection',
+                        side_effect=new_connection):
+            self.assertEqual(conn.prewarm_connections(2), 2)
+        self.assertEqual([c.call_count for c in connects], [1, 1])
+        self.assertEqual(conn._pool.size(), 2)
+        self.assertEqual(conn._pool.stats()['tls_handshakes'], 2)
+
+
 if __name__ == '__main__':
     unittest.main()
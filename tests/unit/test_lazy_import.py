@@ -0,0 +1,118 @@
+# Copyright (c) 2015 Amazon.com, Inc. or its affiliates.  All Rights Reserved
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish, dis-
+# tribute, sublicense, and/or sell copies of the Software, and to permit
+# persons to whom the Software is furnished to do so, subject to the fol-
+# lowing conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABIL-
+# ITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT
+# SHALL THE AUTHOR BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+import os
+import subprocess
+import sys
+import tempfile
+import types
+
+import boto
+from boto.compat import lazy_import
+from boto.s3.user import User
+
+from tests.unit import unittest
+
+
+# Modules that importing boto and a service package should not load.
+HEAVY_MODULES = ['logging.config', 'platform', 'boto.s3.connection',
+                 'boto.s3.key']
+if sys.version_info >= (3, 7):
+    HEAVY_MODULES.extend(['boto.plugin', 'http.client', 'ssl',
+                          'urllib.request'])
+
+
+class TestLazyImport(unittest.TestCase):
+    def run_python(self, code):
+        fd, config = tempfile.mkstemp()
+        os.close(fd)
+        env = dict(os.environ, BOTO_CONFIG=config)
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))))
+        env['PYTHONPATH'] = os.pathsep.join(
+            [root] + [p for p in [os.environ.get('PYTHONPATH')] if p])
+        try:
+            process = subprocess.Popen([sys.executable, '-c', code], env=env,
+                                       stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE,
+                                       universal_newlines=True)
+            stdout, stderr = process.communicate()
+        finally:
+            os.remove(config)
+        self.assertEqual(process.returncode, 0, stderr)
+        return stdout.split()
+
+    def test_import_does_not_load_heavy_modules(self):
+        loaded = self.run_python(
+            'import sys, boto, boto.s3\n'
+            'print(" ".join(m for m in %r if m in sys.modules))' %
+            HEAVY_MODULES)
+        self.assertEqual(loaded, [])
+
+    @unittest.skipIf(sys.version_info < (3, 7),
+                     'module __getattr__ needs Python 3.7')
+    def test_submodules_resolved_on_first_access(self):
+        output = self.run_python(
+            'import boto\n'
+            'print(boto.ses.connection.SESConnection.__name__)\n'
+            'print(boto.emr.JarStep.__name__)\n'
+            'print(boto.ec2.EC2Connection.__name__)\n')
+        self.assertEqual(output, ['SESConnection', 'JarStep',
+                                  'EC2Connection'])
+
+    def test_submodules_loaded_eagerly_before_python_3_7(self):
+        # Pretend to be an older Python, where lazy_import cannot load
+        # submodules on access, so the ones boto has always loaded must
+        # still be loaded.
+        output = self.run_python(
+            'import sys\n'
+            'sys.version_info = (3, 6, 15, "final", 0)\n'
+            'import boto, boto.swf, boto.ec2\n'
+            'print(boto.s3.connect_to_region.__name__)\n'
+            'print(boto.swf.layer1.Layer1.__name__)\n'
+            'print(boto.plugin.__name__)\n'
+            'print(boto.ec2.EC2Connection.__name__)\n')
+        self.assertEqual(output, ['connect_to_region', 'Layer1',
+                                  'boto.plugin', 'EC2Connection'])
+
+    def test_storage_uri_function_is_not_shadowed(self):
+        uri = boto.storage_uri('s3://bucket/key')
+        self.assertEqual(uri.object_name, 'key')
+        self.assertTrue(callable(boto.storage_uri))
+
+    def test_lazy_attributes(self):
+        module = types.ModuleType('fake')
+        lazy_import(module.__dict__, {'User': 'boto.s3.user'})
+        self.assertIs(module.User, User)
+        self.assertIn('User', module.__dict__)
+        with self.assertRaises(AttributeError):
+            module.Missing
+
+    @unittest.skipIf(sys.version_info < (3, 7),
+                     'module __getattr__ needs Python 3.7')
+    def test_unknown_submodule_raises_attribute_error(self):
+        with self.assertRaises(AttributeError):
+            boto.no_such_service
+        self.assertFalse(hasattr(boto.s3, 'no_such_module'))
+
+
+if __name__ == '__main__':
+    unittest.main()
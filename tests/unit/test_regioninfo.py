@@ -26,6 +26,7 @@ import boto
 from boto.pyami.config import Config
 from boto.regioninfo import RegionInfo, load_endpoint_json, merge_endpoints
 from boto.regioninfo import load_regions, get_regions, connect
+from boto.regioninfo import _merge_endpoints_file
 
 from tests.unit import unittest
 
@@ -144,6 +145,21 @@ class TestEndpointLoading(unittest.TestCase):
         self.assertEqual(west_2.connection_cls, FakeConn)
 
 
+class TestEndpointsFile(unittest.TestCase):
+    def test_endpoints_file_is_merged_into_a_copy(self):
+        path = os.path.join(os.path.dirname(__file__), 'test_endpoints.json')
+        builtin = {'ec2': {'us-east-1': 'ec2.us-east-1.amazonaws.com'}}
+        cache = {}
+        merged = _merge_endpoints_file(builtin, path, _cache=cache)
+        self.assertEqual(merged['ec2']['test-1'], 'ec2.test-1.amazonaws.com')
+        self.assertEqual(builtin, {
+            'ec2': {'us-east-1': 'ec2.us-east-1.amazonaws.com'}})
+        with mock.patch('boto.regioninfo.load_endpoint_json') as load:
+            self.assertIs(_merge_endpoints_file(builtin, path, _cache=cache),
+                          merged)
+        self.assertFalse(load.called)
+
+
 class TestConnectToRegion(unittest.TestCase):
     def test_connect(self):
         connection = connect(
@@ -152,6 +168,10 @@ class TestConnectToRegion(unittest.TestCase):
         expected_endpoint = 'ec2.us-west-2.amazonaws.com'
         self.assertEqual(connection.region.endpoint, expected_endpoint)
 
+    def test_connect_unknown_service(self):
+        with self.assertRaises(boto.exception.BotoClientError):
+            connect('not-a-service', 'us-west-2', connection_cls=FakeConn)
+
     def test_does_not_use_heuristics_by_default(self):
         connection = connect(
             'ec2', 'us-southeast-43', connection_cls=FakeConn)
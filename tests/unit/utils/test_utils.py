@@ -25,6 +25,9 @@ import datetime
 import hashlib
 import hmac
 import locale
+import os
+import shutil
+import tempfile
 import time
 
 import boto.utils
@@ -413,5 +416,32 @@ class TestParseHost(unittest.TestCase):
         result = boto.utils.parse_host(host)
         self.assertEquals(result, host)
 
+
+class TestAtomicWrite(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.filename = os.path.join(self.directory, 'file.txt')
+
+    def test_replaces_the_file(self):
+        with open(self.filename, 'w') as f:
+            f.write('old')
+        with boto.utils.atomic_write(self.filename, permissions=0o644) as f:
+            f.write('new')
+        with open(self.filename) as f:
+            self.assertEqual(f.read(), 'new')
+        self.assertEqual(os.listdir(self.directory), ['file.txt'])
+
+    def test_failure_leaves_the_file_alone(self):
+        with open(self.filename, 'w') as f:
+            f.write('old')
+        with self.assertRaises(ValueError):
+            with boto.utils.atomic_write(self.filename) as f:
+                f.write('partial')
+                raise ValueError()
+        with open(self.filename) as f:
+            self.assertEqual(f.read(), 'old')
+        self.assertEqual(os.listdir(self.directory), ['file.txt'])
+
 if __name__ == '__main__':
     unittest.main()